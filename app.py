@@ -1,7 +1,40 @@
 """App principal do Gestor de Plantio."""
 
+from datetime import datetime
+
 import streamlit as st
 st.set_page_config(page_title="Gestor de Plantio", layout="wide")
 
+from utils.importacao import impressao_arquivo, ja_importado, marcar_importado
+from utils.projeto import CHAVES_PROJETO, exportar_projeto, importar_projeto
+
 st.title("Gestor de Plantio 🌱")
-st.markdown("Bem-vindo! Use o menu lateral para navegar entre as etapas do planejamento agrícola.")
\ No newline at end of file
+st.markdown("Bem-vindo! Use o menu lateral para navegar entre as etapas do planejamento agrícola.")
+
+# --- Projeto: cadastros e configurações da sessão num pacote Parquet ---
+st.markdown("### 💾 Projeto")
+col1, col2 = st.columns(2)
+with col1:
+    # O pacote é gerado numa thread do servidor, sem acesso ao session_state: vai uma cópia rasa
+    estado_projeto = {chave: st.session_state[chave] for chave in CHAVES_PROJETO if chave in st.session_state}
+    st.download_button(
+        "⬇️ Salvar projeto (pacote Parquet)",
+        lambda: exportar_projeto(estado_projeto),
+        file_name=f"projeto_gestor_plantio_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip",
+        mime="application/zip",
+        help="Plantios, receitas, despesas, empréstimos, curvas de preço e configurações de cenário."
+    )
+with col2:
+    arquivo_projeto = st.file_uploader("Abrir projeto salvo (.zip)", type=["zip"], key="upload_projeto")
+    if arquivo_projeto:
+        impressao = impressao_arquivo(arquivo_projeto)
+        if not ja_importado(st.session_state, "projeto", impressao):
+            try:
+                dados = importar_projeto(arquivo_projeto, st.session_state)
+                marcar_importado(st.session_state, "projeto", impressao)
+                st.success(
+                    f"Projeto aberto: {len(dados['plantios'])} plantios, {len(dados['despesas'])} despesas "
+                    f"e {len(dados['emprestimos'])} empréstimos."
+                )
+            except Exception as e:
+                st.error(f"Erro ao abrir o projeto: {e}")
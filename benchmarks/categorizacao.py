@@ -0,0 +1,145 @@
+"""
+Benchmark da categorização automática de despesas importadas (utils/categorizacao.py).
+
+Gera uma exportação de ERP sintética (descrições com acentos e variações de caixa, parte
+das linhas com conta contábil cadastrada) e mede `categorizar`, que varre cada descrição
+distinta uma vez com o autômato de Aho–Corasick das regras literais. Para comparação, mede
+também a abordagem ingênua de uma busca (`str.contains`) por regra sobre todas as linhas,
+cujo tempo cresce com o número de regras.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.categorizacao --linhas 100000 --descricoes 50000 --regras 200
+    python -m benchmarks.categorizacao --saida cat.json --comparar cat_anterior.json
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.relatorios import _medir, comparar_resultados
+from utils.categorizacao import (
+    COLUNA_CONTA,
+    COLUNA_PADRAO,
+    REGRAS_PADRAO,
+    _sem_acentos,
+    categorizar,
+)
+
+TERMOS = [
+    "Salário", "Férias", "FGTS", "Diesel S10", "Fertilizante", "Adubo NPK", "Herbicida", "Fungicida",
+    "Sementes", "Manutenção", "Peças", "Frete", "Energia elétrica", "Aluguel", "Seguro", "Contabilidade",
+    "Serviços diversos", "Tarifa bancária", "Material de escritório", "Consultoria",
+]
+
+
+def gerar_exportacao_erp(n_linhas=100_000, n_descricoes=50_000, n_regras=0, n_contas=200, seed=42):
+    """(tabela no formato da importação de despesas, regras) sintéticas."""
+    rng = np.random.default_rng(seed)
+    termos = rng.choice(TERMOS, n_descricoes)
+    descricoes = [f"{termo} NF {i:06d}".upper() if i % 3 == 0 else f"{termo} nf {i:06d}" for i, termo in enumerate(termos)]
+    contas = rng.integers(1000, 1000 + 4 * n_contas, n_linhas)
+    tabela = pd.DataFrame({
+        "Despesa": np.asarray(descricoes, dtype=object)[rng.integers(0, n_descricoes, n_linhas)],
+        COLUNA_CONTA: contas,
+        "Valor": rng.uniform(10, 50_000, n_linhas).round(2),
+    })
+    regras = {
+        # Um quarto dos códigos usados tem conta cadastrada
+        "contas": [
+            {COLUNA_CONTA: str(codigo), "Categoria": "Operacional", "Centro_Custo": ""}
+            for codigo in range(1000, 1000 + n_contas)
+        ],
+        # Regras extras que não casam, para medir o custo por regra
+        "palavras": REGRAS_PADRAO["palavras"] + [
+            {COLUNA_PADRAO: f"fornecedor{i:04d}|produto{i:04d}", "Categoria": "Operacional", "Centro_Custo": ""}
+            for i in range(n_regras)
+        ],
+    }
+    return tabela, regras
+
+
+def categorizar_por_regra(tabela, regras):
+    """Referência ingênua: uma busca sobre todas as linhas para cada regra de palavras."""
+    descricoes = tabela["Despesa"].astype(str).map(_sem_acentos)
+    categorias = pd.Series(np.nan, index=tabela.index, dtype=object)
+    for regra in regras["palavras"]:
+        casou = categorias.isna() & descricoes.str.contains(_sem_acentos(regra[COLUNA_PADRAO]), case=False, regex=True)
+        categorias[casou] = regra["Categoria"]
+    return categorias
+
+
+def executar_benchmark(tabela, regras, repeticoes=3):
+    """Mede `categorizar` e a referência por regra; conta as linhas que ficaram sem categoria."""
+    etapas = {}
+    for nome, funcao in [
+        ("categorizar", lambda: categorizar(tabela, regras)),
+        ("busca_por_regra", lambda: categorizar_por_regra(tabela, {"palavras": regras["palavras"]})),
+    ]:
+        resultado, tempos, pico = _medir(funcao, repeticoes)
+        etapas[nome] = {
+            "tempo_min_s": min(tempos),
+            "tempo_mediana_s": statistics.median(tempos),
+            "pico_memoria_bytes": pico,
+            "repeticoes": repeticoes,
+        }
+        if nome == "categorizar":
+            etapas[nome]["sem_categoria"] = int(resultado[1].sum())
+    return etapas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark da categorização automática de despesas")
+    parser.add_argument("--linhas", type=int, default=100_000)
+    parser.add_argument("--descricoes", type=int, default=50_000, help="Descrições distintas")
+    parser.add_argument("--regras", type=int, default=100, help="Regras de palavras extras (além das de referência)")
+    parser.add_argument("--contas", type=int, default=200, help="Contas contábeis cadastradas")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--saida", help="Arquivo JSON de saída (padrão: stdout)")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior para detectar regressões")
+    parser.add_argument("--tolerancia", type=float, default=0.25, help="Piora relativa aceitável ao comparar (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    parametros = {
+        "linhas": args.linhas,
+        "descricoes": args.descricoes,
+        "regras": args.regras,
+        "contas": args.contas,
+        "seed": args.seed,
+    }
+    tabela, regras = gerar_exportacao_erp(args.linhas, args.descricoes, args.regras, args.contas, args.seed)
+
+    resultado = {
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "parametros": parametros,
+        "etapas": executar_benchmark(tabela, regras, args.repeticoes),
+    }
+
+    codigo_saida = 0
+    if args.comparar:
+        with open(args.comparar, "r") as f:
+            anterior = json.load(f)
+        resultado["regressoes"] = comparar_resultados(resultado, anterior, args.tolerancia)
+        if resultado["regressoes"]:
+            codigo_saida = 1
+
+    texto = json.dumps(resultado, indent=2, ensure_ascii=False)
+    if args.saida:
+        with open(args.saida, "w") as f:
+            f.write(texto)
+    else:
+        print(texto)
+    return codigo_saida
+
+
+if __name__ == "__main__":
+    sys.exit(main())
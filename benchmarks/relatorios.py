@@ -0,0 +1,304 @@
+"""
+Benchmark da geração de relatórios do Gestor de Plantio.
+
+Gera fazendas sintéticas de tamanho configurável e mede cada etapa do pipeline
+(projeção de despesas, DRE, fluxo mensal, DRE por cultura, indicadores, Excel e PPT), com
+tempo e pico de memória por etapa. O resultado sai em JSON para ser comparado
+entre versões.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.relatorios --culturas 4 --plantios 40 --despesas 2000 --emprestimos 50
+    python -m benchmarks.relatorios --cenarios 12  # testes de estresse bancário
+    python -m benchmarks.relatorios --saida bench.json
+    python -m benchmarks.relatorios --comparar bench_anterior.json --tolerancia 0.25
+"""
+
+import argparse
+import json
+import logging
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from utils.agenda import ANO_FIM, ANO_INICIO, RECORRENCIA
+from utils.cenarios import COLUNA_NOME, cenarios_legados, nomes_cenarios, tabela_cenarios
+from utils.dre import calcular_dre_cenarios
+from utils.fluxo_mensal import fluxo_caixa_mensal
+from utils.gerador_dados import gerar_fazenda
+from utils.indicadores import (
+    calcular_dre_por_cultura_cenarios,
+    calcular_indicadores_cenarios,
+    calcular_indicadores_culturas_cenarios,
+    montar_cubo_sessao,
+)
+from utils.inflacao import CHAVE_INDICES, CHAVE_INDICES_CATEGORIA
+from utils.precos import CHAVE_CURVAS
+from utils.projecao import (
+    calcular_receitas_cenarios,
+    calcular_receitas_por_cultura_cenarios,
+    calcular_totais_plantio,
+    projetar_despesas,
+)
+from utils.relatorio_excel import criar_relatorio_excel_completo
+
+def gerar_fazenda_sintetica(n_culturas=3, n_plantios=10, n_despesas=200, n_emprestimos=10, n_anos=5, seed=42, n_cenarios=3):
+    """
+    Monta um estado de sessão sintético (cadastros + tabela de cenários).
+    Além de Projetado/Pessimista/Otimista, gera cenários de estresse até somar `n_cenarios`.
+    """
+    estado = gerar_fazenda(
+        n_plantios=n_plantios, n_despesas=n_despesas, n_emprestimos=n_emprestimos,
+        n_receitas=max(1, n_plantios // 10), n_anos=n_anos, n_culturas=n_culturas, seed=seed
+    )
+    rng = np.random.default_rng(seed)
+    estado.update({
+        "inflacoes": [float(x) for x in rng.uniform(3, 8, n_anos)],
+        "pess_receita": 15,
+        "pess_despesas": 10,
+        "otm_receita": 10,
+        "otm_despesas": 10,
+    })
+    cenarios = cenarios_legados(estado)
+    for i in range(max(0, n_cenarios - len(cenarios))):
+        cenarios.append({
+            COLUNA_NOME: f"Estresse {i + 1}",
+            "Receita (%)": float(rng.uniform(-30, 0)),
+            "Despesas (%)": float(rng.uniform(0, 25)),
+            "Preço (%)": float(rng.uniform(-20, 0)),
+            "Produtividade (%)": float(rng.uniform(-25, 0)),
+            "Inflação (p.p.)": float(rng.uniform(0, 4)),
+        })
+    estado["cenarios"] = cenarios
+    # Índices por categoria, para exercitar a correção de cada despesa pelo seu índice
+    estado[CHAVE_INDICES] = {nome: [float(x) for x in rng.uniform(2, 12, n_anos)] for nome in ("Diesel", "Salário Mínimo")}
+    estado[CHAVE_INDICES_CATEGORIA] = {"Operacional": "Diesel", "RH": "Salário Mínimo"}
+    # Curva de preço mensal para a primeira cultura (as demais seguem o preço cadastrado)
+    primeira = next(iter(estado["plantios"].values()))["cultura"]
+    estado[CHAVE_CURVAS] = [
+        {"Cultura": primeira, "Ano": f"Ano {j + 1}", "Mes": mes, "Preco": float(rng.uniform(80, 160))}
+        for j in range(n_anos) for mes in range(1, 13)
+    ]
+    # Um quarto das despesas com agenda (únicas, intervalos e recorrentes)
+    for despesa in estado["despesas"][::4]:
+        inicio = int(rng.integers(1, n_anos + 1))
+        despesa.update({
+            ANO_INICIO: inicio,
+            ANO_FIM: int(rng.integers(inicio, n_anos + 1)),
+            RECORRENCIA: int(rng.integers(1, 3)),
+        })
+    return estado
+
+
+def _medir(funcao, repeticoes):
+    """Executa `funcao` várias vezes e retorna (resultado, tempos, pico de memória em bytes)."""
+    tempos = []
+    resultado = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append(time.perf_counter() - inicio)
+
+    # Rodada separada para memória, para o tracemalloc não distorcer os tempos
+    tracemalloc.start()
+    funcao()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return resultado, tempos, pico
+
+
+def executar_benchmark(estado, repeticoes=3, incluir_ppt=True):
+    """Mede cada etapa do pipeline de relatórios para o `estado` informado."""
+    anos = estado["anos"]
+    inflacoes = estado["inflacoes"]
+    plantios = estado["plantios"]
+    cenarios = tabela_cenarios(estado)
+    nomes = nomes_cenarios(cenarios)
+    etapas = {}
+
+    def registrar(nome, funcao):
+        resultado, tempos, pico = _medir(funcao, repeticoes)
+        etapas[nome] = {
+            "tempo_min_s": min(tempos),
+            "tempo_mediana_s": statistics.median(tempos),
+            "pico_memoria_bytes": pico,
+            "repeticoes": repeticoes
+        }
+        return resultado
+
+    # --- Projeção de despesas (página 3) ---
+    df_fluxo, custos_por_cultura, rateio, _ = registrar("projecao_despesas", lambda: projetar_despesas(
+        estado["despesas"], estado["emprestimos"], plantios, anos, inflacoes,
+        estado.get(CHAVE_INDICES), estado.get(CHAVE_INDICES_CATEGORIA)
+    ))
+    estado["fluxo_caixa"] = df_fluxo
+    estado["custos_por_cultura"] = custos_por_cultura
+    estado["rateio_administrativo"] = rateio
+
+    # --- DRE consolidado (página 4) ---
+    hectares_total, total_sacas, preco_total = calcular_totais_plantio(plantios)
+    df_despesas_info = pd.DataFrame(estado["despesas"])
+    if df_despesas_info.empty:
+        df_despesas_info = pd.DataFrame(columns=["Categoria", "Valor"])
+
+    def etapa_dre():
+        receitas, receitas_extras = calcular_receitas_cenarios(
+            plantios, estado["receitas_adicionais"], anos, inflacoes, cenarios, estado.get(CHAVE_CURVAS)
+        )
+        return calcular_dre_cenarios(
+            cenarios, inflacoes, anos, receitas, receitas_extras, df_despesas_info, estado["emprestimos"],
+            estado.get(CHAVE_INDICES), estado.get(CHAVE_INDICES_CATEGORIA)
+        )
+
+    dre_cenarios = registrar("dre", etapa_dre)
+
+    # --- Fluxo de caixa mensal (página 4, opcional) ---
+    registrar("fluxo_mensal", lambda: {
+        nome: fluxo_caixa_mensal(dre_cenarios[nome], anos, plantios, estado["emprestimos"])
+        for nome in nomes
+    })
+
+    session_data = {
+        "plantios": plantios,
+        "dre_cenarios": dre_cenarios,
+        "anos": anos,
+        "cenarios": estado["cenarios"],
+        "inflacoes": inflacoes,
+        "hectares_total": hectares_total,
+        "total_sacas": total_sacas,
+        "preco_total_base": preco_total,
+        "total_ativos": hectares_total * 20000 + 1000000,
+        "custos_por_cultura": custos_por_cultura,
+    }
+
+    # --- DRE por cultura (página 5) ---
+    def etapa_dre_cultura():
+        session_data["receitas_por_cultura_cenarios"] = calcular_receitas_por_cultura_cenarios(
+            plantios, custos_por_cultura, anos, inflacoes, cenarios, estado.get(CHAVE_CURVAS)
+        )
+        cubo = montar_cubo_sessao(session_data, nomes)
+        return cubo, calcular_dre_por_cultura_cenarios(session_data, cubo)
+
+    cubo, dre_por_cultura = registrar("dre_por_cultura", etapa_dre_cultura)
+    estado["cubo_resultados"] = cubo
+    estado["dre_por_cultura_cenarios"] = dre_por_cultura
+    estado["receitas_por_cultura_cenarios"] = session_data["receitas_por_cultura_cenarios"]
+
+    # --- Indicadores (página 5) ---
+    def etapa_indicadores():
+        return (
+            calcular_indicadores_cenarios(dre_cenarios, nomes, session_data, cubo),
+            calcular_indicadores_culturas_cenarios(session_data, nomes, cubo),
+        )
+
+    all_indicators, indicadores_cultura = registrar("indicadores", etapa_indicadores)
+
+    df_culturas = pd.DataFrame([
+        {"Cultura": p["cultura"], "Receita Total": p["hectares"] * p["sacas_por_hectare"] * p["preco_saca"], "Área (ha)": p["hectares"]}
+        for p in plantios.values()
+    ]).groupby("Cultura", as_index=False).sum()
+
+    # --- Exportação Excel (página 5) ---
+    registrar("excel", lambda: criar_relatorio_excel_completo(
+        all_indicators, dre_cenarios, df_culturas, nomes, anos,
+        indicadores_cultura, None, None, estado, cubo
+    ))
+
+    # --- Exportação PPT ---
+    if incluir_ppt:
+        try:
+            import pptx  # noqa: F401
+        except ImportError:
+            etapas["ppt"] = {"indisponivel": "python-pptx não instalado"}
+        else:
+            import streamlit as st
+            from utils.ppt_generator import criar_relatorio_ppt_completo
+
+            # Streamlit em modo "bare" emite um aviso a cada chamada; não interessam aqui
+            logging.disable(logging.WARNING)
+            try:
+                # O gerador de PPT lê alguns dados direto do session_state
+                for chave in ["plantios", "dre_por_cultura_cenarios", "receitas_por_cultura_cenarios", "cubo_resultados", "cenarios"]:
+                    st.session_state[chave] = estado[chave]
+                registrar("ppt", lambda: criar_relatorio_ppt_completo(
+                    all_indicators, dre_cenarios, df_culturas, nomes, anos, indicadores_cultura
+                ))
+            finally:
+                logging.disable(logging.NOTSET)
+
+    return etapas
+
+
+def comparar_resultados(atual, anterior, tolerancia):
+    """Retorna a lista de etapas cujo tempo mínimo piorou além da tolerância (fração)."""
+    regressoes = []
+    for etapa, dados in atual["etapas"].items():
+        base = anterior.get("etapas", {}).get(etapa)
+        if not base or "tempo_min_s" not in base or "tempo_min_s" not in dados:
+            continue
+        variacao = dados["tempo_min_s"] / base["tempo_min_s"] - 1 if base["tempo_min_s"] > 0 else 0
+        if variacao > tolerancia:
+            regressoes.append({"etapa": etapa, "anterior_s": base["tempo_min_s"], "atual_s": dados["tempo_min_s"], "variacao": variacao})
+    return regressoes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark da geração de relatórios do Gestor de Plantio")
+    parser.add_argument("--culturas", type=int, default=3)
+    parser.add_argument("--plantios", type=int, default=10)
+    parser.add_argument("--despesas", type=int, default=200)
+    parser.add_argument("--emprestimos", type=int, default=10)
+    parser.add_argument("--anos", type=int, default=5, help="Horizonte da projeção em anos")
+    parser.add_argument("--cenarios", type=int, default=3, help="Número de cenários (os extras são de estresse)")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--sem-ppt", action="store_true", help="Não mede a exportação PPT")
+    parser.add_argument("--saida", help="Arquivo JSON de saída (padrão: stdout)")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior para detectar regressões")
+    parser.add_argument("--tolerancia", type=float, default=0.25, help="Piora relativa aceitável ao comparar (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    parametros = {
+        "culturas": args.culturas,
+        "plantios": args.plantios,
+        "despesas": args.despesas,
+        "emprestimos": args.emprestimos,
+        "anos": args.anos,
+        "cenarios": args.cenarios,
+        "seed": args.seed,
+    }
+    estado = gerar_fazenda_sintetica(args.culturas, args.plantios, args.despesas, args.emprestimos, args.anos, args.seed, args.cenarios)
+
+    resultado = {
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "parametros": parametros,
+        "etapas": executar_benchmark(estado, args.repeticoes, incluir_ppt=not args.sem_ppt),
+    }
+
+    codigo_saida = 0
+    if args.comparar:
+        with open(args.comparar, "r") as f:
+            anterior = json.load(f)
+        resultado["regressoes"] = comparar_resultados(resultado, anterior, args.tolerancia)
+        if resultado["regressoes"]:
+            codigo_saida = 1
+
+    texto = json.dumps(resultado, indent=2, ensure_ascii=False)
+    if args.saida:
+        with open(args.saida, "w") as f:
+            f.write(texto)
+    else:
+        print(texto)
+    return codigo_saida
+
+
+if __name__ == "__main__":
+    sys.exit(main())
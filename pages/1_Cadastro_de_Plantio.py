@@ -1,6 +1,16 @@
 import streamlit as st
+import os
 import uuid
 
+import pandas as pd
+
+from utils.gerador_dados import gerar_fazenda
+from utils.perf import executar_pagina
+from utils.pipeline import marcar_alterado
+from utils.precos import CHAVE_CURVAS, curvas_no_horizonte, ler_tabela_precos
+from utils.rotacao import SAFRAS, ano_inicial, conflitos_rotacao, indices_ocupados, tabela_rotacao
+from utils.session import carregar_na_sessao
+
 def main():
     # --- Funções Auxiliares ---
     def inicializar_dados():
@@ -10,8 +20,8 @@ def main():
         if 'receitas_adicionais' not in st.session_state:
             st.session_state['receitas_adicionais'] = {}
 
-    def adicionar_plantio(ano, cultura, hectares, sacas_por_hectare, preco_saca):
-        """Adiciona um novo plantio ao session_state."""
+    def adicionar_plantio(ano, cultura, hectares, sacas_por_hectare, preco_saca, talhao="", safra=SAFRAS[0], anos=None, regiao=""):
+        """Adiciona um novo plantio ao session_state (anos = anos da projeção em que ocupa o talhão)."""
         plantio_id = str(uuid.uuid4())[:8]
         st.session_state['plantios'][plantio_id] = {
             'ano': ano,
@@ -19,8 +29,13 @@ def main():
             'hectares': hectares,
             'sacas_por_hectare': sacas_por_hectare,
             'preco_saca': preco_saca,
+            'talhao': talhao,
+            'safra': safra,
+            'anos': anos if anos is not None else list(anos_disponiveis),
+            'regiao': regiao,
             'tipo': 'Plantio'
         }
+        marcar_alterado(st.session_state, 'plantios')
         return plantio_id
 
     def adicionar_receita_adicional(nome, valor, categoria, anos_aplicacao):
@@ -32,16 +47,22 @@ def main():
             'categoria': categoria,
             'anos_aplicacao': anos_aplicacao
         }
+        marcar_alterado(st.session_state, 'receitas_adicionais')
         return receita_id
 
-    def atualizar_plantio(pid, hectares, cultura, sacas_por_hectare, preco_saca):
+    def atualizar_plantio(pid, hectares, cultura, sacas_por_hectare, preco_saca, talhao, safra, anos, regiao=""):
         """Atualiza os dados de um plantio existente."""
         st.session_state['plantios'][pid].update({
             'hectares': hectares,
             'cultura': cultura,
             'sacas_por_hectare': sacas_por_hectare,
-            'preco_saca': preco_saca
+            'preco_saca': preco_saca,
+            'talhao': talhao,
+            'safra': safra,
+            'anos': anos,
+            'regiao': regiao
         })
+        marcar_alterado(st.session_state, 'plantios')
 
     def atualizar_receita_adicional(rid, nome, valor, categoria, anos_aplicacao):
         """Atualiza os dados de uma receita adicional existente."""
@@ -51,126 +72,213 @@ def main():
             'categoria': categoria,
             'anos_aplicacao': anos_aplicacao
         })
+        marcar_alterado(st.session_state, 'receitas_adicionais')
 
     def excluir_plantio(pid):
         """Exclui um plantio pelo ID."""
         del st.session_state['plantios'][pid]
+        marcar_alterado(st.session_state, 'plantios')
 
     def excluir_receita_adicional(rid):
         """Exclui uma receita adicional pelo ID."""
-        del st.session_state['receitas_adicionais'][rid,]
+        del st.session_state['receitas_adicionais'][rid]
+        marcar_alterado(st.session_state, 'receitas_adicionais')
+
+    def plantios_alterados():
+        """A tabela das curvas de preço, fora do fragmento, depende do ano inicial dos plantios."""
+        if st.session_state.get(CHAVE_CURVAS):
+            st.rerun()
 
     # --- Inicialização ---
     st.title("Cadastro de Plantio e Receitas 🌱")
     inicializar_dados()
+    anos_disponiveis = [f"Ano {i+1}" for i in range(5)]
+
+    # Cada cadastro (formulário + lista) é um fragmento: cadastrar e salvar alterações reexecutam só ele;
+    # excluir reexecuta a página
+    @st.fragment
+    def cadastro_plantios():
+        # --- Formulário de Cadastro de Plantio ---
+        st.markdown("### Adicionar Novo Plantio")
+        with st.form("form_plantio"):
+            ano = st.number_input("Ano do plantio", min_value=2000, max_value=2100, step=1, value=2025)
+            cultura = st.selectbox("Tipo de cultura", ["Soja", "Arroz", "Trigo", "Outros"])
+            hectares = st.number_input("Área plantada (hectares)", min_value=0.1, step=0.1, value=1200.0)
+            sacas_por_hectare = st.number_input("Produtividade (sacas/ha)", min_value=1.0, step=1.0, value=40.0)
+            preco_saca = st.number_input("Valor da saca (R$)", min_value=0.5, step=0.5, value=120.0)
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                talhao = st.text_input("Talhão", value="", help="Plantios no mesmo talhão formam a rotação de culturas.")
+            with col2:
+                safra = st.selectbox("Safra", SAFRAS)
+            with col3:
+                regiao = st.text_input("Região", value="", help="Usa a curva de preço desta região, se houver (coluna Regiao da tabela de preços).")
+            anos_ocupacao = st.multiselect(
+                "Anos de ocupação", anos_disponiveis, default=anos_disponiveis,
+                help="Anos da projeção em que este plantio ocupa o talhão (ex.: soja no Ano 1, trigo no Ano 2)."
+            )
+            submitted = st.form_submit_button("Cadastrar Plantio")
+
+            if submitted:
+                if not anos_ocupacao:
+                    st.warning("Selecione ao menos um ano de ocupação.")
+                else:
+                    plantio_id = adicionar_plantio(ano, cultura, hectares, sacas_por_hectare, preco_saca, talhao.strip(), safra, anos_ocupacao, regiao.strip())
+                    st.success(f"Plantio cadastrado com sucesso! (ID: {plantio_id})")
+                    plantios_alterados()
+
+        # --- Visualização e Edição de Plantios ---
+        if st.session_state['plantios']:
+            st.markdown("### Rotação de Culturas (Talhão × Ano)")
+            st.dataframe(tabela_rotacao(st.session_state['plantios'], anos_disponiveis), use_container_width=True)
+            conflitos = conflitos_rotacao(st.session_state['plantios'], anos_disponiveis)
+            if conflitos:
+                st.warning("Mais de um plantio na mesma posição: " + "; ".join(f"{t} / {s} / {a}" for t, s, a in conflitos))
+
+            st.markdown("### Plantios Cadastrados")
+            inicio = ano_inicial(st.session_state['plantios'])
+            for pid, dados in st.session_state['plantios'].items():
+                ocupados = [anos_disponiveis[i] for i in indices_ocupados(dados, anos_disponiveis, inicio)]
+                talhao_rotulo = f" - {dados['talhao']}" if dados.get('talhao') else ""
+                with st.expander(f"{dados['ano']} - {dados['cultura']}{talhao_rotulo} ({dados.get('safra', SAFRAS[0])})"):
+                    col1, col2 = st.columns(2)
+
+                    with col1:
+                        novo_hectares = st.number_input(
+                            f"Área (ha)", value=dados['hectares'], key=f"ha_{pid}"
+                        )
+                        opcoes_cultura = ["Soja", "Arroz", "Trigo", "Outros"]
+                        if dados['cultura'] not in opcoes_cultura:
+                            opcoes_cultura.append(dados['cultura'])
+                        nova_cultura = st.selectbox(
+                            f"Cultura",
+                            opcoes_cultura,
+                            index=opcoes_cultura.index(dados['cultura']),
+                            key=f"cult_{pid}"
+                        )
+
+                    with col2:
+                        nova_sacas = st.number_input(
+                            f"Sacas/ha", value=dados['sacas_por_hectare'], key=f"sph_{pid}"
+                        )
+                        novo_preco = st.number_input(
+                            f"Preço saca (R$)", value=dados['preco_saca'], key=f"ps_{pid}"
+                        )
+
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        novo_talhao = st.text_input("Talhão", value=dados.get('talhao', ""), key=f"talhao_{pid}")
+                        nova_safra = st.selectbox(
+                            "Safra", SAFRAS, index=SAFRAS.index(dados.get('safra', SAFRAS[0])), key=f"safra_{pid}"
+                        )
+                    with col2:
+                        novos_anos = st.multiselect("Anos de ocupação", anos_disponiveis, default=ocupados, key=f"anos_{pid}")
+                        nova_regiao = st.text_input("Região", value=dados.get('regiao', ""), key=f"regiao_{pid}")
+
+                    col1, col2 = st.columns([1, 1])
+                    with col1:
+                        if st.button("💾 Salvar alterações", key=f"save_{pid}"):
+                            atualizar_plantio(pid, novo_hectares, nova_cultura, nova_sacas, novo_preco, novo_talhao.strip(), nova_safra, novos_anos, nova_regiao.strip())
+                            st.success(f"Plantio {pid} atualizado com sucesso!")
+                            plantios_alterados()
+
+                    with col2:
+                        if st.button("🗑️ Excluir", key=f"delete_{pid}"):
+                            excluir_plantio(pid)
+                            st.success(f"Plantio {pid} excluído.")
+                            st.rerun()
+
 
-    # --- Formulário de Cadastro de Plantio ---
-    st.markdown("### Adicionar Novo Plantio")
-    with st.form("form_plantio"):
-        ano = st.number_input("Ano do plantio", min_value=2000, max_value=2100, step=1, value=2025)
-        cultura = st.selectbox("Tipo de cultura", ["Soja", "Arroz", "Trigo", "Outros"])
-        hectares = st.number_input("Área plantada (hectares)", min_value=0.1, step=0.1, value=1200.0)
-        sacas_por_hectare = st.number_input("Produtividade (sacas/ha)", min_value=1.0, step=1.0, value=40.0)
-        preco_saca = st.number_input("Valor da saca (R$)", min_value=0.5, step=0.5, value=120.0)
-        submitted = st.form_submit_button("Cadastrar Plantio")
-
-        if submitted:
-            plantio_id = adicionar_plantio(ano, cultura, hectares, sacas_por_hectare, preco_saca)
-            st.success(f"Plantio cadastrado com sucesso! (ID: {plantio_id})")
-
-    # --- Formulário de Cadastro de Receitas Adicionais ---
-    st.markdown("### Adicionar Nova Receita Adicional")
-    with st.form("form_receita_adicional"):
-        nome_receita = st.text_input("Nome da Receita (ex: Venda de Gado, Empréstimo)", value="")
-        valor_receita = st.number_input("Valor Anual (R$)", min_value=0.0, step=100.0, value=0.0)
-        categoria_receita = st.selectbox("Categoria", ["Operacional", "Extra Operacional"])
-        anos_disponiveis = [f"Ano {i+1}" for i in range(5)]
-        anos_aplicacao = st.multiselect("Anos de Aplicação", anos_disponiveis, default=anos_disponiveis)
-        submitted_receita = st.form_submit_button("Cadastrar Receita")
-
-        if submitted_receita:
-            if not nome_receita or valor_receita <= 0 or not anos_aplicacao:
-                st.warning("Preencha todos os campos corretamente.")
-            else:
-                receita_id = adicionar_receita_adicional(nome_receita, valor_receita, categoria_receita, anos_aplicacao)
-                st.success(f"Receita adicional cadastrada com sucesso! (ID: {receita_id})")
-
-    # --- Visualização e Edição de Plantios ---
-    if st.session_state['plantios']:
-        st.markdown("### Plantios Cadastrados")
-        for pid, dados in st.session_state['plantios'].items():
-            with st.expander(f"{dados['ano']} - {dados['cultura']}"):
-                col1, col2 = st.columns(2)
-
-                with col1:
-                    novo_hectares = st.number_input(
-                        f"Área (ha)", value=dados['hectares'], key=f"ha_{pid}"
-                    )
-                    nova_cultura = st.selectbox(
-                        f"Cultura",
-                        ["Soja", "Arroz", "Trigo", "Outros"],
-                        index=["Soja", "Arroz", "Trigo", "Outros"].index(dados['cultura']),
-                        key=f"cult_{pid}"
-                    )
-
-                with col2:
-                    nova_sacas = st.number_input(
-                        f"Sacas/ha", value=dados['sacas_por_hectare'], key=f"sph_{pid}"
-                    )
-                    novo_preco = st.number_input(
-                        f"Preço saca (R$)", value=dados['preco_saca'], key=f"ps_{pid}"
-                    )
-
-                col1, col2 = st.columns([1, 1])
-                with col1:
-                    if st.button("💾 Salvar alterações", key=f"save_{pid}"):
-                        atualizar_plantio(pid, novo_hectares, nova_cultura, nova_sacas, novo_preco)
-                        st.success(f"Plantio {pid} atualizado com sucesso!")
-
-                with col2:
-                    if st.button("🗑️ Excluir", key=f"delete_{pid}"):
-                        excluir_plantio(pid)
-                        st.success(f"Plantio {pid} excluído.")
-                        st.rerun()
-
-    # --- Visualização e Edição de Receitas Adicionais ---
-    if st.session_state['receitas_adicionais']:
-        st.markdown("### Receitas Adicionais Cadastradas")
-        for rid, dados in st.session_state['receitas_adicionais'].items():
-            with st.expander(f"{dados['nome']} ({dados['categoria']})"):
-                col1, col2 = st.columns(2)
-
-                with col1:
-                    novo_nome = st.text_input("Nome da Receita", value=dados['nome'], key=f"nome_{rid}")
-                    novo_valor = st.number_input(
-                        "Valor Anual (R$)", min_value=0.0, step=100.0, value=dados['valor'], key=f"valor_{rid}"
-                    )
-
-                with col2:
-                    nova_categoria = st.selectbox(
-                        "Categoria",
-                        ["Operacional", "Extra Operacional"],
-                        index=["Operacional", "Extra Operacional"].index(dados['categoria']),
-                        key=f"cat_{rid}"
-                    )
-                    novos_anos = st.multiselect(
-                        "Anos de Aplicação",
-                        anos_disponiveis,
-                        default=dados['anos_aplicacao'],
-                        key=f"anos_{rid}"
-                    )
-
-                col1, col2 = st.columns([1, 1])
-                with col1:
-                    if st.button("💾 Salvar alterações", key=f"save_rec_{rid}"):
-                        atualizar_receita_adicional(rid, novo_nome, novo_valor, nova_categoria, novos_anos)
-                        st.success(f"Receita {rid} atualizada com sucesso!")
-
-                with col2:
-                    if st.button("🗑️ Excluir", key=f"delete_rec_{rid}"):
-                        excluir_receita_adicional(rid)
-                        st.success(f"Receita {rid} excluída.")
-                        st.rerun()
+    @st.fragment
+    def cadastro_receitas():
+        # --- Formulário de Cadastro de Receitas Adicionais ---
+        st.markdown("### Adicionar Nova Receita Adicional")
+        with st.form("form_receita_adicional"):
+            nome_receita = st.text_input("Nome da Receita (ex: Venda de Gado, Empréstimo)", value="")
+            valor_receita = st.number_input("Valor Anual (R$)", min_value=0.0, step=100.0, value=0.0)
+            categoria_receita = st.selectbox("Categoria", ["Operacional", "Extra Operacional"])
+            anos_aplicacao = st.multiselect("Anos de Aplicação", anos_disponiveis, default=anos_disponiveis)
+            submitted_receita = st.form_submit_button("Cadastrar Receita")
+
+            if submitted_receita:
+                if not nome_receita or valor_receita <= 0 or not anos_aplicacao:
+                    st.warning("Preencha todos os campos corretamente.")
+                else:
+                    receita_id = adicionar_receita_adicional(nome_receita, valor_receita, categoria_receita, anos_aplicacao)
+                    st.success(f"Receita adicional cadastrada com sucesso! (ID: {receita_id})")
+
+        # --- Visualização e Edição de Receitas Adicionais ---
+        if st.session_state['receitas_adicionais']:
+            st.markdown("### Receitas Adicionais Cadastradas")
+            for rid, dados in st.session_state['receitas_adicionais'].items():
+                with st.expander(f"{dados['nome']} ({dados['categoria']})"):
+                    col1, col2 = st.columns(2)
+
+                    with col1:
+                        novo_nome = st.text_input("Nome da Receita", value=dados['nome'], key=f"nome_{rid}")
+                        novo_valor = st.number_input(
+                            "Valor Anual (R$)", min_value=0.0, step=100.0, value=dados['valor'], key=f"valor_{rid}"
+                        )
+
+                    with col2:
+                        nova_categoria = st.selectbox(
+                            "Categoria",
+                            ["Operacional", "Extra Operacional"],
+                            index=["Operacional", "Extra Operacional"].index(dados['categoria']),
+                            key=f"cat_{rid}"
+                        )
+                        novos_anos = st.multiselect(
+                            "Anos de Aplicação",
+                            anos_disponiveis,
+                            default=dados['anos_aplicacao'],
+                            key=f"anos_{rid}"
+                        )
+
+                    col1, col2 = st.columns([1, 1])
+                    with col1:
+                        if st.button("💾 Salvar alterações", key=f"save_rec_{rid}"):
+                            atualizar_receita_adicional(rid, novo_nome, novo_valor, nova_categoria, novos_anos)
+                            st.success(f"Receita {rid} atualizada com sucesso!")
+
+                    with col2:
+                        if st.button("🗑️ Excluir", key=f"delete_rec_{rid}"):
+                            excluir_receita_adicional(rid)
+                            st.success(f"Receita {rid} excluída.")
+                            st.rerun()
+
+
+    cadastro_plantios()
+
+    # --- Curvas de Preço por Cultura ---
+    with st.expander("📈 Curvas de Preço por Cultura"):
+        st.caption(
+            "Tabela com as colunas Cultura, Ano e Preco (R$/saca) e, opcionalmente, Mes (linhas mensais "
+            "viram a média do ano) e Regiao (plantios da região usam essa curva; os demais, a curva sem região). "
+            "Ano é o ano-calendário ou \"Ano N\". Culturas com curva usam o preço "
+            "da curva em cada ano, interpolado entre os anos informados; as demais, o valor da saca cadastrado "
+            "corrigido pela inflação."
+        )
+        modelo = pd.DataFrame({"Cultura": ["Soja", "Soja", "Soja"], "Ano": [2025, 2026, 2028], "Preco": [120.0, 125.0, 135.0]})
+        st.download_button("⬇️ Baixar Modelo de Curvas", modelo.to_csv(index=False), file_name="modelo_curvas_precos.csv")
+
+        arquivo_precos = st.file_uploader("Upload da tabela de preços (.csv ou .xlsx)", type=["csv", "xlsx"], key="upload_curvas_precos")
+        # Importa cada arquivo uma vez (remover as curvas não deve reimportar o arquivo ainda selecionado)
+        if arquivo_precos is not None and st.session_state.get("curvas_precos_arquivo") != arquivo_precos.file_id:
+            try:
+                st.session_state[CHAVE_CURVAS] = ler_tabela_precos(arquivo_precos).to_dict(orient="records")
+                st.session_state["curvas_precos_arquivo"] = arquivo_precos.file_id
+            except Exception as e:
+                st.error(f"Erro ao ler tabela de preços: {e}")
+
+        if st.session_state.get(CHAVE_CURVAS):
+            st.markdown("**Preço da saca por ano da projeção (R$)**")
+            curvas = curvas_no_horizonte(st.session_state[CHAVE_CURVAS], anos_disponiveis, ano_inicial(st.session_state['plantios']))
+            st.dataframe(curvas.style.format("R$ {:,.2f}"), use_container_width=True)
+            if st.button("Remover curvas de preço"):
+                st.session_state[CHAVE_CURVAS] = []
+                st.rerun()
+
+    cadastro_receitas()
 
     # --- Botão "Limpar Tudo" ---
     st.markdown("---")
@@ -181,5 +289,26 @@ def main():
         st.success("Todos os plantios e receitas foram removidos!")
         st.rerun()
 
+    # --- Dados sintéticos para teste de carga (somente com GESTOR_PLANTIO_MODO_TESTE=1) ---
+    if os.environ.get("GESTOR_PLANTIO_MODO_TESTE") == "1":
+        with st.expander("🧪 Gerar dados sintéticos (teste de carga)"):
+            st.warning("Substitui todos os plantios, receitas, despesas e empréstimos da sessão.")
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                n_plantios = st.number_input("Plantios", min_value=1, value=50, step=10)
+            with col2:
+                n_despesas = st.number_input("Despesas", min_value=0, value=2000, step=500)
+            with col3:
+                n_emprestimos = st.number_input("Empréstimos", min_value=0, value=100, step=50)
+            with col4:
+                n_receitas = st.number_input("Receitas adicionais", min_value=0, value=10, step=5)
+            seed = st.number_input("Semente aleatória", min_value=0, value=42, step=1)
+
+            if st.button("Gerar e carregar na sessão"):
+                dados = gerar_fazenda(int(n_plantios), int(n_despesas), int(n_emprestimos), int(n_receitas), seed=int(seed))
+                carregar_na_sessao(dados)
+                st.success(f"{len(dados['plantios'])} plantios, {len(dados['despesas'])} despesas e {len(dados['emprestimos'])} empréstimos carregados.")
+                st.rerun()
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    executar_pagina("Cadastro de Plantio", main)
@@ -1,6 +1,19 @@
 import streamlit as st
 import json
 import os
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from utils.cenarios import CHAVE_CENARIOS, COLUNA_NOME, COLUNAS_AJUSTE, normalizar_cenarios, tabela_cenarios
+from utils.dre import CATEGORIAS_DRE
+from utils.impostos import BASES, CHAVE_IMPOSTOS, COLUNAS_REGRA, REGIMES, configuracao_impostos, configuracao_regime
+from utils.inflacao import CHAVE_INDICES, CHAVE_INDICES_CATEGORIA, INDICE_GERAL
+from utils.perf import executar_pagina
+from utils.precos import CHAVE_CURVAS
+from utils.varredura import grade_para_tabela, varrer_cenarios
 
 st.set_page_config(layout="wide", page_title="Configurações de Cenário")
 st.title("⚙️ Configurações de Cenário e Inflação")
@@ -30,16 +43,30 @@ def main():
         if key not in st.session_state:
             st.session_state[key] = value
 
+    def salvar_configuracoes():
+        """Grava no config.json os parâmetros desta página."""
+        chaves = [*defaults.keys(), CHAVE_CENARIOS, CHAVE_INDICES, CHAVE_INDICES_CATEGORIA, CHAVE_IMPOSTOS]
+        with open(CONFIG_PATH, "w") as f:
+            json.dump({k: st.session_state.get(k, defaults.get(k)) for k in chaves}, f)
+
     # Interface de ajustes
     with st.form("form_configuracoes"):
-        st.subheader("📉 Ajustes de Cenário")
-        col1, col2 = st.columns(2)
-        with col1:
-            pess_receita = st.number_input("Pessimista: Receita - redução (%)", 0, 50, value=st.session_state.get("pess_receita", 15), key="input_pess_receita")
-            pess_despesas = st.number_input("Pessimista: Despesas - aumento (%)", 0, 50, value=st.session_state.get("pess_despesas", 10), key="input_pess_despesas")
-        with col2:
-            otm_receita = st.number_input("Otimista: Receita - aumento (%)", 0, 50, value=st.session_state.get("otm_receita", 10), key="input_otm_receita")
-            otm_despesas = st.number_input("Otimista: Despesas - redução (%)", 0, 50, value=st.session_state.get("otm_despesas", 10), key="input_otm_despesas")
+        st.subheader("📉 Cenários")
+        st.caption(
+            "Cada linha é um cenário avaliado em todas as páginas. Ajustes em % sobre o caso base "
+            "(negativo reduz); inflação em pontos percentuais somados à inflação de cada ano."
+        )
+        tabela = st.data_editor(
+            tabela_cenarios(st.session_state),
+            num_rows="dynamic",
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                COLUNA_NOME: st.column_config.TextColumn(COLUNA_NOME, required=True),
+                **{coluna: st.column_config.NumberColumn(coluna, min_value=-100.0, max_value=500.0, step=0.5, format="%.1f") for coluna in COLUNAS_AJUSTE},
+            },
+            key="editor_cenarios"
+        )
 
         st.subheader("📈 Inflação Projetada por Ano")
         cols = st.columns(5)
@@ -49,19 +76,179 @@ def main():
                 inflacao_ano = st.number_input(f"Ano {i+1}", min_value=0.0, max_value=100.0, value=st.session_state.get(f"inf_{i}", 4.0), key=f"input_inf_{i}")
                 inflacoes.append(inflacao_ano)
 
+        st.subheader("🧾 Índices de Inflação por Categoria")
+        st.caption(
+            f"Índices específicos (ex.: IPCA, IGP-M, Diesel, Fertilizantes, Salário Mínimo), em % ao ano. "
+            f"Cada categoria de despesa usa o índice escolhido abaixo; \"{INDICE_GERAL}\" é a inflação acima. "
+            "Índices novos ficam disponíveis para as categorias depois de salvar."
+        )
+        colunas_anos = [f"Ano {i+1}" for i in range(5)]
+        indices_salvos = st.session_state.get(CHAVE_INDICES) or {}
+        tabela_indices = st.data_editor(
+            pd.DataFrame(
+                [[nome, *taxas] for nome, taxas in indices_salvos.items()],
+                columns=["Índice", *colunas_anos]
+            ),
+            num_rows="dynamic",
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "Índice": st.column_config.TextColumn("Índice", required=True),
+                **{coluna: st.column_config.NumberColumn(coluna, min_value=-50.0, max_value=100.0, step=0.1, format="%.2f") for coluna in colunas_anos},
+            },
+            key="editor_indices"
+        )
+        opcoes_indice = [INDICE_GERAL, *indices_salvos]
+        mapeamento_salvo = st.session_state.get(CHAVE_INDICES_CATEGORIA) or {}
+        indices_por_categoria = {}
+        cols = st.columns(len(CATEGORIAS_DRE))
+        for col, categoria in zip(cols, CATEGORIAS_DRE.values()):
+            with col:
+                atual = mapeamento_salvo.get(categoria, INDICE_GERAL)
+                indices_por_categoria[categoria] = st.selectbox(
+                    categoria, opcoes_indice, index=opcoes_indice.index(atual) if atual in opcoes_indice else 0,
+                    key=f"indice_categoria_{categoria}"
+                )
+
         if st.form_submit_button("Salvar Configurações"):
-            st.session_state["pess_receita"] = pess_receita
-            st.session_state["pess_despesas"] = pess_despesas
-            st.session_state["otm_receita"] = otm_receita
-            st.session_state["otm_despesas"] = otm_despesas
+            try:
+                cenarios = normalizar_cenarios(tabela)
+            except ValueError as e:
+                st.error(str(e))
+                st.stop()
+            if cenarios.empty:
+                st.error("Cadastre ao menos um cenário.")
+                st.stop()
+            st.session_state[CHAVE_CENARIOS] = cenarios.to_dict("records")
+
+            tabela_indices = tabela_indices.dropna(subset=["Índice"])
+            tabela_indices["Índice"] = tabela_indices["Índice"].astype(str).str.strip()
+            tabela_indices = tabela_indices[(tabela_indices["Índice"] != "") & (tabela_indices["Índice"] != INDICE_GERAL)]
+            if tabela_indices["Índice"].duplicated().any():
+                st.error("Há índices com o mesmo nome.")
+                st.stop()
+            st.session_state[CHAVE_INDICES] = {
+                linha["Índice"]: [float(linha[coluna]) if pd.notna(linha[coluna]) else 0.0 for coluna in colunas_anos]
+                for _, linha in tabela_indices.iterrows()
+            }
+            # Categoria apontando para um índice removido volta ao Geral
+            st.session_state[CHAVE_INDICES_CATEGORIA] = {
+                categoria: indice for categoria, indice in indices_por_categoria.items()
+                if indice in st.session_state[CHAVE_INDICES]
+            }
 
             for i in range(5):
                 st.session_state[f"inf_{i}"] = inflacoes[i]
 
-            with open(CONFIG_PATH, "w") as f:
-                json.dump({k: st.session_state[k] for k in defaults.keys()}, f)
-
+            salvar_configuracoes()
             st.success("Configurações salvas com sucesso. As projeções já podem ser utilizadas nas demais páginas.")
 
+    # --- Regime tributário ---
+    st.subheader("🧾 Regime Tributário")
+    atual = configuracao_impostos(st.session_state)
+    regimes = list(REGIMES)
+    regime = st.selectbox(
+        "Regime", regimes, index=regimes.index(atual["regime"]) if atual["regime"] in regimes else 0,
+        key="regime_tributario_select"
+    )
+    # Trocar de regime carrega as alíquotas de referência; o regime salvo mantém as editadas
+    config = atual if regime == atual["regime"] else configuracao_regime(regime)
+    with st.form("form_impostos"):
+        st.caption(
+            "Alíquotas em % por ano. Base Receita e Folha (Despesas RH) formam os Impostos Sobre Venda; "
+            "base Lucro (lucro operacional) forma os Impostos Sobre Resultado, no DRE e em cada cultura."
+        )
+        colunas_anos = [f"Ano {i+1}" for i in range(5)]
+        regras = st.data_editor(
+            pd.DataFrame(config["regras"], columns=[*COLUNAS_REGRA, *colunas_anos]),
+            num_rows="dynamic",
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "Tributo": st.column_config.TextColumn("Tributo", required=True),
+                "Base": st.column_config.SelectboxColumn("Base", options=BASES, required=True),
+                **{coluna: st.column_config.NumberColumn(coluna, min_value=0.0, max_value=100.0, step=0.05, format="%.2f") for coluna in colunas_anos},
+            },
+            key=f"editor_impostos_{regime}"
+        )
+        compensacao = st.number_input(
+            "Compensação de prejuízos (% do lucro do ano)", min_value=0.0, max_value=100.0, step=5.0,
+            value=float(config.get("compensacao") or 0.0), key=f"compensacao_{regime}",
+            help="0 = sem compensação; 30 = limite do Lucro Real; 100 = compensação integral."
+        )
+        if st.form_submit_button("Salvar Regime Tributário"):
+            regras = regras.dropna(subset=COLUNAS_REGRA)
+            regras[colunas_anos] = regras[colunas_anos].fillna(0.0)
+            st.session_state[CHAVE_IMPOSTOS] = {
+                "regime": regime, "regras": regras.to_dict("records"), "compensacao": compensacao
+            }
+            salvar_configuracoes()
+            st.success(f"Regime {regime} salvo.")
+
+    exibir_varredura()
+
+
+def mapa_calor(tabela, titulo, escala, formato):
+    """Mapa de calor de uma grade (corte de receita × aumento de despesas)."""
+    fig = go.Figure(go.Heatmap(
+        z=tabela.to_numpy(),
+        x=tabela.columns,
+        y=tabela.index,
+        colorscale=escala,
+        hovertemplate=f"Aumento de despesas: %{{x}}%<br>Corte de receita: %{{y}}%<br>{titulo}: %{{z:{formato}}}<extra></extra>"
+    ))
+    fig.update_layout(
+        title=titulo,
+        xaxis_title=tabela.columns.name,
+        yaxis_title=tabela.index.name,
+        height=450
+    )
+    return fig
+
+
+def exibir_varredura():
+    """Modo varredura: DRE de uma grade de cortes de receita × aumentos de despesas, em mapas de calor."""
+    st.subheader("🔥 Varredura de Cenários")
+    if not st.toggle("Ativar modo varredura", key="modo_varredura"):
+        return
+    if not st.session_state.get("plantios"):
+        st.info("Cadastre ao menos um plantio para usar a varredura.")
+        return
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        corte_max = st.slider("Corte máximo de receita (%)", 5, 80, 30, key="varredura_corte_max")
+    with col2:
+        aumento_max = st.slider("Aumento máximo de despesas (%)", 5, 80, 30, key="varredura_aumento_max")
+    with col3:
+        pontos = st.slider("Pontos por eixo", 10, 100, 50, key="varredura_pontos")
+
+    cortes = np.linspace(0, corte_max, pontos)
+    aumentos = np.linspace(0, aumento_max, pontos)
+    anos = [f"Ano {i+1}" for i in range(5)]
+    inflacoes = [st.session_state.get(f"inf_{i}", 4.0) for i in range(5)]
+    despesas_info = pd.DataFrame(st.session_state.get("despesas", []))
+    if despesas_info.empty or "Categoria" not in despesas_info.columns:
+        despesas_info = pd.DataFrame(columns=["Categoria", "Valor"])
+
+    inicio = time.perf_counter()
+    grade = varrer_cenarios(
+        st.session_state["plantios"], st.session_state.get("receitas_adicionais", {}), despesas_info,
+        st.session_state.get("emprestimos", []), anos, inflacoes, cortes, aumentos,
+        st.session_state.get(CHAVE_INDICES), st.session_state.get(CHAVE_INDICES_CATEGORIA),
+        st.session_state.get(CHAVE_CURVAS), configuracao_impostos(st.session_state)
+    )
+    duracao = time.perf_counter() - inicio
+    st.caption(f"{pontos * pontos} combinações calculadas em {duracao * 1000:.0f} ms (inflação salva e despesas cadastradas).")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        lucro = grade_para_tabela(grade["lucro_final"], cortes, aumentos)
+        st.plotly_chart(mapa_calor(lucro, f"Lucro Líquido - {anos[-1]} (R$)", "RdYlGn", ",.0f"), use_container_width=True)
+    with col2:
+        # DSCR infinito (sem parcelas de empréstimo) fica em branco no mapa
+        dscr = grade_para_tabela(np.where(np.isfinite(grade["dscr_minimo"]), grade["dscr_minimo"], np.nan), cortes, aumentos)
+        st.plotly_chart(mapa_calor(dscr, "DSCR Mínimo", "RdYlGn", ".2f"), use_container_width=True)
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    executar_pagina("Ajuste de Cenários", main)
@@ -1,10 +1,26 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
 from io import BytesIO
 
+from utils.agenda import ANO_FIM, ANO_INICIO, COLUNAS_AGENDA, CRESCIMENTO, RECORRENCIA, descrever_agenda
+from utils.inflacao import CHAVE_INDICES, COLUNA_INDICE, INDICE_GERAL
+from utils.rotacao import por_cultura_e_ano
+from utils.categorizacao import CHAVE_REGRAS, COLUNA_CONTA, COLUNA_PADRAO, COLUNAS_CONTAS, COLUNAS_PALAVRAS, categorizar, regras_categorizacao
+from utils.emprestimos import PERIODOS, SISTEMAS, SISTEMA_PADRAO, valor_primeira_parcela
+from utils.importacao import (
+    CHAVE_NATURAL_DESPESAS,
+    TIPOS_ARQUIVO,
+    aplicar_diferencas,
+    diferencas_importacao,
+    ja_importado,
+    ler_planilha,
+    marcar_importado,
+)
+from utils.perf import executar_pagina, medir
+from utils.pipeline import marcar_alterado, obter
+
 st.set_page_config(layout="wide", page_title="Planejamento de Despesas")
 st.title("Planejamento de Despesas")
 
@@ -17,6 +33,159 @@ def main():
     def format_brl(valor):
         return f"R$ {valor:,.2f}".replace(",", "v").replace(".", ",").replace("v", ".")
 
+    # --- Cadastros: os campos dos formulários ficam no session_state (pelas keys dos widgets) ---
+    # Os callbacks rodam antes da reexecução e, ao mudar os dados, reexecutam só o cadastro
+    # alterado e a projeção (st.rerun com as keys dos fragmentos); o resto da página não roda.
+    CATEGORIAS = ["Operacional", "RH", "Administrativa", "Extra Operacional", "Dividendos", "Impostos"]
+    DA_CATEGORIA = "Da categoria"
+    FRAGMENTOS_DESPESAS = ["despesas", "projecao_despesas"]
+    FRAGMENTOS_EMPRESTIMOS = ["emprestimos", "projecao_despesas"]
+
+    def opcoes_indice():
+        return [DA_CATEGORIA, INDICE_GERAL, *st.session_state.get(CHAVE_INDICES, {})]
+
+    def campos_despesa(despesa=None):
+        """Valores dos campos do formulário de despesa: os da despesa editada ou os padrões."""
+        d = despesa or {}
+        centros_custo = obter_centros_custo()
+        crescimento = d.get(CRESCIMENTO)
+        return {
+            "nome_despesa_input": d.get("Despesa", ""),
+            "valor_despesa_input": float(d.get("Valor", 0.0)),
+            "categoria_select": d["Categoria"] if d.get("Categoria") in CATEGORIAS else CATEGORIAS[0],
+            "centro_custo_select": d["Centro_Custo"] if d.get("Centro_Custo") in centros_custo else "Administrativo",
+            "indice_despesa_select": d[COLUNA_INDICE] if d.get(COLUNA_INDICE) in opcoes_indice() else DA_CATEGORIA,
+            "ano_inicio_despesa_select": min(max(int(d.get(ANO_INICIO, 1)), 1), 5),
+            "ano_fim_despesa_select": min(max(int(d.get(ANO_FIM, 5)), 1), 5),
+            "recorrencia_despesa_input": min(max(int(d.get(RECORRENCIA, 1)), 1), 5),
+            "crescimento_despesa_input": float(crescimento) if crescimento is not None and pd.notna(crescimento) else None,
+        }
+
+    def campos_emprestimo(emprestimo=None):
+        """Valores dos campos do formulário de empréstimo: os do empréstimo editado ou os padrões."""
+        e = emprestimo or {}
+        centros_custo = obter_centros_custo()
+        return {
+            "banco_emp_input": e.get("banco", ""),
+            "objeto_emp_input": e.get("objeto", ""),
+            "valor_total_emp_input": float(e.get("valor_total", 0.0)),
+            "encargos_emp_input": float(e.get("encargos", 0.0)),
+            "parcelas_emp_input": max(int(e.get("parcelas", 1)), 1),
+            "periodo_emp_select": e["periodo"] if e.get("periodo") in PERIODOS else "ANUAL",
+            "sistema_emp_select": e["sistema"] if e.get("sistema") in SISTEMAS else SISTEMA_PADRAO,
+            "carencia_emp_input": int(e.get("carencia", 0)),
+            "valor_parcela_emp_input": float(e.get("valor_parcela", 0.0)),
+            "centro_custo_emp_select": e["centro_custo"] if e.get("centro_custo") in centros_custo else "Administrativo",
+            "ano_inicial_emp_select": e["ano_inicial"] if e.get("ano_inicial") in anos else anos[0],
+            "ano_final_emp_select": e["ano_final"] if e.get("ano_final") in anos else anos[-1],
+        }
+
+    def editar_despesa(indice):
+        st.session_state['editing_expense_index'] = indice
+        st.session_state.update(campos_despesa(st.session_state['despesas'][indice] if indice is not None else None))
+
+    def editar_emprestimo(indice):
+        st.session_state["editing_loan_index"] = indice
+        st.session_state.update(campos_emprestimo(st.session_state["emprestimos"][indice] if indice is not None else None))
+
+    def salvar_despesa():
+        s = st.session_state
+        nome, valor = s["nome_despesa_input"].strip(), s["valor_despesa_input"]
+        ano_inicio, ano_fim = s["ano_inicio_despesa_select"], s["ano_fim_despesa_select"]
+        if not nome or valor <= 0:
+            s["aviso_despesa"] = "Preencha todos os campos corretamente."
+            return
+        if ano_fim < ano_inicio:
+            s["aviso_despesa"] = "O ano final deve ser igual ou posterior ao ano inicial."
+            return
+        nova_despesa = {
+            "Despesa": nome,
+            "Valor": valor,
+            "Categoria": s["categoria_select"],
+            "Centro_Custo": s["centro_custo_select"],
+            ANO_INICIO: ano_inicio,
+            ANO_FIM: ano_fim,
+            RECORRENCIA: int(s["recorrencia_despesa_input"])
+        }
+        if s["indice_despesa_select"] != DA_CATEGORIA:
+            nova_despesa[COLUNA_INDICE] = s["indice_despesa_select"]
+        if s["crescimento_despesa_input"] is not None:
+            nova_despesa[CRESCIMENTO] = s["crescimento_despesa_input"]
+        if s['editing_expense_index'] is not None:
+            s['despesas'][s['editing_expense_index']] = nova_despesa
+        else:
+            s['despesas'].append(nova_despesa)
+        marcar_alterado(s, 'despesas')
+        editar_despesa(None)
+        st.rerun(FRAGMENTOS_DESPESAS)
+
+    def excluir_despesa(indice):
+        st.session_state['despesas'].pop(indice)
+        marcar_alterado(st.session_state, 'despesas')
+        editar_despesa(None)
+        st.rerun(FRAGMENTOS_DESPESAS)
+
+    def salvar_emprestimo():
+        s = st.session_state
+        banco, objeto = s["banco_emp_input"].strip(), s["objeto_emp_input"].strip()
+        valor_total, valor_parcela, sistema = s["valor_total_emp_input"], s["valor_parcela_emp_input"], s["sistema_emp_select"]
+        ano_inicial, ano_final = s["ano_inicial_emp_select"], s["ano_final_emp_select"]
+        if anos.index(ano_final) < anos.index(ano_inicial):
+            s["aviso_emprestimo"] = "Ano Final deve ser maior ou igual ao Ano Inicial."
+            return
+        if valor_total <= 0 or (valor_parcela <= 0 and sistema == "PARCELA FIXA") or not banco or not objeto:
+            s["aviso_emprestimo"] = "Preencha todos os campos obrigatórios (Banco, Valor Total > 0, Valor da Parcela > 0 em PARCELA FIXA e Finalidade)."
+            return
+        novo = {
+            "banco": banco,
+            "valor_total": valor_total,
+            "objeto": objeto,
+            "encargos": s["encargos_emp_input"],
+            "parcelas": s["parcelas_emp_input"],
+            "valor_parcela": valor_parcela,
+            "periodo": s["periodo_emp_select"],
+            "ano_inicial": ano_inicial,
+            "ano_final": ano_final,
+            "centro_custo": s["centro_custo_emp_select"],
+            "sistema": sistema,
+            "carencia": s["carencia_emp_input"]
+        }
+        if sistema != "PARCELA FIXA":
+            novo["valor_parcela"] = valor_primeira_parcela(novo)
+        if s["editing_loan_index"] is not None:
+            s["emprestimos"][s["editing_loan_index"]] = novo
+        else:
+            s["emprestimos"].append(novo)
+        marcar_alterado(s, "emprestimos")
+        editar_emprestimo(None)
+        st.rerun(FRAGMENTOS_EMPRESTIMOS)
+
+    def excluir_emprestimo(indice):
+        st.session_state["emprestimos"].pop(indice)
+        marcar_alterado(st.session_state, "emprestimos")
+        editar_emprestimo(None)
+        st.rerun(FRAGMENTOS_EMPRESTIMOS)
+
+    def importar(chave, registros, impressao, fragmentos):
+        """Acrescenta os registros importados ao cadastro e reexecuta a importação, o cadastro e a projeção."""
+        st.session_state[chave].extend(registros)
+        marcar_alterado(st.session_state, chave)
+        marcar_importado(st.session_state, chave, impressao)
+        st.rerun(["importacao", *fragmentos])
+
+    def aplicar_importacao(diferencas, remover, impressao):
+        st.session_state['despesas'] = aplicar_diferencas(st.session_state['despesas'], diferencas, remover)
+        marcar_importado(st.session_state, "despesas", impressao)
+        editar_despesa(None)
+        st.rerun(["importacao", *FRAGMENTOS_DESPESAS])
+
+    # --- Modelos de Excel: montados só quando o download é pedido ---
+    def planilha_modelo(modelo, aba):
+        buffer = BytesIO()
+        with pd.ExcelWriter(buffer, engine='xlsxwriter') as writer:
+            modelo.to_excel(writer, index=False, sheet_name=aba)
+        return buffer.getvalue()
+
     # --- Função para obter centros de custo disponíveis ---
     def obter_centros_custo():
         """Obtém lista de centros de custo baseados nas culturas cadastradas + Administrativo"""
@@ -34,29 +203,21 @@ def main():
 
     # --- Função para calcular rateio administrativo ---
     def calcular_rateio_administrativo():
-        """Calcula o percentual de rateio por cultura baseado na área plantada"""
-        if not st.session_state.get('plantios'):
+        """Calcula o percentual de rateio por cultura pela área ocupada nos anos da projeção (rotação)"""
+        plantios = st.session_state.get('plantios')
+        if not plantios:
             return {}
         
-        # Calcular área total e por cultura
-        areas_por_cultura = {}
-        area_total = 0
-        
-        for plantio in st.session_state['plantios'].values():
-            cultura = plantio.get('cultura', '')
-            hectares = plantio.get('hectares', 0)
-            
-            if cultura and hectares > 0:
-                if cultura not in areas_por_cultura:
-                    areas_por_cultura[cultura] = 0
-                areas_por_cultura[cultura] += hectares
-                area_total += hectares
+        culturas = [c for c in dict.fromkeys(p.get('cultura', '') for p in plantios.values()) if c]
+        area, _, _ = por_cultura_e_ano(plantios, culturas, [f"Ano {i+1}" for i in range(5)])
+        area_total = area.sum()
         
         # Calcular percentuais de rateio
         rateio = {}
         if area_total > 0:
-            for cultura, area in areas_por_cultura.items():
-                rateio[cultura] = (area / area_total) * 100
+            for cultura, area_cultura in zip(culturas, area.sum(axis=1)):
+                if area_cultura > 0:
+                    rateio[cultura] = (area_cultura / area_total) * 100
         
         return rateio
 
@@ -84,6 +245,10 @@ def main():
             with col:
                 st.metric(f"Ano {i+1}", f"{valor:.2f}%")
 
+        if st.session_state.get(CHAVE_INDICES):
+            st.caption("Índices específicos (definidos em Ajuste de Cenários), em % ao ano:")
+            st.dataframe(pd.DataFrame(st.session_state[CHAVE_INDICES], index=[f"Ano {i+1}" for i in range(5)]).T)
+
     # --- MODELOS DE EXCEL ---
     st.markdown("### 📥 Modelos de Excel para Preenchimento")
 
@@ -92,17 +257,16 @@ def main():
     with col_mod1:
         st.markdown("**📄 Modelo de Despesas**")
         modelo_despesas = pd.DataFrame({
-            "Despesa": ["Energia", "Combustível"],
+            "Despesa": ["Energia", "Reforma de Trator"],
             "Valor": [10000, 5000],
             "Categoria": ["Operacional", "Operacional"],
-            "Centro_Custo": ["Administrativo", "Soja"]
+            "Centro_Custo": ["Administrativo", "Soja"],
+            ANO_INICIO: [1, 3],
+            ANO_FIM: [5, 3],
+            RECORRENCIA: [1, 1]
         })
 
-        buffer_despesas = BytesIO()
-        with pd.ExcelWriter(buffer_despesas, engine='xlsxwriter') as writer:
-            modelo_despesas.to_excel(writer, index=False, sheet_name="Despesas")
-        buffer_despesas.seek(0)
-        st.download_button("⬇️ Baixar Modelo de Despesas", buffer_despesas, file_name="modelo_despesas.xlsx")
+        st.download_button("⬇️ Baixar Modelo de Despesas", lambda: planilha_modelo(modelo_despesas, "Despesas"), file_name="modelo_despesas.xlsx")
 
     with col_mod2:
         st.markdown("**📄 Modelo de Empréstimos**")
@@ -116,85 +280,208 @@ def main():
             "periodo": ["ANUAL"],
             "ano_inicial": ["Ano 1"],
             "ano_final": ["Ano 5"],
-            "centro_custo": ["Soja"]
+            "centro_custo": ["Soja"],
+            "sistema": ["PARCELA FIXA"],
+            "carencia": [0]
         })
 
-        buffer_emprestimos = BytesIO()
-        with pd.ExcelWriter(buffer_emprestimos, engine='xlsxwriter') as writer:
-            modelo_emprestimos.to_excel(writer, index=False, sheet_name="Emprestimos")
-        buffer_emprestimos.seek(0)
-        st.download_button("⬇️ Baixar Modelo de Empréstimos", buffer_emprestimos, file_name="modelo_emprestimos.xlsx")
-
-    # --- IMPORTAÇÃO DE EXCEL ---
-    with st.expander("📤 Importar Despesas de Excel"):
-        despesa_file = st.file_uploader("Upload do arquivo de despesas (.xlsx)", type=["xlsx"], key="upload_despesas")
-
-        if despesa_file and not st.session_state.get("despesas_importadas_ok"):
-            try:
-                df_despesas = pd.read_excel(despesa_file)
-                required_cols = {"Despesa", "Valor", "Categoria"}
-                if not required_cols.issubset(df_despesas.columns):
-                    st.error(f"Colunas obrigatórias: {required_cols}")
-                else:
-                    # Adicionar Centro_Custo se não existir
-                    if "Centro_Custo" not in df_despesas.columns:
-                        df_despesas["Centro_Custo"] = "Administrativo"
-                    
-                    novas = df_despesas[["Despesa", "Valor", "Categoria", "Centro_Custo"]].dropna().to_dict(orient="records")
-                    st.session_state['despesas'].extend(novas)
-                    st.session_state["despesas_importadas_ok"] = True
-                    st.success(f"{len(novas)} despesas importadas com sucesso!")
-                    st.rerun()
-            except Exception as e:
-                st.error(f"Erro ao ler arquivo: {e}")
-
-    with st.expander("📤 Importar Empréstimos de Excel"):
-        emprestimo_file = st.file_uploader("Upload do arquivo de empréstimos (.xlsx)", type=["xlsx"], key="upload_emprestimos")
-        if emprestimo_file and not st.session_state.get("emprestimos_importados_ok"):
-            try:
-                df_emp = pd.read_excel(emprestimo_file)
-                required_cols = {
-                    "banco", "valor_total", "objeto", "encargos", "parcelas", "valor_parcela", "periodo", "ano_inicial", "ano_final"
-                }
-                if not required_cols.issubset(df_emp.columns):
-                    st.error(f"Colunas obrigatórias: {required_cols}")
-                else:
-                    total = len(df_emp)
-                    emprestimos_importados = []
-                    progress_bar = st.progress(0, text="Iniciando importação de empréstimos...")
-
-                    for i, (_, row) in enumerate(df_emp.iterrows()):
-                        # Validação: ano_final >= ano_inicial
-                        if anos.index(row["ano_final"]) < anos.index(row["ano_inicial"]):
-                            st.error(f"Erro na linha {i+1}: Ano Final deve ser maior ou igual ao Ano Inicial.")
-                            continue
-
-                        # Adicionar centro_custo se não existir
-                        centro_custo = row.get("centro_custo", "Administrativo")
-
-                        novo_emp = {
-                            "banco": row["banco"],
-                            "valor_total": row["valor_total"],
-                            "objeto": row["objeto"],
-                            "encargos": row["encargos"],
-                            "parcelas": int(row["parcelas"]),
-                            "valor_parcela": row["valor_parcela"],
-                            "periodo": row["periodo"],
-                            "ano_inicial": row["ano_inicial"],
-                            "ano_final": row["ano_final"],
-                            "centro_custo": centro_custo
+        st.download_button("⬇️ Baixar Modelo de Empréstimos", lambda: planilha_modelo(modelo_emprestimos, "Emprestimos"), file_name="modelo_emprestimos.xlsx")
+
+    # --- IMPORTAÇÃO DE ARQUIVOS (fragmento) ---
+    @st.fragment(key="importacao")
+    def importacao():
+        with st.expander("📤 Importar Despesas (Excel, CSV ou Parquet)"):
+            despesa_file = st.file_uploader("Upload do arquivo de despesas (.xlsx, .csv ou .parquet)", type=TIPOS_ARQUIVO, key="upload_despesas")
+            atualizar = st.radio(
+                "Modo de importação", ["Acrescentar", "Atualizar pela chave"], horizontal=True, key="modo_importacao_despesas",
+                help="Atualizar pela chave casa as linhas com as despesas cadastradas: novas são inseridas, alteradas são atualizadas e nada se duplica."
+            ) == "Atualizar pela chave"
+            automatica = st.toggle(
+                "🏷️ Categorizar automaticamente", key="categorizar_despesas",
+                help="Preenche Categoria e Centro_Custo vazios pela conta contábil (coluna Conta) e por palavras-chave na descrição (coluna Despesa)."
+            )
+            if automatica:
+                regras = regras_categorizacao(st.session_state)
+                with st.form("form_regras_categorizacao"):
+                    st.caption(
+                        "A conta tem prioridade sobre as palavras-chave. Padrões: palavras separadas por | ou expressão regular, "
+                        "sem diferenciar maiúsculas e acentos. Centro de custo vazio mantém o do arquivo."
+                    )
+                    col1, col2 = st.columns([1, 2])
+                    with col1:
+                        contas = st.data_editor(
+                            pd.DataFrame(regras["contas"], columns=COLUNAS_CONTAS).astype({COLUNA_CONTA: str}),
+                            num_rows="dynamic", hide_index=True, use_container_width=True, key="editor_regras_contas"
+                        )
+                    with col2:
+                        palavras = st.data_editor(
+                            pd.DataFrame(regras["palavras"], columns=COLUNAS_PALAVRAS),
+                            num_rows="dynamic", hide_index=True, use_container_width=True, key="editor_regras_palavras"
+                        )
+                    if st.form_submit_button("Salvar Regras"):
+                        st.session_state[CHAVE_REGRAS] = {
+                            "contas": contas.dropna(subset=[COLUNA_CONTA, "Categoria"]).to_dict("records"),
+                            "palavras": palavras.dropna(subset=[COLUNA_PADRAO, "Categoria"]).to_dict("records"),
                         }
+                        st.success("Regras salvas.")
+
+            if despesa_file:
+                try:
+                    impressao, df_despesas = ler_planilha(st.session_state, despesa_file)
+                    df_despesas = df_despesas.copy()
+                    required_cols = {"Despesa", "Valor"} if automatica else {"Despesa", "Valor", "Categoria"}
+                    if not required_cols.issubset(df_despesas.columns):
+                        st.error(f"Colunas obrigatórias: {required_cols}")
+                    elif not atualizar and ja_importado(st.session_state, "despesas", impressao):
+                        st.info("Este arquivo já foi importado.")
+                    else:
+                        if automatica:
+                            with medir("categorizar importação"):
+                                df_despesas, sem_regra = categorizar(df_despesas, regras_categorizacao(st.session_state))
+                            df_despesas["Centro_Custo"] = df_despesas["Centro_Custo"].fillna("Administrativo")
+                            st.caption(f"{len(df_despesas) - sem_regra.sum()} de {len(df_despesas)} linhas categorizadas.")
+                            if sem_regra.any():
+                                st.warning(f"{sem_regra.sum()} linhas sem regra correspondente ficam fora da importação.")
+                                colunas_sem_regra = [c for c in ("Despesa", COLUNA_CONTA, "Valor") if c in df_despesas.columns]
+                                st.dataframe(df_despesas.loc[sem_regra, colunas_sem_regra].head(1000), hide_index=True, use_container_width=True)
+
+                        # Adicionar Centro_Custo se não existir
+                        if "Centro_Custo" not in df_despesas.columns:
+                            df_despesas["Centro_Custo"] = "Administrativo"
+                        df_despesas.columns = df_despesas.columns.astype(str)
+                    
+                        colunas = ["Despesa", "Valor", "Categoria", "Centro_Custo"]
+                        colunas_chave = []
+                        if atualizar:
+                            colunas_chave = st.multiselect(
+                                "Chave natural", list(dict.fromkeys([*CHAVE_NATURAL_DESPESAS, *df_despesas.columns])),
+                                default=CHAVE_NATURAL_DESPESAS, key="chave_importacao_despesas",
+                                help="Colunas que identificam a mesma despesa entre uploads (ex.: o código do ERP)."
+                            )
+                        novas = df_despesas[colunas].dropna()
+                        # Colunas opcionais: índice de inflação, agenda e colunas extras da chave (vazio = padrão)
+                        opcionais = [
+                            c for c in dict.fromkeys([COLUNA_INDICE, *COLUNAS_AGENDA, *colunas_chave])
+                            if c in df_despesas.columns and c not in colunas
+                        ]
+                        novas = novas.to_dict(orient="records") if not opcionais else [
+                            {**registro, **{c: v for c, v in extras.items() if pd.notna(v)}}
+                            for registro, extras in zip(
+                                novas.to_dict(orient="records"),
+                                df_despesas.loc[novas.index, opcionais].to_dict(orient="records")
+                            )
+                        ]
+                        if not atualizar:
+                            # O arquivo (e a categorização) é conferido antes de importar
+                            st.button(
+                                f"Importar {len(novas)} despesas", key="importar_despesas", disabled=not novas,
+                                on_click=importar, args=("despesas", novas, impressao, FRAGMENTOS_DESPESAS)
+                            )
+                        elif not colunas_chave:
+                            st.warning("Escolha ao menos uma coluna para a chave natural.")
+                        else:
+                            remover = st.checkbox("Remover despesas cadastradas que não estão no arquivo", key="remover_ausentes_despesas")
+                            diferencas = diferencas_importacao(st.session_state['despesas'], novas, colunas_chave)
+                            col1, col2, col3, col4 = st.columns(4)
+                            col1.metric("Novas", len(diferencas["inserir"]))
+                            col2.metric("Alteradas", len(diferencas["atualizar"]))
+                            col3.metric("Removidas" if remover else "Ausentes no arquivo", len(diferencas["remover"]))
+                            col4.metric("Inalteradas", diferencas["iguais"])
+                            if diferencas["repetidos"] or diferencas["duplicados"]:
+                                st.caption(
+                                    f"{diferencas['repetidos']} linhas com chave repetida no arquivo (vale a última); "
+                                    f"{len(diferencas['duplicados'])} despesas duplicadas no cadastro serão removidas."
+                                )
+                            alteracoes = (
+                                len(diferencas["inserir"]) + len(diferencas["atualizar"]) + len(diferencas["duplicados"])
+                                + (len(diferencas["remover"]) if remover else 0)
+                            )
+                            st.button(
+                                "Aplicar importação", key="aplicar_importacao_despesas", disabled=alteracoes == 0,
+                                on_click=aplicar_importacao, args=(diferencas, remover, impressao)
+                            )
+                except Exception as e:
+                    st.error(f"Erro ao ler arquivo: {e}")
 
-                        emprestimos_importados.append(novo_emp)
-                        progress_bar.progress((i + 1) / total, text=f"Importando {i + 1} de {total} empréstimos...")
+        with st.expander("📤 Importar Empréstimos (Excel, CSV ou Parquet)"):
+            emprestimo_file = st.file_uploader("Upload do arquivo de empréstimos (.xlsx, .csv ou .parquet)", type=TIPOS_ARQUIVO, key="upload_emprestimos")
+            if emprestimo_file:
+                try:
+                    impressao, df_emp = ler_planilha(st.session_state, emprestimo_file)
+                    required_cols = {
+                        "banco", "valor_total", "objeto", "encargos", "parcelas", "valor_parcela", "periodo", "ano_inicial", "ano_final"
+                    }
+                    if not required_cols.issubset(df_emp.columns):
+                        st.error(f"Colunas obrigatórias: {required_cols}")
+                    elif ja_importado(st.session_state, "emprestimos", impressao):
+                        st.info("Este arquivo já foi importado.")
+                    else:
+                        total = len(df_emp)
+                        emprestimos_importados = []
+                        linhas_ignoradas = []
+                        progress_bar = st.progress(0, text="Iniciando importação de empréstimos...")
+
+                        for i, (_, row) in enumerate(df_emp.iterrows()):
+                            progress_bar.progress((i + 1) / total, text=f"Importando {i + 1} de {total} empréstimos...")
+                            ano_inicial, ano_final = str(row["ano_inicial"]).strip(), str(row["ano_final"]).strip()
+                            # Validação: anos da projeção e ano_final >= ano_inicial
+                            if ano_inicial not in anos or ano_final not in anos:
+                                linhas_ignoradas.append(f"Linha {i+1}: ano fora da projeção ({ano_inicial} a {ano_final}).")
+                                continue
+                            if anos.index(ano_final) < anos.index(ano_inicial):
+                                linhas_ignoradas.append(f"Linha {i+1}: Ano Final deve ser maior ou igual ao Ano Inicial.")
+                                continue
+
+                            # Validação: período e sistema entre as opções do cadastro
+                            periodo = str(row["periodo"]).strip().upper()
+                            sistema = str(row["sistema"]).strip().upper() if pd.notna(row.get("sistema")) else SISTEMA_PADRAO
+                            if periodo not in PERIODOS:
+                                linhas_ignoradas.append(f"Linha {i+1}: período '{row['periodo']}' inválido (use {', '.join(PERIODOS)}).")
+                                continue
+                            if sistema not in SISTEMAS:
+                                linhas_ignoradas.append(f"Linha {i+1}: sistema '{row['sistema']}' inválido (use {', '.join(SISTEMAS)}).")
+                                continue
+
+                            # Adicionar centro_custo se não existir
+                            centro_custo = row.get("centro_custo", "Administrativo")
+
+                            try:
+                                novo_emp = {
+                                    "banco": row["banco"],
+                                    "valor_total": float(row["valor_total"]),
+                                    "objeto": row["objeto"],
+                                    "encargos": float(row["encargos"]),
+                                    "parcelas": int(row["parcelas"]),
+                                    "valor_parcela": float(row["valor_parcela"]),
+                                    "periodo": periodo,
+                                    "ano_inicial": ano_inicial,
+                                    "ano_final": ano_final,
+                                    "centro_custo": centro_custo,
+                                    "sistema": sistema,
+                                    "carencia": int(row["carencia"]) if pd.notna(row.get("carencia")) else 0
+                                }
+                                # PRICE e SAC: a parcela sai do valor, da taxa e do prazo, como no formulário
+                                if sistema != "PARCELA FIXA":
+                                    novo_emp["valor_parcela"] = valor_primeira_parcela(novo_emp)
+                            except (TypeError, ValueError) as e:
+                                linhas_ignoradas.append(f"Linha {i+1}: {e}")
+                                continue
+
+                            emprestimos_importados.append(novo_emp)
+
+                        progress_bar.empty()
+                        # As linhas ignoradas são conferidas antes de importar
+                        if linhas_ignoradas:
+                            st.warning("Linhas ignoradas:\n\n" + "\n".join(f"- {linha}" for linha in linhas_ignoradas))
+                        st.button(
+                            f"Importar {len(emprestimos_importados)} de {total} empréstimos", key="importar_emprestimos",
+                            disabled=not emprestimos_importados,
+                            on_click=importar, args=("emprestimos", emprestimos_importados, impressao, FRAGMENTOS_EMPRESTIMOS)
+                        )
+                except Exception as e:
+                    st.error(f"Erro ao ler arquivo: {e}")
 
-                    st.session_state["emprestimos"].extend(emprestimos_importados)
-                    st.session_state["emprestimos_importados_ok"] = True
-                    progress_bar.empty()
-                    st.success(f"{total} empréstimos importados com sucesso!")
-                    st.rerun()
-            except Exception as e:
-                st.error(f"Erro ao ler arquivo: {e}")
+    importacao()
 
     # --- EXIBIR RATEIO ATUAL ---
     st.markdown("### 📊 Centro de Custos e Rateio")
@@ -217,371 +504,224 @@ def main():
             else:
                 st.write("• Nenhuma cultura cadastrada ainda")
 
-    # --- ADICIONAR DESPESAS MANUALMENTE ---
-    with st.expander("### 💰 Cadastro de Despesas"):
-
-        is_editing = st.session_state['editing_expense_index'] is not None
-        expense_to_edit = st.session_state['despesas'][st.session_state['editing_expense_index']] if is_editing else None
+    # --- CADASTROS (fragmentos) ---
+    # Editar e cancelar reexecutam só o fragmento do cadastro. Incluir, alterar, excluir e importar
+    # reexecutam o cadastro e a projeção, que só é recalculada porque os dados mudaram (utils.pipeline).
+    @st.fragment(key="despesas")
+    def cadastro_despesas():
+        # --- ADICIONAR DESPESAS MANUALMENTE ---
+        with st.expander("### 💰 Cadastro de Despesas"):
+
+            is_editing = st.session_state['editing_expense_index'] is not None
+            for chave, valor in campos_despesa().items():
+                st.session_state.setdefault(chave, valor)
+
+            with st.form("form_despesa"):
+                st.subheader(f"{'Editar' if is_editing else 'Adicionar'} Despesa")
+
+                col1, col2 = st.columns(2)
+                with col1:
+                    st.text_input("Nome da Despesa", key="nome_despesa_input")
+                    st.number_input("Valor Anual (R$)", min_value=0.0, step=100.0, key="valor_despesa_input")
+            
+                with col2:
+                    st.selectbox("Categoria", CATEGORIAS, key="categoria_select")
+                
+                    # Centro de Custo
+                    st.selectbox("Centro de Custo", obter_centros_custo(), key="centro_custo_select")
 
-        with st.form("form_despesa", clear_on_submit=not is_editing):
-            st.subheader(f"{'Editar' if is_editing else 'Adicionar'} Despesa")
+                    # Índice de inflação: por padrão, o da categoria (ou o Geral)
+                    st.selectbox(
+                        "Índice de Inflação", opcoes_indice(), key="indice_despesa_select",
+                        help="Da categoria: usa o índice associado à categoria em Ajuste de Cenários."
+                    )
 
-            default_nome = expense_to_edit['Despesa'] if is_editing else ""
-            default_valor = expense_to_edit['Valor'] if is_editing else 0.0
-            categorias = ["Operacional", "RH", "Administrativa", "Extra Operacional", "Dividendos", "Impostos"]
-            default_categoria_index = categorias.index(
-                expense_to_edit['Categoria']) if is_editing and expense_to_edit['Categoria'] in categorias else 0
+                # Agenda: anos em que a despesa ocorre (início = fim para despesa única) e crescimento próprio
+                st.markdown("**Agenda**")
+                anos_agenda = list(range(1, 6))
+                col3, col4, col5, col6 = st.columns(4)
+                with col3:
+                    st.selectbox("Ano inicial", anos_agenda, format_func=lambda a: f"Ano {a}", key="ano_inicio_despesa_select")
+                with col4:
+                    st.selectbox("Ano final", anos_agenda, format_func=lambda a: f"Ano {a}", key="ano_fim_despesa_select")
+                with col5:
+                    st.number_input("Repetir a cada (anos)", min_value=1, max_value=5, step=1, key="recorrencia_despesa_input")
+                with col6:
+                    st.number_input(
+                        "Crescimento próprio (% a.a.)", min_value=-50.0, max_value=100.0, step=0.5, value=None,
+                        key="crescimento_despesa_input", help="Vazio: corrige pelo índice de inflação."
+                    )
 
-            col1, col2 = st.columns(2)
-            with col1:
-                nome = st.text_input("Nome da Despesa", value=default_nome, key="nome_despesa_input")
-                valor = st.number_input("Valor Anual (R$)", min_value=0.0, step=100.0, value=default_valor, key="valor_despesa_input")
-            
-            with col2:
-                categoria = st.selectbox("Categoria", categorias, index=default_categoria_index, key="categoria_select")
-                
-                # Centro de Custo
-                centros_custo = obter_centros_custo()
-                default_centro = expense_to_edit.get('Centro_Custo', 'Administrativo') if is_editing else 'Administrativo'
-                default_centro_index = centros_custo.index(default_centro) if default_centro in centros_custo else 0
-                centro_custo = st.selectbox("Centro de Custo", centros_custo, index=default_centro_index, key="centro_custo_select")
-
-            col_buttons = st.columns([1, 1, 4])
-            submit = False
-            cancel = False
-            with col_buttons[0]:
-                submit = st.form_submit_button("Atualizar" if is_editing else "Adicionar")
-            with col_buttons[1]:
-                if is_editing:
-                    cancel = st.form_submit_button("Cancelar Edição")
-
-            if submit:
-                if not nome or valor <= 0:
-                    st.warning("Preencha todos os campos corretamente.")
-                else:
-                    nova_despesa = {
-                        "Despesa": nome.strip(), 
-                        "Valor": valor, 
-                        "Categoria": categoria,
-                        "Centro_Custo": centro_custo
-                    }
+                col_buttons = st.columns([1, 1, 4])
+                with col_buttons[0]:
+                    st.form_submit_button("Atualizar" if is_editing else "Adicionar", on_click=salvar_despesa)
+                with col_buttons[1]:
                     if is_editing:
-                        st.session_state['despesas'][st.session_state['editing_expense_index']] = nova_despesa
-                        st.session_state['editing_expense_index'] = None
-                    else:
-                        st.session_state['despesas'].append(nova_despesa)
-                    st.rerun()
-
-            if is_editing and cancel:
-                st.session_state['editing_expense_index'] = None
-                st.rerun()
-
-    # --- EMPRÉSTIMOS ---
-    with st.expander("### 🏦 Cadastro de Empréstimos e Financiamentos"):
-
-        editing_loan = st.session_state["editing_loan_index"] is not None
-        emprestimo_to_edit = st.session_state["emprestimos"][st.session_state["editing_loan_index"]] if editing_loan else {}
-
-        with st.form("form_emprestimo", clear_on_submit=not editing_loan):
-            st.subheader(f"{'Editar' if editing_loan else 'Cadastrar'} Empréstimo")
-
-            col1, col2 = st.columns(2)
-            with col1:
-                banco = st.text_input("Banco/Instituição", value=emprestimo_to_edit.get("banco", ""))
-                objeto = st.text_input("Finalidade (ex: Trator, Sementes)", value=emprestimo_to_edit.get("objeto", ""))
-                valor_total = st.number_input("Valor Total do Empréstimo", min_value=0.0, step=1000.0, format="%.2f",
-                                            value=emprestimo_to_edit.get("valor_total", 0.0))
-                encargos = st.number_input("Taxa de Juros (% ao ano)", min_value=0.0, step=0.1,
-                                        value=float(emprestimo_to_edit.get("encargos", 0.0)))
-
-            with col2:
-                parcelas = st.number_input("Quantidade de Parcelas", min_value=1, step=1,
-                                        value=emprestimo_to_edit.get("parcelas", 1))
-                periodicidade = st.selectbox("Período de Pagamento", ["ANUAL", "SEMESTRAL", "MENSAL"],
-                                            index=["ANUAL", "SEMESTRAL", "MENSAL"].index(
-                                                emprestimo_to_edit.get("periodo", "ANUAL")))
-                valor_parcela = st.number_input("Valor da Parcela (R$)", min_value=0.0, step=100.0, format="%.2f",
-                                              value=emprestimo_to_edit.get("valor_parcela", 0.0))
+                        st.form_submit_button("Cancelar Edição", on_click=editar_despesa, args=(None,))
+
+                if aviso := st.session_state.pop("aviso_despesa", None):
+                    st.warning(aviso)
+
+
+        # --- EXIBIÇÃO DE DESPESAS ---
+        st.markdown("### Despesas Cadastradas")
+        with st.expander("Despesas Cadastradas"):
+            if not st.session_state['despesas']:
+                st.info("Nenhuma despesa cadastrada.")
+            else:
+                for i, d in enumerate(st.session_state['despesas']):
+                    cols = st.columns([2, 2, 2, 2, 1, 1])
+                    cols[0].write(d["Despesa"])
+                    cols[0].caption(descrever_agenda(d, 5))
+                    cols[1].write(format_brl(d["Valor"]))
+                    cols[2].write(d["Categoria"] + (f" ({d[COLUNA_INDICE]})" if d.get(COLUNA_INDICE) else ""))
+                    cols[3].write(d.get("Centro_Custo", "Não definido"))
+                    cols[4].button("Editar", key=f"edit_{i}", on_click=editar_despesa, args=(i,))
+                    cols[5].button("Excluir", key=f"del_{i}", on_click=excluir_despesa, args=(i,))
+
+
+    @st.fragment(key="emprestimos")
+    def cadastro_emprestimos():
+        # --- EMPRÉSTIMOS ---
+        with st.expander("### 🏦 Cadastro de Empréstimos e Financiamentos"):
+
+            editing_loan = st.session_state["editing_loan_index"] is not None
+            for chave, valor in campos_emprestimo().items():
+                st.session_state.setdefault(chave, valor)
+
+            with st.form("form_emprestimo"):
+                st.subheader(f"{'Editar' if editing_loan else 'Cadastrar'} Empréstimo")
+
+                col1, col2 = st.columns(2)
+                with col1:
+                    st.text_input("Banco/Instituição", key="banco_emp_input")
+                    st.text_input("Finalidade (ex: Trator, Sementes)", key="objeto_emp_input")
+                    st.number_input("Valor Total do Empréstimo", min_value=0.0, step=1000.0, format="%.2f", key="valor_total_emp_input")
+                    st.number_input("Taxa de Juros (% ao ano)", min_value=0.0, step=0.1, key="encargos_emp_input")
+
+                with col2:
+                    st.number_input("Quantidade de Parcelas", min_value=1, step=1, key="parcelas_emp_input")
+                    st.selectbox("Período de Pagamento", PERIODOS, key="periodo_emp_select")
+                    st.selectbox("Sistema de Amortização", SISTEMAS, key="sistema_emp_select",
+                                 help="PRICE e SAC calculam as parcelas a partir do valor total e da taxa de juros. "
+                                      "PARCELA FIXA usa o valor da parcela informado.")
+                    st.number_input("Carência (períodos só com juros)", min_value=0, step=1, key="carencia_emp_input")
+                    st.number_input("Valor da Parcela (R$) - usado em PARCELA FIXA", min_value=0.0, step=100.0, format="%.2f",
+                                    key="valor_parcela_emp_input")
                 
-                # Centro de Custo para Empréstimos
-                centros_custo = obter_centros_custo()
-                default_centro = emprestimo_to_edit.get('centro_custo', 'Administrativo')
-                default_centro_index = centros_custo.index(default_centro) if default_centro in centros_custo else 0
-                centro_custo_emp = st.selectbox("Centro de Custo", centros_custo, index=default_centro_index, key="centro_custo_emp_select")
+                    # Centro de Custo para Empréstimos
+                    st.selectbox("Centro de Custo", obter_centros_custo(), key="centro_custo_emp_select")
                 
-            # Segunda linha para os anos
-            col3, col4 = st.columns(2)
-            with col3:
-                ano_inicial = st.selectbox("Ano Inicial da Projeção", anos,
-                                        index=anos.index(emprestimo_to_edit.get("ano_inicial", "Ano 1")))
-            with col4:
-                ano_final = st.selectbox("Ano Final da Projeção", anos,
-                                        index=anos.index(emprestimo_to_edit.get("ano_final", "Ano 5")))
-
-            # Validação: ano_final >= ano_inicial
-            if anos.index(ano_final) < anos.index(ano_inicial):
-                st.error("Ano Final deve ser maior ou igual ao Ano Inicial.")
-            else:
+                # Segunda linha para os anos
+                col3, col4 = st.columns(2)
+                with col3:
+                    st.selectbox("Ano Inicial da Projeção", anos, key="ano_inicial_emp_select")
+                with col4:
+                    st.selectbox("Ano Final da Projeção", anos, key="ano_final_emp_select")
+
                 col_buttons = st.columns([1, 1, 3])
-                enviar = False
-                cancelar = False
-                
                 with col_buttons[0]:
-                    enviar = st.form_submit_button("Atualizar" if editing_loan else "Cadastrar")
+                    st.form_submit_button("Atualizar" if editing_loan else "Cadastrar", on_click=salvar_emprestimo)
                 with col_buttons[1]:
                     if editing_loan:
-                        cancelar = st.form_submit_button("Cancelar")
-
-                if enviar and valor_total > 0 and valor_parcela > 0 and banco.strip() and objeto.strip():
-                    novo = {
-                        "banco": banco.strip(),
-                        "valor_total": valor_total,
-                        "objeto": objeto.strip(),
-                        "encargos": encargos,
-                        "parcelas": parcelas,
-                        "valor_parcela": valor_parcela,
-                        "periodo": periodicidade,
-                        "ano_inicial": ano_inicial,
-                        "ano_final": ano_final,
-                        "centro_custo": centro_custo_emp
-                    }
+                        st.form_submit_button("Cancelar", on_click=editar_emprestimo, args=(None,))
 
-                    if editing_loan:
-                        st.session_state["emprestimos"][st.session_state["editing_loan_index"]] = novo
-                        st.session_state["editing_loan_index"] = None
-                    else:
-                        st.session_state["emprestimos"].append(novo)
-                    st.success("Empréstimo salvo com sucesso!")
-                    st.rerun()
-                elif enviar:
-                    st.warning("Preencha todos os campos obrigatórios (Banco, Valor Total > 0, Valor da Parcela > 0 e Finalidade).")
+                if aviso := st.session_state.pop("aviso_emprestimo", None):
+                    st.warning(aviso)
                 
-                if editing_loan and cancelar:
-                    st.session_state["editing_loan_index"] = None
-                    st.rerun()
-
-    # --- EXIBIÇÃO DE DESPESAS ---
-    st.markdown("### Despesas Cadastradas")
-    with st.expander("Despesas Cadastradas"):
-        if not st.session_state['despesas']:
-            st.info("Nenhuma despesa cadastrada.")
-        else:
-            for i, d in enumerate(st.session_state['despesas']):
-                cols = st.columns([2, 2, 2, 2, 1, 1])
-                cols[0].write(d["Despesa"])
-                cols[1].write(format_brl(d["Valor"]))
-                cols[2].write(d["Categoria"])
-                cols[3].write(d.get("Centro_Custo", "Não definido"))
-                if cols[4].button("Editar", key=f"edit_{i}"):
-                    st.session_state['editing_expense_index'] = i
-                    st.rerun()
-                if cols[5].button("Excluir", key=f"del_{i}"):
-                    st.session_state['despesas'].pop(i)
-                    st.rerun()
-
-    # --- EXIBIÇÃO DOS EMPRÉSTIMOS ---
-    st.markdown("### Empréstimos Cadastrados")
-    with st.expander("Empréstimos"):
-        if not st.session_state["emprestimos"]:
-            st.info("Nenhum empréstimo cadastrado.")
-        else:
-            for i, e in enumerate(st.session_state["emprestimos"]):
-                cols = st.columns([2, 2, 2, 2, 2, 1, 1])
-                cols[0].write(e["banco"])
-                cols[1].write(e["objeto"])
-                cols[2].write(format_brl(e["valor_total"]))
-                cols[3].write(format_brl(e["valor_parcela"]))
-                cols[4].write(e.get("centro_custo", "Não definido"))
-                if cols[5].button("Editar", key=f"edit_loan_{i}"):
-                    st.session_state["editing_loan_index"] = i
-                    st.rerun()
-                if cols[6].button("Excluir", key=f"del_loan_{i}"):
-                    st.session_state["emprestimos"].pop(i)
-                    st.rerun()
-
-    # --- PROJEÇÃO ---
-    st.markdown("---")
-    st.markdown("### 📊 Projeção de Despesas com Inflação")
 
-    tem_despesas = st.session_state.get('despesas') and isinstance(st.session_state['despesas'], list)
-    tem_emprestimos = st.session_state.get('emprestimos') and isinstance(st.session_state['emprestimos'], list)
-
-    # Initialize df_fluxo with empty DataFrame or proper default
-    df_fluxo = pd.DataFrame()
-
-    if not tem_despesas and not tem_emprestimos:
-        st.info("Adicione despesas ou empréstimos para ver a projeção.")
-    else:
-        # --- PROJEÇÃO GERAL (como era antes) ---
-        df_fluxo = pd.DataFrame(columns=anos)
-
-        if tem_despesas:
-            df_desp = pd.DataFrame(st.session_state['despesas'])
-
-            if not df_desp.empty and "Despesa" in df_desp.columns and "Valor" in df_desp.columns:
-                df_desp['Despesa_Normalized'] = df_desp['Despesa'].astype(str).str.strip()
-                group = df_desp.groupby('Despesa_Normalized')['Valor'].sum()
-
-                for i, ano in enumerate(anos):
-                    fator = np.prod([1 + inflacoes[j] / 100 for j in range(i + 1)])
-                    df_fluxo[ano] = group * fator if not group.empty else 0
-
-        if tem_emprestimos:
-            for emp in st.session_state['emprestimos']:
-                linha = f"Empréstimo: {emp['objeto']}"
-                if linha not in df_fluxo.index:
-                    df_fluxo.loc[linha] = [0] * len(anos)
-                start_year_index = anos.index(emp["ano_inicial"])
-                end_year_index = anos.index(emp["ano_final"])
-                num_years = end_year_index - start_year_index + 1
-                for i in range(start_year_index, min(start_year_index + min(emp["parcelas"], num_years), len(anos))):
-                    ano = anos[i]
-                    df_fluxo.at[linha, ano] += emp["valor_parcela"]
-
-        df_fluxo.index.name = "Despesa"
-        
-        # --- NOVA PROJEÇÃO POR CENTRO DE CUSTOS ---
-        st.markdown("#### 📊 Projeção Geral")
-        st.dataframe(df_fluxo.style.format(format_brl))
-        
-        # Calcular custos por cultura com rateio
-        rateio_percentual = {}
+        # --- EXIBIÇÃO DOS EMPRÉSTIMOS ---
+        st.markdown("### Empréstimos Cadastrados")
+        with st.expander("Empréstimos"):
+            if not st.session_state["emprestimos"]:
+                st.info("Nenhum empréstimo cadastrado.")
+            else:
+                for i, e in enumerate(st.session_state["emprestimos"]):
+                    cols = st.columns([2, 2, 2, 2, 2, 1, 1])
+                    cols[0].write(e["banco"])
+                    cols[1].write(e["objeto"])
+                    cols[2].write(format_brl(e["valor_total"]))
+                    cols[3].write(format_brl(e["valor_parcela"]))
+                    cols[4].write(e.get("centro_custo", "Não definido"))
+                    cols[5].button("Editar", key=f"edit_loan_{i}", on_click=editar_emprestimo, args=(i,))
+                    cols[6].button("Excluir", key=f"del_loan_{i}", on_click=excluir_emprestimo, args=(i,))
+
+
+    cadastro_despesas()
+    cadastro_emprestimos()
+
+    # --- PROJEÇÃO (fragmento) ---
+    # Reexecutada sozinha pelos cadastros; numa execução completa, devolve o que a exportação usa
+    @st.fragment(key="projecao_despesas")
+    def projecao_despesas():
+        st.markdown("---")
+        st.markdown("### 📊 Projeção de Despesas com Inflação")
+
+        # Initialize df_fluxo with empty DataFrame or proper default
+        df_fluxo = pd.DataFrame()
         areas_por_cultura = {}
-        area_total = 0
-        
-        if st.session_state.get('plantios'):
-            for plantio in st.session_state['plantios'].values():
-                cultura = plantio.get('cultura', '')
-                hectares = plantio.get('hectares', 0)
-                
-                if cultura and hectares > 0:
-                    if cultura not in areas_por_cultura:
-                        areas_por_cultura[cultura] = 0
-                    areas_por_cultura[cultura] += hectares
-                    area_total += hectares
-            
-            if area_total > 0:
-                for cultura, area in areas_por_cultura.items():
-                    rateio_percentual[cultura] = area / area_total
-        
-        # Criar projeção por cultura
-        if areas_por_cultura:
-            st.markdown("#### 🌱 Projeção por Cultura (com Rateio Administrativo)")
-            
-            custos_por_cultura = {}
-            for cultura in areas_por_cultura.keys():
-                custos_por_cultura[cultura] = pd.DataFrame(columns=anos)
-            
-            # Processar despesas
-            if tem_despesas:
-                for despesa in st.session_state['despesas']:
-                    nome_despesa = despesa['Despesa']
-                    valor_base = despesa['Valor']
-                    centro_custo = despesa.get('Centro_Custo', 'Administrativo')
-                    
-                    if centro_custo == 'Administrativo':
-                        # Ratear para todas as culturas
-                        for cultura, percentual in rateio_percentual.items():
-                            valor_cultura = valor_base * percentual
-                            linha_nome = f"{nome_despesa} (Rateio Adm.)"
-                            
-                            # Aplicar inflação por ano
-                            valores_anos = []
-                            for i, ano in enumerate(anos):
-                                fator_inflacao = np.prod([1 + inflacoes[j] / 100 for j in range(i + 1)])
-                                valores_anos.append(valor_cultura * fator_inflacao)
-                            
-                            if linha_nome not in custos_por_cultura[cultura].index:
-                                custos_por_cultura[cultura].loc[linha_nome] = valores_anos
-                            else:
-                                custos_por_cultura[cultura].loc[linha_nome] += valores_anos
+
+        if not st.session_state['despesas'] and not st.session_state['emprestimos']:
+            st.info("Adicione despesas ou empréstimos para ver a projeção.")
+        else:
+            projecao = obter(st.session_state, "projecao_despesas")
+            df_fluxo = projecao["fluxo_caixa"]
+            custos_por_cultura = projecao["custos_por_cultura"]
+            rateio_percentual = projecao["rateio_administrativo"]
+            areas_por_cultura = projecao["areas_por_cultura"]
+
+            # --- NOVA PROJEÇÃO POR CENTRO DE CUSTOS ---
+            st.markdown("#### 📊 Projeção Geral")
+            with medir("styler projeção geral"):
+                st.dataframe(df_fluxo.style.format(format_brl))
+
+            # Criar projeção por cultura
+            if areas_por_cultura:
+                st.markdown("#### 🌱 Projeção por Cultura (com Rateio Administrativo)")
+
+                # Exibir custos por cultura
+                for cultura, df_cultura in custos_por_cultura.items():
+                    if not df_cultura.empty:
+                        st.markdown(f"**🌿 {cultura}**")
+                        df_cultura.index.name = "Item"
+                        with medir(f"styler projeção ({cultura})"):
+                            st.dataframe(df_cultura.style.format(format_brl))
                     
-                    elif centro_custo in custos_por_cultura:
-                        # Despesa direta da cultura
-                        valores_anos = []
+                        # Totais da cultura
+                        totais_cultura = df_cultura.sum(axis=0)
+                        st.markdown(f"**Total {cultura}:**")
+                        cols_cultura = st.columns(len(anos))
                         for i, ano in enumerate(anos):
-                            fator_inflacao = np.prod([1 + inflacoes[j] / 100 for j in range(i + 1)])
-                            valores_anos.append(valor_base * fator_inflacao)
-                        
-                        custos_por_cultura[centro_custo].loc[nome_despesa] = valores_anos
-            
-            # Processar empréstimos
-            if tem_emprestimos:
-                for emp in st.session_state['emprestimos']:
-                    nome_emprestimo = f"Empréstimo: {emp['objeto']}"
-                    centro_custo = emp.get('centro_custo', 'Administrativo')
-                    valor_parcela = emp.get('valor_parcela', 0)
-                    
-                    if centro_custo == 'Administrativo':
-                        # Ratear para todas as culturas
-                        for cultura, percentual in rateio_percentual.items():
-                            valor_cultura = valor_parcela * percentual
-                            linha_nome = f"{nome_emprestimo} (Rateio Adm.)"
-                            
-                            # Inicializar linha se não existir
-                            if linha_nome not in custos_por_cultura[cultura].index:
-                                custos_por_cultura[cultura].loc[linha_nome] = [0] * len(anos)
-                            
-                            # Aplicar parcelas nos anos apropriados
-                            start_year_index = anos.index(emp.get("ano_inicial", "Ano 1"))
-                            end_year_index = anos.index(emp.get("ano_final", "Ano 5"))
-                            num_years = end_year_index - start_year_index + 1
-                            parcelas = emp.get('parcelas', 1)
-                            
-                            for i in range(start_year_index, min(start_year_index + min(parcelas, num_years), len(anos))):
-                                ano = anos[i]
-                                custos_por_cultura[cultura].at[linha_nome, ano] += valor_cultura
-                    
-                    elif centro_custo in custos_por_cultura:
-                        # Empréstimo direto da cultura
-                        if nome_emprestimo not in custos_por_cultura[centro_custo].index:
-                            custos_por_cultura[centro_custo].loc[nome_emprestimo] = [0] * len(anos)
-                        
-                        start_year_index = anos.index(emp.get("ano_inicial", "Ano 1"))
-                        end_year_index = anos.index(emp.get("ano_final", "Ano 5"))
-                        num_years = end_year_index - start_year_index + 1
-                        parcelas = emp.get('parcelas', 1)
-                        
-                        for i in range(start_year_index, min(start_year_index + min(parcelas, num_years), len(anos))):
-                            ano = anos[i]
-                            custos_por_cultura[centro_custo].at[nome_emprestimo, ano] += valor_parcela
-            
-            # Exibir custos por cultura
-            for cultura, df_cultura in custos_por_cultura.items():
-                if not df_cultura.empty:
-                    st.markdown(f"**🌿 {cultura}**")
-                    df_cultura.index.name = "Item"
-                    st.dataframe(df_cultura.style.format(format_brl))
-                    
-                    # Totais da cultura
-                    totais_cultura = df_cultura.sum(axis=0)
-                    st.markdown(f"**Total {cultura}:**")
-                    cols_cultura = st.columns(len(anos))
-                    for i, ano in enumerate(anos):
-                        with cols_cultura[i]:
-                            st.metric(ano, format_brl(totais_cultura.get(ano, 0)))
-                    st.markdown("---")
+                            with cols_cultura[i]:
+                                st.metric(ano, format_brl(totais_cultura.get(ano, 0)))
+                        st.markdown("---")
             
-            # Salvar dados para outras páginas
-            st.session_state['custos_por_cultura'] = custos_por_cultura
-            st.session_state['rateio_administrativo'] = rateio_percentual
+                # Salvar dados para outras páginas
+                st.session_state['custos_por_cultura'] = custos_por_cultura
+                st.session_state['rateio_administrativo'] = rateio_percentual
         
-        st.session_state['fluxo_caixa'] = df_fluxo
-
-    # Only calculate totals if df_fluxo has data
-    if not df_fluxo.empty:
-        totais_por_ano = df_fluxo.sum(axis=0)
-    else:
-        # Create empty Series with anos as index
-        totais_por_ano = pd.Series(0.0, index=anos)
-
-    st.markdown("#### 💵 Total Geral de Despesas por Ano")
-    cols_totais = st.columns(len(anos))
-    for i, ano in enumerate(anos):
-        with cols_totais[i]:
-            # Safe access with default value of 0
-            valor = totais_por_ano.get(ano, 0.0)
-            st.metric(ano, format_brl(valor))
+            st.session_state['fluxo_caixa'] = df_fluxo
+
+        # Only calculate totals if df_fluxo has data
+        if not df_fluxo.empty:
+            totais_por_ano = df_fluxo.sum(axis=0)
+        else:
+            # Create empty Series with anos as index
+            totais_por_ano = pd.Series(0.0, index=anos)
+
+        st.markdown("#### 💵 Total Geral de Despesas por Ano")
+        cols_totais = st.columns(len(anos))
+        for i, ano in enumerate(anos):
+            with cols_totais[i]:
+                # Safe access with default value of 0
+                valor = totais_por_ano.get(ano, 0.0)
+                st.metric(ano, format_brl(valor))
+
+        return df_fluxo, totais_por_ano, areas_por_cultura
+
+    df_fluxo, totais_por_ano, areas_por_cultura = projecao_despesas()
+    tem_despesas = st.session_state.get('despesas') and isinstance(st.session_state['despesas'], list)
+    tem_emprestimos = st.session_state.get('emprestimos') and isinstance(st.session_state['emprestimos'], list)
 
     # --- LIMPAR TUDO ---
     if st.button("Limpar Tudo", key="btn_clear_all"):
@@ -589,8 +729,6 @@ def main():
             keys_to_clear = list(st.session_state.keys())
             for key in keys_to_clear:
                 del st.session_state[key]
-            st.session_state["despesas_importadas_ok"] = False
-            st.session_state["emprestimos_importados_ok"] = False
             st.success("Todos os dados e uploads foram limpos!")
             st.rerun()
         else:
@@ -666,7 +804,8 @@ def main():
         if st.button("📊 Gerar Relatório Excel", type="primary"):
             if tem_despesas or tem_emprestimos:
                 try:
-                    excel_buffer = criar_relatorio_excel()
+                    with medir("excel despesas"):
+                        excel_buffer = criar_relatorio_excel()
                     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
                     filename = f"relatorio_despesas_completo_{timestamp}.xlsx"
                     
@@ -687,4 +826,4 @@ def main():
         st.info("📋 **O relatório inclui:**\n- Fluxo de caixa geral\n- Custos detalhados por cultura\n- Rateio administrativo\n- Despesas e empréstimos cadastrados\n- Configurações de inflação")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    executar_pagina("Despesas", main)
@@ -6,11 +6,17 @@ import plotly.express as px
 from io import BytesIO
 
 from utils.session import carregar_configuracoes
-from utils.dre import calcular_dre
+from utils.cubo import montar_cubo
+from utils.cenarios import COLUNA_NOME, emojis_cenarios
+from utils.pipeline import obter
+from utils.projecao import calcular_totais_plantio
+from utils.emprestimos import emprestimos_invalidos
+from utils.fluxo_mensal import CHAVE_CALENDARIOS, fluxo_caixa_mensal, indicadores_caixa, tabela_calendarios, calendarios_da_tabela
+from utils.perf import executar_pagina, medir
 carregar_configuracoes()
 
 st.set_page_config(layout="wide", page_title="Fluxo de Caixa Projeção")
-st.title("🎯 Fluxo de Caixa - Cenários (Projetado, Pessimista, Otimista)")
+st.title("🎯 Fluxo de Caixa - Cenários")
 
 def main():
 
@@ -18,7 +24,7 @@ def main():
     if "plantios" not in st.session_state or not st.session_state["plantios"]:
         st.warning("Cadastre ao menos um plantio para gerar o fluxo de caixa.")
         st.stop()
-    if "fluxo_caixa" not in st.session_state:
+    if not st.session_state.get("despesas") and not st.session_state.get("emprestimos"):
         st.warning("Você precisa preencher as despesas antes de acessar esta página.")
         st.stop()
 
@@ -26,7 +32,7 @@ def main():
     anos = [f"Ano {i+1}" for i in range(5)]
     inflacoes = [st.session_state.get(f"inf_{i}", 4.0) for i in range(5)]
     plantios = st.session_state["plantios"]
-    df_base_fluxo = st.session_state["fluxo_caixa"]
+    df_base_fluxo = obter(st.session_state, "projecao_despesas")["fluxo_caixa"]
 
     with st.expander("🔧 Cenário e Inflação"):
         st.markdown("### 📈 Inflação Estimada por Ano")
@@ -39,79 +45,37 @@ def main():
             with col:
                 st.metric(f"Ano {i+1}", f"{valor:.2f}%")
 
-        pess_receita = st.session_state["pess_receita"]
-        pess_despesas = st.session_state["pess_despesas"]
-        otm_receita = st.session_state["otm_receita"]
-        otm_despesas = st.session_state["otm_despesas"]
+        cenarios = obter(st.session_state, "cenarios")
+        nomes_cenarios = cenarios[COLUNA_NOME].tolist()
+        impostos = obter(st.session_state, "impostos")
 
         st.markdown("### 🔧 Parâmetros de Cenário Atuais")
-        col1, col2, col3, col4 = st.columns(4)
-        with col1:
-            st.metric("💸 Receita Pessimista", f"-{st.session_state.get('pess_receita', 15)}%")
-        with col2:    
-            st.metric("💰 Despesa Pessimista", f"+{st.session_state.get('pess_despesas', 10)}%")
-        with col3:
-            st.metric("💸 Receita Otimista", f"+{st.session_state.get('otm_receita', 10)}%")
-        with col4:
-            st.metric("💰 Despesa Otimista", f"-{st.session_state.get('otm_despesas', 10)}%")
+        st.dataframe(cenarios, hide_index=True, use_container_width=True)
 
     # === CÁLCULO DA RECEITA ESTIMADA BASE ===
-    total_sacas = preco_total = hectares_total = 0
-
-    for p_data in plantios.values():
-        hectares = p_data.get("hectares", 0)
-        sacas = p_data.get("sacas_por_hectare", 0)
-        preco = p_data.get("preco_saca", 0)
-        hectares_total += hectares
-        total_sacas += sacas * hectares
-        preco_total += preco * sacas * hectares
+    hectares_total, total_sacas, preco_total = calcular_totais_plantio(plantios)
 
     if hectares_total == 0 or total_sacas == 0:
         st.error("Dados de plantio incompletos para estimar receita.")
         st.stop()
 
-    media_receita_hectare = (preco_total / total_sacas) * (total_sacas / hectares_total)
-
-    # Receita Estimada para o cenário base (projetado)
-    receita_base = []
-    for i in range(5):
-        fator = np.prod([1 + inflacoes[j] / 100 for j in range(i + 1)])
-        receita_base.append(hectares_total * media_receita_hectare * fator)
-
-    # Adicionar Receitas Extras
-    receitas_extras = {"Operacional": [0] * 5, "Extra Operacional": [0] * 5}
-    if "receitas_adicionais" in st.session_state:
-        for receita in st.session_state["receitas_adicionais"].values():
-            valor = receita["valor"]
-            categoria = receita["categoria"]
-            for ano in receita["anos_aplicacao"]:
-                idx = anos.index(ano)
-                if categoria == "Operacional":
-                    fator = np.prod([1 + inflacoes[j] / 100 for j in range(idx + 1)])
-                    receitas_extras["Operacional"][idx] += valor * fator
-                else:
-                    receitas_extras["Extra Operacional"][idx] += valor
-
-    # CENÁRIOS DE RECEITA
-    receitas = {
-        "Projetado": [receita_base[i] + receitas_extras["Operacional"][i] for i in range(5)],
-        "Pessimista": [(receita_base[i] + receitas_extras["Operacional"][i]) * (1 - pess_receita / 100) for i in range(5)],
-        "Otimista": [(receita_base[i] + receitas_extras["Operacional"][i]) * (1 + otm_receita / 100) for i in range(5)]
-    }
-
-    # CENÁRIOS DE FLUXO DE DESPESAS
-    def ajustar_despesas(df_base, ajuste_percentual):
-        df = df_base.copy()
-        for row in df.index:
-            if row not in ["Receita Estimada", "Lucro Líquido", "Impostos Sobre Resultado"]:
-                df.loc[row] = df.loc[row] * (1 + ajuste_percentual / 100)
-        return df
-
-    fluxos = {
-        "Projetado": df_base_fluxo.copy(),
-        "Pessimista": ajustar_despesas(df_base_fluxo, pess_despesas),
-        "Otimista": ajustar_despesas(df_base_fluxo, -otm_despesas)
-    }
+    # CENÁRIOS DE RECEITA (inclui receitas adicionais)
+    receitas, receitas_extras = obter(st.session_state, "receitas")
+
+    # EMPRÉSTIMOS (cronograma no fluxo de despesas dos cenários)
+    emprestimos = st.session_state.get("emprestimos", [])
+    invalidos = set(emprestimos_invalidos(emprestimos, anos))
+    for i in sorted(invalidos):
+        st.warning(f"Empréstimo inválido: {emprestimos[i].get('objeto', 'Desconhecido')}. Ignorando.")
+
+    # CENÁRIOS DE FLUXO DE DESPESAS (mesmos fatores por índice e agenda que o DRE usa)
+    fluxo_cenarios = obter(st.session_state, "fluxo_despesas_cenarios")
+    with medir("ajustar_despesas"):
+        base = df_base_fluxo.reindex(columns=anos).to_numpy(dtype=float)
+        valores_fluxo = np.stack([
+            fluxo_cenarios[linha] if linha in fluxo_cenarios else np.broadcast_to(base[i], (len(nomes_cenarios), len(anos)))
+            for i, linha in enumerate(df_base_fluxo.index)
+        ], axis=1) if len(df_base_fluxo) else np.zeros((len(nomes_cenarios), 0, len(anos)))
 
     col1, col2 = st.columns(2)
 
@@ -141,26 +105,23 @@ def main():
 
     with col2:
         with st.expander("🧾 Entenda os impostos aplicados no DRE e Fluxo de Caixa"):
-            st.markdown("""
-            O sistema aplica os principais impostos com base na **receita estimada** e no **lucro operacional**, simulando uma empresa agropecuária no regime presumido.
-
-            **1. Impostos sobre Venda (4,85%)**
-            - **FUNRURAL (1,2%)**: contribuição previdenciária sobre a receita bruta da comercialização.
-            - **PIS/COFINS (3,65%)**: contribuições sociais sobre faturamento, comuns no agronegócio.
+            st.markdown(f"""
+            O sistema aplica os impostos do regime tributário **{impostos['regime']}** (configurável na página de Ajuste de Cenários), com alíquotas por ano:
 
-            Esses impostos incidem diretamente sobre a **Receita Estimada** e são somados como "Impostos Sobre Venda".
+            - **Impostos sobre Venda**: tributos com base na **Receita Estimada** (e, se houver, na folha — Despesas RH).
+            - **Impostos sobre Resultado**: tributos com base no **Lucro Operacional**, somente se positivo. Prejuízos de anos anteriores abatem até **{impostos.get('compensacao') or 0:.0f}%** do lucro de cada ano.
 
-            **2. Impostos sobre Resultado (15%)**
-            - Refere-se a uma estimativa de **IRPJ + CSLL**, aplicada **somente sobre o Lucro Operacional**, se positivo.
-
-            > 💡 Estes valores são simulações aproximadas, ideais para análise financeira e não substituem a apuração contábil real.
+            Os mesmos impostos são usados no DRE consolidado, no resultado de cada cultura e nos indicadores.
             """)
+            st.dataframe(pd.DataFrame(impostos["regras"]), hide_index=True, use_container_width=True)
+            st.caption("💡 Estes valores são simulações aproximadas, ideais para análise financeira e não substituem a apuração contábil real.")
 
     # === EXIBIÇÃO COMPARATIVA DE CENÁRIOS ===
-    st.markdown("### 📊 Análise de Cenários (Projetado, Pessimista, Otimista)")
+    st.markdown("### 📊 Análise de Cenários")
 
-    abas = st.tabs(["📈 Projetado", "🔻 Pessimista", "🔺 Otimista"])
-    nomes_cenarios = ["Projetado", "Pessimista", "Otimista"]
+    emojis = emojis_cenarios(cenarios)
+    # Só a aba selecionada é montada; trocar de aba reexecuta a página com os dados do cache (utils.pipeline)
+    abas = st.tabs([f"{emojis[nome]} {nome}" for nome in nomes_cenarios], key="abas_cenarios_fluxo", on_change="rerun")
 
     def format_brl(x):
         try:
@@ -192,55 +153,42 @@ def main():
         return ["background-color: #FF4040; color: white;" if x <= 0 else "" for x in linha]
 
     def gerar_excel_download(df_fluxo, df_dre, df_retorno, resumo, nome_cenario):
-        output = BytesIO()
-        with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-            df_fluxo.to_excel(writer, sheet_name="Fluxo de Caixa")
-            df_dre.to_excel(writer, sheet_name="DRE")
-            resumo.to_excel(writer, sheet_name="Resumo Financeiro")
-            df_retorno.to_excel(writer, sheet_name="Retorno por Real Gasto")
-            workbook = writer.book
-            currency_format = workbook.add_format({'num_format': 'R$ #,##0.00'})
-            for sheet in writer.sheets.values():
-                for col_num in range(len(df_fluxo.columns) + 1):
-                    sheet.set_column(col_num, col_num, 15, currency_format)
-        output.seek(0)
+        def planilha():
+            output = BytesIO()
+            with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+                df_fluxo.to_excel(writer, sheet_name="Fluxo de Caixa")
+                df_dre.to_excel(writer, sheet_name="DRE")
+                resumo.to_excel(writer, sheet_name="Resumo Financeiro")
+                df_retorno.to_excel(writer, sheet_name="Retorno por Real Gasto")
+                workbook = writer.book
+                currency_format = workbook.add_format({'num_format': 'R$ #,##0.00'})
+                for sheet in writer.sheets.values():
+                    for col_num in range(len(df_fluxo.columns) + 1):
+                        sheet.set_column(col_num, col_num, 15, currency_format)
+            return output.getvalue()
+
+        # A planilha só é montada quando o botão é clicado
         st.download_button(
             label=f"⬇️ Baixar Excel - {nome_cenario}",
-            data=output,
+            data=planilha,
             file_name=f"cenario_{nome_cenario.lower()}.xlsx",
             mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
             key=f"download_excel_{nome_cenario.lower()}"
         )
 
-    for aba, nome in zip(abas, nomes_cenarios):
+    # DRE dos cenários, guardado num cubo de resultados (as tabelas abaixo são visões dele)
+    dre_cenarios = obter(st.session_state, "dre_cenarios")
+    cubo = montar_cubo(dre_cenarios, nomes_cenarios, anos, impostos=impostos)
+
+    for s, (aba, nome) in enumerate(zip(abas, nomes_cenarios)):
+        if not aba.open:
+            continue
         with aba:
             st.subheader(f"📊 Fluxo de Caixa - Cenário {nome}")
-            df_fluxo = fluxos[nome].copy()
+            df_fluxo = pd.DataFrame(valores_fluxo[s], index=df_base_fluxo.index, columns=anos)
             df_fluxo.loc["Receita Estimada"] = receitas[nome]
             df_fluxo.loc["Receita Extra Operacional"] = receitas_extras["Extra Operacional"]
 
-            # Adicionar empréstimos ao fluxo de caixa (alinhado com DRE)
-            emprestimos_por_ano = [0] * len(anos)
-            if "emprestimos" in st.session_state:
-                for emp in st.session_state["emprestimos"]:
-                    try:
-                        linha = f"Empréstimo: {emp['objeto']}"
-                        if linha not in df_fluxo.index:
-                            df_fluxo.loc[linha] = [0] * len(anos)
-                        start_year_index = anos.index(emp["ano_inicial"])
-                        end_year_index = anos.index(emp["ano_final"])
-                        parcelas_restantes = emp["parcelas"]
-                        for i in range(start_year_index, min(end_year_index + 1, len(anos))):
-                            if parcelas_restantes > 0:
-                                ajuste = (pess_despesas if nome == "Pessimista" else (-otm_despesas if nome == "Otimista" else 0)) / 100
-                                valor_parcela = emp["valor_parcela"] * (1 + ajuste)
-                                df_fluxo.at[linha, anos[i]] = valor_parcela  # Atribui em vez de somar
-                                emprestimos_por_ano[i] = valor_parcela  # Define o valor para o DRE
-                                parcelas_restantes -= 1
-                    except (ValueError, KeyError):
-                        st.warning(f"Empréstimo inválido: {emp.get('objeto', 'Desconhecido')}. Ignorando.")
-                        continue
-
             ordem = ["Receita Estimada", "Receita Extra Operacional"] + [i for i in df_fluxo.index if i not in ["Receita Estimada", "Receita Extra Operacional"]]
             df_fluxo = df_fluxo.loc[ordem]
 
@@ -255,42 +203,18 @@ def main():
                 }
             ]
 
-            st.dataframe(
-                df_fluxo.style
-                    .format(format_brl)
-                    .apply(aplicar_estilo_fluxo, axis=1)
-                    .set_table_styles(style_idx_fluxo, overwrite=False),
-                use_container_width=True
-            )
+            with medir(f"styler fluxo ({nome})"):
+                st.dataframe(
+                    df_fluxo.style
+                        .format(format_brl)
+                        .apply(aplicar_estilo_fluxo, axis=1)
+                        .set_table_styles(style_idx_fluxo, overwrite=False),
+                    use_container_width=True
+                )
 
             st.subheader(f"📘 DRE - Cenário {nome}")
 
-            df_despesas_info = pd.DataFrame(st.session_state.get("despesas", []))
-            if not df_despesas_info.empty and "Categoria" in df_despesas_info.columns:
-                df_despesas_info["Categoria"] = df_despesas_info["Categoria"].astype(str).str.strip()
-            else:
-                df_despesas_info = pd.DataFrame(columns=["Categoria", "Valor"])
-
-            dre_calc = calcular_dre(
-                nome, inflacoes, anos, hectares_total, total_sacas, preco_total,
-                receitas, receitas_extras,
-                df_despesas_info,
-                st.session_state.get("emprestimos", []),
-                pess_despesas, otm_despesas
-            )
-
-            # --- ADICIONE ESTAS LINHAS AQUI ---
-            if "dre_cenarios" not in st.session_state:
-                st.session_state["dre_cenarios"] = {}
-            st.session_state["dre_cenarios"][nome] = dre_calc
-
-            df_dre = pd.DataFrame(dre_calc, index=anos).T.loc[[ 
-                "Receita", "Impostos Sobre Venda", "Despesas Operacionais",
-                "Margem de Contribuição", "Despesas Administrativas", "Despesas RH",
-                "Resultado Operacional", "Despesas Extra Operacional",
-                "Lucro Operacional", "Impostos Sobre Resultado",
-                "Receita Extra Operacional", "Dividendos", "Lucro Líquido"
-            ]]
+            df_dre = cubo.tabela(nome)
 
             style_idx_dre = []
             if "Receita" in df_dre.index:
@@ -306,13 +230,14 @@ def main():
                         "props": [("background-color", "#006400"), ("color", "white")]
                     })
 
-            st.dataframe(
-                df_dre.style
-                    .format(format_brl)
-                    .apply(aplicar_estilo_dre, axis=1)
-                    .set_table_styles(style_idx_dre, overwrite=False),
-                height=495
-            )
+            with medir(f"styler DRE ({nome})"):
+                st.dataframe(
+                    df_dre.style
+                        .format(format_brl)
+                        .apply(aplicar_estilo_dre, axis=1)
+                        .set_table_styles(style_idx_dre, overwrite=False),
+                    height=495
+                )
 
             st.subheader(f"📈 Retorno por Real Gasto - Cenário {nome}")
             despesas_totais = (
@@ -340,24 +265,6 @@ def main():
                 use_container_width=True
             )
 
-            emprestimos_detalhados = []
-            if "emprestimos" in st.session_state:
-                for i, emp in enumerate(st.session_state["emprestimos"], start=1):
-                    try:
-                        descricao = emp.get("objeto", f"Empréstimo {i}").strip() or f"Empréstimo {i}"
-                        start_year_index = anos.index(emp["ano_inicial"])
-                        end_year_index = anos.index(emp["ano_final"])
-                        num_years = end_year_index - start_year_index + 1
-                        total = emp["valor_parcela"] * min(emp["parcelas"], num_years)
-                        emprestimos_detalhados.append({
-                            "Descrição": f"{descricao} ({emp['ano_inicial']} a {emp['ano_final']})",
-                            "Valor": total,
-                            "Categoria": "Extra Operacional"
-                        })
-                    except (ValueError, KeyError):
-                        st.warning(f"Empréstimo inválido: {emp.get('objeto', 'Desconhecido')}. Ignorando.")
-                        continue
-            
             st.subheader(f"📌 Resumo Financeiro Anual - Cenário {nome}")
 
             resumo = pd.DataFrame({
@@ -371,12 +278,59 @@ def main():
                 use_container_width=True
             )
 
-            gerar_excel_download(df_fluxo, df_dre, df_retorno, resumo, nome)
+            with medir(f"excel ({nome})"):
+                gerar_excel_download(df_fluxo, df_dre, df_retorno, resumo, nome)
+
+    # === FLUXO DE CAIXA MENSAL (opcional) ===
+    st.markdown("### 📅 Fluxo de Caixa Mensal")
+    if not st.toggle("Exibir visão mensal (sazonalidade de colheita e compra de insumos)", key="fluxo_mensal_ativo"):
+        st.caption("A visão mensal distribui o DRE anual pelos meses conforme o calendário de cada cultura.")
+        return
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        cenario_mensal = st.selectbox("Cenário", nomes_cenarios, key="fluxo_mensal_cenario")
+    with col2:
+        caixa_inicial = st.number_input("Caixa inicial (R$)", value=0.0, step=10000.0, format="%.2f", key="fluxo_mensal_caixa_inicial")
+    with col3:
+        caixa_minimo = st.number_input("Caixa mínimo desejado (R$)", min_value=0.0, value=0.0, step=10000.0, format="%.2f", key="fluxo_mensal_caixa_minimo")
+
+    with st.expander("🗓️ Calendário das culturas (% da receita e dos insumos por mês)"):
+        culturas = sorted({p.get("cultura", "") for p in plantios.values() if p.get("cultura")})
+        tabela = st.data_editor(
+            tabela_calendarios(culturas, st.session_state.get(CHAVE_CALENDARIOS)),
+            use_container_width=True,
+            key="editor_calendarios"
+        )
+        st.session_state[CHAVE_CALENDARIOS] = calendarios_da_tabela(tabela)
 
-    # --- ADICIONE ESTAS LINHAS FORA DO LOOP, APÓS ELE TERMINAR ---
-        st.session_state["receitas_cenarios"] = receitas
-        st.session_state["inflacoes"] = inflacoes
-        st.session_state["anos"] = anos
+    with medir("fluxo mensal"):
+        df_mensal = fluxo_caixa_mensal(
+            dre_cenarios[cenario_mensal], anos, plantios, emprestimos,
+            caixa_inicial, st.session_state[CHAVE_CALENDARIOS]
+        )
+        indicadores = indicadores_caixa(df_mensal, caixa_minimo)
+
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Saldo Mínimo de Caixa", format_brl(indicadores["Saldo Mínimo"]))
+    with col2:
+        st.metric("Mês do Saldo Mínimo", indicadores["Mês do Saldo Mínimo"])
+    with col3:
+        st.metric("Necessidade de Capital de Giro", format_brl(indicadores["Necessidade de Capital de Giro"]))
+    with col4:
+        st.metric("Meses Abaixo do Mínimo", indicadores["Meses Abaixo do Mínimo"])
+
+    fig = go.Figure()
+    fig.add_trace(go.Bar(x=df_mensal.columns, y=df_mensal.loc["(=) Fluxo Líquido do Mês"], name="Fluxo Líquido do Mês"))
+    fig.add_trace(go.Scatter(x=df_mensal.columns, y=df_mensal.loc["Saldo de Caixa"], name="Saldo de Caixa", mode="lines+markers"))
+    if caixa_minimo > 0:
+        fig.add_hline(y=caixa_minimo, line_dash="dash", line_color="red", annotation_text="Caixa mínimo")
+    fig.update_layout(title=f"Fluxo de Caixa Mensal - Cenário {cenario_mensal}", yaxis_title="R$", hovermode="x unified")
+    st.plotly_chart(fig, use_container_width=True)
+
+    with st.expander("📋 Tabela mensal"):
+        st.dataframe(df_mensal.style.format(format_brl), use_container_width=True)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    executar_pagina("Fluxo de Caixa", main)
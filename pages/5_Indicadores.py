@@ -3,13 +3,23 @@ import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
 import plotly.express as px
-from io import BytesIO
 import base64
 from datetime import datetime
 
 # Importa as configurações de sessão e a função de cálculo do DRE existente
 from utils.session import carregar_configuracoes
 from utils.dre import calcular_dre # <--- ESSENCIAL: Reutilizar a função existente!
+from utils.indicadores import calcular_dre_por_cultura_cenarios
+from utils.cenarios import COLUNA_NOME, cenario_base, parametros_cenarios
+from utils.cubo import CONSOLIDADO, VISAO_FLUXO_CAIXA, VISAO_FLUXO_CULTURA
+from utils.precos import CHAVE_CURVAS
+from utils.pipeline import obter
+from utils.relatorio_excel import criar_relatorio_excel_completo
+from utils.sensibilidade import METRICAS_TORNADO, analise_tornado
+from utils.equilibrio import COLUNAS_EQUILIBRIO, calcular_equilibrio
+from utils.impostos import CHAVE_IMPOSTOS
+from utils.inflacao import CHAVE_INDICES, CHAVE_INDICES_CATEGORIA
+from utils.perf import executar_pagina, medido
 
 carregar_configuracoes()
 
@@ -28,15 +38,26 @@ def format_brl(x):
     except Exception:
         return x # Retorna o valor original em caso de erro
 
-def calcular_cagr(valor_inicial, valor_final, periodos):
-    """Calcula a Taxa de Crescimento Anual Composta (CAGR)."""
-    if valor_inicial <= 0 or periodos <= 0:
-        return 0.0 # Evita divisão por zero ou log de números não positivos
-    if valor_final <= 0: # Se o valor final for negativo, é um declínio
-        # Calcula a taxa de declínio como um CAGR negativo
-        # Usamos o valor absoluto para o cálculo da base, mas o resultado é negativo
-        return ((abs(valor_final) / valor_inicial) ** (1 / periodos) - 1) * -100
-    return ((valor_final / valor_inicial) ** (1 / periodos) - 1) * 100
+def secao_sob_demanda(titulo, chave):
+    """Expander cujo conteúdo (e cálculo) só é montado quando ele está aberto."""
+    return st.expander(titulo, key=chave, on_change="rerun")
+
+@medido()
+def display_headline_kpis(cubo, all_indicators):
+    """Indicadores-chave do cenário de referência, exibidos antes das seções detalhadas."""
+    base = cenario_base(list(all_indicators))
+    indicators = all_indicators[base]
+    receita = cubo.total("Receita", base, CONSOLIDADO)
+    lucro = cubo.total("Lucro Líquido", base, CONSOLIDADO)
+    dscr = [x for x in indicators["DSCR"] if x != float("inf")]
+
+    st.markdown(f"### 🎯 Resumo - Cenário {base}")
+    col1, col2, col3, col4, col5 = st.columns(5)
+    col1.metric("Receita Total (5 anos)", format_brl(float(receita)))
+    col2.metric("Lucro Líquido (5 anos)", format_brl(float(lucro)))
+    col3.metric("Margem Média", f"{lucro / receita * 100:.2f}%" if receita > 0 else "-")
+    col4.metric("DSCR Mínimo", f"{min(dscr):.2f}" if dscr else "∞")
+    col5.metric("CAGR Lucro Líquido", f"{indicators['CAGR Lucro Líquido (%)']:.2f}%")
 
 def display_indicator_explanation():
     """Exibe a seção de explicação dos indicadores financeiros."""
@@ -111,584 +132,181 @@ def display_indicator_explanation():
         - **Interpretação:** Valores negativos requerem revisão de custos ou estratégias.
         """)
 
+@medido()
 def get_base_financial_data():
     """
-    Consolida a extração de dados financeiros base e o cálculo de receitas.
-    Inclui dados por cultura quando disponíveis.
+    Dados financeiros base (receitas, DRE e dados por cultura) do grafo de cálculo da sessão.
+    Não depende da visita prévia às páginas de Despesas e Fluxo de Caixa.
     """
-    required_keys = ["plantios", "dre_cenarios", "receitas_cenarios", "inflacoes", "anos"]
-    for key in required_keys:
-        if key not in st.session_state:
-            st.warning(f"Dados essenciais não encontrados: '{key}'. Por favor, verifique as páginas anteriores.")
-            st.stop()
-    if not st.session_state["plantios"]:
+    if not st.session_state.get("plantios"):
         st.warning("Nenhum plantio cadastrado. Cadastre ao menos um plantio para gerar os indicadores.")
         st.stop()
 
-    plantios = st.session_state["plantios"]
-    inflacoes = st.session_state["inflacoes"]
-    anos = st.session_state["anos"]
-
-    hectares_total = 0
-    total_sacas = 0
-    preco_total_base = 0
-
-    # Calcular totais de plantio
-    for p_data in plantios.values():
-        hectares = p_data.get("hectares", 0)
-        sacas = p_data.get("sacas_por_hectare", 0)
-        preco = p_data.get("preco_saca", 0)
-        hectares_total += hectares
-        total_sacas += sacas * hectares
-        preco_total_base += preco * sacas * hectares
-
-    if hectares_total == 0 or total_sacas == 0:
+    # Cópia rasa: a página acrescenta chaves (cubo, DRE por cultura) sem alterar o cache
+    session_data = dict(obter(st.session_state, "dados_indicadores"))
+    if session_data["hectares_total"] == 0 or session_data["total_sacas"] == 0:
         st.error("Dados de plantio incompletos para estimar receita e indicadores. Verifique o cadastro de plantios.")
         st.stop()
+    return session_data
 
-    # Estimativa de ativos totais
-    total_ativos = hectares_total * 20000 + 1000000
-
-    # Receitas já calculadas
-    receitas_cenarios = st.session_state["receitas_cenarios"]
-
-    # Receitas extras projetadas
-    receitas_extras_projetadas = {"Operacional": [0] * len(anos), "Extra Operacional": [0] * len(anos)}
-    if "receitas_adicionais" in st.session_state:
-        for receita_add in st.session_state["receitas_adicionais"].values():
-            valor = receita_add["valor"]
-            categoria = receita_add["categoria"]
-            for ano_aplicacao in receita_add["anos_aplicacao"]:
-                try:
-                    idx = anos.index(ano_aplicacao)
-                    if categoria == "Operacional":
-                        fator = np.prod([1 + inflacoes[j] for j in range(idx + 1)])
-                        receitas_extras_projetadas["Operacional"][idx] += valor * fator
-                    else:
-                        receitas_extras_projetadas["Extra Operacional"][idx] += valor
-                except ValueError:
-                    continue
-
-    # Dados por cultura (se disponíveis)
-    custos_por_cultura = st.session_state.get('custos_por_cultura', {})
-    rateio_administrativo = st.session_state.get('rateio_administrativo', {})
-    
-    # Calcular receitas por cultura para TODOS OS CENÁRIOS
-    receitas_por_cultura_cenarios = {}
-    
-    if plantios and custos_por_cultura:
-        for cenario_name in ["Projetado", "Pessimista", "Otimista"]:
-            receitas_por_cultura_cenarios[cenario_name] = {}
-            
-            # Obter fatores de ajuste do cenário
-            pess_receita = st.session_state.get("pess_receita", 15)
-            otm_receita = st.session_state.get("otm_receita", 10)
-            
-            fator_receita = 1.0
-            if cenario_name == "Pessimista":
-                fator_receita = 1 - (pess_receita / 100)
-            elif cenario_name == "Otimista":
-                fator_receita = 1 + (otm_receita / 100)
-            
-            for plantio_nome, plantio_data in plantios.items():
-                cultura = plantio_data.get('cultura', '')
-                if cultura and cultura in custos_por_cultura:
-                    if cultura not in receitas_por_cultura_cenarios[cenario_name]:
-                        receitas_por_cultura_cenarios[cenario_name][cultura] = {}
-                        for ano in anos:
-                            receitas_por_cultura_cenarios[cenario_name][cultura][ano] = 0
-                    
-                    # Calcular receita da cultura para cada ano com ajuste de cenário
-                    hectares = plantio_data.get('hectares', 0)
-                    sacas_por_ha = plantio_data.get('sacas_por_hectare', 0)
-                    preco_saca = plantio_data.get('preco_saca', 0)
-                    
-                    for i, ano in enumerate(anos):
-                        fator_inflacao = np.prod([1 + inflacoes[j] / 100 for j in range(i + 1)])
-                        receita_base = hectares * sacas_por_ha * preco_saca * fator_inflacao
-                        receita_cenario = receita_base * fator_receita
-                        receitas_por_cultura_cenarios[cenario_name][cultura][ano] += receita_cenario
-
-    return {
-        "plantios": plantios,
-        "dre_cenarios": st.session_state["dre_cenarios"],
-        "receitas_cenarios": receitas_cenarios,
-        "inflacoes": inflacoes,
-        "anos": anos,
-        "pess_receita": st.session_state.get("pess_receita", 15),
-        "pess_despesas": st.session_state.get("pess_despesas", 10),
-        "otm_receita": st.session_state.get("otm_receita", 10),
-        "otm_despesas": st.session_state.get("otm_despesas", 10),
-        "despesas_info": pd.DataFrame(st.session_state.get("despesas", [])),
-        "emprestimos": st.session_state.get("emprestimos", []),
-        "hectares_total": hectares_total,
-        "total_sacas": total_sacas,
-        "preco_total_base": preco_total_base,
-        "total_ativos": total_ativos,
-        "receitas_extras_projetadas": receitas_extras_projetadas,
-        "custos_por_cultura": custos_por_cultura,
-        "rateio_administrativo": rateio_administrativo,
-        "receitas_por_cultura_cenarios": receitas_por_cultura_cenarios
-    }
-
-def calcular_dre_por_cultura_cenarios(session_data):
-    """Calcula DRE específico por cultura e cenário baseado nas receitas e custos de cada cultura."""
-    receitas_por_cultura_cenarios = session_data.get("receitas_por_cultura_cenarios", {})
-    custos_por_cultura = session_data.get("custos_por_cultura", {})
-    anos = session_data.get("anos", [])
-    nomes_cenarios = ["Projetado", "Pessimista", "Otimista"]
-    
-    dre_por_cultura_cenarios = {}
-    
-    for cenario in nomes_cenarios:
-        dre_por_cultura_cenarios[cenario] = {}
-        
-        if cenario in receitas_por_cultura_cenarios:
-            receitas_cenario = receitas_por_cultura_cenarios[cenario]
-            
-            for cultura in receitas_cenario:
-                receitas_cultura = receitas_cenario[cultura]
-                custos_cultura = custos_por_cultura.get(cultura, {})
-                
-                # Calcular valores para cada ano
-                receitas_lista = []
-                custos_operacionais_lista = []
-                custos_administrativos_lista = []
-                custos_rh_lista = []
-                impostos_venda_lista = []
-                impostos_resultado_lista = []
-                dividendos_lista = []
-                despesas_extra_lista = []
-                
-                for ano in anos:
-                    receita_ano = receitas_cultura.get(str(ano), 0)
-                    receitas_lista.append(receita_ano)
-                    
-                    # Rateio proporcional dos custos baseado na receita da cultura
-                    receita_total_ano = sum(
-                        receitas_por_cultura_cenarios[cenario].get(c, {}).get(str(ano), 0) 
-                        for c in receitas_por_cultura_cenarios[cenario]
-                    )
-                    
-                    if receita_total_ano > 0:
-                        proporcao_cultura = receita_ano / receita_total_ano
-                    else:
-                        proporcao_cultura = 0
-                    
-                    # Aplicar proporção aos custos (usando DRE consolidado como base)
-                    dre_consolidado = session_data["dre_cenarios"].get(cenario, {})
-                    
-                    custo_operacional = dre_consolidado.get("Despesas Operacionais", [0] * len(anos))[anos.index(ano)] * proporcao_cultura
-                    custo_administrativo = dre_consolidado.get("Despesas Administrativas", [0] * len(anos))[anos.index(ano)] * proporcao_cultura
-                    custo_rh = dre_consolidado.get("Despesas RH", [0] * len(anos))[anos.index(ano)] * proporcao_cultura
-                    imposto_venda = dre_consolidado.get("Impostos Sobre Venda", [0] * len(anos))[anos.index(ano)] * proporcao_cultura
-                    imposto_resultado = dre_consolidado.get("Impostos Sobre Resultado", [0] * len(anos))[anos.index(ano)] * proporcao_cultura
-                    dividendo = dre_consolidado.get("Dividendos", [0] * len(anos))[anos.index(ano)] * proporcao_cultura
-                    despesa_extra = dre_consolidado.get("Despesas Extra Operacional", [0] * len(anos))[anos.index(ano)] * proporcao_cultura
-                    
-                    custos_operacionais_lista.append(custo_operacional)
-                    custos_administrativos_lista.append(custo_administrativo)
-                    custos_rh_lista.append(custo_rh)
-                    impostos_venda_lista.append(imposto_venda)
-                    impostos_resultado_lista.append(imposto_resultado)
-                    dividendos_lista.append(dividendo)
-                    despesas_extra_lista.append(despesa_extra)
-                
-                # Calcular lucro líquido
-                lucro_liquido_lista = []
-                for i in range(len(anos)):
-                    lucro = (receitas_lista[i] - impostos_venda_lista[i] - 
-                            custos_operacionais_lista[i] - custos_administrativos_lista[i] - 
-                            custos_rh_lista[i] - despesas_extra_lista[i] - 
-                            dividendos_lista[i] - impostos_resultado_lista[i])
-                    lucro_liquido_lista.append(lucro)
-                
-                # Montar DRE da cultura
-                dre_por_cultura_cenarios[cenario][cultura] = {
-                    "Receita": receitas_lista,
-                    "Impostos Sobre Venda": impostos_venda_lista,
-                    "Despesas Operacionais": custos_operacionais_lista,
-                    "Despesas Administrativas": custos_administrativos_lista,
-                    "Despesas RH": custos_rh_lista,
-                    "Despesas Extra Operacional": despesas_extra_lista,
-                    "Dividendos": dividendos_lista,
-                    "Impostos Sobre Resultado": impostos_resultado_lista,
-                    "Lucro Líquido": lucro_liquido_lista
-                }
-    
-    return dre_por_cultura_cenarios
-
-def calculate_indicators_for_scenario(scenario_name, dre_data, session_data):
-    """Calcula todos os indicadores financeiros para um dado cenário."""
-    anos = session_data["anos"]
-    hectares_total = session_data["hectares_total"]
-    total_sacas = session_data["total_sacas"]
-    preco_total_base = session_data["preco_total_base"]
-    # Preço médio por saca no ano base (para Break-Even Yield)
-    preco_medio_saca_base = preco_total_base / total_sacas if total_sacas > 0 else 0
-    total_ativos = session_data["total_ativos"]
-
-    # Extrair dados relevantes do DRE
-    receita = dre_data["Receita"]
-    impostos_sobre_venda = dre_data["Impostos Sobre Venda"]
-    despesas_operacionais = dre_data["Despesas Operacionais"]
-    despesas_administrativas = dre_data["Despesas Administrativas"]
-    despesas_rh = dre_data["Despesas RH"]
-    despesas_extra_operacional = dre_data["Despesas Extra Operacional"]
-    dividendos = dre_data["Dividendos"]
-    impostos_sobre_resultado = dre_data["Impostos Sobre Resultado"]
-    lucro_liquido = dre_data["Lucro Líquido"]
-    lucro_operacional = dre_data["Lucro Operacional"] # Já vem calculado do dre.py
-
-    # Calcular despesas totais para cada ano
-    despesas_totais = [
-        impostos_sobre_venda[i] +
-        despesas_operacionais[i] +
-        despesas_administrativas[i] +
-        despesas_rh[i] +
-        despesas_extra_operacional[i] +
-        dividendos[i] +
-        impostos_sobre_resultado[i]
-        for i in range(len(anos))
-    ]
-
-    indicators = {}
-
-    # 1. Margem Líquida (%)
-    indicators["Margem Líquida (%)"] = [
-        (l / r * 100) if r != 0 else 0 for l, r in zip(lucro_liquido, receita)
-    ]
-
-    # 2. Retorno por Real Gasto
-    indicators["Retorno por Real Gasto"] = [
-        (l / d) if d != 0 else 0 for l, d in zip(lucro_liquido, despesas_totais)
-    ]
-
-    # 3. Liquidez Operacional (Receita / Despesas Operacionais)
-    indicators["Liquidez Operacional"] = [
-        (r / d) if d != 0 else 0 for r, d in zip(receita, despesas_operacionais)
-    ]
-
-    # 4. Endividamento (%) (Total Parcelas Empréstimos / Receita Total)
-    # Usando Despesas Extra Operacional como proxy para o serviço da dívida,
-    # pois o dre.py já incorpora os ajustes de cenário para empréstimos nessa linha.
-    endividamento_anual = []
-    for i in range(len(anos)):
-        # Assumindo que Despesas Extra Operacional inclui principalmente pagamentos de empréstimos
-        # Se houver outras despesas extra operacionais significativas, isso pode ser menos preciso.
-        total_servico_divida_ano = despesas_extra_operacional[i]
-        endividamento_anual.append((total_servico_divida_ano / receita[i] * 100) if receita[i] != 0 else 0)
-    indicators["Endividamento (%)"] = endividamento_anual
-
-    # 5. Produtividade por Hectare (R\$/ha)
-    indicators["Produtividade por Hectare (R$/ha)"] = [
-        (r / hectares_total) if hectares_total != 0 else 0 for r in receita
-    ]
-
-    # 6. Custo por Receita (%)
-    indicators["Custo por Receita (%)"] = [
-        (d / r * 100) if r != 0 else 0 for d, r in zip(despesas_operacionais, receita)
-    ]
-
-    # 7. Debt Service Coverage Ratio (DSCR)
-    # DSCR = Lucro Operacional / Total Debt Service (pagamentos de empréstimos)
-    dscr_anual = []
-    for i in range(len(anos)):
-        total_servico_divida_ano = despesas_extra_operacional[i] # Usando proxy novamente
-        if total_servico_divida_ano != 0:
-            dscr_anual.append(lucro_operacional[i] / total_servico_divida_ano)
-        else:
-            dscr_anual.append(float("inf")) # Sem serviço da dívida, então a cobertura é infinita
-    indicators["DSCR"] = dscr_anual
-
-    # 8. Break-Even Yield (sacas/ha)
-    # Break-Even Yield = (Custos Totais / (Hectares * Preço por Saca))
-    # Usando o preço médio por saca do ano base para a projeção
-    indicators["Break-Even Yield (sacas/ha)"] = [
-        (despesas_totais[i] / (hectares_total * preco_medio_saca_base)) if (hectares_total != 0 and preco_medio_saca_base != 0) else 0
-        for i in range(len(anos))
-    ]
-
-    # 9. Return on Assets (ROA) (%)
-    indicators["ROA (%)"] = [
-        (l / total_ativos * 100) if total_ativos != 0 else 0 for l in lucro_liquido
-    ]
-
-    # 10. CAGR Receita (%)
-    indicators["CAGR Receita (%)"] = calcular_cagr(receita[0], receita[-1], len(anos) - 1)
-
-    # 11. CAGR Lucro Líquido (%)
-    indicators["CAGR Lucro Líquido (%)"] = calcular_cagr(lucro_liquido[0], lucro_liquido[-1], len(anos) - 1)
-
-    # 12. Custo por Hectare (R\$/ha)
-    indicators["Custo por Hectare (R$/ha)"] = [
-        (d / hectares_total) if hectares_total != 0 else 0 for d in despesas_totais
-    ]
-
-    return indicators
-
-def calculate_custos_cultura_por_cenario(custos_por_cultura_base, cenario_name, session_data):
-    """Calcula custos por cultura ajustados pelo cenário."""
-    if not custos_por_cultura_base:
-        return {}
-    
-    # Obter fatores de ajuste do cenário
-    pess_despesas = session_data.get("pess_despesas", 10)
-    otm_despesas = session_data.get("otm_despesas", 10)
-    
-    fator_custo = 1.0
-    if cenario_name == "Pessimista":
-        fator_custo = 1 + (pess_despesas / 100)
-    elif cenario_name == "Otimista":
-        fator_custo = 1 - (otm_despesas / 100)
-    
-    # Aplicar fator aos custos por cultura
-    custos_ajustados = {}
-    for cultura, df_custos in custos_por_cultura_base.items():
-        if not df_custos.empty:
-            custos_ajustados[cultura] = df_custos * fator_custo
-        else:
-            custos_ajustados[cultura] = df_custos
-    
-    return custos_ajustados
-
-def display_indicators_by_cultura(session_data):
+@medido()
+def display_indicators_by_cultura(session_data, all_indicators_cultura_cenarios):
     """Exibe indicadores detalhados por cultura para todos os cenários."""
-    custos_por_cultura = session_data.get("custos_por_cultura", {})
-    receitas_por_cultura_cenarios = session_data.get("receitas_por_cultura_cenarios", {})
-    
-    if not custos_por_cultura or not receitas_por_cultura_cenarios:
+    if not all_indicators_cultura_cenarios:
         st.info("📌 Para visualizar indicadores por cultura, cadastre despesas/empréstimos com centros de custo na página de Despesas.")
-        return {}
+        return
     
-    st.markdown("### 🌱 Análise Financeira por Cultura e Cenário")
-    
-    total_ativos = session_data["total_ativos"]
     anos = session_data["anos"]
-    hectares_total = session_data["hectares_total"]
     
     # Criar abas para cada cenário
-    tab1, tab2, tab3 = st.tabs(["📊 Projetado", "📉 Pessimista", "📈 Otimista"])
-    tabs = [tab1, tab2, tab3]
-    cenarios = ["Projetado", "Pessimista", "Otimista"]
-    
-    all_indicators_cultura_cenarios = {}
+    cenarios = session_data["nomes_cenarios"]
+    emojis = session_data["emojis_cenarios"]
+    tabs = st.tabs([f"{emojis[nome]} {nome}" for nome in cenarios], key="abas_cultura_cenarios", on_change="rerun")
     
+    # Só a aba selecionada é montada
     for tab, cenario_name in zip(tabs, cenarios):
+        if not tab.open:
+            continue
         with tab:
             st.markdown(f"#### Indicadores por Cultura - Cenário {cenario_name}")
             
-            # Calcular custos ajustados pelo cenário
-            custos_ajustados = calculate_custos_cultura_por_cenario(custos_por_cultura, cenario_name, session_data)
-            
-            # Obter receitas do cenário
-            receitas_cenario = receitas_por_cultura_cenarios.get(cenario_name, {})
-            
-            all_indicators_cultura_cenarios[cenario_name] = {}
-            
-            for cultura in custos_ajustados.keys():
-                if cultura in receitas_cenario:
-                    # Calcular hectares da cultura
-                    hectares_cultura = sum(
-                        plantio.get('hectares', 0) 
-                        for plantio in session_data["plantios"].values() 
-                        if plantio.get('cultura') == cultura
-                    )
-                    
-                    # Calcular ativos proporcionais
-                    total_ativos_cultura = (hectares_cultura / hectares_total * total_ativos) if hectares_total > 0 else 0
-                    
-                    # Calcular indicadores para a cultura no cenário
-                    indicators_cultura = calculate_indicators_for_cultura(
-                        cultura, 
-                        receitas_cenario[cultura], 
-                        custos_ajustados[cultura], 
-                        anos, 
-                        total_ativos_cultura
-                    )
-                    
-                    all_indicators_cultura_cenarios[cenario_name][cultura] = indicators_cultura
-                    
-                    # Exibir tabela de indicadores da cultura
-                    st.subheader(f"🌿 {cultura}")
-                    
-                    df_indicadores_cultura = pd.DataFrame({
-                        k: v for k, v in indicators_cultura.items()
-                        if k not in ["CAGR Receita (%)", "CAGR Lucro Líquido (%)"]
-                    }, index=anos)
-                    
-                    styled_df_cultura = df_indicadores_cultura.style.format({
-                        "Margem Líquida (%)": "{:.2f}%",
-                        "Retorno por Real Gasto": "{:.2f}",
-                        "Liquidez Operacional": "{:.2f}",
-                        "Custo por Receita (%)": "{:.2f}%",
-                        "ROA (%)": "{:.2f}%"
-                    })
-                    
-                    st.dataframe(styled_df_cultura, use_container_width=True)
-                    
-                    # Métricas CAGR
-                    col_cagr1, col_cagr2 = st.columns(2)
-                    with col_cagr1:
-                        st.metric("📈 CAGR Receita (5 anos)", f"{indicators_cultura['CAGR Receita (%)']:.2f}%")
-                    with col_cagr2:
-                        st.metric("📈 CAGR Lucro Líquido (5 anos)", f"{indicators_cultura['CAGR Lucro Líquido (%)']:.2f}%")
-                    
-                    # Parecer da cultura
-                    generate_financial_opinion_cultura(indicators_cultura, cultura, hectares_cultura)
-                    
-                    st.markdown("---")
-    
-    return all_indicators_cultura_cenarios
+            for cultura, indicators_cultura in all_indicators_cultura_cenarios[cenario_name].items():
+                # Calcular hectares da cultura
+                hectares_cultura = sum(
+                    plantio.get('hectares', 0) 
+                    for plantio in session_data["plantios"].values() 
+                    if plantio.get('cultura') == cultura
+                )
+                
+                # Exibir tabela de indicadores da cultura
+                st.subheader(f"🌿 {cultura}")
+                
+                df_indicadores_cultura = pd.DataFrame({
+                    k: v for k, v in indicators_cultura.items()
+                    if k not in ["CAGR Receita (%)", "CAGR Lucro Líquido (%)"]
+                }, index=anos)
+                
+                styled_df_cultura = df_indicadores_cultura.style.format({
+                    "Margem Líquida (%)": "{:.2f}%",
+                    "Retorno por Real Gasto": "{:.2f}",
+                    "Liquidez Operacional": "{:.2f}",
+                    "Custo por Receita (%)": "{:.2f}%",
+                    "ROA (%)": "{:.2f}%"
+                })
+                
+                st.dataframe(styled_df_cultura, use_container_width=True)
+                
+                # Métricas CAGR
+                col_cagr1, col_cagr2 = st.columns(2)
+                with col_cagr1:
+                    st.metric("📈 CAGR Receita (5 anos)", f"{indicators_cultura['CAGR Receita (%)']:.2f}%")
+                with col_cagr2:
+                    st.metric("📈 CAGR Lucro Líquido (5 anos)", f"{indicators_cultura['CAGR Lucro Líquido (%)']:.2f}%")
+                
+                # Parecer da cultura
+                generate_financial_opinion_cultura(indicators_cultura, cultura, hectares_cultura)
+                
+                st.markdown("---")
 
+def fluxos_cultura_cenario(cubo, cenario, session_data):
+    """Fluxo por cultura: visão do cubo (receita, impostos rateados e custos diretos dos centros de custo)."""
+    if cenario not in cubo.cenarios:
+        return {}
+    return {
+        cultura: cubo.como_dict(cenario, cultura, visao=VISAO_FLUXO_CULTURA)
+        for cultura in cubo.culturas
+        if cultura in session_data.get("custos_por_cultura", {})
+    }
+
+@medido()
 def generate_fluxo_caixa_consolidado_e_culturas(session_data, all_indicators_cultura_cenarios):
     """Gera fluxo de caixa consolidado e por cultura."""
     st.markdown("### 💰 Fluxo de Caixa Projetado")
     
     anos = session_data["anos"]
-    dre_cenarios = session_data["dre_cenarios"]
+    cubo = session_data["cubo"]
     
-    # Criar abas para fluxo de caixa
-    tab_geral, tab_culturas = st.tabs(["💼 Consolidado", "🌱 Por Cultura"])
+    # Só a aba selecionada é montada; os fluxos (usados também na exportação) saem do cubo
+    tab_geral, tab_culturas = st.tabs(["💼 Consolidado", "🌱 Por Cultura"], key="abas_fluxo_caixa", on_change="rerun")
     
-    with tab_geral:
-        st.markdown("#### 💼 Fluxo de Caixa Consolidado")
-        
-        # Criar DataFrame do fluxo de caixa consolidado
-        fluxo_consolidado = {}
-        
-        for cenario in ["Projetado", "Pessimista", "Otimista"]:
-            dre_data = dre_cenarios[cenario]
+    # Fluxo de caixa consolidado: visão do cubo de resultados
+    fluxo_consolidado = {
+        cenario: cubo.como_dict(cenario, visao=VISAO_FLUXO_CAIXA)
+        for cenario in cubo.cenarios
+    }
+    
+    if tab_geral.open:
+        with tab_geral:
+            st.markdown("#### 💼 Fluxo de Caixa Consolidado")
             
-            fluxo_consolidado[cenario] = {
-                "Receita Operacional": dre_data["Receita"],
-                "(-) Impostos sobre Venda": [-x for x in dre_data["Impostos Sobre Venda"]],
-                "(-) Despesas Operacionais": [-x for x in dre_data["Despesas Operacionais"]],
-                "(-) Despesas Administrativas": [-x for x in dre_data["Despesas Administrativas"]],
-                "(-) Despesas RH": [-x for x in dre_data["Despesas RH"]],
-                "(=) EBITDA": [
-                    dre_data["Receita"][i] 
-                    - dre_data["Impostos Sobre Venda"][i]
-                    - dre_data["Despesas Operacionais"][i] 
-                    - dre_data["Despesas Administrativas"][i]
-                    - dre_data["Despesas RH"][i]
-                    for i in range(len(anos))
-                ],
-                "(-) Despesas Extra Operacionais": [-x for x in dre_data["Despesas Extra Operacional"]],
-                "(-) Dividendos": [-x for x in dre_data["Dividendos"]],
-                "(-) Impostos sobre Resultado": [-x for x in dre_data["Impostos Sobre Resultado"]],
-                "(=) FLUXO DE CAIXA LÍQUIDO": dre_data["Lucro Líquido"]
-            }
-        
-        # Exibir fluxo de caixa por cenário
-        for cenario in ["Projetado", "Pessimista", "Otimista"]:
-            emoji = "📊" if cenario == "Projetado" else "📉" if cenario == "Pessimista" else "📈"
+            # Exibir fluxo de caixa por cenário
+            for cenario in cubo.cenarios:
+                emoji = session_data["emojis_cenarios"].get(cenario, "📊")
             
-            with st.expander(f"{emoji} Fluxo de Caixa - {cenario}"):
-                df_fluxo = pd.DataFrame(fluxo_consolidado[cenario], index=anos).T
-                
-                # Aplicar formatação
-                styled_fluxo = df_fluxo.style.format(lambda x: f"R$ {x:,.0f}".replace(",", "v").replace(".", ",").replace("v", "."))
-                
-                # Destacar linhas importantes
-                def highlight_important_rows(s):
-                    styles = []
-                    for idx in s.index:
-                        if "(=)" in str(idx):
-                            styles.append('background-color: #e6f3ff; font-weight: bold')
-                        elif "(-)" in str(idx):
-                            styles.append('color: #d32f2f')
-                        else:
-                            styles.append('')
-                    return styles
-                
-                styled_fluxo = styled_fluxo.apply(highlight_important_rows, axis=1)
-                st.dataframe(styled_fluxo, use_container_width=True)
-                
-                # Resumo do cenário
-                total_5_anos = sum(fluxo_consolidado[cenario]["(=) FLUXO DE CAIXA LÍQUIDO"])
-                media_anual = total_5_anos / len(anos)
-                
-                col1, col2 = st.columns(2)
-                with col1:
-                    st.metric("Total 5 Anos", f"R$ {total_5_anos:,.0f}".replace(",", "v").replace(".", ",").replace("v", "."))
-                with col2:
-                    st.metric("Média Anual", f"R$ {media_anual:,.0f}".replace(",", "v").replace(".", ",").replace("v", "."))
+                with st.expander(f"{emoji} Fluxo de Caixa - {cenario}"):
+                    df_fluxo = cubo.tabela(cenario, visao=VISAO_FLUXO_CAIXA)
+                
+                    # Aplicar formatação
+                    styled_fluxo = df_fluxo.style.format(lambda x: f"R$ {x:,.0f}".replace(",", "v").replace(".", ",").replace("v", "."))
+                
+                    # Destacar linhas importantes
+                    def highlight_important_rows(s):
+                        styles = []
+                        for idx in s.index:
+                            if "(=)" in str(idx):
+                                styles.append('background-color: #e6f3ff; font-weight: bold')
+                            elif "(-)" in str(idx):
+                                styles.append('color: #d32f2f')
+                            else:
+                                styles.append('')
+                        return styles
+                
+                    styled_fluxo = styled_fluxo.apply(highlight_important_rows, axis=1)
+                    st.dataframe(styled_fluxo, use_container_width=True)
+                
+                    # Resumo do cenário
+                    total_5_anos = cubo.total("Lucro Líquido", cenario, CONSOLIDADO)
+                    media_anual = total_5_anos / len(anos)
+                
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        st.metric("Total 5 Anos", f"R$ {total_5_anos:,.0f}".replace(",", "v").replace(".", ",").replace("v", "."))
+                    with col2:
+                        st.metric("Média Anual", f"R$ {media_anual:,.0f}".replace(",", "v").replace(".", ",").replace("v", "."))
+    
+    if not all_indicators_cultura_cenarios:
+        if tab_culturas.open:
+            with tab_culturas:
+                st.markdown("#### 🌱 Fluxo de Caixa por Cultura")
+                st.info("📌 Dados por cultura não disponíveis. Configure centros de custo na página de Despesas.")
+        return fluxo_consolidado, {}
+    
+    if not tab_culturas.open:
+        # Aba fechada: fluxos do último cenário escolhido, para a exportação
+        cenario_selecionado = st.session_state.get("fluxo_cultura_cenario", cubo.cenarios[0])
+        return fluxo_consolidado, fluxos_cultura_cenario(cubo, cenario_selecionado, session_data)
     
     with tab_culturas:
         st.markdown("#### 🌱 Fluxo de Caixa por Cultura")
         
-        if not all_indicators_cultura_cenarios:
-            st.info("📌 Dados por cultura não disponíveis. Configure centros de custo na página de Despesas.")
-            return fluxo_consolidado, {}
-        
         # Selecionar cenário para análise por cultura
         cenario_selecionado = st.selectbox(
             "Selecione o cenário para análise:",
-            ["Projetado", "Pessimista", "Otimista"],
-            key="fluxo_cultura_cenario"
+            cubo.cenarios,
+            key="fluxo_cultura_cenario",
+            persist_state="page"
         )
         
         if cenario_selecionado not in all_indicators_cultura_cenarios:
             st.warning("Dados do cenário selecionado não disponíveis.")
             return fluxo_consolidado, {}
         
-        receitas_por_cultura = session_data.get("receitas_por_cultura_cenarios", {}).get(cenario_selecionado, {})
-        custos_por_cultura = session_data.get("custos_por_cultura", {})
-        
-        # Calcular custos ajustados pelo cenário
-        custos_ajustados = calculate_custos_cultura_por_cenario(custos_por_cultura, cenario_selecionado, session_data)
-        
-        fluxos_por_cultura = {}
-        
-        for cultura in receitas_por_cultura.keys():
-            if cultura in custos_ajustados:
-                
-                # Obter receitas da cultura
-                receitas_cultura = [receitas_por_cultura[cultura].get(ano, 0) for ano in anos]
-                
-                # Obter custos da cultura
-                if isinstance(custos_ajustados[cultura], pd.DataFrame) and not custos_ajustados[cultura].empty:
-                    custos_totais = custos_ajustados[cultura].sum(axis=0).tolist()
-                else:
-                    custos_totais = [0] * len(anos)
-                
-                # Estimar impostos (aproximação baseada na proporção geral)
-                impostos_receita = session_data["dre_cenarios"][cenario_selecionado]["Impostos Sobre Venda"]
-                receita_geral = session_data["dre_cenarios"][cenario_selecionado]["Receita"]
-                
-                impostos_cultura = []
-                for i, ano in enumerate(anos):
-                    if receita_geral[i] > 0:
-                        proporcao_receita = receitas_cultura[i] / receita_geral[i]
-                        imposto_estimado = impostos_receita[i] * proporcao_receita
-                        impostos_cultura.append(imposto_estimado)
-                    else:
-                        impostos_cultura.append(0)
-                
-                # Estimar impostos sobre resultado
-                lucro_bruto = [receitas_cultura[i] - impostos_cultura[i] - custos_totais[i] for i in range(len(anos))]
-                impostos_resultado = [max(0, lucro * 0.25) for lucro in lucro_bruto]  # Aproximação de 25%
-                
-                # Fluxo líquido
-                fluxo_liquido = [
-                    receitas_cultura[i] - impostos_cultura[i] - custos_totais[i] - impostos_resultado[i]
-                    for i in range(len(anos))
-                ]
-                
-                fluxos_por_cultura[cultura] = {
-                    "(+) Receita Operacional": receitas_cultura,
-                    "(-) Impostos sobre Venda": [-x for x in impostos_cultura],
-                    "(-) Custos Diretos": [-x for x in custos_totais],
-                    "(=) Lucro Bruto": lucro_bruto,
-                    "(-) Impostos sobre Resultado": [-x for x in impostos_resultado],
-                    "(=) FLUXO DE CAIXA LÍQUIDO": fluxo_liquido
-                }
+        fluxos_por_cultura = fluxos_cultura_cenario(cubo, cenario_selecionado, session_data)
         
         # Exibir fluxo de caixa por cultura
         for cultura, fluxo_data in fluxos_por_cultura.items():
             with st.expander(f"🌿 {cultura} - Fluxo de Caixa"):
-                df_fluxo_cultura = pd.DataFrame(fluxo_data, index=anos).T
+                df_fluxo_cultura = cubo.tabela(cenario_selecionado, cultura, visao=VISAO_FLUXO_CULTURA)
                 
                 # Aplicar formatação
                 styled_fluxo_cultura = df_fluxo_cultura.style.format(
@@ -793,131 +411,22 @@ def generate_fluxo_caixa_consolidado_e_culturas(session_data, all_indicators_cul
     
     return fluxo_consolidado, fluxos_por_cultura
 
-def generate_excel_export_with_cultura(all_indicators, all_dre_data, df_culturas_for_excel, nomes_cenarios, anos, all_indicators_cultura_cenarios=None, fluxo_consolidado=None, fluxos_por_cultura=None):
+@medido()
+def generate_excel_export_with_cultura(all_indicators, all_dre_data, df_culturas_for_excel, nomes_cenarios, anos, all_indicators_cultura_cenarios=None, fluxo_consolidado=None, fluxos_por_cultura=None, cubo=None):
     """Gera exportação Excel incluindo dados por cultura e fluxos de caixa."""
     st.markdown("### ⬇️ Exportar Relatório Completo")
     
-    def criar_relatorio_completo():
-        output_excel = BytesIO()
-        
-        with pd.ExcelWriter(output_excel, engine="xlsxwriter") as writer:
-            # === DADOS GERAIS POR CENÁRIO ===
-            for cenario in nomes_cenarios:
-                # Indicadores gerais
-                indicators_df_for_excel = pd.DataFrame({
-                    k: v for k, v in all_indicators[cenario].items()
-                    if k not in ["CAGR Receita (%)", "CAGR Lucro Líquido (%)"]
-                }, index=anos)
-                cagr_row_data = [all_indicators[cenario]["CAGR Receita (%)"], all_indicators[cenario]["CAGR Lucro Líquido (%)"]] + \
-                                [np.nan] * (len(indicators_df_for_excel.columns) - 2)
-                cagr_row = pd.Series(cagr_row_data, index=indicators_df_for_excel.columns, name="CAGR")
-                indicators_df_for_excel = pd.concat([indicators_df_for_excel, pd.DataFrame(cagr_row).T])
-                indicators_df_for_excel.to_excel(writer, sheet_name=f"Indicadores_Geral_{cenario}")
-
-                # DRE geral
-                df_dre_for_excel = pd.DataFrame(all_dre_data[cenario], index=anos).T
-                df_dre_for_excel.to_excel(writer, sheet_name=f"DRE_Geral_{cenario}")
-
-            # === DADOS POR CULTURA E CENÁRIO ===
-            if all_indicators_cultura_cenarios:
-                for cenario_name in nomes_cenarios:
-                    if cenario_name in all_indicators_cultura_cenarios:
-                        for cultura, indicators_cultura in all_indicators_cultura_cenarios[cenario_name].items():
-                            # Indicadores por cultura e cenário
-                            df_cultura_indicators = pd.DataFrame({
-                                k: v for k, v in indicators_cultura.items()
-                                if k not in ["CAGR Receita (%)", "CAGR Lucro Líquido (%)"]
-                            }, index=anos)
-                            
-                            # Adicionar CAGR
-                            cagr_cultura_data = [indicators_cultura["CAGR Receita (%)"], indicators_cultura["CAGR Lucro Líquido (%)"]] + \
-                                               [np.nan] * (len(df_cultura_indicators.columns) - 2)
-                            cagr_cultura_row = pd.Series(cagr_cultura_data, index=df_cultura_indicators.columns, name="CAGR")
-                            df_cultura_indicators = pd.concat([df_cultura_indicators, pd.DataFrame(cagr_cultura_row).T])
-                            df_cultura_indicators.to_excel(writer, sheet_name=f"Indicadores_{cultura}_{cenario_name}")
-            
-            # === NOVOS DADOS: FLUXOS DE CAIXA ===
-            if fluxo_consolidado:
-                for cenario, fluxo_data in fluxo_consolidado.items():
-                    df_fluxo = pd.DataFrame(fluxo_data, index=anos).T
-                    df_fluxo.to_excel(writer, sheet_name=f'FluxoCaixa_Geral_{cenario}', index=True)
-            
-            if fluxos_por_cultura:
-                for cultura, fluxo_data in fluxos_por_cultura.items():
-                    df_fluxo_cultura = pd.DataFrame(fluxo_data, index=anos).T
-                    df_fluxo_cultura.to_excel(writer, sheet_name=f'FluxoCaixa_{cultura}', index=True)
-                
-                # Criar comparativo de fluxos por cultura
-                comparativo_fluxos = []
-                for cultura, fluxo_data in fluxos_por_cultura.items():
-                    total_fluxo = sum(fluxo_data["(=) FLUXO DE CAIXA LÍQUIDO"])
-                    media_anual = total_fluxo / len(anos)
-                    
-                    hectares = sum(
-                        plantio.get('hectares', 0) 
-                        for plantio_nome, plantio in st.session_state.get('plantios', {}).items() 
-                        if plantio.get('cultura') == cultura
-                    )
-                    
-                    comparativo_fluxos.append({
-                        'Cultura': cultura,
-                        'Area_ha': hectares,
-                        'Fluxo_Total_5anos': total_fluxo,
-                        'Fluxo_Medio_Anual': media_anual,
-                        'Fluxo_por_Hectare_Ano': media_anual / hectares if hectares > 0 else 0
-                    })
-                
-                if comparativo_fluxos:
-                    df_comparativo_fluxos = pd.DataFrame(comparativo_fluxos)
-                    df_comparativo_fluxos.to_excel(writer, sheet_name='Comparativo_FluxoCaixa_Culturas', index=False)
-            
-            # === DADOS EXISTENTES ===
-            if st.session_state.get('custos_por_cultura'):
-                for cultura, df_cultura in st.session_state['custos_por_cultura'].items():
-                    if not df_cultura.empty:
-                        df_cultura.to_excel(writer, sheet_name=f'Custos_{cultura}', index=True)
-            
-            if st.session_state.get('fluxo_caixa') is not None and not st.session_state['fluxo_caixa'].empty:
-                df_fluxo_despesas = st.session_state['fluxo_caixa'].copy()
-                df_fluxo_despesas.to_excel(writer, sheet_name='Fluxo_Despesas', index=True)
-            
-            if st.session_state.get('despesas'):
-                df_despesas_cadastradas = pd.DataFrame(st.session_state['despesas'])
-                df_despesas_cadastradas.to_excel(writer, sheet_name='Despesas_Cadastradas', index=False)
-
-            if st.session_state.get('emprestimos'):
-                df_emprestimos_cadastrados = pd.DataFrame(st.session_state['emprestimos'])
-                df_emprestimos_cadastrados.to_excel(writer, sheet_name='Emprestimos_Cadastrados', index=False)
-            
-            if st.session_state.get('plantios'):
-                plantios_list = []
-                for nome, dados in st.session_state['plantios'].items():
-                    plantio_row = {'Nome': nome}
-                    plantio_row.update(dados)
-                    plantios_list.append(plantio_row)
-                df_plantios = pd.DataFrame(plantios_list)
-                df_plantios.to_excel(writer, sheet_name='Plantios_Cadastrados', index=False)
-            
-            # Receita por Cultura
-            df_culturas_for_excel.to_excel(writer, sheet_name="Receita_por_Cultura", index=False)
-            
-            # Configurações
-            df_config = pd.DataFrame({
-                'Ano': anos,
-                'Inflacao (%)': st.session_state.get('inflacoes', [4.0] * len(anos))
-            })
-            df_config.to_excel(writer, sheet_name='Configuracoes_Inflacao', index=False)
-
-        output_excel.seek(0)
-        return output_excel
-    
     # Criar as colunas para os botões
     col_export1, col_export2, col_export3, col_export4 = st.columns([1, 1, 1, 1])
     
     with col_export1:
         if st.button("📊 Gerar Excel", type="primary", key="relatorio_excel"):
             try:
-                excel_buffer = criar_relatorio_completo()
+                excel_buffer = criar_relatorio_excel_completo(
+                    all_indicators, all_dre_data, df_culturas_for_excel, nomes_cenarios, anos,
+                    all_indicators_cultura_cenarios, fluxo_consolidado, fluxos_por_cultura,
+                    {**st.session_state, **obter(st.session_state, "projecao_despesas")}, cubo
+                )
                 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
                 filename = f"relatorio_completo_gestor_plantio_{timestamp}.xlsx"
                 
@@ -975,18 +484,9 @@ def generate_excel_export_with_cultura(all_indicators, all_dre_data, df_culturas
 def display_scenario_parameters(session_data):
     """Exibe os parâmetros de cenário configurados."""
     st.markdown("### ⚙️ Parâmetros dos Cenários")
-    
-    col1, col2, col3, col4 = st.columns(4)
-    
-    with col1:
-        st.metric("📉 Receita Pessimista", f"-{session_data['pess_receita']}%")
-    with col2:
-        st.metric("📈 Despesa Pessimista", f"+{session_data['pess_despesas']}%")
-    with col3:
-        st.metric("📈 Receita Otimista", f"+{session_data['otm_receita']}%")
-    with col4:
-        st.metric("📉 Despesa Otimista", f"-{session_data['otm_despesas']}%")
+    st.dataframe(session_data["tabela_cenarios"], hide_index=True, use_container_width=True)
 
+@medido()
 def display_revenue_by_crop(session_data):
     """Exibe a receita por cultura e retorna DataFrame para exportação."""
     st.markdown("### 🌾 Receita por Cultura (Ano Base)")
@@ -1033,16 +533,17 @@ def display_revenue_by_crop(session_data):
     
     return df_culturas_grouped
 
-def display_indicators_table(all_indicators, anos):
+@medido()
+def display_indicators_table(all_indicators, anos, emojis):
     """Exibe as tabelas de indicadores para todos os cenários."""
     st.markdown("### 📊 Indicadores Financeiros por Cenário")
     
-    tab1, tab2, tab3 = st.tabs(["📊 Projetado", "📉 Pessimista", "📈 Otimista"])
-    
-    tabs = [tab1, tab2, tab3]
-    cenarios = ["Projetado", "Pessimista", "Otimista"]
+    cenarios = list(all_indicators)
+    tabs = st.tabs([f"{emojis.get(nome, '📊')} {nome}" for nome in cenarios], key="abas_indicadores", on_change="rerun")
     
     for tab, cenario in zip(tabs, cenarios):
+        if not tab.open:
+            continue
         with tab:
             indicators = all_indicators[cenario]
             
@@ -1075,23 +576,22 @@ def display_indicators_table(all_indicators, anos):
             with col_cagr2:
                 st.metric("📈 CAGR Lucro Líquido (5 anos)", f"{indicators['CAGR Lucro Líquido (%)']:.2f}%")
 
-def display_financial_summary(dre_cenarios, anos):
+@medido()
+def display_financial_summary(cubo, anos):
     """Exibe resumo financeiro consolidado."""
     st.markdown("### 💰 Resumo Financeiro Consolidado")
     
-    # Criar resumo para cada cenário
-    resumo_data = []
-    for cenario, dre_data in dre_cenarios.items():
-        receita_total = sum(dre_data["Receita"])
-        lucro_total = sum(dre_data["Lucro Líquido"])
-        margem_media = (lucro_total / receita_total * 100) if receita_total > 0 else 0
-        
-        resumo_data.append({
-            "Cenário": cenario,
-            "Receita Total (5 anos)": receita_total,
-            "Lucro Total (5 anos)": lucro_total,
-            "Margem Média (%)": margem_media
-        })
+    # Totais de todos os cenários de uma vez (eixo dos anos somado no cubo)
+    receita_total = cubo.total("Receita", cultura=CONSOLIDADO)
+    lucro_total = cubo.total("Lucro Líquido", cultura=CONSOLIDADO)
+    margem_media = np.divide(lucro_total * 100, receita_total, out=np.zeros_like(receita_total), where=receita_total > 0)
+    
+    resumo_data = {
+        "Cenário": cubo.cenarios,
+        "Receita Total (5 anos)": receita_total,
+        "Lucro Total (5 anos)": lucro_total,
+        "Margem Média (%)": margem_media
+    }
     
     df_resumo = pd.DataFrame(resumo_data)
     
@@ -1103,10 +603,9 @@ def display_financial_summary(dre_cenarios, anos):
     
     st.dataframe(styled_resumo, use_container_width=True)
 
-def generate_visualizations(dre_cenarios, all_indicators, anos, nomes_cenarios, session_data):
+@medido()
+def generate_visualizations(cubo, all_indicators, anos, nomes_cenarios, session_data):
     """Gera visualizações gráficas dos dados."""
-    st.markdown("### 📈 Visualizações")
-    
     col_viz1, col_viz2 = st.columns(2)
     
     with col_viz1:
@@ -1115,10 +614,9 @@ def generate_visualizations(dre_cenarios, all_indicators, anos, nomes_cenarios,
         fig_receita_lucro = go.Figure()
         
         for cenario in nomes_cenarios:
-            dre_data = dre_cenarios[cenario]
             fig_receita_lucro.add_trace(go.Scatter(
                 x=anos,
-                y=dre_data["Receita"],
+                y=cubo.sel(cenario, CONSOLIDADO, "Receita"),
                 mode='lines+markers',
                 name=f'Receita {cenario}',
                 line=dict(width=3)
@@ -1126,7 +624,7 @@ def generate_visualizations(dre_cenarios, all_indicators, anos, nomes_cenarios,
             
             fig_receita_lucro.add_trace(go.Scatter(
                 x=anos,
-                y=dre_data["Lucro Líquido"],
+                y=cubo.sel(cenario, CONSOLIDADO, "Lucro Líquido"),
                 mode='lines+markers',
                 name=f'Lucro {cenario}',
                 line=dict(dash='dot')
@@ -1165,12 +663,105 @@ def generate_visualizations(dre_cenarios, all_indicators, anos, nomes_cenarios,
         
         st.plotly_chart(fig_margem, use_container_width=True)
 
+@medido()
+def display_tornado(session_data):
+    """Gráfico tornado: impacto de cada direcionador, perturbado para baixo e para cima, numa métrica."""
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        nomes = session_data["nomes_cenarios"]
+        cenario = st.selectbox("Cenário", nomes, index=nomes.index(cenario_base(nomes)), key="tornado_cenario")
+    with col2:
+        metrica = st.selectbox("Métrica", list(METRICAS_TORNADO), key="tornado_metrica")
+    with col3:
+        variacao = st.slider("Variação (±%)", 1, 50, 10, key="tornado_variacao")
+    with col4:
+        variacao_inflacao = st.slider("Inflação (±p.p.)", 0.5, 5.0, 1.0, step=0.5, key="tornado_inflacao")
+
+    despesas_info = session_data["despesas_info"]
+    if despesas_info.empty or "Categoria" not in despesas_info.columns:
+        despesas_info = pd.DataFrame(columns=["Despesa", "Categoria", "Valor"])
+    tabela = session_data["tabela_cenarios"]
+    indice = tabela.index[tabela[COLUNA_NOME] == cenario][0]
+    parametros = {chave: valores[indice] for chave, valores in parametros_cenarios(tabela).items()}
+
+    resultado, base = analise_tornado(
+        session_data["plantios"], st.session_state.get("receitas_adicionais", {}), despesas_info,
+        session_data["emprestimos"], session_data["anos"], session_data["inflacoes"], parametros,
+        variacao, variacao_inflacao, metrica, session_data["hectares_total"], session_data["total_ativos"],
+        st.session_state.get(CHAVE_INDICES), st.session_state.get(CHAVE_INDICES_CATEGORIA),
+        st.session_state.get(CHAVE_CURVAS), session_data[CHAVE_IMPOSTOS]
+    )
+    # DSCR infinito (sem parcelas) não tem amplitude mensurável
+    resultado = resultado[np.isfinite(resultado["Amplitude"]) & (resultado["Amplitude"] > 0)]
+    if resultado.empty:
+        st.info("Nenhum direcionador altera a métrica selecionada.")
+        return
+
+    quantidade = len(resultado)
+    if quantidade > 5:
+        maximo = min(50, quantidade)
+        quantidade = st.slider("Direcionadores exibidos", 5, maximo, min(15, maximo), key="tornado_quantidade")
+    topo = resultado.head(quantidade).iloc[::-1]
+
+    fig = go.Figure()
+    fig.add_trace(go.Bar(y=topo["Direcionador"], x=topo["Impacto Baixo"], orientation="h", name=f"-{variacao}%", marker_color="#d62728"))
+    fig.add_trace(go.Bar(y=topo["Direcionador"], x=topo["Impacto Alto"], orientation="h", name=f"+{variacao}%", marker_color="#2ca02c"))
+    fig.update_layout(
+        title=f"{metrica} - {cenario} (base: {base:,.2f})",
+        barmode="overlay",
+        xaxis_title="Variação em relação à base",
+        height=max(400, 28 * len(topo)),
+        legend=dict(orientation="h")
+    )
+    st.plotly_chart(fig, use_container_width=True)
+    st.caption(f"{len(resultado)} direcionadores avaliados de uma vez. Inflação varia ±{variacao_inflacao} p.p.; os demais, ±{variacao}%.")
+
+    if st.toggle("📋 Tabela de sensibilidade", key="tornado_tabela"):
+        st.dataframe(resultado.style.format({c: "{:,.2f}" for c in ["Baixo", "Alto", "Impacto Baixo", "Impacto Alto", "Amplitude"]}), hide_index=True, use_container_width=True)
+
+
+@medido()
+def display_break_even(session_data):
+    """Preço e produtividade de equilíbrio e preços-alvo por cultura, cenário e ano."""
+    cubo = session_data["cubo"]
+    if not cubo.culturas:
+        st.info("Cadastre despesas por cultura para calcular o ponto de equilíbrio de cada cultura.")
+        return
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        nomes = session_data["nomes_cenarios"]
+        cenario = st.selectbox("Cenário", nomes, index=nomes.index(cenario_base(nomes)), key="equilibrio_cenario")
+    with col2:
+        margem_alvo = st.number_input("Margem líquida alvo (%)", -50.0, 60.0, 10.0, step=1.0, key="equilibrio_margem")
+    with col3:
+        dscr_alvo = st.number_input("DSCR alvo", 0.5, 5.0, 1.3, step=0.1, key="equilibrio_dscr")
+
+    equilibrio = calcular_equilibrio(
+        cubo, session_data["plantios"], session_data["tabela_cenarios"], margem_alvo, dscr_alvo, session_data[CHAVE_IMPOSTOS]
+    )
+    tabela = equilibrio[equilibrio[COLUNA_NOME] == cenario].drop(columns=COLUNA_NOME)
+    st.dataframe(
+        tabela.style.format({coluna: "{:,.2f}" for coluna in COLUNAS_EQUILIBRIO}, na_rep="-"),
+        hide_index=True, use_container_width=True
+    )
+    st.caption(
+        "Preços no ano de cada linha (com inflação e ajustes do cenário), cobrindo os custos diretos da cultura. "
+        "DSCR como na tabela de indicadores: lucro operacional da cultura (lucro bruto, já descontadas as parcelas e "
+        "antes dos impostos sobre o resultado) / parcelas de empréstimos alocadas; '-' quando não há parcelas "
+        "ou a meta é inatingível."
+    )
+
+
+@medido()
 def generate_financial_opinion(all_indicators, session_data):
     """Gera parecer financeiro consolidado."""
     st.markdown("#### 📝 Análise Consolidada dos Cenários")
     
-    # Análise do cenário projetado
-    indicators_proj = all_indicators["Projetado"]
+    # Análise do cenário de referência
+    nomes = list(all_indicators)
+    base = cenario_base(nomes)
+    indicators_proj = all_indicators[base]
     
     margem_media = np.mean(indicators_proj["Margem Líquida (%)"])
     retorno_medio = np.mean(indicators_proj["Retorno por Real Gasto"])
@@ -1241,82 +832,21 @@ def generate_financial_opinion(all_indicators, session_data):
         parecer.append(f"• **Crescimento do Lucro ({indicators_proj['CAGR Lucro Líquido (%)']:.2f}%)**: Lucro em trajetória positiva. Considere reinvestir em áreas estratégicas.")
 
     # Comparação entre cenários
-    lucro_proj = sum(session_data["dre_cenarios"]["Projetado"]["Lucro Líquido"])
-    lucro_pess = sum(session_data["dre_cenarios"]["Pessimista"]["Lucro Líquido"])
-    lucro_otm = sum(session_data["dre_cenarios"]["Otimista"]["Lucro Líquido"])
-    
-    diferenca_pess = ((lucro_pess - lucro_proj) / lucro_proj * 100) if lucro_proj != 0 else 0
-    diferenca_otm = ((lucro_otm - lucro_proj) / lucro_proj * 100) if lucro_proj != 0 else 0
-    
-    parecer.append(f"• **Análise de Cenários**: No cenário pessimista, o lucro seria {abs(diferenca_pess):.1f}% {'menor' if diferenca_pess < 0 else 'maior'}. No otimista, seria {diferenca_otm:.1f}% maior.")
+    cubo = session_data["cubo"]
+    lucros = cubo.total("Lucro Líquido", nomes, CONSOLIDADO)
+    lucro_proj = lucros[nomes.index(base)]
+    diferencas = (lucros - lucro_proj) / lucro_proj * 100 if lucro_proj != 0 else np.zeros(len(nomes))
+    
+    comparacoes = [
+        f"no cenário {nome}, o lucro seria {abs(diferenca):.1f}% {'menor' if diferenca < 0 else 'maior'}"
+        for nome, diferenca in zip(nomes, diferencas) if nome != base
+    ]
+    if comparacoes:
+        parecer.append(f"• **Análise de Cenários** (em relação ao {base}): " + "; ".join(comparacoes) + ".")
 
     # Usar quebras de linha duplas para Markdown
     st.markdown("\n\n".join(parecer))
 
-def calculate_indicators_for_cultura(cultura, receitas_cultura, custos_cultura, anos, total_ativos_cultura):
-    """Calcula indicadores financeiros para uma cultura específica."""
-    # Verificar se os dados existem e não estão vazios
-    if not receitas_cultura:
-        return {}
-    
-    # Para DataFrame, usar .empty para verificar se está vazio
-    if isinstance(custos_cultura, pd.DataFrame) and custos_cultura.empty:
-        return {}
-    elif isinstance(custos_cultura, dict) and not custos_cultura:
-        return {}
-    
-    # Converter para listas se necessário
-    if isinstance(receitas_cultura, dict):
-        receitas = [receitas_cultura.get(ano, 0) for ano in anos]
-    else:
-        receitas = list(receitas_cultura)
-    
-    # Calcular custos totais por ano
-    if isinstance(custos_cultura, pd.DataFrame) and not custos_cultura.empty:
-        custos_totais = custos_cultura.sum(axis=0).tolist()
-    elif isinstance(custos_cultura, dict):
-        custos_totais = [custos_cultura.get(ano, 0) for ano in anos]
-    else:
-        custos_totais = [0] * len(anos)
-    
-    # Calcular lucro líquido
-    lucro_liquido = [r - c for r, c in zip(receitas, custos_totais)]
-    
-    indicators = {}
-    
-    # 1. Margem Líquida (%)
-    indicators["Margem Líquida (%)"] = [
-        (l / r * 100) if r != 0 else 0 for l, r in zip(lucro_liquido, receitas)
-    ]
-    
-    # 2. Retorno por Real Gasto
-    indicators["Retorno por Real Gasto"] = [
-        (l / c) if c != 0 else 0 for l, c in zip(lucro_liquido, custos_totais)
-    ]
-    
-    # 3. Liquidez Operacional
-    indicators["Liquidez Operacional"] = [
-        (r / c) if c != 0 else 0 for r, c in zip(receitas, custos_totais)
-    ]
-    
-    # 4. Custo por Receita (%)
-    indicators["Custo por Receita (%)"] = [
-        (c / r * 100) if r != 0 else 0 for c, r in zip(custos_totais, receitas)
-    ]
-    
-    # 5. ROA (%)
-    indicators["ROA (%)"] = [
-        (l / total_ativos_cultura * 100) if total_ativos_cultura != 0 else 0 for l in lucro_liquido
-    ]
-    
-    # 6. CAGR Receita (%)
-    indicators["CAGR Receita (%)"] = calcular_cagr(receitas[0], receitas[-1], len(anos) - 1)
-    
-    # 7. CAGR Lucro Líquido (%)
-    indicators["CAGR Lucro Líquido (%)"] = calcular_cagr(lucro_liquido[0], lucro_liquido[-1], len(anos) - 1)
-    
-    return indicators
-
 def generate_financial_opinion_cultura(indicators_cultura, cultura, hectares_cultura):
     """Gera parecer financeiro específico para uma cultura."""
     st.markdown(f"#### 🌿 Parecer Financeiro - {cultura}")
@@ -1368,16 +898,30 @@ def generate_financial_opinion_cultura(indicators_cultura, cultura, hectares_cul
     st.markdown("\n\n".join(parecer))
 
 def main():
+    # Espaço reservado no topo: o resumo aparece assim que o grafo de cálculo responde
+    resumo = st.container()
     display_indicator_explanation()
 
     # Carrega todos os dados necessários
     session_data = get_base_financial_data()
     
-    # Calcula DREs por cultura
-    dre_por_cultura_cenarios = calcular_dre_por_cultura_cenarios(session_data)
+    # Nomes dos cenários (tabela da página de Ajuste de Cenários)
+    nomes_cenarios = session_data["nomes_cenarios"]
+    anos = session_data["anos"]
+
+    # Cubo de resultados (cenário × cultura × linha × ano): base de tabelas, gráficos e relatórios
+    cubo = obter(st.session_state, "cubo")
+    session_data["cubo"] = cubo
+    st.session_state["cubo_resultados"] = cubo
+
+    # Indicadores de cada cenário e o resumo do cenário de referência
+    all_indicators = obter(st.session_state, "indicadores")
+    with resumo:
+        display_headline_kpis(cubo, all_indicators)
+
+    # DREs por cultura (visão do cubo), mantidos no session_state para o PPT
+    dre_por_cultura_cenarios = calcular_dre_por_cultura_cenarios(session_data, cubo)
     session_data["dre_por_cultura_cenarios"] = dre_por_cultura_cenarios
-    
-    # Salva no session_state para uso no PPT
     st.session_state["dre_por_cultura_cenarios"] = dre_por_cultura_cenarios
 
     # Exibe os parâmetros de cenário
@@ -1386,37 +930,49 @@ def main():
     # Exibe a receita por cultura
     df_culturas_for_excel = display_revenue_by_crop(session_data)
 
-    # Nomes dos cenários
-    nomes_cenarios = ["Projetado", "Pessimista", "Otimista"]
-    anos = session_data["anos"]
-
-    # Calcula os indicadores para cada cenário
-    all_indicators = {}
-    for cenario_name in nomes_cenarios:
-        dre_data = session_data["dre_cenarios"][cenario_name]
-        all_indicators[cenario_name] = calculate_indicators_for_scenario(cenario_name, dre_data, session_data)
-
     # Exibe as tabelas de indicadores GERAIS
-    display_indicators_table(all_indicators, anos)
-
-    # Exibe indicadores POR CULTURA E CENÁRIO
-    all_indicators_cultura_cenarios = display_indicators_by_cultura(session_data)
-
-    # NOVO: Exibe fluxo de caixa consolidado e por cultura
-    fluxo_consolidado, fluxos_por_cultura = generate_fluxo_caixa_consolidado_e_culturas(session_data, all_indicators_cultura_cenarios)
+    display_indicators_table(all_indicators, anos, session_data["emojis_cenarios"])
 
     # Exibe o resumo financeiro
-    display_financial_summary(session_data["dre_cenarios"], anos)
+    display_financial_summary(cubo, anos)
+
+    # Indicadores POR CULTURA E CENÁRIO (usados também no fluxo por cultura e na exportação)
+    all_indicators_cultura_cenarios = obter(st.session_state, "indicadores_culturas")
 
-    # Gera e exibe as visualizações 
-    generate_visualizations(session_data["dre_cenarios"], all_indicators, anos, nomes_cenarios, session_data)
+    # Fluxo de caixa consolidado e por cultura
+    fluxo_consolidado, fluxos_por_cultura = generate_fluxo_caixa_consolidado_e_culturas(session_data, all_indicators_cultura_cenarios)
 
-    # Gera o parecer financeiro GERAL
-    st.markdown("### 📝 Parecer Financeiro Consolidado")
-    generate_financial_opinion(all_indicators, session_data)
+    # Seções detalhadas: montadas e calculadas só quando abertas
+    secao = secao_sob_demanda("🌱 Análise Financeira por Cultura e Cenário", "secao_culturas")
+    if secao.open:
+        with secao:
+            display_indicators_by_cultura(session_data, all_indicators_cultura_cenarios)
+
+    secao = secao_sob_demanda("📈 Visualizações", "secao_visualizacoes")
+    if secao.open:
+        with secao:
+            generate_visualizations(cubo, all_indicators, anos, nomes_cenarios, session_data)
+
+    # Sensibilidade de cada direcionador (tornado)
+    secao = secao_sob_demanda("🌪️ Análise de Sensibilidade (Tornado)", "secao_tornado")
+    if secao.open:
+        with secao:
+            display_tornado(session_data)
+
+    # Ponto de equilíbrio e preços-alvo por cultura
+    secao = secao_sob_demanda("🎯 Equilíbrio e Metas por Cultura", "secao_equilibrio")
+    if secao.open:
+        with secao:
+            display_break_even(session_data)
+
+    # Parecer financeiro GERAL
+    secao = secao_sob_demanda("📝 Parecer Financeiro Consolidado", "secao_parecer")
+    if secao.open:
+        with secao:
+            generate_financial_opinion(all_indicators, session_data)
     
     # Atualizar exportações para incluir dados por cultura e cenários
-    generate_excel_export_with_cultura(all_indicators, session_data["dre_cenarios"], df_culturas_for_excel, nomes_cenarios, anos, all_indicators_cultura_cenarios, fluxo_consolidado, fluxos_por_cultura)
+    generate_excel_export_with_cultura(all_indicators, session_data["dre_cenarios"], df_culturas_for_excel, nomes_cenarios, anos, all_indicators_cultura_cenarios, fluxo_consolidado, fluxos_por_cultura, cubo)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    executar_pagina("Indicadores", main)
@@ -64,4 +64,12 @@ print(f"Índice transposto: {df_transposto.index.tolist()[:3]}...")
 print(f"Colunas transpostas: {df_transposto.columns.tolist()}")
 
 print("\n✅ Estrutura de dados parece estar correta!")
-print("💡 Execute o teste no app principal para verificar a geração do PPT")
+
+# Geração real do PPT com os dados de exemplo
+ppt_buffer = criar_relatorio_ppt_completo(all_indicators, all_dre_data, df_culturas_for_excel, ["Projetado"], anos)
+if ppt_buffer:
+    print(f"\n✅ PPT gerado ({len(ppt_buffer.getvalue())} bytes)")
+else:
+    print("\n❌ Falha ao gerar o PPT (verifique se python-pptx está instalado)")
+
+print("💡 Para medir o tempo de cada etapa em fazendas maiores: python -m benchmarks.relatorios --help")
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Os módulos do app são importados a partir da raiz do projeto (utils.*, benchmarks.*)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
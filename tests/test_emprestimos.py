@@ -0,0 +1,43 @@
+"""Motor de amortização (utils/emprestimos.py)."""
+import numpy as np
+
+from utils.emprestimos import emprestimos_invalidos, parcelas_anuais, valor_primeira_parcela
+
+ANOS = [f"Ano {i + 1}" for i in range(5)]
+
+
+def _emprestimo(sistema, **campos):
+    return {
+        "banco": "Banco X", "objeto": "Trator", "valor_total": 100_000.0, "encargos": 10.0, "parcelas": 5,
+        "valor_parcela": 0.0, "periodo": "ANUAL", "ano_inicial": "Ano 1", "ano_final": "Ano 5",
+        "sistema": sistema, **campos,
+    }
+
+
+def test_price_parcelas_iguais():
+    emprestimo = _emprestimo("PRICE")
+    assert np.allclose(parcelas_anuais([emprestimo], ANOS), 26_379.75, atol=0.01)
+    assert np.isclose(valor_primeira_parcela(emprestimo), 26_379.75, atol=0.01)
+
+
+def test_sac_amortizacao_constante():
+    assert np.allclose(parcelas_anuais([_emprestimo("SAC")], ANOS), [[30_000, 28_000, 26_000, 24_000, 22_000]])
+
+
+def test_carencia_paga_so_juros():
+    parcelas = parcelas_anuais([_emprestimo("PRICE", parcelas=3, carencia=2)], ANOS)[0]
+    assert np.allclose(parcelas[:2], 10_000)
+    assert np.allclose(parcelas[2:], 100_000 * 0.1 / (1 - 1.1 ** -3))
+
+
+def test_parcela_fixa_usa_o_valor_informado():
+    parcelas = parcelas_anuais([_emprestimo("PARCELA FIXA", valor_parcela=25_000.0, parcelas=4)], ANOS)
+    assert np.allclose(parcelas, [[25_000, 25_000, 25_000, 25_000, 0]])
+
+
+def test_ano_invalido_vira_linha_zerada():
+    emprestimos = [_emprestimo("PRICE"), _emprestimo("PRICE", ano_inicial="Ano 9"), _emprestimo("SAC", ano_inicial="Ano 4", ano_final="Ano 2")]
+    parcelas = parcelas_anuais(emprestimos, ANOS)
+    assert parcelas.shape == (3, 5)
+    assert np.all(parcelas[1:] == 0) and np.all(parcelas[0] > 0)
+    assert emprestimos_invalidos(emprestimos, ANOS) == [1, 2]
@@ -0,0 +1,30 @@
+"""Metas por cultura (utils/equilibrio.py) conferidas contra o resultado que elas produzem."""
+import numpy as np
+
+from utils.cenarios import tabela_cenarios
+from utils.equilibrio import calcular_equilibrio
+from utils.gerador_dados import gerar_fazenda
+from utils.pipeline import obter
+from utils.rotacao import por_cultura_e_ano
+
+
+def test_preco_para_dscr_alvo_atinge_o_dscr_dos_indicadores():
+    estado = gerar_fazenda(n_plantios=8, n_despesas=120, n_emprestimos=6, seed=5)
+    for emprestimo in estado["emprestimos"]:
+        emprestimo["centro_custo"] = next(iter(estado["plantios"].values()))["cultura"]
+    cubo = obter(estado, "cubo")
+    tabela = calcular_equilibrio(cubo, estado["plantios"], tabela_cenarios(estado), dscr_alvo=1.5)
+
+    culturas = cubo.culturas
+    receita = cubo.sel(None, culturas, "Receita")
+    custos = cubo.sel(None, culturas, "Custos Diretos")
+    parcelas = cubo.sel(None, culturas, "Parcelas de Empréstimos (Custos Diretos)")
+    aliquota_venda = cubo.sel(None, culturas, "Impostos Sobre Venda") / receita
+    _, sacas, _ = por_cultura_e_ano(estado["plantios"], culturas, cubo.anos)
+
+    preco = tabela["Preço p/ DSCR Alvo (R$/sc)"].to_numpy().reshape(receita.shape)
+    com_meta = np.isfinite(preco)
+    assert com_meta.any()
+    # Lucro operacional da cultura com a receita da meta, sobre as parcelas alocadas a ela
+    lucro_operacional = preco * sacas[None] * (1 - aliquota_venda) - custos
+    np.testing.assert_allclose((lucro_operacional / parcelas)[com_meta], 1.5)
@@ -0,0 +1,44 @@
+"""Importação pela chave natural (utils/importacao.py)."""
+import numpy as np
+
+from utils.importacao import aplicar_diferencas, diferencas_importacao
+
+
+def _despesa(codigo, valor, nome="Energia"):
+    return {"Despesa": nome, "Codigo": codigo, "Valor": valor, "Categoria": "Operacional"}
+
+
+def test_insere_atualiza_remove_e_conta_iguais():
+    atuais = [_despesa(1, 100.0), _despesa(2, 200.0), _despesa(3, 300.0)]
+    novos = [_despesa(1, 100.0), _despesa(2, 250.0), _despesa(4, 400.0)]
+
+    diferencas = diferencas_importacao(atuais, novos, ["Codigo"])
+
+    assert diferencas["inserir"] == [novos[2]]
+    assert diferencas["atualizar"] == {1: novos[1]}
+    assert diferencas["remover"] == [2]
+    assert diferencas["iguais"] == 1
+    assert [d["Valor"] for d in aplicar_diferencas(atuais, diferencas)] == [100.0, 250.0, 300.0, 400.0]
+    assert [d["Codigo"] for d in aplicar_diferencas(atuais, diferencas, remover=True)] == [1, 2, 4]
+
+
+def test_chave_repetida_e_cadastro_duplicado():
+    atuais = [_despesa(1, 100.0), _despesa(1, 100.0)]
+    novos = [_despesa(1, 150.0), _despesa(1, 175.0)]
+
+    diferencas = diferencas_importacao(atuais, novos, ["Codigo"])
+
+    assert diferencas["repetidos"] == 1
+    assert diferencas["duplicados"] == [1]
+    assert aplicar_diferencas(atuais, diferencas) == [_despesa(1, 175.0)]
+
+
+def test_chave_numerica_casa_entre_inteiro_float_e_texto():
+    atuais = [_despesa(123, 100.0), _despesa(None, 50.0, "Sem código")]
+    novos = [_despesa(123.0, 100.0), _despesa(np.nan, 50.0, "Sem código")]
+
+    diferencas = diferencas_importacao(atuais, novos, ["Codigo"])
+    assert diferencas["inserir"] == [] and diferencas["iguais"] == 1
+
+    diferencas = diferencas_importacao(atuais, [_despesa(" 123 ", 100.0)], ["Codigo"])
+    assert diferencas["inserir"] == [] and diferencas["atualizar"] == {0: _despesa(" 123 ", 100.0)}
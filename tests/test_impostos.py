@@ -0,0 +1,30 @@
+"""Regimes tributários (utils/impostos.py)."""
+import numpy as np
+
+from utils.impostos import aliquotas, configuracao_regime, impostos_sobre_resultado, impostos_sobre_venda
+
+
+def test_lucro_presumido():
+    impostos = configuracao_regime("Lucro Presumido", 3)
+    assert np.allclose(impostos_sobre_venda([1_000.0] * 3, [500.0] * 3, impostos), 48.5)
+    assert np.allclose(impostos_sobre_resultado([100.0, -50.0, 200.0], impostos), [15.0, 0.0, 30.0])
+
+
+def test_funrural_sobre_folha():
+    impostos = configuracao_regime("Produtor Rural PF - Funrural sobre Folha", 2)
+    assert np.allclose(impostos_sobre_venda([1_000.0, 2_000.0], [100.0, 100.0], impostos), [22.0, 24.0])
+
+
+def test_compensacao_de_prejuizos_limitada():
+    # Lucro Real: até 30% do lucro do ano abate o prejuízo acumulado
+    impostos = configuracao_regime("Lucro Real", 5)
+    resultado = impostos_sobre_resultado([[-100.0, 100.0, 100.0, 100.0, 100.0]], impostos)
+    assert np.allclose(resultado, np.array([[0.0, 70.0, 70.0, 70.0, 90.0]]) * 0.34)
+
+
+def test_anos_alem_da_tabela_repetem_a_ultima_aliquota():
+    impostos = configuracao_regime("Lucro Presumido", 2)
+    impostos["regras"][2]["Ano 2"] = 20.0
+    taxas, limite = aliquotas(impostos, 4)
+    assert np.allclose(taxas["Lucro"], [0.15, 0.20, 0.20, 0.20])
+    assert limite == 0.0
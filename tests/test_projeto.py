@@ -0,0 +1,73 @@
+"""Pacote de projeto (utils/projeto.py): salvar pela página inicial e abrir de novo."""
+import io
+import threading
+from pathlib import Path
+
+from streamlit.runtime.media_file_manager import MediaFileManager
+from streamlit.testing.v1 import AppTest
+
+from utils.gerador_dados import gerar_fazenda
+from utils.importacao import CHAVE_IMPORTADOS, CHAVE_LEITURAS
+from utils.projeto import exportar_projeto, importar_projeto
+
+APP = str(Path(__file__).resolve().parents[1] / "app.py")
+
+
+def test_salvar_pela_pagina_e_abrir(monkeypatch):
+    geradores = []
+    add_deferred = MediaFileManager.add_deferred
+
+    def registrar(self, data_callable, *args, **kwargs):
+        geradores.append(data_callable)
+        return add_deferred(self, data_callable, *args, **kwargs)
+
+    monkeypatch.setattr(MediaFileManager, "add_deferred", registrar)
+
+    at = AppTest.from_file(APP, default_timeout=60)
+    dados = gerar_fazenda(n_plantios=6, n_despesas=30, n_emprestimos=2, seed=7)
+    for chave in ("plantios", "despesas", "emprestimos", "receitas_adicionais"):
+        at.session_state[chave] = dados[chave]
+    at.session_state["inf_2"] = 7.5
+    at.run()
+    assert not at.exception
+    assert len(geradores) == 1
+
+    # O servidor gera o arquivo numa thread própria, fora da execução do script
+    pacote = {}
+    thread = threading.Thread(target=lambda: pacote.setdefault("bytes", geradores[0]()))
+    thread.start()
+    thread.join()
+
+    estado = {}
+    abertos = importar_projeto(io.BytesIO(pacote["bytes"]), estado)
+    assert len(abertos["plantios"]) == len(dados["plantios"]) > 0
+    assert len(abertos["despesas"]) == len(dados["despesas"]) > 0
+    assert estado["emprestimos"] and estado["inf_2"] == 7.5
+
+
+def test_salvar_e_abrir_com_tipos_misturados_e_calendarios():
+    dados = gerar_fazenda(n_plantios=3, n_despesas=4, n_emprestimos=1, seed=3)
+    # Exportação de ERP: códigos de conta numéricos e alfanuméricos na mesma coluna
+    for despesa, conta in zip(dados["despesas"], [3101, "3.1.02", 3103, None]):
+        if conta is not None:
+            despesa["Conta"] = conta
+    estado = {
+        **dados,
+        "calendarios_culturas": {"Soja": {"colheita": {3: 40.0, 4: 60.0}, "insumos": {9: 100.0}}},
+    }
+
+    aberto = {}
+    abertos = importar_projeto(io.BytesIO(exportar_projeto(estado)), aberto)
+
+    assert [d.get("Conta") for d in abertos["despesas"]] == ["3101", "3.1.02", "3103", None]
+    assert [d["Valor"] for d in abertos["despesas"]] == [d["Valor"] for d in dados["despesas"]]
+    assert aberto["calendarios_culturas"] == estado["calendarios_culturas"]
+
+
+def test_abrir_projeto_esquece_arquivos_importados():
+    dados = gerar_fazenda(n_plantios=2, n_despesas=3, n_emprestimos=1, seed=5)
+    estado = {**dados, CHAVE_IMPORTADOS: {"despesas": {"abc"}}, CHAVE_LEITURAS: {"abc": object()}}
+
+    importar_projeto(io.BytesIO(exportar_projeto(dados)), estado)
+
+    assert CHAVE_IMPORTADOS not in estado and CHAVE_LEITURAS not in estado
@@ -0,0 +1,37 @@
+"""Direcionadores do tornado (utils/sensibilidade.py)."""
+import numpy as np
+import pandas as pd
+
+from utils.cenarios import parametros_cenarios, tabela_cenarios
+from utils.gerador_dados import gerar_fazenda
+from utils.sensibilidade import analise_tornado
+
+
+def _tornado(estado, despesas_info):
+    parametros = {chave: valores[0] for chave, valores in parametros_cenarios(tabela_cenarios(estado)).items()}
+    return analise_tornado(
+        estado["plantios"], estado["receitas_adicionais"], despesas_info, estado["emprestimos"],
+        estado["anos"], [4.0, 5.0, 6.0, 5.0, 4.0], parametros,
+        indices={"Diesel": [9.0, 1.0, 7.0, 2.0, 3.0]}, indices_por_categoria={"Operacional": "Diesel"}
+    )
+
+
+def test_um_direcionador_por_plantio_e_por_categoria():
+    estado = gerar_fazenda(n_plantios=4, n_despesas=500, n_emprestimos=2, seed=2)
+    tabela, _ = _tornado(estado, pd.DataFrame(estado["despesas"]))
+
+    tipos = tabela["Tipo"].value_counts()
+    assert tipos["Receita"] == len(estado["plantios"])
+    assert tipos["Despesa"] == len({d["Categoria"] for d in estado["despesas"]} & {"Operacional", "Administrativa", "RH", "Dividendos"})
+    assert tipos["Inflação"] == len(estado["anos"])
+
+
+def test_direcionador_de_categoria_equivale_a_aumentar_a_categoria():
+    estado = gerar_fazenda(n_plantios=4, n_despesas=500, n_emprestimos=2, seed=2)
+    despesas = pd.DataFrame(estado["despesas"])
+    tabela, _ = _tornado(estado, despesas)
+
+    aumentadas = despesas.copy()
+    aumentadas.loc[aumentadas["Categoria"] == "Operacional", "Valor"] *= 1.10
+    _, base_aumentada = _tornado(estado, aumentadas)
+    assert np.isclose(tabela.set_index("Direcionador").loc["Despesas - Operacional", "Alto"], base_aumentada)
@@ -0,0 +1,111 @@
+# utils/agenda.py
+"""
+Agenda das despesas: em quais anos da projeção cada despesa ocorre e como cresce.
+
+Campos opcionais de cada despesa (ausentes = despesa anual em todos os anos):
+    Ano_Inicio / Ano_Fim  primeiro e último ano (1 = Ano 1); início = fim é uma despesa única
+    Recorrencia           ocorre a cada N anos a partir do início (1 = todo ano)
+    Crescimento           % ao ano que substitui o índice de inflação da despesa
+
+A agenda vira uma máscara booleana (despesa × ano) e a projeção do cadastro inteiro é um
+único broadcast valor × fator × máscara. Para o DRE, despesas com a mesma série de taxas e a
+mesma máscara formam um grupo; os totais por categoria saem de uma matriz (categoria × grupo).
+"""
+import numpy as np
+import pandas as pd
+
+from utils.inflacao import codigos_indice, taxas_indices
+
+ANO_INICIO = "Ano_Inicio"
+ANO_FIM = "Ano_Fim"
+RECORRENCIA = "Recorrencia"
+CRESCIMENTO = "Crescimento"
+COLUNAS_AGENDA = [ANO_INICIO, ANO_FIM, RECORRENCIA, CRESCIMENTO]
+
+
+def _coluna(despesas_info, coluna, padrao):
+    """Valores numéricos de uma coluna opcional, com `padrao` onde ausente."""
+    if coluna not in despesas_info.columns:
+        return np.full(len(despesas_info), padrao, dtype=float)
+    return pd.to_numeric(despesas_info[coluna], errors="coerce").fillna(padrao).to_numpy(dtype=float)
+
+
+def mascaras_agenda(despesas_info, n_anos):
+    """Máscara (despesa × ano) com True nos anos em que cada despesa ocorre."""
+    inicio = _coluna(despesas_info, ANO_INICIO, 1)[:, None]
+    fim = _coluna(despesas_info, ANO_FIM, n_anos)[:, None]
+    passo = np.maximum(_coluna(despesas_info, RECORRENCIA, 1), 1)[:, None]
+    ano = np.arange(1, n_anos + 1)[None, :]
+    return (ano >= inicio) & (ano <= fim) & ((ano - inicio) % passo == 0)
+
+
+def taxas_despesas(despesas_info, indices, n_anos, indices_por_categoria=None):
+    """Taxa anual (%) de cada despesa (despesa × ano): a do seu índice ou o crescimento próprio."""
+    taxas = taxas_indices(indices, n_anos)[codigos_indice(despesas_info, indices, indices_por_categoria)]
+    crescimento = _coluna(despesas_info, CRESCIMENTO, np.nan)[:, None]
+    return np.where(np.isnan(crescimento), taxas, crescimento)
+
+
+def fatores_agendados(despesas_info, indices, n_anos, indices_por_categoria=None):
+    """Fator de cada despesa em cada ano (despesa × ano): crescimento acumulado, zero fora da agenda."""
+    taxas = taxas_despesas(despesas_info, indices, n_anos, indices_por_categoria)
+    return np.cumprod(1 + taxas / 100, axis=1) * mascaras_agenda(despesas_info, n_anos)
+
+
+def grupos_agenda(despesas_info, indices, n_anos, indices_por_categoria=None):
+    """
+    Agrupa despesas com a mesma série de taxas e a mesma máscara.
+    Retorna (grupo de cada despesa (despesa,), taxas (grupo × ano), máscaras (grupo × ano)).
+    """
+    chaves = np.concatenate([
+        taxas_despesas(despesas_info, indices, n_anos, indices_por_categoria),
+        mascaras_agenda(despesas_info, n_anos)
+    ], axis=1)
+    unicas, grupos = np.unique(chaves, axis=0, return_inverse=True)
+    return grupos.reshape(-1), unicas[:, :n_anos], unicas[:, n_anos:].astype(bool)
+
+
+def fatores_grupos(taxas, mascaras, desvio=0.0):
+    """Fatores (..., grupo, ano); `desvio` (p.p.) faz broadcast com (..., grupo, ano)."""
+    return np.cumprod(1 + (taxas + np.asarray(desvio, dtype=float)) / 100, axis=-1) * mascaras
+
+
+def pesos_categoria_grupo(despesas_info, categorias, grupos, n_grupos):
+    """Soma dos valores cadastrados por categoria e grupo de agenda: matriz (categoria × grupo)."""
+    pesos = np.zeros((len(categorias), n_grupos))
+    if despesas_info.empty or "Categoria" not in despesas_info.columns:
+        return pesos
+    linhas = pd.Index(list(categorias)).get_indexer(despesas_info["Categoria"])
+    validas = linhas >= 0
+    np.add.at(pesos, (linhas[validas], grupos[validas]), despesas_info["Valor"].to_numpy(dtype=float)[validas])
+    return pesos
+
+
+def despesas_por_categoria(despesas_info, categorias, indices, n_anos, indices_por_categoria=None, desvio=0.0):
+    """
+    Despesas agendadas e corrigidas de cada categoria: {categoria: array (..., ano)}.
+    Com `desvio` por cenário (S,), cada série tem forma (S, ano).
+    """
+    if despesas_info.empty:
+        return {categoria: np.zeros(n_anos) for categoria in categorias}
+    grupos, taxas, mascaras = grupos_agenda(despesas_info, indices, n_anos, indices_por_categoria)
+    pesos = pesos_categoria_grupo(despesas_info, categorias, grupos, len(taxas))
+    fatores = fatores_grupos(taxas, mascaras, np.asarray(desvio, dtype=float)[..., None, None])
+    series = np.einsum("kg,...gy->...ky", pesos, fatores)
+    return {categoria: series[..., k, :] for k, categoria in enumerate(categorias)}
+
+
+def descrever_agenda(despesa, n_anos):
+    """Resumo legível da agenda de uma despesa (dict do cadastro)."""
+    serie = pd.DataFrame([despesa])
+    anos = np.flatnonzero(mascaras_agenda(serie, n_anos)[0]) + 1
+    if len(anos) == n_anos:
+        texto = "Anual"
+    elif len(anos) == 0:
+        texto = "Fora da projeção"
+    elif len(anos) == 1:
+        texto = f"Única (Ano {anos[0]})"
+    else:
+        texto = ", ".join(f"Ano {a}" for a in anos)
+    crescimento = _coluna(serie, CRESCIMENTO, np.nan)[0]
+    return texto if np.isnan(crescimento) else f"{texto}; {crescimento:+.1f}% a.a."
@@ -0,0 +1,159 @@
+# utils/categorizacao.py
+"""
+Categorização automática das despesas importadas de exportações de ERP.
+
+Duas tabelas de regras atribuem Categoria e Centro_Custo às linhas que não os trazem:
+    contas        código da conta contábil (coluna "Conta") → Categoria, Centro_Custo
+    palavras      padrão (palavras separadas por "|" ou expressão regular) buscado na
+                  descrição (coluna "Despesa") → Categoria, Centro_Custo
+A conta tem prioridade; a busca por palavras vale para o que sobrar. As regras só com
+palavras literais vão para um autômato de Aho–Corasick, que varre cada descrição distinta
+uma vez qualquer que seja o número de palavras; as que usam expressão regular são buscadas
+uma a uma. Não diferencia maiúsculas nem acentos; vence a ocorrência mais à esquerda e, na
+mesma posição, a regra listada primeiro. Centro_Custo vazio na regra mantém o do arquivo.
+Valores já preenchidos no arquivo não são alterados.
+"""
+import re
+import unicodedata
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+CHAVE_REGRAS = "regras_categorizacao"  # {"contas": [registros], "palavras": [registros]}
+COLUNA_CONTA = "Conta"
+COLUNA_PADRAO = "Padrao"
+COLUNAS_CONTAS = [COLUNA_CONTA, "Categoria", "Centro_Custo"]
+COLUNAS_PALAVRAS = [COLUNA_PADRAO, "Categoria", "Centro_Custo"]
+METACARACTERES = set(".^$*+?{}[]\\()")
+
+REGRAS_PADRAO = {
+    "contas": [],
+    "palavras": [
+        {COLUNA_PADRAO: "salario|folha|ferias|13o|inss|fgts|rescis", "Categoria": "RH", "Centro_Custo": "Administrativo"},
+        {COLUNA_PADRAO: "dividendo|distribuicao de lucro", "Categoria": "Dividendos", "Centro_Custo": "Administrativo"},
+        {COLUNA_PADRAO: "contab|escritorio|aluguel|energia|internet|telefon|seguro", "Categoria": "Administrativa", "Centro_Custo": "Administrativo"},
+        {COLUNA_PADRAO: "semente|fertiliz|adubo|calcario|defensiv|herbicid|fungicid|insetic", "Categoria": "Operacional", "Centro_Custo": ""},
+        {COLUNA_PADRAO: "diesel|combustiv|lubrific|manutencao|pecas|frete|colheita|plantio", "Categoria": "Operacional", "Centro_Custo": ""},
+    ],
+}
+
+
+def regras_categorizacao(estado):
+    """Regras salvas na sessão, ou as de referência."""
+    return estado.get(CHAVE_REGRAS) or REGRAS_PADRAO
+
+
+def _sem_acentos(texto):
+    return unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode("ascii")
+
+
+def _preenchido(valores):
+    return valores.notna() & (valores.astype(str).str.strip() != "")
+
+
+def _automato(palavras):
+    """Autômato de Aho–Corasick (transições, falhas, saídas) para a lista [(palavra, regra)]."""
+    transicoes, falhas, saidas = [{}], [0], [[]]
+    for palavra, regra in palavras:
+        estado = 0
+        for letra in palavra:
+            if letra not in transicoes[estado]:
+                transicoes[estado][letra] = len(transicoes)
+                transicoes.append({})
+                falhas.append(0)
+                saidas.append([])
+            estado = transicoes[estado][letra]
+        saidas[estado].append((len(palavra), regra))
+
+    fila = deque(transicoes[0].values())
+    while fila:
+        estado = fila.popleft()
+        for letra, proximo in transicoes[estado].items():
+            fila.append(proximo)
+            falha = falhas[estado]
+            while falha and letra not in transicoes[falha]:
+                falha = falhas[falha]
+            falhas[proximo] = transicoes[falha].get(letra, 0)
+            saidas[proximo] = saidas[proximo] + saidas[falhas[proximo]]
+    return transicoes, falhas, saidas
+
+
+def compilar_palavras(palavras):
+    """
+    Busca das regras de palavras: (autômato das regras literais, maior palavra, [(regra,
+    expressão)] das demais), ou None sem regras. Padrão inválido gera ValueError.
+    """
+    literais, expressoes = [], []
+    for i, regra in enumerate(palavras):
+        padrao = _sem_acentos(str(regra[COLUNA_PADRAO]).strip())
+        alternativas = padrao.lower().split("|")
+        if all(alternativas) and not METACARACTERES & set(padrao):
+            literais.extend((palavra, i) for palavra in alternativas)
+            continue
+        try:
+            expressoes.append((i, re.compile(padrao, re.IGNORECASE)))
+        except re.error as e:
+            raise ValueError(f"Padrão inválido na regra {i + 1} ({padrao}): {e}") from None
+    if not literais and not expressoes:
+        return None
+    return _automato(literais), max((len(p) for p, _ in literais), default=0), expressoes
+
+
+def regra_da_descricao(texto, busca):
+    """Índice da regra que casa com `texto` (sem acentos), ou -1."""
+    (transicoes, falhas, saidas), maior, expressoes = busca
+    melhor = (len(texto) + 1, -1)  # (início da ocorrência, regra)
+    estado = 0
+    for fim, letra in enumerate(texto.lower()):
+        if fim - maior >= melhor[0]:
+            break  # nenhuma ocorrência ainda possível começa antes da melhor
+        while estado and letra not in transicoes[estado]:
+            estado = falhas[estado]
+        estado = transicoes[estado].get(letra, 0)
+        for tamanho, regra in saidas[estado]:
+            melhor = min(melhor, (fim - tamanho + 1, regra))
+    for regra, expressao in expressoes:
+        ocorrencia = expressao.search(texto)
+        if ocorrencia:
+            melhor = min(melhor, (ocorrencia.start(), regra))
+    return melhor[1]
+
+
+def categorizar(tabela, regras):
+    """
+    Preenche Categoria e Centro_Custo das linhas sem esses valores. Retorna a tabela
+    categorizada (cópia) e a máscara das linhas que continuaram sem Categoria.
+    """
+    tabela = tabela.copy()
+    for coluna in ("Categoria", "Centro_Custo"):
+        if coluna not in tabela.columns:
+            tabela[coluna] = np.nan
+        # object: coluna ausente ou toda vazia chega como float e não aceitaria texto
+        tabela[coluna] = tabela[coluna].astype(object).where(_preenchido(tabela[coluna]))
+
+    # Conta contábil: junção por hash contra a tabela de contas
+    contas = pd.DataFrame(regras.get("contas") or [], columns=COLUNAS_CONTAS).dropna(subset=[COLUNA_CONTA, "Categoria"])
+    if COLUNA_CONTA in tabela.columns and not contas.empty:
+        contas[COLUNA_CONTA] = contas[COLUNA_CONTA].astype(str).str.strip().str.removesuffix(".0")
+        contas = contas.drop_duplicates(COLUNA_CONTA).set_index(COLUNA_CONTA)
+        codigos = tabela[COLUNA_CONTA].astype(str).str.strip().str.removesuffix(".0")
+        for coluna in ("Categoria", "Centro_Custo"):
+            tabela[coluna] = tabela[coluna].fillna(codigos.map(contas[coluna].where(_preenchido(contas[coluna]))))
+
+    # Palavras-chave: uma varredura por descrição distinta das linhas ainda sem categoria
+    palavras = pd.DataFrame(regras.get("palavras") or [], columns=COLUNAS_PALAVRAS)
+    palavras = palavras[_preenchido(palavras[COLUNA_PADRAO]) & _preenchido(palavras["Categoria"])].reset_index(drop=True)
+    pendentes = tabela["Categoria"].isna().to_numpy()
+    busca = compilar_palavras(palavras.to_dict("records"))
+    if busca is not None and pendentes.any():
+        codigos, descricoes = pd.factorize(tabela.loc[pendentes, "Despesa"].astype(str))
+        regra = np.array([regra_da_descricao(_sem_acentos(d), busca) for d in descricoes], dtype=int)[codigos]
+        achou = regra >= 0
+        linhas = tabela.index[pendentes][achou]
+        escolhidas = palavras.iloc[regra[achou]]
+        tabela.loc[linhas, "Categoria"] = escolhidas["Categoria"].to_numpy()
+        centros = escolhidas["Centro_Custo"].where(_preenchido(escolhidas["Centro_Custo"])).to_numpy()
+        tabela.loc[linhas, "Centro_Custo"] = tabela.loc[linhas, "Centro_Custo"].fillna(pd.Series(centros, index=linhas))
+
+    return tabela, tabela["Categoria"].isna()
@@ -0,0 +1,110 @@
+# utils/cenarios.py
+"""
+Tabela de cenários definida pelo usuário.
+
+Cada cenário é uma linha com ajustes percentuais sobre o caso base:
+- Receita (%): ajuste final da receita operacional (ex.: -15 = receita 15% menor);
+- Despesas (%): ajuste das despesas e das parcelas de empréstimos;
+- Preço (%) e Produtividade (%): ajustes do preço da saca e das sacas por hectare;
+- Inflação (p.p.): pontos percentuais somados à inflação de cada ano.
+
+A tabela é convertida em vetores (um valor por cenário), e receitas, DRE e custos são
+calculados para todos os cenários de uma vez. Configurações antigas, com as chaves
+pess_*/otm_*, viram a tabela Projetado/Pessimista/Otimista.
+"""
+import numpy as np
+import pandas as pd
+
+COLUNA_NOME = "Cenário"
+COLUNAS_AJUSTE = ["Receita (%)", "Despesas (%)", "Preço (%)", "Produtividade (%)", "Inflação (p.p.)"]
+COLUNAS = [COLUNA_NOME] + COLUNAS_AJUSTE
+CENARIO_BASE = "Projetado"
+CHAVE_CENARIOS = "cenarios"
+
+
+def cenarios_legados(estado):
+    """Tabela Projetado/Pessimista/Otimista a partir das chaves pess_*/otm_* da configuração."""
+    return [
+        {COLUNA_NOME: "Projetado", **{c: 0.0 for c in COLUNAS_AJUSTE}},
+        {
+            COLUNA_NOME: "Pessimista", **{c: 0.0 for c in COLUNAS_AJUSTE},
+            "Receita (%)": -float(estado.get("pess_receita", 15)),
+            "Despesas (%)": float(estado.get("pess_despesas", 10)),
+        },
+        {
+            COLUNA_NOME: "Otimista", **{c: 0.0 for c in COLUNAS_AJUSTE},
+            "Receita (%)": float(estado.get("otm_receita", 10)),
+            "Despesas (%)": -float(estado.get("otm_despesas", 10)),
+        },
+    ]
+
+
+def normalizar_cenarios(tabela):
+    """
+    Converte registros ou DataFrame numa tabela limpa: nomes sem espaços, linhas sem nome
+    descartadas e ajustes vazios tratados como zero. Lança ValueError se houver nomes repetidos.
+    """
+    df = pd.DataFrame(tabela if tabela is not None else [], columns=COLUNAS)
+    df[COLUNA_NOME] = df[COLUNA_NOME].fillna("").astype(str).str.strip()
+    df = df[df[COLUNA_NOME] != ""].reset_index(drop=True)
+    df[COLUNAS_AJUSTE] = df[COLUNAS_AJUSTE].apply(pd.to_numeric, errors="coerce").fillna(0.0).astype(float)
+    repetidos = df[COLUNA_NOME][df[COLUNA_NOME].duplicated()].unique().tolist()
+    if repetidos:
+        raise ValueError(f"Nomes de cenário repetidos: {', '.join(repetidos)}")
+    return df
+
+
+def tabela_cenarios(estado):
+    """Tabela de cenários da sessão (ou da configuração antiga, se não houver tabela)."""
+    registros = estado.get(CHAVE_CENARIOS)
+    df = normalizar_cenarios(registros) if registros else pd.DataFrame()
+    return df if not df.empty else normalizar_cenarios(cenarios_legados(estado))
+
+
+def nomes_cenarios(estado_ou_tabela):
+    """Nomes dos cenários, na ordem da tabela."""
+    tabela = estado_ou_tabela if isinstance(estado_ou_tabela, pd.DataFrame) else tabela_cenarios(estado_ou_tabela)
+    return tabela[COLUNA_NOME].tolist()
+
+
+def cenario_base(nomes):
+    """Cenário de referência das comparações: "Projetado" se existir, senão o primeiro."""
+    return CENARIO_BASE if CENARIO_BASE in nomes else nomes[0]
+
+
+def emojis_cenarios(tabela):
+    """Emoji de cada cenário pelo sinal do impacto líquido dos ajustes (📉 adverso, 📈 favorável, 📊 neutro)."""
+    impacto = (
+        tabela["Receita (%)"] + tabela["Preço (%)"] + tabela["Produtividade (%)"]
+        - tabela["Despesas (%)"] - tabela["Inflação (p.p.)"]
+    )
+    return {
+        nome: "📊" if valor == 0 else ("📉" if valor < 0 else "📈")
+        for nome, valor in zip(tabela[COLUNA_NOME], impacto)
+    }
+
+
+def parametros_cenarios(tabela):
+    """Vetores (um valor por cenário) com os fatores multiplicativos e o desvio de inflação."""
+    return {
+        "receita": 1 + tabela["Receita (%)"].to_numpy(dtype=float) / 100,
+        "despesas": 1 + tabela["Despesas (%)"].to_numpy(dtype=float) / 100,
+        "preco": 1 + tabela["Preço (%)"].to_numpy(dtype=float) / 100,
+        "produtividade": 1 + tabela["Produtividade (%)"].to_numpy(dtype=float) / 100,
+        "inflacao": tabela["Inflação (p.p.)"].to_numpy(dtype=float),
+    }
+
+
+def fatores_inflacao_cenarios(inflacoes, n_anos, tabela):
+    """Inflação acumulada de cada cenário (cenário × ano)."""
+    taxas = np.asarray(inflacoes[:n_anos], dtype=float)[None, :] + parametros_cenarios(tabela)["inflacao"][:, None]
+    return np.cumprod(1 + taxas / 100, axis=1)
+
+
+def fatores_custo_cenarios(tabela, inflacoes, n_anos):
+    """
+    Fator (cenário × ano) aplicado a custos já projetados com a inflação base:
+    ajuste de despesas vezes a diferença de inflação acumulada do cenário.
+    """
+    base = np.cumprod(1 + np.asarray(inflacoes[:n_anos], dtype=float) / 100)
+    return parametros_cenarios(tabela)["despesas"][:, None] * fatores_inflacao_cenarios(inflacoes, n_anos, tabela) / base
@@ -0,0 +1,230 @@
+# utils/cubo.py
+"""
+Cubo de resultados: um único array (cenário × cultura × linha × ano) com eixos rotulados.
+
+É a estrutura compartilhada pelas páginas 4 e 5, pelo Excel e pelas apresentações.
+Tabelas de DRE e de fluxo de caixa são visões do cubo: cada linha de uma visão é uma
+combinação linear das linhas do cubo, calculada de uma vez por produto matricial.
+
+A primeira posição do eixo de culturas é o consolidado da fazenda. As culturas recebem
+as linhas do DRE consolidado rateadas pela sua participação na receita das culturas,
+além dos custos diretos dos seus centros de custo (página de Despesas).
+"""
+import numpy as np
+import pandas as pd
+
+from utils.impostos import impostos_sobre_resultado
+from utils.perf import medido
+
+CONSOLIDADO = "Consolidado"
+EIXOS = ("cenario", "cultura", "linha", "ano")
+
+# Ordem de exibição do DRE
+LINHAS_DRE = [
+    "Receita", "Impostos Sobre Venda", "Despesas Operacionais",
+    "Margem de Contribuição", "Despesas Administrativas", "Despesas RH",
+    "Resultado Operacional", "Despesas Extra Operacional",
+    "Lucro Operacional", "Impostos Sobre Resultado",
+    "Receita Extra Operacional", "Dividendos", "Lucro Líquido"
+]
+# Linhas do DRE consolidado rateadas entre as culturas pela participação na receita
+LINHAS_RATEIO = [
+    "Impostos Sobre Venda", "Despesas Operacionais", "Despesas Administrativas", "Despesas RH",
+    "Despesas Extra Operacional", "Dividendos", "Impostos Sobre Resultado"
+]
+# Linhas próprias das culturas (custos diretos dos centros de custo, imposto estimado sobre eles
+# pelo regime tributário e a parte dos custos diretos que é parcela de empréstimo, usada na
+# cobertura da dívida)
+PREFIXO_EMPRESTIMO = "Empréstimo: "
+LINHAS_CUSTO_DIRETO = [
+    "Custos Diretos", "Impostos Sobre Resultado (Custos Diretos)", "Parcelas de Empréstimos (Custos Diretos)"
+]
+LINHAS_CUBO = LINHAS_DRE + LINHAS_CUSTO_DIRETO
+
+# DRE por cultura no formato usado pelas apresentações
+LINHAS_DRE_CULTURA = [
+    "Receita", "Impostos Sobre Venda", "Despesas Operacionais", "Despesas Administrativas",
+    "Despesas RH", "Despesas Extra Operacional", "Dividendos", "Impostos Sobre Resultado", "Lucro Líquido"
+]
+
+# --- Visões: {rótulo: {linha do cubo: coeficiente}} ---
+
+VISAO_FLUXO_CAIXA = {
+    "Receita Operacional": {"Receita": 1},
+    "(-) Impostos sobre Venda": {"Impostos Sobre Venda": -1},
+    "(-) Despesas Operacionais": {"Despesas Operacionais": -1},
+    "(-) Despesas Administrativas": {"Despesas Administrativas": -1},
+    "(-) Despesas RH": {"Despesas RH": -1},
+    "(=) EBITDA": {"Resultado Operacional": 1},
+    "(-) Despesas Extra Operacionais": {"Despesas Extra Operacional": -1},
+    "(-) Dividendos": {"Dividendos": -1},
+    "(-) Impostos sobre Resultado": {"Impostos Sobre Resultado": -1},
+    "(=) FLUXO DE CAIXA LÍQUIDO": {"Lucro Líquido": 1},
+}
+
+VISAO_FLUXO_CULTURA = {
+    "(+) Receita Operacional": {"Receita": 1},
+    "(-) Impostos sobre Venda": {"Impostos Sobre Venda": -1},
+    "(-) Custos Diretos": {"Custos Diretos": -1},
+    "(=) Lucro Bruto": {"Receita": 1, "Impostos Sobre Venda": -1, "Custos Diretos": -1},
+    "(-) Impostos sobre Resultado": {"Impostos Sobre Resultado (Custos Diretos)": -1},
+    "(=) FLUXO DE CAIXA LÍQUIDO": {
+        "Receita": 1, "Impostos Sobre Venda": -1, "Custos Diretos": -1,
+        "Impostos Sobre Resultado (Custos Diretos)": -1
+    },
+}
+
+
+class CuboResultados:
+    """Array (cenário × cultura × linha × ano) com rótulos em cada eixo."""
+
+    def __init__(self, valores, cenarios, culturas, linhas, anos):
+        self.valores = np.asarray(valores, dtype=float)
+        self.rotulos = {
+            "cenario": list(cenarios),
+            "cultura": list(culturas),
+            "linha": list(linhas),
+            "ano": list(anos),
+        }
+        self._posicoes = {eixo: {r: i for i, r in enumerate(rotulos)} for eixo, rotulos in self.rotulos.items()}
+        esperado = tuple(len(self.rotulos[eixo]) for eixo in EIXOS)
+        if self.valores.shape != esperado:
+            raise ValueError(f"Forma {self.valores.shape} não corresponde aos rótulos {esperado}.")
+
+    @property
+    def cenarios(self):
+        return self.rotulos["cenario"]
+
+    @property
+    def culturas(self):
+        """Culturas (sem o consolidado)."""
+        return [c for c in self.rotulos["cultura"] if c != CONSOLIDADO]
+
+    @property
+    def anos(self):
+        return self.rotulos["ano"]
+
+    def indice(self, eixo, rotulo):
+        """Posição de `rotulo` no eixo; listas viram listas de posições e None, o eixo inteiro."""
+        if rotulo is None:
+            return slice(None)
+        if isinstance(rotulo, (list, tuple)):
+            return [self._posicoes[eixo][r] for r in rotulo]
+        return self._posicoes[eixo][rotulo]
+
+    def sel(self, cenario=None, cultura=None, linha=None, ano=None):
+        """Fatia do cubo. Rótulos únicos removem o eixo; sem listas, o resultado é uma view (sem cópia)."""
+        chave = [self.indice(eixo, r) for eixo, r in zip(EIXOS, (cenario, cultura, linha, ano))]
+        # Um eixo por vez, do último para o primeiro (indexação ortogonal, como em xarray)
+        resultado = self.valores
+        for eixo in reversed(range(len(EIXOS))):
+            resultado = resultado[(slice(None),) * eixo + (chave[eixo],)]
+        return resultado
+
+    def total(self, linha, cenario=None, cultura=None):
+        """Soma da linha em todos os anos."""
+        return self.sel(cenario=cenario, cultura=cultura, linha=linha).sum(axis=-1)
+
+    def visao(self, visao, cenario=None, cultura=None):
+        """Aplica uma visão {rótulo: {linha: coef}}: resultado (..., rótulo, ano)."""
+        coeficientes = np.zeros((len(visao), len(self.rotulos["linha"])))
+        for i, pesos in enumerate(visao.values()):
+            for linha, coef in pesos.items():
+                coeficientes[i, self._posicoes["linha"][linha]] = coef
+        return np.matmul(coeficientes, self.sel(cenario=cenario, cultura=cultura))
+
+    def tabela(self, cenario, cultura=CONSOLIDADO, linhas=None, visao=None):
+        """DataFrame (linha × ano) de um cenário e cultura, pelas `linhas` do cubo ou por uma `visao`."""
+        if visao is not None:
+            return pd.DataFrame(self.visao(visao, cenario, cultura), index=list(visao), columns=self.anos)
+        linhas = linhas if linhas is not None else LINHAS_DRE
+        return pd.DataFrame(self.sel(cenario, cultura, linhas), index=linhas, columns=self.anos)
+
+    def como_dict(self, cenario, cultura=CONSOLIDADO, linhas=None, visao=None):
+        """Mesma fatia de `tabela` como {linha: [valores por ano]}, para código que espera listas."""
+        if visao is not None:
+            return dict(zip(visao, self.visao(visao, cenario, cultura).tolist()))
+        linhas = linhas if linhas is not None else LINHAS_DRE
+        return dict(zip(linhas, self.sel(cenario, cultura, linhas).tolist()))
+
+    def dre_por_cultura(self, linhas=LINHAS_DRE_CULTURA):
+        """{cenário: {cultura: {linha: lista}}} (formato de `dre_por_cultura_cenarios`)."""
+        return {
+            cenario: {cultura: self.como_dict(cenario, cultura, linhas) for cultura in self.culturas}
+            for cenario in self.cenarios
+        }
+
+
+def _recalcular_derivadas(valores, linhas):
+    """Recalcula as linhas de resultado do DRE a partir das linhas de receita e despesa."""
+    linha = {nome: i for i, nome in enumerate(linhas)}
+
+    def v(nome):
+        return valores[..., linha[nome], :]
+
+    valores[..., linha["Margem de Contribuição"], :] = v("Receita") - v("Impostos Sobre Venda") - v("Despesas Operacionais")
+    valores[..., linha["Resultado Operacional"], :] = v("Margem de Contribuição") - v("Despesas Administrativas") - v("Despesas RH")
+    valores[..., linha["Lucro Operacional"], :] = v("Resultado Operacional") - v("Despesas Extra Operacional")
+    valores[..., linha["Lucro Líquido"], :] = (
+        v("Lucro Operacional") - v("Impostos Sobre Resultado") - v("Dividendos") + v("Receita Extra Operacional")
+    )
+
+
+@medido()
+def montar_cubo(dre_cenarios, nomes_cenarios, anos, receitas_por_cultura_cenarios=None, custos_por_cultura=None, fatores_custo=None,
+                impostos=None):
+    """
+    Monta o cubo a partir dos DREs consolidados ({cenário: {linha: lista}}), das receitas
+    por cultura ({cenário: {cultura: {ano: valor}}}) e dos custos diretos por cultura
+    (DataFrames item × ano), multiplicados por `fatores_custo` (um por cenário ou cenário × ano).
+    O imposto sobre o resultado de cada cultura segue o regime `impostos` (utils.impostos).
+    """
+    receitas_por_cultura_cenarios = receitas_por_cultura_cenarios or {}
+    custos_por_cultura = custos_por_cultura or {}
+    n_anos = len(anos)
+
+    culturas = []
+    for nome in nomes_cenarios:
+        culturas += [c for c in receitas_por_cultura_cenarios.get(nome, {}) if c not in culturas]
+
+    valores = np.zeros((len(nomes_cenarios), 1 + len(culturas), len(LINHAS_CUBO), n_anos))
+    linha = {nome: i for i, nome in enumerate(LINHAS_CUBO)}
+
+    # Consolidado: linhas do DRE como vieram do cálculo
+    for s, nome in enumerate(nomes_cenarios):
+        dre = dre_cenarios.get(nome, {})
+        for nome_linha in LINHAS_DRE:
+            valores[s, 0, linha[nome_linha]] = np.asarray(dre.get(nome_linha, [0] * n_anos), dtype=float)
+
+    if culturas:
+        receitas = np.array([
+            [[receitas_por_cultura_cenarios.get(nome, {}).get(c, {}).get(ano, 0) for ano in anos] for c in culturas]
+            for nome in nomes_cenarios
+        ], dtype=float)  # (cenário, cultura, ano)
+        participacao = receitas / np.where(receitas.sum(axis=1, keepdims=True) > 0, receitas.sum(axis=1, keepdims=True), np.inf)
+
+        rateio = [linha[nome_linha] for nome_linha in LINHAS_RATEIO]
+        valores[:, 1:, linha["Receita"]] = receitas
+        valores[:, 1:, rateio] = participacao[:, :, None, :] * valores[:, :1, rateio]
+        _recalcular_derivadas(valores[:, 1:], LINHAS_CUBO)
+
+        def somar_custos(apenas_emprestimos=False):
+            totais = np.zeros((len(culturas), n_anos))
+            for i, c in enumerate(culturas):
+                df = custos_por_cultura.get(c)
+                if df is None or df.empty:
+                    continue
+                if apenas_emprestimos:
+                    df = df[df.index.astype(str).str.startswith(PREFIXO_EMPRESTIMO)]
+                totais[i] = df.sum(axis=0).reindex(anos, fill_value=0).to_numpy(dtype=float)
+            return totais
+
+        fatores = np.asarray(fatores_custo if fatores_custo is not None else np.ones(len(nomes_cenarios)), dtype=float)
+        fatores = fatores[:, None] if fatores.ndim == 1 else fatores  # (cenário, ano)
+        valores[:, 1:, linha["Custos Diretos"]] = fatores[:, None, :] * somar_custos()[None]
+        valores[:, 1:, linha["Parcelas de Empréstimos (Custos Diretos)"]] = fatores[:, None, :] * somar_custos(True)[None]
+        lucro_bruto = receitas - valores[:, 1:, linha["Impostos Sobre Venda"]] - valores[:, 1:, linha["Custos Diretos"]]
+        valores[:, 1:, linha["Impostos Sobre Resultado (Custos Diretos)"]] = impostos_sobre_resultado(lucro_bruto, impostos)
+        valores[:, 0, [linha[l] for l in LINHAS_CUSTO_DIRETO]] = valores[:, 1:, [linha[l] for l in LINHAS_CUSTO_DIRETO]].sum(axis=1)
+
+    return CuboResultados(valores, nomes_cenarios, [CONSOLIDADO] + culturas, LINHAS_CUBO, anos)
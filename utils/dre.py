@@ -2,97 +2,137 @@
 import numpy as np
 import pandas as pd
 
-def calcular_dre(cenario, inflacoes, anos, hectares_total, total_sacas, preco_total, receitas, receitas_extras, despesas_info, emprestimos, pess_despesas, otm_despesas, fluxo_ajustado=None):
-    if fluxo_ajustado is not None:
-        fluxo = fluxo_ajustado
-        # Verificação de colunas obrigatórias
-        required_cols = [
-            "Despesas Operacionais",
-            "Despesas Administrativas",
-            "Despesas RH",
-            "Despesas Extra Operacional",
-            "Impostos Sobre Venda",
-            "Impostos Sobre Resultado",
-            "Dividendos"
-        ]
-        if not all(col in fluxo for col in required_cols):
-            raise ValueError("O fluxo ajustado fornecido está incompleto.")
-        # Garantir uso dos valores do fluxo ajustado
-        despesas_operacionais = fluxo["Despesas Operacionais"]
-        despesas_administrativas = fluxo["Despesas Administrativas"]
-        despesas_rh = fluxo["Despesas RH"]
-        despesas_extra_operacional = fluxo["Despesas Extra Operacional"]
-        impostos_sobre_venda = fluxo["Impostos Sobre Venda"]
-        impostos_sobre_resultado = fluxo["Impostos Sobre Resultado"]
-        dividendos = fluxo["Dividendos"]
-    dre = {}
-    receita = receitas[cenario]
-    dre["Receita"] = receita
-    # Se fluxo_ajustado foi passado, usar impostos_sobre_venda da variável, senão calcular
-    if fluxo_ajustado is not None:
-        dre["Impostos Sobre Venda"] = impostos_sobre_venda
-        dre["Despesas Operacionais"] = despesas_operacionais
-        dre["Despesas Administrativas"] = despesas_administrativas
-        dre["Despesas RH"] = despesas_rh
-        dre["Despesas Extra Operacional"] = despesas_extra_operacional
-        dre["Dividendos"] = dividendos
-        # Receita Extra Operacional segue a lógica anterior
-        dre["Receita Extra Operacional"] = receitas_extras["Extra Operacional"]
-        # Impostos Sobre Resultado: se existir no fluxo, usa, senão calcula
-        if "Impostos Sobre Resultado" in fluxo:
-            dre["Impostos Sobre Resultado"] = impostos_sobre_resultado
-        else:
-            dre["Impostos Sobre Resultado"] = [
-                0 for _ in range(len(anos))
-            ]
-    else:
-        dre["Impostos Sobre Venda"] = [r * 0.0485 for r in receita]
+from utils.agenda import despesas_por_categoria
+from utils.cenarios import nomes_cenarios, parametros_cenarios
+from utils.cubo import LINHAS_DRE
+from utils.emprestimos import total_parcelas_por_ano
+from utils.impostos import impostos_sobre_resultado, impostos_sobre_venda
+from utils.inflacao import tabela_indices
+from utils.perf import medido
+
+# Linha do DRE → categoria das despesas cadastradas
+CATEGORIAS_DRE = {
+    "Despesas Operacionais": "Operacional",
+    "Despesas Administrativas": "Administrativa",
+    "Despesas RH": "RH",
+    "Dividendos": "Dividendos",
+}
+
+
+def despesas_categoria_inflacionadas(despesas_info, inflacoes, n_anos, indices=None, indices_por_categoria=None, desvio=0.0):
+    """Despesas de cada categoria do DRE, agendadas e corrigidas pelos seus índices: {categoria: (..., ano)}."""
+    return despesas_por_categoria(
+        despesas_info, list(CATEGORIAS_DRE.values()), tabela_indices(inflacoes, indices), n_anos,
+        indices_por_categoria, desvio
+    )
+
+
+def dre_vetorizado(receita, ajuste_despesas, despesas_categoria, parcelas, receita_extra_operacional, impostos=None):
+    """
+    Calcula o DRE de muitos cenários de uma vez.
+    `receita` tem forma (..., ano); `despesas_categoria` ({categoria: valores já inflacionados})
+    tem séries que fazem broadcast para essa forma; `ajuste_despesas` é escalar ou tem a forma
+    dos eixos iniciais (fator multiplicativo: 1.10 = despesas 10% maiores). `impostos` é a
+    configuração do regime tributário (utils.impostos; padrão: Lucro Presumido).
+    Retorna (..., linha, ano) em LINHAS_DRE.
+    """
+    receita = np.asarray(receita, dtype=float)
+    fator = np.asarray(ajuste_despesas, dtype=float)[..., None]
+    dre = np.zeros(receita.shape[:-1] + (len(LINHAS_DRE),) + receita.shape[-1:])
+    linha = {nome: i for i, nome in enumerate(LINHAS_DRE)}
+
+    def v(nome):
+        return dre[..., linha[nome], :]
 
-        def linha_despesa(cat):
-            total = sum(despesas_info[despesas_info["Categoria"] == cat]["Valor"]) if not despesas_info.empty else 0
-            ajuste = pess_despesas if cenario == "Pessimista" else (-otm_despesas if cenario == "Otimista" else 0)
-            return [total * np.prod([1 + inflacoes[j] / 100 for j in range(i + 1)]) * (1 + ajuste / 100) for i in range(5)]
+    dre[..., linha["Receita"], :] = receita
+    for nome_linha, categoria in CATEGORIAS_DRE.items():
+        dre[..., linha[nome_linha], :] = np.asarray(despesas_categoria.get(categoria, 0), dtype=float) * fator
+    dre[..., linha["Impostos Sobre Venda"], :] = impostos_sobre_venda(receita, v("Despesas RH"), impostos)
+    dre[..., linha["Despesas Extra Operacional"], :] = np.asarray(parcelas, dtype=float) * fator
+    dre[..., linha["Receita Extra Operacional"], :] = np.asarray(receita_extra_operacional, dtype=float)
 
-        dre["Despesas Operacionais"] = linha_despesa("Operacional")
-        dre["Despesas Administrativas"] = linha_despesa("Administrativa")
-        dre["Despesas RH"] = linha_despesa("RH")
-        dre["Dividendos"] = linha_despesa("Dividendos")
+    dre[..., linha["Margem de Contribuição"], :] = v("Receita") - v("Impostos Sobre Venda") - v("Despesas Operacionais")
+    dre[..., linha["Resultado Operacional"], :] = v("Margem de Contribuição") - v("Despesas Administrativas") - v("Despesas RH")
+    dre[..., linha["Lucro Operacional"], :] = v("Resultado Operacional") - v("Despesas Extra Operacional")
+    dre[..., linha["Impostos Sobre Resultado"], :] = impostos_sobre_resultado(v("Lucro Operacional"), impostos)
+    dre[..., linha["Lucro Líquido"], :] = (
+        v("Lucro Operacional") - v("Impostos Sobre Resultado") - v("Dividendos") + v("Receita Extra Operacional")
+    )
+    return dre
 
-        extra_operacional = [0] * 5
-        for emp in emprestimos:
-            try:
-                start = anos.index(emp["ano_inicial"])
-                end = anos.index(emp["ano_final"])
-                parcelas = emp["parcelas"]
-                ajuste = (pess_despesas if cenario == "Pessimista" else (-otm_despesas if cenario == "Otimista" else 0)) / 100
-                for i in range(start, min(end + 1, 5)):
-                    if parcelas > 0:
-                        extra_operacional[i] += emp["valor_parcela"] * (1 + ajuste)
-                        parcelas -= 1
-            except:
-                continue
-        dre["Despesas Extra Operacional"] = extra_operacional
-        dre["Receita Extra Operacional"] = receitas_extras["Extra Operacional"]
 
-    # Cálculo das margens e resultados, sempre usando as variáveis corretas
+@medido()
+def calcular_dre_cenarios(cenarios, inflacoes, anos, receitas, receitas_extras, despesas_info, emprestimos,
+                          indices=None, indices_por_categoria=None, impostos=None):
+    """
+    DRE de todos os cenários da tabela `cenarios` numa única passada vetorizada.
+    O ajuste de inflação de cada cenário (p.p.) desloca todos os índices.
+    Retorna {cenário: {linha: [valores por ano]}}.
+    """
+    nomes = nomes_cenarios(cenarios)
+    parametros = parametros_cenarios(cenarios)
+    dre = dre_vetorizado(
+        np.array([receitas[nome] for nome in nomes], dtype=float),
+        parametros["despesas"],
+        despesas_categoria_inflacionadas(
+            despesas_info, inflacoes, len(anos), indices, indices_por_categoria, parametros["inflacao"]
+        ),
+        total_parcelas_por_ano(emprestimos, anos),
+        receitas_extras["Extra Operacional"],
+        impostos
+    )
+    return {nome: dict(zip(LINHAS_DRE, dre[s].tolist())) for s, nome in enumerate(nomes)}
+
+
+@medido()
+def calcular_dre(cenario, inflacoes, anos, hectares_total, total_sacas, preco_total, receitas, receitas_extras, despesas_info, emprestimos, ajuste_despesas=0, fluxo_ajustado=None,
+                 indices=None, indices_por_categoria=None, impostos=None):
+    """DRE de um cenário; `ajuste_despesas` em % (ex.: 10 = despesas 10% maiores)."""
+    if fluxo_ajustado is None:
+        dre = dre_vetorizado(
+            receitas[cenario], 1 + ajuste_despesas / 100,
+            despesas_categoria_inflacionadas(despesas_info, inflacoes, len(anos), indices, indices_por_categoria),
+            total_parcelas_por_ano(emprestimos, anos), receitas_extras["Extra Operacional"], impostos
+        )
+        return dict(zip(LINHAS_DRE, dre.tolist()))
+
+    fluxo = fluxo_ajustado
+    # Verificação de colunas obrigatórias
+    required_cols = [
+        "Despesas Operacionais",
+        "Despesas Administrativas",
+        "Despesas RH",
+        "Despesas Extra Operacional",
+        "Impostos Sobre Venda",
+        "Impostos Sobre Resultado",
+        "Dividendos"
+    ]
+    if not all(col in fluxo for col in required_cols):
+        raise ValueError("O fluxo ajustado fornecido está incompleto.")
+
+    receita = receitas[cenario]
+    dre = {
+        "Receita": receita,
+        "Impostos Sobre Venda": fluxo["Impostos Sobre Venda"],
+        "Despesas Operacionais": fluxo["Despesas Operacionais"],
+        "Despesas Administrativas": fluxo["Despesas Administrativas"],
+        "Despesas RH": fluxo["Despesas RH"],
+        "Despesas Extra Operacional": fluxo["Despesas Extra Operacional"],
+        "Dividendos": fluxo["Dividendos"],
+        "Receita Extra Operacional": receitas_extras["Extra Operacional"],
+        "Impostos Sobre Resultado": fluxo["Impostos Sobre Resultado"],
+    }
+    # Cálculo das margens e resultados a partir dos valores do fluxo ajustado
     dre["Margem de Contribuição"] = [
-        receita[i] - dre["Impostos Sobre Venda"][i] - dre["Despesas Operacionais"][i] for i in range(5)
+        receita[i] - dre["Impostos Sobre Venda"][i] - dre["Despesas Operacionais"][i] for i in range(len(anos))
     ]
     dre["Resultado Operacional"] = [
-        dre["Margem de Contribuição"][i] - dre["Despesas Administrativas"][i] - dre["Despesas RH"][i] for i in range(5)
+        dre["Margem de Contribuição"][i] - dre["Despesas Administrativas"][i] - dre["Despesas RH"][i] for i in range(len(anos))
     ]
     dre["Lucro Operacional"] = [
-        dre["Resultado Operacional"][i] - dre["Despesas Extra Operacional"][i] for i in range(5)
+        dre["Resultado Operacional"][i] - dre["Despesas Extra Operacional"][i] for i in range(len(anos))
     ]
-    # Impostos Sobre Resultado: se já definido (por fluxo), mantém, senão calcula aqui
-    if fluxo_ajustado is not None and "Impostos Sobre Resultado" in fluxo:
-        # Já está definido acima
-        pass
-    else:
-        dre["Impostos Sobre Resultado"] = [
-            dre["Lucro Operacional"][i] * 0.15 if dre["Lucro Operacional"][i] > 0 else 0 for i in range(5)
-        ]
     dre["Lucro Líquido"] = [
-        dre["Lucro Operacional"][i] - dre["Impostos Sobre Resultado"][i] - dre["Dividendos"][i] + dre["Receita Extra Operacional"][i] for i in range(5)
+        dre["Lucro Operacional"][i] - dre["Impostos Sobre Resultado"][i] - dre["Dividendos"][i] + dre["Receita Extra Operacional"][i] for i in range(len(anos))
     ]
-    return dre
\ No newline at end of file
+    return dre
@@ -0,0 +1,178 @@
+# utils/emprestimos.py
+"""
+Motor de amortização de empréstimos.
+
+Todos os contratos são calculados de uma vez: cada empréstimo vira uma linha de
+uma matriz (empréstimos × períodos) com parcela, juros e amortização, que é
+espalhada numa grade mensal (empréstimos × 12·anos) e depois somada por ano.
+Páginas 3 e 4 e o DRE usam as mesmas funções, então os valores batem em todo lugar.
+
+Sistemas:
+- PRICE: parcelas iguais calculadas a partir de valor_total, encargos e parcelas.
+- SAC: amortização constante, juros sobre o saldo.
+- PARCELA FIXA: usa o valor_parcela informado (padrão de cadastros antigos);
+  os encargos só separam juros de amortização.
+
+`encargos` é a taxa anual (%), convertida para a taxa equivalente do `periodo`.
+`carencia` é o número de períodos iniciais em que só os juros são pagos. A primeira
+parcela vence no fim do primeiro período a partir do início do `ano_inicial`, e nada
+é pago depois do `ano_final`.
+"""
+import numpy as np
+
+from utils.perf import medido
+
+SISTEMAS = ["PRICE", "SAC", "PARCELA FIXA"]
+SISTEMA_PADRAO = "PARCELA FIXA"
+MESES_POR_PERIODO = {"ANUAL": 12, "SEMESTRAL": 6, "MENSAL": 1}
+PERIODOS = list(MESES_POR_PERIODO)
+
+
+def _numero(valor, padrao=0.0):
+    try:
+        valor = float(valor)
+    except (TypeError, ValueError):
+        return padrao
+    return padrao if np.isnan(valor) else valor
+
+
+def _parametros(emprestimos, anos):
+    """Converte a lista de contratos em vetores; contratos inválidos ficam com validos=False."""
+    n = len(emprestimos)
+    p = {
+        "validos": np.zeros(n, dtype=bool),
+        "inicio": np.zeros(n, dtype=np.int64),
+        "fim": np.zeros(n, dtype=np.int64),
+        "passo": np.full(n, 12, dtype=np.int64),
+        "parcelas": np.zeros(n, dtype=np.int64),
+        "carencia": np.zeros(n, dtype=np.int64),
+        "valor_total": np.zeros(n),
+        "valor_parcela": np.zeros(n),
+        "taxa": np.zeros(n),
+        "sistema": np.zeros(n, dtype=np.int64),
+    }
+    for k, emp in enumerate(emprestimos):
+        try:
+            inicio = anos.index(emp["ano_inicial"])
+            fim = anos.index(emp["ano_final"])
+        except (KeyError, ValueError, TypeError, AttributeError):
+            continue
+        passo = MESES_POR_PERIODO.get(str(emp.get("periodo", "ANUAL")).strip().upper(), 12)
+        sistema = str(emp.get("sistema") or SISTEMA_PADRAO).strip().upper()
+
+        p["validos"][k] = fim >= inicio
+        p["inicio"][k] = inicio
+        p["fim"][k] = fim
+        p["passo"][k] = passo
+        p["parcelas"][k] = max(int(_numero(emp.get("parcelas"), 0)), 0)
+        p["carencia"][k] = max(int(_numero(emp.get("carencia"), 0)), 0)
+        p["valor_total"][k] = _numero(emp.get("valor_total"))
+        p["valor_parcela"][k] = _numero(emp.get("valor_parcela"))
+        p["taxa"][k] = (1 + _numero(emp.get("encargos")) / 100) ** (passo / 12) - 1
+        p["sistema"][k] = SISTEMAS.index(sistema) if sistema in SISTEMAS else SISTEMAS.index(SISTEMA_PADRAO)
+    return p
+
+
+def _cronograma_periodos(p):
+    """Parcela, juros e amortização por período de cada contrato (matrizes n × períodos)."""
+    n = len(p["validos"])
+    n_periodos = int((p["carencia"] + p["parcelas"]).max()) if n else 0
+    k = np.arange(n_periodos)[None, :]
+
+    taxa = p["taxa"][:, None]
+    pv = p["valor_total"][:, None]
+    n_parc = p["parcelas"][:, None]
+    carencia = p["carencia"][:, None]
+    j = k - carencia  # índice da parcela de amortização (negativo = carência)
+    em_carencia = j < 0
+    ativo = k < carencia + n_parc
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fator = (1 + taxa) ** np.maximum(j, 0)
+        pmt_price = np.where(taxa > 0, pv * taxa / (1 - (1 + taxa) ** -n_parc), pv / np.maximum(n_parc, 1))
+        parcela_informada = p["valor_parcela"][:, None]
+        pmt = np.where(p["sistema"][:, None] == SISTEMAS.index("PRICE"), pmt_price, parcela_informada)
+        # Saldo devedor no início de cada parcela (fórmula fechada de série uniforme)
+        saldo_uniforme = np.where(taxa > 0, pv * fator - pmt * (fator - 1) / taxa, pv - pmt * np.maximum(j, 0))
+    saldo_sac = pv * (1 - np.maximum(j, 0) / np.maximum(n_parc, 1))
+    saldo = np.where(p["sistema"][:, None] == SISTEMAS.index("SAC"), saldo_sac, saldo_uniforme)
+    saldo = np.clip(np.nan_to_num(saldo), 0, None)
+
+    juros = saldo * taxa
+    parcela = np.where(
+        p["sistema"][:, None] == SISTEMAS.index("SAC"),
+        pv / np.maximum(n_parc, 1) + juros,
+        np.broadcast_to(pmt, juros.shape)
+    )
+    parcela = np.where(em_carencia, juros, parcela)
+    juros = np.minimum(juros, parcela)
+
+    mascara = ativo & p["validos"][:, None]
+    parcela = np.where(mascara, parcela, 0.0)
+    juros = np.where(mascara, juros, 0.0)
+    return parcela, juros, parcela - juros
+
+
+@medido()
+def cronograma_mensal(emprestimos, anos):
+    """
+    Cronograma mensal de todos os contratos.
+    Retorna dict com matrizes (n_emprestimos × 12·len(anos)): "parcela", "juros", "amortizacao".
+    """
+    p = _parametros(list(emprestimos or []), anos)
+    n, n_meses = len(p["validos"]), 12 * len(anos)
+    parcela, juros, amortizacao = _cronograma_periodos(p)
+
+    # Mês de vencimento de cada período: fim do período contado do início do ano_inicial
+    k = np.arange(parcela.shape[1])[None, :]
+    mes = 12 * p["inicio"][:, None] + (k + 1) * p["passo"][:, None] - 1
+    dentro = (mes < 12 * (p["fim"][:, None] + 1)) & (mes < n_meses)
+    linhas = np.broadcast_to(np.arange(n)[:, None], mes.shape)
+
+    resultado = {}
+    for nome, valores in (("parcela", parcela), ("juros", juros), ("amortizacao", amortizacao)):
+        grade = np.zeros((n, n_meses))
+        np.add.at(grade, (linhas[dentro], mes[dentro]), valores[dentro])
+        resultado[nome] = grade
+    return resultado
+
+
+def agregar_anual(grade_mensal):
+    """Soma uma grade mensal (… × 12·anos) em anos (… × anos)."""
+    return grade_mensal.reshape(*grade_mensal.shape[:-1], -1, 12).sum(axis=-1)
+
+
+def parcelas_anuais(emprestimos, anos):
+    """Total pago por ano em cada contrato (n_emprestimos × len(anos))."""
+    return agregar_anual(cronograma_mensal(emprestimos, anos)["parcela"])
+
+
+def total_parcelas_por_ano(emprestimos, anos):
+    """Total pago por ano somando todos os contratos."""
+    if not emprestimos:
+        return np.zeros(len(anos))
+    return parcelas_anuais(emprestimos, anos).sum(axis=0)
+
+
+def parcelas_por_linha(emprestimos, parcelas_emprestimos, prefixo="Empréstimo: "):
+    """Agrupa as parcelas anuais de cada contrato na linha "Empréstimo: <objeto>" do fluxo."""
+    linhas = {}
+    for emp, valores in zip(emprestimos, parcelas_emprestimos):
+        linha = f"{prefixo}{emp['objeto']}"
+        linhas[linha] = linhas[linha] + valores if linha in linhas else valores.copy()
+    return linhas
+
+
+def emprestimos_invalidos(emprestimos, anos):
+    """Índices dos contratos que não puderam ser projetados (anos ausentes ou invertidos)."""
+    return [int(i) for i in np.flatnonzero(~_parametros(list(emprestimos or []), anos)["validos"])]
+
+
+def valor_primeira_parcela(emprestimo):
+    """Valor da primeira parcela após a carência, para exibição e cadastro."""
+    emp = dict(emprestimo, ano_inicial="Ano 1", ano_final="Ano 1")
+    p = _parametros([emp], ["Ano 1"])
+    p["validos"][:] = True
+    parcela, _, _ = _cronograma_periodos(p)
+    carencia = int(p["carencia"][0])
+    return float(parcela[0, carencia]) if parcela.shape[1] > carencia else 0.0
@@ -0,0 +1,76 @@
+# utils/equilibrio.py
+"""
+Ponto de equilíbrio e metas por cultura, cenário e ano, em forma fechada.
+
+O resultado de uma cultura (visão de fluxo por cultura do cubo) é linear por partes na receita R:
+    lucro bruto  = R·(1 - t) - CD
+    lucro líquido = lucro bruto - a·max(lucro bruto, 0)
+com t a alíquota efetiva de impostos sobre venda da cultura, CD os custos diretos e a a
+alíquota sobre o resultado do regime tributário no ano (utils.impostos; a compensação de
+prejuízos não entra nas metas). A meta de DSCR usa a mesma definição dos indicadores
+(lucro operacional / parcelas), que é anterior aos impostos sobre o resultado. A receita que atinge cada meta sai de uma divisão sobre os
+arrays do cubo, sem reexecutar o DRE; preço e produtividade vêm de R dividido por sacas e área.
+"""
+import numpy as np
+import pandas as pd
+
+from utils.cenarios import COLUNA_NOME, parametros_cenarios
+from utils.impostos import aliquotas
+from utils.indicadores import dividir
+from utils.perf import medido
+from utils.rotacao import por_cultura_e_ano
+
+COLUNAS_EQUILIBRIO = [
+    "Preço Atual (R$/sc)", "Preço de Equilíbrio (R$/sc)", "Produtividade Atual (sc/ha)",
+    "Produtividade de Equilíbrio (sc/ha)", "Preço p/ Margem Alvo (R$/sc)", "Preço p/ DSCR Alvo (R$/sc)"
+]
+
+
+def receita_para_margem(custos, aliquota_venda, margem, aliquota_resultado):
+    """Receita com margem líquida `margem` (fração): ramo com IR se a meta é lucro, sem IR se é prejuízo."""
+    if margem >= 0:
+        denominador = (1 - aliquota_resultado) * (1 - aliquota_venda) - margem
+        return np.where(denominador > 0, dividir((1 - aliquota_resultado) * custos, denominador, np.nan), np.nan)
+    return dividir(custos, 1 - aliquota_venda - margem, np.nan)
+
+
+@medido()
+def calcular_equilibrio(cubo, plantios, cenarios, margem_alvo=10.0, dscr_alvo=1.3, impostos=None):
+    """
+    Preço e produtividade de equilíbrio e preços para `margem_alvo` (%) e `dscr_alvo`,
+    para todas as culturas, cenários e anos de uma vez. Retorna DataFrame em formato longo.
+    """
+    culturas = cubo.culturas
+    if not culturas:
+        return pd.DataFrame(columns=[COLUNA_NOME, "Cultura", "Ano"] + COLUNAS_EQUILIBRIO)
+
+    receita = cubo.sel(None, culturas, "Receita")  # (cenário, cultura, ano)
+    custos = cubo.sel(None, culturas, "Custos Diretos")
+    parcelas = cubo.sel(None, culturas, "Parcelas de Empréstimos (Custos Diretos)")
+    taxas, _ = aliquotas(impostos, len(cubo.anos))
+    aliquota_venda = dividir(cubo.sel(None, culturas, "Impostos Sobre Venda"), receita, taxas["Receita"])
+
+    # Sacas produzidas no cenário (produtividade ajustada); o preço efetivo inclui inflação e ajustes de receita
+    area, sacas_base, _ = por_cultura_e_ano(plantios, culturas, cubo.anos)  # (cultura, ano), pela rotação
+    ajuste_produtividade = parametros_cenarios(cenarios.set_index(COLUNA_NOME).loc[cubo.cenarios].reset_index())["produtividade"]
+    sacas = sacas_base[None] * ajuste_produtividade[:, None, None]
+    preco_atual = dividir(receita, sacas, np.nan)
+    produtividade_atual = dividir(sacas, area[None], np.nan)
+
+    receita_equilibrio = custos / (1 - aliquota_venda)
+    receita_margem = receita_para_margem(custos, aliquota_venda, margem_alvo / 100, taxas["Lucro"])
+    # DSCR como nos indicadores: lucro operacional (já descontadas as parcelas, antes dos impostos
+    # sobre o resultado) / parcelas; na cultura, o lucro bruto. Sem parcelas não há meta de cobertura
+    receita_dscr = np.where(parcelas > 0, dividir(custos + dscr_alvo * parcelas, 1 - aliquota_venda, np.nan), np.nan)
+
+    resultados = np.stack([
+        preco_atual,
+        dividir(receita_equilibrio, sacas, np.nan),
+        produtividade_atual,
+        produtividade_atual * dividir(receita_equilibrio, receita, np.nan),
+        dividir(receita_margem, sacas, np.nan),
+        dividir(receita_dscr, sacas, np.nan),
+    ], axis=-1)  # (cenário, cultura, ano, coluna)
+
+    indice = pd.MultiIndex.from_product([cubo.cenarios, culturas, cubo.anos], names=[COLUNA_NOME, "Cultura", "Ano"])
+    return pd.DataFrame(resultados.reshape(-1, len(COLUNAS_EQUILIBRIO)), index=indice, columns=COLUNAS_EQUILIBRIO).reset_index()
@@ -0,0 +1,159 @@
+# utils/fluxo_mensal.py
+"""
+Fluxo de caixa mensal (12 meses × horizonte) a partir do DRE anual.
+
+Cada linha do DRE recebe um perfil de distribuição por mês (matriz anos × 12 que
+soma 1 em cada ano). A receita segue o calendário de colheita das culturas, as
+despesas operacionais seguem a compra de insumos e os empréstimos usam o
+cronograma mensal real do motor de amortização. Como todo perfil soma 1 no ano,
+o fluxo mensal somado por ano reproduz exatamente o DRE.
+"""
+import numpy as np
+import pandas as pd
+
+from utils.emprestimos import cronograma_mensal
+from utils.perf import medido
+
+CHAVE_CALENDARIOS = "calendarios_culturas"  # {cultura: {"colheita"/"insumos": {mês: %}}}
+MESES = ["Jan", "Fev", "Mar", "Abr", "Mai", "Jun", "Jul", "Ago", "Set", "Out", "Nov", "Dez"]
+
+# Percentual da receita (colheita/venda) e da compra de insumos em cada mês (1 = Jan)
+CALENDARIOS = {
+    "Soja": {"colheita": {3: 30, 4: 50, 5: 20}, "insumos": {8: 20, 9: 30, 10: 35, 11: 15}},
+    "Arroz": {"colheita": {2: 15, 3: 45, 4: 40}, "insumos": {8: 25, 9: 35, 10: 30, 11: 10}},
+    "Trigo": {"colheita": {10: 20, 11: 50, 12: 30}, "insumos": {4: 30, 5: 45, 6: 25}},
+}
+
+# Linhas do DRE que são entradas de caixa; as demais são saídas
+ENTRADAS = ["Receita", "Receita Extra Operacional"]
+SAIDAS = [
+    "Impostos Sobre Venda", "Despesas Operacionais", "Despesas Administrativas", "Despesas RH",
+    "Despesas Extra Operacional", "Impostos Sobre Resultado", "Dividendos"
+]
+
+# Perfis fixos (independentes das culturas)
+PERFIS_FIXOS = {
+    "Despesas Administrativas": {m: 1 for m in range(1, 13)},
+    "Despesas RH": {**{m: 1 for m in range(1, 12)}, 12: 2},  # 13º salário em dezembro
+    "Impostos Sobre Resultado": {3: 1, 6: 1, 9: 1, 12: 1},  # apuração trimestral
+    "Dividendos": {12: 1},
+    "Receita Extra Operacional": {m: 1 for m in range(1, 13)},
+}
+
+
+def perfil_mensal(pesos):
+    """Converte {mês: peso} em vetor de 12 posições que soma 1 (uniforme se vazio)."""
+    vetor = np.zeros(12)
+    for mes, peso in (pesos or {}).items():
+        vetor[int(mes) - 1] += float(peso)
+    total = vetor.sum()
+    return vetor / total if total > 0 else np.full(12, 1 / 12)
+
+
+def perfil_culturas(plantios, tipo, calendarios=None):
+    """
+    Perfil mensal combinado das culturas para `tipo` ("colheita" ou "insumos").
+    A colheita é ponderada pela receita de cada cultura e os insumos pela área.
+    """
+    calendarios = calendarios if calendarios is not None else CALENDARIOS
+    pesos = {}
+    for plantio in (plantios or {}).values():
+        cultura = plantio.get("cultura", "")
+        hectares = plantio.get("hectares", 0)
+        peso = hectares if tipo == "insumos" else hectares * plantio.get("sacas_por_hectare", 0) * plantio.get("preco_saca", 0)
+        pesos[cultura] = pesos.get(cultura, 0) + peso
+
+    total = sum(pesos.values())
+    if total <= 0:
+        return np.full(12, 1 / 12)
+    return sum(
+        peso / total * perfil_mensal(calendarios.get(cultura, {}).get(tipo))
+        for cultura, peso in pesos.items()
+    )
+
+
+def perfil_emprestimos(emprestimos, anos):
+    """Perfil (anos × 12) das parcelas de empréstimos segundo o cronograma real."""
+    if not emprestimos:
+        return np.full((len(anos), 12), 1 / 12)
+    mensal = cronograma_mensal(emprestimos, anos)["parcela"].sum(axis=0).reshape(len(anos), 12)
+    totais = mensal.sum(axis=1, keepdims=True)
+    return np.where(totais > 0, mensal / np.where(totais > 0, totais, 1), 1 / 12)
+
+
+@medido()
+def fluxo_caixa_mensal(dre, anos, plantios, emprestimos=None, caixa_inicial=0.0, calendarios=None):
+    """
+    Distribui o DRE anual em meses e calcula o saldo de caixa acumulado.
+    Retorna DataFrame (linhas × meses) com colunas "Ano N - Mês"; saídas ficam negativas.
+    """
+    n_anos = len(anos)
+    colheita = perfil_culturas(plantios, "colheita", calendarios)
+    insumos = perfil_culturas(plantios, "insumos", calendarios)
+
+    perfis = {
+        "Receita": colheita,
+        "Impostos Sobre Venda": colheita,
+        "Despesas Operacionais": insumos,
+        "Despesas Extra Operacional": perfil_emprestimos(emprestimos, anos),
+        **{linha: perfil_mensal(pesos) for linha, pesos in PERFIS_FIXOS.items()},
+    }
+
+    linhas = ENTRADAS + SAIDAS
+    sinais = np.array([1.0] * len(ENTRADAS) + [-1.0] * len(SAIDAS))
+    anuais = np.array([np.asarray(dre.get(linha, [0] * n_anos), dtype=float) for linha in linhas])  # (L, Y)
+    matriz_perfis = np.stack([np.broadcast_to(perfis[linha], (n_anos, 12)) for linha in linhas])  # (L, Y, 12)
+
+    mensal = (sinais[:, None, None] * anuais[:, :, None] * matriz_perfis).reshape(len(linhas), n_anos * 12)
+    liquido = mensal.sum(axis=0)
+    saldo = caixa_inicial + np.cumsum(liquido)
+
+    colunas = [f"{ano} - {mes}" for ano in anos for mes in MESES]
+    df = pd.DataFrame(mensal, index=linhas, columns=colunas)
+    df.loc["(=) Fluxo Líquido do Mês"] = liquido
+    df.loc["Saldo de Caixa"] = saldo
+    return df
+
+
+def tabela_calendarios(culturas, calendarios=None):
+    """Calendários em formato de tabela editável (linhas "Cultura · tipo", colunas = meses, em %)."""
+    calendarios = calendarios if calendarios is not None else CALENDARIOS
+    linhas = {}
+    for cultura in culturas:
+        for tipo in ["colheita", "insumos"]:
+            linhas[f"{cultura} · {tipo}"] = perfil_mensal(calendarios.get(cultura, {}).get(tipo)) * 100
+    return pd.DataFrame.from_dict(linhas, orient="index", columns=MESES).round(1)
+
+
+def calendarios_da_tabela(df):
+    """Inverso de `tabela_calendarios`."""
+    calendarios = {}
+    for rotulo, linha in df.fillna(0).iterrows():
+        cultura, tipo = rotulo.rsplit(" · ", 1)
+        calendarios.setdefault(cultura, {})[tipo] = {i + 1: float(v) for i, v in enumerate(linha) if v > 0}
+    return calendarios
+
+
+def agregar_fluxo_anual(df_mensal, anos):
+    """Soma o fluxo mensal por ano (o saldo usa o valor de dezembro)."""
+    valores = df_mensal.drop(index="Saldo de Caixa").to_numpy().reshape(-1, len(anos), 12).sum(axis=2)
+    df = pd.DataFrame(valores, index=df_mensal.index.drop("Saldo de Caixa"), columns=anos)
+    df.loc["Saldo de Caixa"] = df_mensal.loc["Saldo de Caixa"].to_numpy().reshape(len(anos), 12)[:, -1]
+    return df
+
+
+def indicadores_caixa(df_mensal, caixa_minimo=0.0):
+    """
+    Saldo mínimo do horizonte, mês em que ocorre e necessidade de capital de giro
+    (aporte necessário para o saldo nunca ficar abaixo de `caixa_minimo`).
+    """
+    saldo = df_mensal.loc["Saldo de Caixa"]
+    posicao = int(np.argmin(saldo.to_numpy()))
+    saldo_minimo = float(saldo.iloc[posicao])
+    meses_abaixo = int((saldo.to_numpy() < caixa_minimo).sum())
+    return {
+        "Saldo Mínimo": saldo_minimo,
+        "Mês do Saldo Mínimo": saldo.index[posicao],
+        "Necessidade de Capital de Giro": max(0.0, caixa_minimo - saldo_minimo),
+        "Meses Abaixo do Mínimo": meses_abaixo,
+    }
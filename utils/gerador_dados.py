@@ -0,0 +1,266 @@
+"""
+Gerador de dados sintéticos para testes de carga.
+
+Preenche `plantios`, `despesas`, `emprestimos` e `receitas_adicionais` com
+distribuições próximas das de fazendas reais e permite:
+- exportar despesas e empréstimos como Excel nos formatos dos modelos da
+  página de Despesas ("Modelo de Despesas" / "Modelo de Empréstimos");
+- carregar os dados direto no session_state (utils.session.carregar_na_sessao).
+
+Uso pela linha de comando (a partir da raiz do projeto):
+    python -m utils.gerador_dados --plantios 200 --despesas 20000 --emprestimos 1500 --saida dados_teste
+"""
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from utils.emprestimos import SISTEMAS
+
+# Culturas aceitas pela página de Cadastro de Plantio, com participação típica na área
+CULTURAS = {
+    "Soja": {"peso": 0.50, "sacas_por_hectare": (50, 70), "preco_saca": (110, 145)},
+    "Arroz": {"peso": 0.25, "sacas_por_hectare": (130, 180), "preco_saca": (80, 115)},
+    "Trigo": {"peso": 0.15, "sacas_por_hectare": (40, 65), "preco_saca": (65, 90)},
+    "Outros": {"peso": 0.10, "sacas_por_hectare": (60, 120), "preco_saca": (50, 90)},
+}
+
+# Participação de cada categoria no número de despesas e faixa típica de valor anual (R$)
+CATEGORIAS_DESPESA = {
+    "Operacional": {"peso": 0.60, "valor": (2000, 250000)},
+    "Administrativa": {"peso": 0.15, "valor": (1000, 60000)},
+    "RH": {"peso": 0.15, "valor": (15000, 120000)},
+    "Dividendos": {"peso": 0.03, "valor": (50000, 400000)},
+    "Extra Operacional": {"peso": 0.05, "valor": (1000, 80000)},
+    "Impostos": {"peso": 0.02, "valor": (1000, 50000)},
+}
+
+NOMES_DESPESA = {
+    "Operacional": ["Sementes", "Fertilizantes", "Defensivos", "Combustível", "Energia", "Manutenção de Máquinas",
+                    "Frete", "Secagem", "Armazenagem", "Irrigação", "Arrendamento", "Assistência Técnica"],
+    "Administrativa": ["Contabilidade", "Escritório", "Internet e Telefone", "Seguros", "Software de Gestão", "Jurídico"],
+    "RH": ["Salários", "Encargos Trabalhistas", "Alimentação", "EPIs", "Treinamentos"],
+    "Dividendos": ["Distribuição de Lucros"],
+    "Extra Operacional": ["Multas", "Doações", "Despesas Bancárias"],
+    "Impostos": ["ITR", "IPVA Frota", "Taxas Municipais"],
+}
+
+# Fração das despesas lançadas no centro Administrativo (rateadas por área)
+FRACAO_ADMINISTRATIVO = 0.35
+
+BANCOS = ["Banco do Brasil", "Sicredi", "Bradesco", "Santander", "Itaú", "Caixa", "BRDE", "Cresol"]
+OBJETOS_EMPRESTIMO = ["Custeio Safra", "Trator", "Colheitadeira", "Plantadeira", "Armazém", "Pivô Central",
+                      "Caminhão", "Correção de Solo", "Pulverizador", "Secador"]
+
+# Distribuição da periodicidade e faixa do número de parcelas para cada uma
+PERIODOS = {
+    "ANUAL": {"peso": 0.60, "parcelas": (1, 8)},
+    "SEMESTRAL": {"peso": 0.25, "parcelas": (2, 12)},
+    "MENSAL": {"peso": 0.15, "parcelas": (12, 60)},
+}
+
+RECEITAS_ADICIONAIS = {
+    "Operacional": ["Venda de Gado", "Serviços de Colheita", "Venda de Sementes", "Prestação de Serviços"],
+    "Extra Operacional": ["Arrendamento de Área", "Aluguel de Galpão", "Rendimentos Financeiros", "Venda de Sucata"],
+}
+
+
+def _escolher(rng, opcoes, n):
+    """Sorteia `n` chaves de `opcoes` respeitando os pesos de cada uma."""
+    nomes = list(opcoes.keys())
+    pesos = np.array([opcoes[nome]["peso"] for nome in nomes], dtype=float)
+    return np.array(nomes, dtype=object)[rng.choice(len(nomes), size=n, p=pesos / pesos.sum())]
+
+
+def _uniforme_por_grupo(rng, grupos, faixas):
+    """Sorteia um valor uniforme para cada item dentro da faixa do seu grupo."""
+    minimos = np.array([faixas[g][0] for g in grupos], dtype=float)
+    maximos = np.array([faixas[g][1] for g in grupos], dtype=float)
+    return minimos + rng.random(len(grupos)) * (maximos - minimos)
+
+
+def gerar_plantios(n_plantios, rng, culturas=None, ano=2025):
+    """Gera `n_plantios` plantios com área log-normal e produtividade/preço por cultura."""
+    culturas = culturas or CULTURAS
+    nomes = _escolher(rng, culturas, n_plantios)
+    sacas = _uniforme_por_grupo(rng, nomes, {c: culturas[c]["sacas_por_hectare"] for c in culturas})
+    precos = _uniforme_por_grupo(rng, nomes, {c: culturas[c]["preco_saca"] for c in culturas})
+    hectares = np.clip(rng.lognormal(mean=5.5, sigma=0.8, size=n_plantios), 5, 20000)
+
+    plantios = {}
+    for i in range(n_plantios):
+        plantios[f"{i:08x}"] = {
+            'ano': ano,
+            'cultura': str(nomes[i]),
+            'hectares': round(float(hectares[i]), 1),
+            'sacas_por_hectare': round(float(sacas[i]), 1),
+            'preco_saca': round(float(precos[i]), 2),
+            'tipo': 'Plantio'
+        }
+    return plantios
+
+
+def gerar_despesas(n_despesas, rng, areas_por_cultura):
+    """
+    Gera despesas com mix de categorias e centros de custo (Administrativo + culturas).
+    As despesas diretas são distribuídas entre as culturas proporcionalmente à área.
+    """
+    categorias = _escolher(rng, CATEGORIAS_DESPESA, n_despesas)
+    valores = _uniforme_por_grupo(rng, categorias, {c: CATEGORIAS_DESPESA[c]["valor"] for c in CATEGORIAS_DESPESA})
+
+    culturas = list(areas_por_cultura)
+    administrativo = rng.random(n_despesas) < FRACAO_ADMINISTRATIVO
+    if culturas:
+        pesos = np.array([areas_por_cultura[c] for c in culturas], dtype=float)
+        indices_cultura = rng.choice(len(culturas), size=n_despesas, p=pesos / pesos.sum())
+    else:
+        indices_cultura = np.zeros(n_despesas, dtype=int)
+
+    despesas = []
+    for i in range(n_despesas):
+        categoria = str(categorias[i])
+        nomes = NOMES_DESPESA[categoria]
+        centro = "Administrativo" if administrativo[i] or not culturas else culturas[indices_cultura[i]]
+        despesas.append({
+            "Despesa": f"{nomes[i % len(nomes)]} {i + 1}",
+            "Valor": round(float(valores[i]), 2),
+            "Categoria": categoria,
+            "Centro_Custo": centro
+        })
+    return despesas
+
+
+def gerar_emprestimos(n_emprestimos, rng, culturas, anos):
+    """Gera contratos com taxa, periodicidade, sistema de amortização e carência."""
+    periodos = _escolher(rng, PERIODOS, n_emprestimos)
+    parcelas = np.array([rng.integers(PERIODOS[p]["parcelas"][0], PERIODOS[p]["parcelas"][1] + 1) for p in periodos])
+    encargos = np.round(rng.uniform(5.0, 14.0, n_emprestimos), 2)
+    valores = np.round(np.clip(rng.lognormal(mean=12.5, sigma=1.0, size=n_emprestimos), 20000, 20000000), 2)
+    meses_por_periodo = np.array([{"ANUAL": 12, "SEMESTRAL": 6, "MENSAL": 1}[p] for p in periodos])
+
+    # Parcela constante (Price) na taxa equivalente do período
+    taxa_periodo = (1 + encargos / 100) ** (meses_por_periodo / 12) - 1
+    valor_parcela = valores * taxa_periodo / (1 - (1 + taxa_periodo) ** -parcelas)
+
+    sistemas = rng.choice(SISTEMAS, size=n_emprestimos, p=[0.5, 0.3, 0.2])
+    carencias = np.where(rng.random(n_emprestimos) < 0.2, rng.integers(1, 3, n_emprestimos), 0)
+    # No SAC a parcela varia; guarda a primeira (maior) para exibição
+    valor_parcela = np.where(sistemas == "SAC", valores / parcelas + valores * taxa_periodo, valor_parcela)
+
+    inicios = rng.integers(len(anos), size=n_emprestimos)
+    culturas = list(culturas)
+    centros = ["Administrativo"] + culturas
+
+    emprestimos = []
+    for i in range(n_emprestimos):
+        # Prazo em anos coberto pelas parcelas, limitado ao horizonte da projeção
+        anos_contrato = int(np.ceil((parcelas[i] + carencias[i]) * meses_por_periodo[i] / 12))
+        fim = min(int(inicios[i]) + anos_contrato - 1, len(anos) - 1)
+        emprestimos.append({
+            "banco": BANCOS[int(rng.integers(len(BANCOS)))],
+            "valor_total": float(valores[i]),
+            "objeto": f"{OBJETOS_EMPRESTIMO[int(rng.integers(len(OBJETOS_EMPRESTIMO)))]} {i + 1}",
+            "encargos": float(encargos[i]),
+            "parcelas": int(parcelas[i]),
+            "valor_parcela": round(float(valor_parcela[i]), 2),
+            "periodo": str(periodos[i]),
+            "ano_inicial": anos[int(inicios[i])],
+            "ano_final": anos[fim],
+            "centro_custo": centros[int(rng.integers(len(centros)))],
+            "sistema": str(sistemas[i]),
+            "carencia": int(carencias[i])
+        })
+    return emprestimos
+
+
+def gerar_receitas_adicionais(n_receitas, rng, anos):
+    """Gera receitas adicionais operacionais e extra operacionais em subconjuntos de anos."""
+    receitas = {}
+    for i in range(n_receitas):
+        categoria = "Operacional" if rng.random() < 0.6 else "Extra Operacional"
+        nomes = RECEITAS_ADICIONAIS[categoria]
+        mascara = rng.random(len(anos)) < 0.8
+        if not mascara.any():
+            mascara[int(rng.integers(len(anos)))] = True
+        receitas[f"r{i:07x}"] = {
+            'nome': f"{nomes[i % len(nomes)]} {i + 1}",
+            'valor': round(float(rng.uniform(5000, 300000)), 2),
+            'categoria': categoria,
+            'anos_aplicacao': [ano for ano, ativo in zip(anos, mascara) if ativo]
+        }
+    return receitas
+
+
+def gerar_fazenda(n_plantios=20, n_despesas=500, n_emprestimos=20, n_receitas=5, n_anos=5, n_culturas=None, seed=42):
+    """
+    Gera uma fazenda sintética completa no formato do session_state.
+    `n_culturas` acima das culturas padrão cria culturas extras ("Cultura 5", ...).
+    """
+    rng = np.random.default_rng(seed)
+    anos = [f"Ano {i+1}" for i in range(n_anos)]
+
+    culturas = dict(CULTURAS)
+    if n_culturas is not None:
+        nomes = list(CULTURAS)[:n_culturas]
+        culturas = {nome: CULTURAS[nome] for nome in nomes}
+        for i in range(len(nomes), n_culturas):
+            culturas[f"Cultura {i + 1}"] = {"peso": 0.05, "sacas_por_hectare": (40, 120), "preco_saca": (50, 120)}
+
+    plantios = gerar_plantios(n_plantios, rng, culturas)
+    areas_por_cultura = {}
+    for plantio in plantios.values():
+        areas_por_cultura[plantio["cultura"]] = areas_por_cultura.get(plantio["cultura"], 0) + plantio["hectares"]
+    culturas_cadastradas = sorted(areas_por_cultura)
+
+    return {
+        "plantios": plantios,
+        "despesas": gerar_despesas(n_despesas, rng, areas_por_cultura),
+        "emprestimos": gerar_emprestimos(n_emprestimos, rng, culturas_cadastradas, anos),
+        "receitas_adicionais": gerar_receitas_adicionais(n_receitas, rng, anos),
+        "anos": anos,
+    }
+
+
+def exportar_excel(dados, pasta):
+    """
+    Grava despesas e empréstimos em Excel nos formatos dos modelos da página de Despesas.
+    Retorna os caminhos dos arquivos gerados.
+    """
+    os.makedirs(pasta, exist_ok=True)
+    caminhos = {}
+
+    df_despesas = pd.DataFrame(dados["despesas"], columns=["Despesa", "Valor", "Categoria", "Centro_Custo"])
+    caminhos["despesas"] = os.path.join(pasta, "despesas.xlsx")
+    with pd.ExcelWriter(caminhos["despesas"], engine='xlsxwriter') as writer:
+        df_despesas.to_excel(writer, index=False, sheet_name="Despesas")
+
+    df_emprestimos = pd.DataFrame(dados["emprestimos"], columns=[
+        "banco", "valor_total", "objeto", "encargos", "parcelas", "valor_parcela",
+        "periodo", "ano_inicial", "ano_final", "centro_custo", "sistema", "carencia"
+    ])
+    caminhos["emprestimos"] = os.path.join(pasta, "emprestimos.xlsx")
+    with pd.ExcelWriter(caminhos["emprestimos"], engine='xlsxwriter') as writer:
+        df_emprestimos.to_excel(writer, index=False, sheet_name="Emprestimos")
+
+    return caminhos
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera dados sintéticos de fazenda para testes de carga")
+    parser.add_argument("--plantios", type=int, default=20)
+    parser.add_argument("--despesas", type=int, default=500)
+    parser.add_argument("--emprestimos", type=int, default=20)
+    parser.add_argument("--receitas", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--saida", default="dados_sinteticos", help="Pasta onde os arquivos Excel serão gravados")
+    args = parser.parse_args(argv)
+
+    dados = gerar_fazenda(args.plantios, args.despesas, args.emprestimos, args.receitas, seed=args.seed)
+    for tipo, caminho in exportar_excel(dados, args.saida).items():
+        print(f"{tipo}: {caminho}")
+
+
+if __name__ == "__main__":
+    main()
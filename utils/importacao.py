@@ -0,0 +1,167 @@
+# utils/importacao.py
+"""
+Leitura das planilhas enviadas pelos uploads, com cache pelo conteúdo do arquivo.
+
+Formatos: Excel (.xlsx), Parquet e CSV. No CSV, o separador (; , tab |) e a vírgula
+decimal do padrão brasileiro ("1.234,56") são detectados numa amostra do início do arquivo,
+e a codificação cai para latin-1 quando o arquivo não é UTF-8 (exportações de ERP).
+
+Cada arquivo é identificado pelo hash (blake2b) dos seus bytes: o mesmo conteúdo é lido uma
+única vez, mesmo com outro nome ou enviado de novo, e alternar entre arquivos já enviados não
+volta a abrir a planilha. As leituras ficam no session_state num cache LRU de tamanho fixo.
+O hash também marca os arquivos já importados em cada cadastro, então reenviar um arquivo
+idêntico não duplica registros.
+
+Na importação por chave (upsert), as linhas do arquivo são casadas com o cadastro por uma
+chave natural (ex.: Despesa + Centro_Custo + Categoria, ou o código do ERP): o resultado é um
+resumo de inserções, atualizações e ausências aplicado de uma só vez.
+
+As tabelas devolvidas são compartilhadas com o cache: copie antes de modificar.
+"""
+import hashlib
+import io
+import math
+import numbers
+import re
+from collections import OrderedDict
+
+import pandas as pd
+
+CHAVE_LEITURAS = "_leituras"
+CHAVE_IMPORTADOS = "_arquivos_importados"  # {cadastro: set(hash)}
+MAX_LEITURAS = 8
+TIPOS_ARQUIVO = ["xlsx", "csv", "parquet"]
+SEPARADORES = [";", ",", "\t", "|"]
+AMOSTRA_CSV = 64 * 1024
+CHAVE_NATURAL_DESPESAS = ["Despesa", "Centro_Custo", "Categoria"]
+
+
+def impressao_arquivo(arquivo):
+    """Hash do conteúdo do arquivo enviado."""
+    return hashlib.blake2b(arquivo.getvalue(), digest_size=16).hexdigest()
+
+
+def formato_csv(amostra):
+    """(separador, decimal, milhar) de uma amostra de texto CSV."""
+    linhas = [re.sub(r'"[^"]*"', "", linha) for linha in amostra.splitlines()[:50] if linha.strip()] or [""]
+    # Separador: o que mais aparece no cabeçalho entre os que se repetem igual em quase todas as linhas
+    contagens = {sep: [linha.count(sep) for linha in linhas] for sep in SEPARADORES}
+    constantes = [
+        sep for sep, c in contagens.items()
+        if c[0] > 0 and sum(n == c[0] for n in c) >= 0.8 * len(c)
+    ]
+    separador = max(constantes or SEPARADORES, key=lambda sep: contagens[sep][0])
+    # Vírgula decimal: números como 1.234,56 ou 10,5 fora de aspas, com separador que não é a vírgula
+    if separador != "," and re.search(r"(?:^|[^\w.,])-?\d{1,3}(?:\.\d{3})*,\d+(?:$|[^\w.,])", amostra, re.MULTILINE):
+        return separador, ",", "."
+    return separador, ".", None
+
+
+def ler_csv(arquivo):
+    """CSV com separador, decimal e codificação detectados."""
+    dados = arquivo.read() if hasattr(arquivo, "read") else open(arquivo, "rb").read()
+    try:
+        texto = dados[:AMOSTRA_CSV].decode("utf-8-sig")
+        codificacao = "utf-8-sig"
+    except UnicodeDecodeError:
+        texto, codificacao = dados[:AMOSTRA_CSV].decode("latin-1"), "latin-1"
+    separador, decimal, milhar = formato_csv(texto.rsplit("\n", 1)[0] if len(dados) > AMOSTRA_CSV else texto)
+    return pd.read_csv(io.BytesIO(dados), sep=separador, decimal=decimal, thousands=milhar, encoding=codificacao)
+
+
+def ler_tabela(arquivo):
+    """Lê .xlsx, .csv ou .parquet conforme a extensão do nome do arquivo."""
+    nome = getattr(arquivo, "name", str(arquivo)).lower()
+    if nome.endswith(".parquet"):
+        return pd.read_parquet(arquivo)
+    if nome.endswith(".csv"):
+        return ler_csv(arquivo)
+    return pd.read_excel(arquivo)
+
+
+def ler_planilha(estado, arquivo, leitor=ler_tabela):
+    """(hash, tabela) do arquivo; a leitura só acontece se esse conteúdo não estiver no cache."""
+    impressao = impressao_arquivo(arquivo)
+    cache = estado.setdefault(CHAVE_LEITURAS, OrderedDict())
+    if impressao in cache:
+        cache.move_to_end(impressao)
+    else:
+        arquivo.seek(0)
+        cache[impressao] = leitor(arquivo)
+        while len(cache) > MAX_LEITURAS:
+            cache.popitem(last=False)
+    return impressao, cache[impressao]
+
+
+def ja_importado(estado, cadastro, impressao):
+    """Se o arquivo com esse hash já foi importado no cadastro."""
+    return impressao in estado.get(CHAVE_IMPORTADOS, {}).get(cadastro, set())
+
+
+def marcar_importado(estado, cadastro, impressao):
+    """Registra o arquivo como importado no cadastro."""
+    estado.setdefault(CHAVE_IMPORTADOS, {}).setdefault(cadastro, set()).add(impressao)
+
+
+def _valor_chave(valor):
+    """Texto de um valor da chave: 123, 123.0 e "123" casam; None e NaN viram ""."""
+    if isinstance(valor, numbers.Real) and not isinstance(valor, bool):
+        if math.isnan(valor):
+            return ""
+        if float(valor).is_integer():
+            return str(int(valor))
+    elif valor is None or valor is pd.NA:
+        return ""
+    return str(valor).strip()
+
+
+def _chave(registro, colunas):
+    return tuple(_valor_chave(registro.get(coluna)) for coluna in colunas)
+
+
+def diferencas_importacao(atuais, novos, colunas_chave):
+    """
+    Compara o cadastro atual com os registros do arquivo pela chave natural `colunas_chave`.
+    Índices por hash (dict) dos dois lados: uma passada em cada lista. Chave repetida no
+    arquivo fica com a última linha; no cadastro, com a primeira (as demais são duplicadas).
+    Retorna {"inserir": [registros], "atualizar": {índice atual: registro}, "remover":
+    [índices atuais ausentes do arquivo], "duplicados": [índices], "iguais": n, "repetidos": n}.
+    """
+    posicoes, duplicados = {}, []
+    for indice, registro in enumerate(atuais):
+        if not any(coluna in registro for coluna in colunas_chave):
+            continue  # cadastrado sem a chave (ex.: antes do código do ERP): fica como está
+        chave = _chave(registro, colunas_chave)
+        if chave in posicoes:
+            duplicados.append(indice)
+        else:
+            posicoes[chave] = indice
+
+    arquivo = {}
+    for registro in novos:
+        arquivo[_chave(registro, colunas_chave)] = registro
+
+    inserir, atualizar, iguais = [], {}, 0
+    for chave, registro in arquivo.items():
+        indice = posicoes.get(chave)
+        if indice is None:
+            inserir.append(registro)
+        elif any(atuais[indice].get(campo) != valor for campo, valor in registro.items()):
+            atualizar[indice] = registro
+        else:
+            iguais += 1
+    remover = [indice for chave, indice in posicoes.items() if chave not in arquivo]
+    return {
+        "inserir": inserir, "atualizar": atualizar, "remover": remover, "duplicados": duplicados,
+        "iguais": iguais, "repetidos": len(novos) - len(arquivo),
+    }
+
+
+def aplicar_diferencas(atuais, diferencas, remover=False):
+    """Novo cadastro sem duplicados, com inserções, atualizações (campos do arquivo) e, se pedido, remoções."""
+    removidos = set(diferencas["duplicados"]) | (set(diferencas["remover"]) if remover else set())
+    resultado = [
+        {**registro, **diferencas["atualizar"].get(indice, {})}
+        for indice, registro in enumerate(atuais) if indice not in removidos
+    ]
+    return resultado + diferencas["inserir"]
@@ -0,0 +1,104 @@
+# utils/impostos.py
+"""
+Motor de impostos orientado por tabela.
+
+Cada regime tributário é uma lista de regras (tributo, base, alíquota % por ano) mais o limite
+de compensação de prejuízos (% do lucro do ano que pode ser abatido por prejuízos anteriores).
+Bases: "Receita" e "Folha" (Despesas RH) geram os Impostos Sobre Venda; "Lucro" (lucro
+operacional) gera os Impostos Sobre Resultado.
+
+A compensação é uma varredura acumulada ao longo dos anos, vetorizada sobre todos os eixos
+iniciais (cenários, culturas, casos), de modo que DRE, cubo, sensibilidade e varredura usam
+os mesmos impostos e trocar de regime é só reavaliar os arrays.
+"""
+import numpy as np
+import pandas as pd
+
+CHAVE_IMPOSTOS = "impostos"  # {"regime": nome, "regras": [registros], "compensacao": %}
+BASES = ["Receita", "Folha", "Lucro"]
+COLUNAS_REGRA = ["Tributo", "Base"]
+
+# Alíquotas de referência (%), editáveis ano a ano na página de Ajuste de Cenários
+REGIMES = {
+    "Lucro Presumido": {
+        "regras": [("Funrural", "Receita", 1.2), ("PIS/COFINS", "Receita", 3.65), ("IRPJ + CSLL", "Lucro", 15.0)],
+        "compensacao": 0.0,
+    },
+    "Lucro Real": {
+        "regras": [("Funrural PJ + SENAR", "Receita", 2.05), ("PIS/COFINS", "Receita", 0.0), ("IRPJ + CSLL", "Lucro", 34.0)],
+        "compensacao": 30.0,
+    },
+    "Produtor Rural PF - Funrural sobre Receita": {
+        "regras": [("Funrural PF + SENAR", "Receita", 1.5), ("IRPF", "Lucro", 27.5)],
+        "compensacao": 100.0,
+    },
+    "Produtor Rural PF - Funrural sobre Folha": {
+        "regras": [("SENAR", "Receita", 0.2), ("INSS Patronal", "Folha", 20.0), ("IRPF", "Lucro", 27.5)],
+        "compensacao": 100.0,
+    },
+}
+REGIME_PADRAO = "Lucro Presumido"
+
+
+def configuracao_regime(regime, n_anos=5):
+    """Configuração de referência de um regime, com a mesma alíquota em todos os anos."""
+    return {
+        "regime": regime,
+        "regras": [
+            {"Tributo": tributo, "Base": base, **{f"Ano {j + 1}": aliquota for j in range(n_anos)}}
+            for tributo, base, aliquota in REGIMES[regime]["regras"]
+        ],
+        "compensacao": REGIMES[regime]["compensacao"],
+    }
+
+
+def configuracao_impostos(estado):
+    """Configuração salva na sessão/configuração, ou a do regime padrão."""
+    return estado.get(CHAVE_IMPOSTOS) or configuracao_regime(REGIME_PADRAO)
+
+
+def aliquotas(impostos, n_anos):
+    """
+    Alíquotas (fração) somadas por base: {base: array (ano,)} e o limite de compensação (fração).
+    Anos além da tabela repetem a última alíquota informada.
+    """
+    impostos = impostos or configuracao_regime(REGIME_PADRAO)
+    regras = pd.DataFrame(impostos["regras"], columns=COLUNAS_REGRA)
+    colunas = [f"Ano {j + 1}" for j in range(n_anos)]
+    taxas = pd.DataFrame(impostos["regras"]).reindex(columns=colunas).apply(pd.to_numeric, errors="coerce")
+    taxas = taxas.ffill(axis=1).fillna(0.0).to_numpy(dtype=float).reshape(len(regras), n_anos) / 100
+    return (
+        {base: taxas[(regras["Base"] == base).to_numpy()].sum(axis=0) for base in BASES},
+        float(impostos.get("compensacao") or 0.0) / 100
+    )
+
+
+def base_tributavel(lucro, limite):
+    """
+    Lucro tributável de cada ano (..., ano) após compensar prejuízos acumulados, abatendo no
+    máximo `limite` (fração) do lucro do ano. Varredura sobre o último eixo.
+    """
+    lucro = np.asarray(lucro, dtype=float)
+    base = np.maximum(lucro, 0)
+    if limite <= 0:
+        return base
+    saldo = np.zeros(lucro.shape[:-1])
+    for j in range(lucro.shape[-1]):
+        compensado = np.minimum(saldo, limite * base[..., j])
+        base[..., j] -= compensado
+        saldo += np.maximum(-lucro[..., j], 0) - compensado
+    return base
+
+
+def impostos_sobre_venda(receita, folha, impostos=None):
+    """Impostos sobre venda (..., ano): alíquotas de receita e de folha (Despesas RH)."""
+    receita = np.asarray(receita, dtype=float)
+    taxas, _ = aliquotas(impostos, receita.shape[-1])
+    return receita * taxas["Receita"] + np.asarray(folha, dtype=float) * taxas["Folha"]
+
+
+def impostos_sobre_resultado(lucro, impostos=None):
+    """Impostos sobre resultado (..., ano), com compensação de prejuízos de anos anteriores."""
+    lucro = np.asarray(lucro, dtype=float)
+    taxas, limite = aliquotas(impostos, lucro.shape[-1])
+    return base_tributavel(lucro, limite) * taxas["Lucro"]
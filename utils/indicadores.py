@@ -0,0 +1,264 @@
+# utils/indicadores.py
+import numpy as np
+import pandas as pd
+
+from utils.cenarios import COLUNA_NOME, fatores_custo_cenarios, tabela_cenarios
+from utils.cenarios import nomes_cenarios as nomes_cenarios_tabela
+from utils.cubo import CONSOLIDADO, montar_cubo
+from utils.impostos import CHAVE_IMPOSTOS
+from utils.perf import medido
+
+def calcular_cagr(valor_inicial, valor_final, periodos):
+    """Calcula a Taxa de Crescimento Anual Composta (CAGR)."""
+    if valor_inicial <= 0 or periodos <= 0:
+        return 0.0 # Evita divisão por zero ou log de números não positivos
+    if valor_final <= 0: # Se o valor final for negativo, é um declínio
+        # Calcula a taxa de declínio como um CAGR negativo
+        # Usamos o valor absoluto para o cálculo da base, mas o resultado é negativo
+        return ((abs(valor_final) / valor_inicial) ** (1 / periodos) - 1) * -100
+    return ((valor_final / valor_inicial) ** (1 / periodos) - 1) * 100
+
+def montar_cubo_sessao(session_data, nomes_cenarios=None):
+    """Cubo de resultados (cenário × cultura × linha × ano) a partir dos dados da sessão."""
+    tabela = tabela_cenarios(session_data)
+    if nomes_cenarios is not None:
+        tabela = tabela.set_index(COLUNA_NOME).loc[list(nomes_cenarios)].reset_index()
+    anos = session_data.get("anos", [])
+    return montar_cubo(
+        session_data.get("dre_cenarios", {}), nomes_cenarios_tabela(tabela), anos,
+        session_data.get("receitas_por_cultura_cenarios", {}), session_data.get("custos_por_cultura", {}),
+        fatores_custo_cenarios(tabela, session_data.get("inflacoes", [0.0] * len(anos)), len(anos)),
+        session_data.get(CHAVE_IMPOSTOS)
+    )
+
+def calcular_dre_por_cultura_cenarios(session_data, cubo=None):
+    """Calcula DRE específico por cultura e cenário (visão por cultura do cubo de resultados)."""
+    cubo = cubo if cubo is not None else montar_cubo_sessao(session_data)
+    return cubo.dre_por_cultura()
+
+# --- Kernel vetorizado de indicadores ---
+
+# Linhas do DRE usadas pelo kernel, na ordem do eixo "linha" do array de entrada
+LINHAS_KERNEL = [
+    "Receita", "Impostos Sobre Venda", "Despesas Operacionais", "Despesas Administrativas",
+    "Despesas RH", "Despesas Extra Operacional", "Dividendos", "Impostos Sobre Resultado",
+    "Lucro Operacional", "Lucro Líquido"
+]
+LINHAS_DESPESA = [
+    "Impostos Sobre Venda", "Despesas Operacionais", "Despesas Administrativas", "Despesas RH",
+    "Despesas Extra Operacional", "Dividendos", "Impostos Sobre Resultado"
+]
+
+# Ordem do eixo "indicador" do resultado
+INDICADORES = [
+    "Margem Líquida (%)", "Retorno por Real Gasto", "Liquidez Operacional", "Endividamento (%)",
+    "Produtividade por Hectare (R$/ha)", "Custo por Receita (%)", "DSCR", "Break-Even Yield (sacas/ha)",
+    "ROA (%)", "CAGR Receita (%)", "CAGR Lucro Líquido (%)", "Custo por Hectare (R$/ha)"
+]
+INDICADORES_CULTURA = [
+    "Margem Líquida (%)", "Retorno por Real Gasto", "Liquidez Operacional", "Custo por Receita (%)",
+    "ROA (%)", "CAGR Receita (%)", "CAGR Lucro Líquido (%)"
+]
+INDICADORES_CAGR = ["CAGR Receita (%)", "CAGR Lucro Líquido (%)"]
+
+
+def dividir(numerador, denominador, padrao=0.0):
+    """Divisão elemento a elemento com máscara: onde o denominador é zero, usa `padrao`."""
+    numerador, denominador = np.broadcast_arrays(np.asarray(numerador, dtype=float), np.asarray(denominador, dtype=float))
+    resultado = np.full(numerador.shape, padrao, dtype=float)
+    np.divide(numerador, denominador, out=resultado, where=denominador != 0)
+    return resultado
+
+
+def cagr_vetorizado(inicial, final, periodos):
+    """Versão vetorizada de `calcular_cagr` (mesmas regras de sinal e de base não positiva)."""
+    inicial, final = np.asarray(inicial, dtype=float), np.asarray(final, dtype=float)
+    if periodos <= 0:
+        return np.zeros(np.broadcast(inicial, final).shape)
+    valido = np.broadcast_to(inicial > 0, np.broadcast(inicial, final).shape)
+    # Potência só onde a base é positiva: base não positiva não gera NaN nem aviso
+    razao = dividir(np.abs(final), inicial)
+    taxa = (np.power(razao, 1 / periodos, out=np.ones_like(razao), where=valido) - 1) * 100
+    return np.where(valido, np.where(final <= 0, -taxa, taxa), 0.0)
+
+
+def dre_para_array(dre, n_anos):
+    """Converte o dict de linhas do DRE no array (linha × ano) esperado pelo kernel."""
+    return np.array([np.asarray(dre.get(linha, [0] * n_anos), dtype=float) for linha in LINHAS_KERNEL])
+
+
+@medido()
+def kernel_indicadores(dre, hectares, preco_medio_saca, total_ativos):
+    """
+    Calcula todos os indicadores de uma vez.
+    `dre` tem forma (..., linha, ano) com as linhas em LINHAS_KERNEL (ex.: cenário × cultura × linha × ano);
+    `hectares`, `preco_medio_saca` e `total_ativos` são escalares ou arrays com a forma dos eixos iniciais.
+    Retorna array (..., indicador, ano) na ordem de INDICADORES; CAGR é repetido em todos os anos.
+    """
+    dre = np.asarray(dre, dtype=float)
+    linha = {nome: dre[..., i, :] for i, nome in enumerate(LINHAS_KERNEL)}
+    hectares = np.asarray(hectares, dtype=float)[..., None]
+    preco_medio_saca = np.asarray(preco_medio_saca, dtype=float)[..., None]
+    total_ativos = np.asarray(total_ativos, dtype=float)[..., None]
+
+    receita = linha["Receita"]
+    lucro_liquido = linha["Lucro Líquido"]
+    servico_divida = linha["Despesas Extra Operacional"]  # proxy: parcelas de empréstimos
+    despesas_totais = dre[..., [LINHAS_KERNEL.index(l) for l in LINHAS_DESPESA], :].sum(axis=-2)
+    n_anos = dre.shape[-1]
+
+    def por_ano(valor):
+        return np.broadcast_to(valor[..., None], receita.shape)
+
+    resultado = {
+        "Margem Líquida (%)": dividir(lucro_liquido, receita) * 100,
+        "Retorno por Real Gasto": dividir(lucro_liquido, despesas_totais),
+        "Liquidez Operacional": dividir(receita, linha["Despesas Operacionais"]),
+        "Endividamento (%)": dividir(servico_divida, receita) * 100,
+        "Produtividade por Hectare (R$/ha)": dividir(receita, hectares),
+        "Custo por Receita (%)": dividir(linha["Despesas Operacionais"], receita) * 100,
+        # Sem serviço da dívida, a cobertura é infinita
+        "DSCR": dividir(linha["Lucro Operacional"], servico_divida, padrao=np.inf),
+        "Break-Even Yield (sacas/ha)": dividir(despesas_totais, hectares * preco_medio_saca),
+        "ROA (%)": dividir(lucro_liquido, total_ativos) * 100,
+        "CAGR Receita (%)": por_ano(cagr_vetorizado(receita[..., 0], receita[..., -1], n_anos - 1)),
+        "CAGR Lucro Líquido (%)": por_ano(cagr_vetorizado(lucro_liquido[..., 0], lucro_liquido[..., -1], n_anos - 1)),
+        "Custo por Hectare (R$/ha)": dividir(despesas_totais, hectares),
+    }
+    return np.stack([np.broadcast_to(resultado[nome], receita.shape) for nome in INDICADORES], axis=-2)
+
+
+def indicadores_para_dict(valores, nomes=INDICADORES):
+    """Converte um resultado (indicador × ano) do kernel no dict usado pelas telas e relatórios."""
+    return {
+        nome: float(valores[INDICADORES.index(nome), 0]) if nome in INDICADORES_CAGR else valores[INDICADORES.index(nome)].tolist()
+        for nome in nomes
+    }
+
+
+def calculate_indicators_for_scenario(scenario_name, dre_data, session_data):
+    """Calcula todos os indicadores financeiros para um dado cenário."""
+    anos = session_data["anos"]
+    total_sacas = session_data["total_sacas"]
+    # Preço médio por saca no ano base (para Break-Even Yield)
+    preco_medio_saca_base = session_data["preco_total_base"] / total_sacas if total_sacas > 0 else 0
+
+    valores = kernel_indicadores(
+        dre_para_array(dre_data, len(anos)), session_data["hectares_total"],
+        preco_medio_saca_base, session_data["total_ativos"]
+    )
+    return indicadores_para_dict(valores)
+
+
+@medido()
+def calcular_indicadores_cenarios(dre_cenarios, nomes_cenarios, session_data, cubo=None):
+    """
+    Indicadores consolidados de todos os cenários numa única chamada do kernel.
+    Com `cubo`, a entrada do kernel é a fatia consolidada do cubo (sem conversão de listas).
+    """
+    anos = session_data["anos"]
+    total_sacas = session_data["total_sacas"]
+    preco_medio_saca_base = session_data["preco_total_base"] / total_sacas if total_sacas > 0 else 0
+
+    if cubo is not None:
+        dre = cubo.sel(cenario=list(nomes_cenarios), cultura=CONSOLIDADO, linha=LINHAS_KERNEL)
+    else:
+        dre = np.stack([dre_para_array(dre_cenarios[nome], len(anos)) for nome in nomes_cenarios])
+    valores = kernel_indicadores(dre, session_data["hectares_total"], preco_medio_saca_base, session_data["total_ativos"])
+    return {nome: indicadores_para_dict(valores[s]) for s, nome in enumerate(nomes_cenarios)}
+
+
+def dre_simplificado_cultura(receitas, custos_totais):
+    """
+    Array (..., linha, ano) de uma cultura a partir de receita e custo total:
+    o custo entra como Despesa Operacional e o lucro é receita − custo.
+    """
+    receitas, custos_totais = np.broadcast_arrays(np.asarray(receitas, dtype=float), np.asarray(custos_totais, dtype=float))
+    dre = np.zeros(receitas.shape[:-1] + (len(LINHAS_KERNEL),) + receitas.shape[-1:])
+    dre[..., LINHAS_KERNEL.index("Receita"), :] = receitas
+    dre[..., LINHAS_KERNEL.index("Despesas Operacionais"), :] = custos_totais
+    dre[..., LINHAS_KERNEL.index("Lucro Operacional"), :] = receitas - custos_totais
+    dre[..., LINHAS_KERNEL.index("Lucro Líquido"), :] = receitas - custos_totais
+    return dre
+
+
+def fator_custo_cenario(cenario_name, session_data):
+    """Fator multiplicativo dos custos no cenário (ajuste de despesas da tabela de cenários)."""
+    tabela = tabela_cenarios(session_data)
+    ajuste = tabela.loc[tabela[COLUNA_NOME] == cenario_name, "Despesas (%)"]
+    return 1 + float(ajuste.iloc[0]) / 100 if not ajuste.empty else 1.0
+
+def calculate_custos_cultura_por_cenario(custos_por_cultura_base, cenario_name, session_data):
+    """Calcula custos por cultura ajustados pelo cenário."""
+    if not custos_por_cultura_base:
+        return {}
+    
+    fator_custo = fator_custo_cenario(cenario_name, session_data)
+
+    # Aplicar fator aos custos por cultura
+    custos_ajustados = {}
+    for cultura, df_custos in custos_por_cultura_base.items():
+        if not df_custos.empty:
+            custos_ajustados[cultura] = df_custos * fator_custo
+        else:
+            custos_ajustados[cultura] = df_custos
+    
+    return custos_ajustados
+
+def calculate_indicators_for_cultura(cultura, receitas_cultura, custos_cultura, anos, total_ativos_cultura):
+    """Calcula indicadores financeiros para uma cultura específica."""
+    # Verificar se os dados existem e não estão vazios
+    if not receitas_cultura:
+        return {}
+    if isinstance(custos_cultura, pd.DataFrame) and custos_cultura.empty:
+        return {}
+    elif isinstance(custos_cultura, dict) and not custos_cultura:
+        return {}
+
+    if isinstance(receitas_cultura, dict):
+        receitas = [receitas_cultura.get(ano, 0) for ano in anos]
+    else:
+        receitas = list(receitas_cultura)
+
+    if isinstance(custos_cultura, pd.DataFrame):
+        custos_totais = custos_cultura.sum(axis=0).tolist()
+    else:
+        custos_totais = [custos_cultura.get(ano, 0) for ano in anos]
+
+    valores = kernel_indicadores(dre_simplificado_cultura(receitas, custos_totais), 0, 0, total_ativos_cultura)
+    return indicadores_para_dict(valores, INDICADORES_CULTURA)
+
+
+@medido()
+def calcular_indicadores_culturas_cenarios(session_data, nomes_cenarios, cubo=None):
+    """
+    Indicadores de todas as culturas em todos os cenários numa única chamada do kernel,
+    lendo receita e custos diretos do cubo de resultados. Retorna {cenario: {cultura: indicadores}}.
+    """
+    custos_por_cultura = session_data.get("custos_por_cultura", {})
+    receitas_por_cultura_cenarios = session_data.get("receitas_por_cultura_cenarios", {})
+    hectares_total = session_data["hectares_total"]
+    cubo = cubo if cubo is not None else montar_cubo_sessao(session_data, nomes_cenarios)
+
+    # Só culturas com custos e receita (mesmo critério das telas)
+    culturas = [c for c in cubo.culturas if c in custos_por_cultura and not custos_por_cultura[c].empty]
+    if not culturas:
+        return {nome: {} for nome in nomes_cenarios}
+
+    receitas = cubo.sel(cenario=list(nomes_cenarios), cultura=culturas, linha="Receita")
+    custos = cubo.sel(cenario=list(nomes_cenarios), cultura=culturas, linha="Custos Diretos")
+    hectares = np.array([
+        sum(p.get("hectares", 0) for p in session_data["plantios"].values() if p.get("cultura") == c)
+        for c in culturas
+    ], dtype=float)
+    ativos = hectares / hectares_total * session_data["total_ativos"] if hectares_total > 0 else np.zeros(len(culturas))
+
+    valores = kernel_indicadores(dre_simplificado_cultura(receitas, custos), 0, 0, ativos[None, :])
+
+    return {
+        nome: {
+            c: indicadores_para_dict(valores[s, k], INDICADORES_CULTURA)
+            for k, c in enumerate(culturas) if c in receitas_por_cultura_cenarios.get(nome, {})
+        }
+        for s, nome in enumerate(nomes_cenarios)
+    }
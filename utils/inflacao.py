@@ -0,0 +1,40 @@
+# utils/inflacao.py
+"""
+Índices de inflação nomeados (IPCA, IGP-M, diesel, fertilizantes, salário mínimo, ...).
+
+Cada índice é um vetor de taxas anuais (%). O índice "Geral" é a inflação da página de
+Ajuste de Cenários (inf_0..inf_4). Cada despesa usa o índice informado nela (campo
+"Indice"), senão o da sua categoria, senão o Geral. A projeção monta a matriz de taxas
+(índice × ano) e faz um único gather pelos códigos das despesas (ver utils.agenda).
+"""
+import numpy as np
+import pandas as pd
+
+INDICE_GERAL = "Geral"
+CHAVE_INDICES = "indices_inflacao"  # {nome: [taxa % por ano]}
+CHAVE_INDICES_CATEGORIA = "indices_por_categoria"  # {categoria: nome do índice}
+COLUNA_INDICE = "Indice"  # campo opcional de cada despesa
+
+
+def tabela_indices(inflacoes, indices_nomeados=None):
+    """Índices disponíveis, com o Geral (`inflacoes`) na primeira posição."""
+    indices = {INDICE_GERAL: list(inflacoes)}
+    indices.update({nome: taxas for nome, taxas in (indices_nomeados or {}).items() if nome != INDICE_GERAL})
+    return indices
+
+
+def taxas_indices(indices, n_anos):
+    """Taxas (%) de todos os índices como matriz (índice × ano), na ordem de `indices`."""
+    return np.array([np.asarray(t, dtype=float)[:n_anos] for t in indices.values()]).reshape(len(indices), n_anos)
+
+
+def codigos_indice(despesas_info, indices, indices_por_categoria=None):
+    """Posição (em `indices`) do índice de cada despesa: o da despesa, o da categoria ou o Geral."""
+    n = len(despesas_info)
+    nomes = pd.Series([None] * n, index=despesas_info.index, dtype=object)
+    if COLUNA_INDICE in despesas_info.columns:
+        nomes = despesas_info[COLUNA_INDICE].where(despesas_info[COLUNA_INDICE].isin(list(indices)))
+    if indices_por_categoria and "Categoria" in despesas_info.columns:
+        nomes = nomes.fillna(despesas_info["Categoria"].map(indices_por_categoria))
+    codigos = pd.Index(list(indices)).get_indexer(nomes.fillna(INDICE_GERAL))
+    return np.where(codigos >= 0, codigos, 0)
@@ -0,0 +1,154 @@
+# utils/perf.py
+"""
+Instrumentação leve dos trechos pesados das páginas.
+
+Desligada por padrão: enquanto o painel "⏱️ Performance" da barra lateral não for
+ativado, `medir` e `medido` custam apenas uma consulta a um atributo thread-local.
+Cada execução (rerun) do Streamlit roda na sua própria thread de script, então o
+estado da medição não se mistura entre sessões.
+"""
+import itertools
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+import pandas as pd
+import streamlit as st
+
+CHAVE_ATIVO = "perf_ativo"
+CHAVE_MEDICOES = "perf_medicoes"
+CHAVE_EXECUCAO = "perf_execucao"
+MAX_MEDICOES = 5000
+
+_local = threading.local()
+_execucoes = itertools.count(1)
+
+
+def execucao_atual():
+    """Identificador da execução da página em andamento (0 fora de `executar_pagina`)."""
+    return getattr(_local, "rodada", 0)
+
+
+def iniciar_medicoes(pagina):
+    """Chamar no início de cada página: liga/desliga a coleta para esta execução."""
+    _local.rodada = next(_execucoes)
+    _local.ativo = bool(st.session_state.get(CHAVE_ATIVO, False))
+    if not _local.ativo:
+        return
+    _local.pagina = pagina
+    _local.nivel = 0
+    st.session_state[CHAVE_EXECUCAO] = st.session_state.get(CHAVE_EXECUCAO, 0) + 1
+    _local.execucao = st.session_state[CHAVE_EXECUCAO]
+    _local.medicoes = st.session_state.setdefault(CHAVE_MEDICOES, [])
+
+
+@contextmanager
+def medir(etapa):
+    """Mede tempo e blocos alocados do trecho, se a instrumentação estiver ativa."""
+    if not getattr(_local, "ativo", False):
+        yield
+        return
+
+    nivel = _local.nivel
+    _local.nivel = nivel + 1
+    blocos_inicio = sys.getallocatedblocks()
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        duracao = time.perf_counter() - inicio
+        _local.nivel = nivel
+        _local.medicoes.append({
+            "execucao": _local.execucao,
+            "pagina": _local.pagina,
+            "etapa": etapa,
+            "nivel": nivel,
+            "tempo_ms": duracao * 1000,
+            "blocos_alocados": sys.getallocatedblocks() - blocos_inicio,
+        })
+        if len(_local.medicoes) > MAX_MEDICOES:
+            del _local.medicoes[:len(_local.medicoes) - MAX_MEDICOES]
+
+
+def medido(etapa=None):
+    """Decorador equivalente a `medir`, usando o nome da função como etapa padrão."""
+    def decorador(funcao):
+        nome = etapa or funcao.__name__
+
+        @wraps(funcao)
+        def wrapper(*args, **kwargs):
+            if not getattr(_local, "ativo", False):
+                return funcao(*args, **kwargs)
+            with medir(nome):
+                return funcao(*args, **kwargs)
+        return wrapper
+    return decorador
+
+
+def executar_pagina(pagina, main):
+    """Executa o `main` da página medindo o total e mostra o painel na barra lateral."""
+    painel = _abrir_painel()
+    iniciar_medicoes(pagina)
+    try:
+        with medir("página (total)"):
+            main()
+    finally:
+        # Fora da execução da página (ex.: reexecução só de um fragmento) nada é medido
+        _local.rodada = 0
+        _local.ativo = False
+        exibir_painel_performance(painel)
+
+
+def _alternar_painel():
+    st.session_state[CHAVE_ATIVO] = st.session_state["_perf_ativo_widget"]
+
+
+def _abrir_painel():
+    """Desenha o interruptor do painel e retorna o container onde vão as medições."""
+    expander = st.sidebar.expander("⏱️ Performance")
+    expander.toggle(
+        "Medir tempos desta página",
+        value=st.session_state.get(CHAVE_ATIVO, False),
+        key="_perf_ativo_widget",
+        on_change=_alternar_painel
+    )
+    return expander.container()
+
+
+def exibir_painel_performance(painel=None):
+    """Mostra as medições da execução atual e a exportação CSV de todo o histórico."""
+    painel = painel if painel is not None else _abrir_painel()
+    with painel:
+        if not st.session_state.get(CHAVE_ATIVO, False):
+            st.caption("Ative para coletar tempos e alocações a cada execução.")
+            return
+
+        medicoes = st.session_state.get(CHAVE_MEDICOES, [])
+        if not medicoes:
+            st.caption("Nenhuma medição ainda. A próxima execução da página será medida.")
+            return
+
+        df = pd.DataFrame(medicoes)
+        ultima = df[df["execucao"] == df["execucao"].max()]
+        tabela = ultima.assign(etapa=ultima["nivel"].map(lambda n: "· " * n) + ultima["etapa"])
+        st.dataframe(
+            tabela[["etapa", "tempo_ms", "blocos_alocados"]].style.format({"tempo_ms": "{:.1f}"}),
+            hide_index=True,
+            use_container_width=True
+        )
+
+        col1, col2 = st.columns(2)
+        with col1:
+            st.download_button(
+                "⬇️ CSV",
+                data=df.to_csv(index=False).encode("utf-8"),
+                file_name="medicoes_performance.csv",
+                mime="text/csv",
+                key="perf_download_csv"
+            )
+        with col2:
+            if st.button("🧹 Limpar", key="perf_limpar"):
+                st.session_state[CHAVE_MEDICOES] = []
+                st.rerun()
@@ -0,0 +1,294 @@
+# utils/pipeline.py
+"""
+Grafo de cálculo da sessão: cadastros → receitas e despesas projetadas → DRE → cubo → indicadores.
+
+Cada nó declara as chaves do session_state que lê (entradas) e os nós de que depende.
+`obter(estado, nome)` avalia só o caminho necessário até o nó pedido e guarda o resultado
+de cada nó com a assinatura das suas entradas e das assinaturas dos nós a montante: um
+cadastro alterado recalcula apenas os nós abaixo dele. Assim qualquer página pede o que
+precisa, sem depender de outra página ter sido visitada antes.
+
+Os cadastros (CADASTROS) não são serializados: a impressão deles é a identidade do objeto,
+o tamanho e uma versão. Trocar o objeto no session_state já muda a impressão; quem altera um
+cadastro no lugar chama `marcar_alterado(estado, chave)`. As demais entradas, pequenas, são
+resumidas uma vez por execução da página e reaproveitadas pelos `obter` seguintes enquanto o
+objeto no session_state for o mesmo (`id`). Uma delas alterada no lugar no meio da execução,
+depois de um `obter`, precisa de `st.rerun()` ou de `descartar_impressoes()` para ser percebida
+ainda nessa execução.
+
+Os valores devolvidos são compartilhados com o cache: copie antes de modificar.
+"""
+import hashlib
+import pickle
+import threading
+
+import pandas as pd
+
+from utils.cenarios import CHAVE_CENARIOS, COLUNA_NOME, emojis_cenarios, tabela_cenarios
+from utils.dre import calcular_dre_cenarios
+from utils.impostos import CHAVE_IMPOSTOS, configuracao_impostos
+from utils.indicadores import calcular_indicadores_cenarios, calcular_indicadores_culturas_cenarios, montar_cubo_sessao
+from utils.inflacao import CHAVE_INDICES, CHAVE_INDICES_CATEGORIA
+from utils.perf import execucao_atual, medir
+from utils.precos import CHAVE_CURVAS
+from utils.projecao import (
+    calcular_receitas_cenarios,
+    calcular_receitas_por_cultura_cenarios,
+    calcular_totais_plantio,
+    fluxo_despesas_cenarios,
+    projetar_despesas,
+)
+
+CHAVE_CACHE = "_pipeline"
+CHAVE_VERSOES = "_pipeline_versoes"
+CADASTROS = ("plantios", "receitas_adicionais", "despesas", "emprestimos")
+N_ANOS = 5
+
+# nome → (entradas do session_state, nós de que depende, função(estado, *valores dos nós))
+NOS = {}
+
+_local = threading.local()
+
+
+def no(nome, entradas=(), dependencias=()):
+    """Registra a função decorada como o nó `nome` do grafo."""
+    def decorador(funcao):
+        NOS[nome] = (tuple(entradas), tuple(dependencias), funcao)
+        return funcao
+    return decorador
+
+
+def _impressao(valor):
+    """Resumo (hash) de um valor do session_state."""
+    return hashlib.blake2b(pickle.dumps(valor, protocol=pickle.HIGHEST_PROTOCOL), digest_size=16).hexdigest()
+
+
+def _impressoes_da_execucao(estado):
+    """{chave: (id do valor, impressão)} das entradas já resumidas nesta execução da página."""
+    rodada = execucao_atual()
+    if not rodada:
+        return {}
+    if getattr(_local, "rodada", None) != (rodada, id(estado)):
+        _local.rodada = (rodada, id(estado))
+        _local.impressoes = {}
+    return _local.impressoes
+
+
+def descartar_impressoes():
+    """Esquece as impressões da execução atual (após alterar um cadastro no lugar)."""
+    _local.rodada = None
+
+
+def _versoes(estado):
+    if CHAVE_VERSOES not in estado:
+        estado[CHAVE_VERSOES] = {}
+    return estado[CHAVE_VERSOES]
+
+
+def marcar_alterado(estado, *chaves):
+    """Registra que os cadastros `chaves` foram alterados no lugar (append, pop, edição de um item)."""
+    versoes = _versoes(estado)
+    for chave in chaves:
+        versao, objeto = versoes.get(chave, (0, None))
+        versoes[chave] = (versao + 1, objeto)
+
+
+def _versao(estado, chave, valor):
+    """Versão do cadastro; guarda o objeto resumido para que outro não ocupe o mesmo `id`."""
+    versoes = _versoes(estado)
+    versao, objeto = versoes.get(chave, (0, None))
+    if objeto is not valor:
+        versoes[chave] = (versao, valor)
+    return versao
+
+
+def _impressao_entrada(estado, chave, impressoes):
+    valor = estado.get(chave)
+    if chave in CADASTROS and isinstance(valor, (dict, list)):
+        return _impressao((id(valor), len(valor), _versao(estado, chave, valor)))
+    if chave not in impressoes or impressoes[chave][0] != id(valor):
+        impressoes[chave] = (id(valor), _impressao(valor))
+    return impressoes[chave][1]
+
+
+def assinatura(estado, nome, memo=None):
+    """Assinatura do nó: muda quando alguma entrada dele ou de um nó a montante muda."""
+    memo = {} if memo is None else memo
+    if nome not in memo:
+        entradas, dependencias, _ = NOS[nome]
+        impressoes = memo.setdefault("_entradas", _impressoes_da_execucao(estado))
+        memo[nome] = _impressao((
+            nome,
+            [_impressao_entrada(estado, chave, impressoes) for chave in entradas],
+            [assinatura(estado, dependencia, memo) for dependencia in dependencias]
+        ))
+    return memo[nome]
+
+
+def obter(estado, nome, memo=None):
+    """Valor do nó `nome`, recalculado só se a sua assinatura mudou desde a última avaliação."""
+    memo = {} if memo is None else memo
+    if CHAVE_CACHE not in estado:
+        estado[CHAVE_CACHE] = {}
+    cache = estado[CHAVE_CACHE]
+    atual = assinatura(estado, nome, memo)
+    if nome in cache and cache[nome][0] == atual:
+        return cache[nome][1]
+
+    _, dependencias, funcao = NOS[nome]
+    valores = [obter(estado, dependencia, memo) for dependencia in dependencias]
+    with medir(f"pipeline: {nome}"):
+        valor = funcao(estado, *valores)
+    cache[nome] = (atual, valor)
+    return valor
+
+
+# --- Nós ---
+
+@no("anos")
+def _anos(estado):
+    return [f"Ano {i + 1}" for i in range(N_ANOS)]
+
+
+@no("inflacoes", entradas=[f"inf_{i}" for i in range(N_ANOS)])
+def _inflacoes(estado):
+    return [estado.get(f"inf_{i}", 4.0) for i in range(N_ANOS)]
+
+
+@no("cenarios", entradas=[CHAVE_CENARIOS, "pess_receita", "pess_despesas", "otm_receita", "otm_despesas"])
+def _cenarios(estado):
+    return tabela_cenarios(estado)
+
+
+@no("impostos", entradas=[CHAVE_IMPOSTOS])
+def _impostos(estado):
+    return configuracao_impostos(estado)
+
+
+@no("despesas_info", entradas=["despesas"])
+def _despesas_info(estado):
+    """Cadastro de despesas com a categoria limpa (entrada do DRE)."""
+    despesas_info = pd.DataFrame(estado.get("despesas") or [])
+    if despesas_info.empty or "Categoria" not in despesas_info.columns:
+        return pd.DataFrame(columns=["Categoria", "Valor"])
+    despesas_info["Categoria"] = despesas_info["Categoria"].astype(str).str.strip()
+    return despesas_info
+
+
+@no(
+    "projecao_despesas",
+    entradas=["despesas", "emprestimos", "plantios", CHAVE_INDICES, CHAVE_INDICES_CATEGORIA],
+    dependencias=["anos", "inflacoes"]
+)
+def _projecao_despesas(estado, anos, inflacoes):
+    """Projeção da página de Despesas: {fluxo_caixa, custos_por_cultura, rateio_administrativo, areas_por_cultura}."""
+    df_fluxo, custos_por_cultura, rateio, areas = projetar_despesas(
+        estado.get("despesas") or [], estado.get("emprestimos") or [], estado.get("plantios") or {},
+        anos, inflacoes, estado.get(CHAVE_INDICES), estado.get(CHAVE_INDICES_CATEGORIA)
+    )
+    return {
+        "fluxo_caixa": df_fluxo,
+        "custos_por_cultura": custos_por_cultura,
+        "rateio_administrativo": rateio,
+        "areas_por_cultura": areas,
+    }
+
+
+@no(
+    "fluxo_despesas_cenarios",
+    entradas=["despesas", "emprestimos", CHAVE_INDICES, CHAVE_INDICES_CATEGORIA],
+    dependencias=["anos", "inflacoes", "cenarios"]
+)
+def _fluxo_despesas_cenarios(estado, anos, inflacoes, cenarios):
+    """Linhas do fluxo de despesas em cada cenário: {linha: (cenário × ano)}."""
+    return fluxo_despesas_cenarios(
+        estado.get("despesas") or [], estado.get("emprestimos") or [], anos, inflacoes, cenarios,
+        estado.get(CHAVE_INDICES), estado.get(CHAVE_INDICES_CATEGORIA)
+    )
+
+
+@no("receitas", entradas=["plantios", "receitas_adicionais", CHAVE_CURVAS], dependencias=["anos", "inflacoes", "cenarios"])
+def _receitas(estado, anos, inflacoes, cenarios):
+    """(receitas por cenário, receitas adicionais projetadas)."""
+    return calcular_receitas_cenarios(
+        estado.get("plantios") or {}, estado.get("receitas_adicionais") or {},
+        anos, inflacoes, cenarios, estado.get(CHAVE_CURVAS)
+    )
+
+
+@no(
+    "dre_cenarios",
+    entradas=["emprestimos", CHAVE_INDICES, CHAVE_INDICES_CATEGORIA],
+    dependencias=["cenarios", "inflacoes", "anos", "receitas", "despesas_info", "impostos"]
+)
+def _dre_cenarios(estado, cenarios, inflacoes, anos, receitas, despesas_info, impostos):
+    receitas_cenarios, receitas_extras = receitas
+    return calcular_dre_cenarios(
+        cenarios, inflacoes, anos, receitas_cenarios, receitas_extras, despesas_info, estado.get("emprestimos") or [],
+        estado.get(CHAVE_INDICES), estado.get(CHAVE_INDICES_CATEGORIA), impostos
+    )
+
+
+@no(
+    "receitas_por_cultura",
+    entradas=["plantios", CHAVE_CURVAS],
+    dependencias=["projecao_despesas", "anos", "inflacoes", "cenarios"]
+)
+def _receitas_por_cultura(estado, projecao, anos, inflacoes, cenarios):
+    plantios = estado.get("plantios") or {}
+    if not plantios or not projecao["custos_por_cultura"]:
+        return {}
+    return calcular_receitas_por_cultura_cenarios(
+        plantios, projecao["custos_por_cultura"], anos, inflacoes, cenarios, estado.get(CHAVE_CURVAS)
+    )
+
+
+@no(
+    "dados_indicadores",
+    entradas=["plantios", "despesas", "emprestimos"],
+    dependencias=["anos", "inflacoes", "cenarios", "impostos", "receitas", "dre_cenarios", "projecao_despesas", "receitas_por_cultura"]
+)
+def _dados_indicadores(estado, anos, inflacoes, cenarios, impostos, receitas, dre_cenarios, projecao, receitas_por_cultura):
+    """Dados base da página de Indicadores (o `session_data` consumido por utils.indicadores)."""
+    plantios = estado.get("plantios") or {}
+    hectares_total, total_sacas, preco_total_base = calcular_totais_plantio(plantios)
+    return {
+        "plantios": plantios,
+        "dre_cenarios": dre_cenarios,
+        "receitas_cenarios": receitas[0],
+        "inflacoes": inflacoes,
+        "anos": anos,
+        "cenarios": cenarios.to_dict("records"),
+        "tabela_cenarios": cenarios,
+        "nomes_cenarios": cenarios[COLUNA_NOME].tolist(),
+        "emojis_cenarios": emojis_cenarios(cenarios),
+        "despesas_info": pd.DataFrame(estado.get("despesas") or []),
+        "emprestimos": estado.get("emprestimos") or [],
+        "hectares_total": hectares_total,
+        "total_sacas": total_sacas,
+        "preco_total_base": preco_total_base,
+        "total_ativos": hectares_total * 20000 + 1000000,  # estimativa de ativos totais
+        "receitas_extras_projetadas": receitas[1],
+        "custos_por_cultura": projecao["custos_por_cultura"],
+        "rateio_administrativo": projecao["rateio_administrativo"],
+        "receitas_por_cultura_cenarios": receitas_por_cultura,
+        CHAVE_IMPOSTOS: impostos,
+    }
+
+
+@no("cubo", dependencias=["dados_indicadores"])
+def _cubo(estado, dados):
+    return montar_cubo_sessao(dados, dados["nomes_cenarios"])
+
+
+@no("indicadores", dependencias=["dados_indicadores", "cubo"])
+def _indicadores(estado, dados, cubo):
+    return calcular_indicadores_cenarios(dados["dre_cenarios"], dados["nomes_cenarios"], dados, cubo)
+
+
+@no("indicadores_culturas", dependencias=["dados_indicadores", "cubo"])
+def _indicadores_culturas(estado, dados, cubo):
+    """{cenario: {cultura: indicadores}}; vazio sem custos ou receitas por cultura."""
+    if not dados["custos_por_cultura"] or not dados["receitas_por_cultura_cenarios"]:
+        return {}
+    return calcular_indicadores_culturas_cenarios(dados, dados["nomes_cenarios"], cubo)
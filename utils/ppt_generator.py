@@ -4,11 +4,27 @@ import numpy as np
 from io import BytesIO
 from datetime import datetime
 
+from utils.cenarios import cenario_base, emojis_cenarios, tabela_cenarios
+from utils.cubo import LINHAS_DRE_CULTURA, VISAO_FLUXO_CAIXA
+from utils.perf import medido
+
+# Fluxo de caixa consolidado com rótulos abreviados para caber no slide
+VISAO_FLUXO_CAIXA_PPT = dict(zip([
+    "Receita Operacional", "(-) Impostos s/ Venda", "(-) Desp. Operacionais", "(-) Desp. Administrativas",
+    "(-) Despesas RH", "(=) EBITDA", "(-) Desp. Extra Op.", "(-) Dividendos", "(-) Imp. s/ Resultado",
+    "(=) FLUXO LÍQUIDO"
+], VISAO_FLUXO_CAIXA.values()))
+
+@medido()
 def criar_relatorio_ppt_completo(all_indicators, all_dre_data, df_culturas_for_excel, nomes_cenarios, anos, all_indicators_cultura_cenarios=None):
     """
     Gera um relatório COMPLETO em PowerPoint com TODAS as informações do 5_indicadores.py
     Inclui: DREs, Indicadores, Pareceres, Fluxos de Caixa, Análises por Cultura, etc.
+    As tabelas de DRE e fluxo vêm do cubo de resultados da página 5, quando disponível.
     """
+    cubo = st.session_state.get("cubo_resultados")
+    emojis = emojis_cenarios(tabela_cenarios(st.session_state))
+    base = cenario_base(list(nomes_cenarios))
     try:
         # Importações necessárias
         from pptx import Presentation
@@ -492,7 +508,7 @@ def criar_relatorio_ppt_completo(all_indicators, all_dre_data, df_culturas_for_e
         subtitle.text = f"""Gestão de Plantio - Análise Consolidada e por Cultura
         
 Período de Análise: {anos[0]} - {anos[-1]}
-Cenários: Projetado | Pessimista | Otimista
+Cenários: {' | '.join(nomes_cenarios)}
 
 📊 Indicadores Financeiros Detalhados
 🌱 Análise por Cultura e Cenário  
@@ -507,14 +523,14 @@ Base: Sistema 5_Indicadores.py"""
 
 📊 ESCOPO DA ANÁLISE:
 • Período: {len(anos)} anos ({anos[0]} - {anos[-1]})
-• Cenários analisados: {len(nomes_cenarios)} (Projetado, Pessimista, Otimista)
+• Cenários analisados: {len(nomes_cenarios)} ({', '.join(nomes_cenarios)})
 • Culturas avaliadas: {len(df_culturas_for_excel) if not df_culturas_for_excel.empty else 'Não especificado'}
 
-💰 PRINCIPAIS MÉTRICAS (Cenário Projetado):
-• Receita total projetada: R$ {sum(all_dre_data['Projetado']['Receita']):,.0f}
-• Lucro líquido total: R$ {sum(all_dre_data['Projetado']['Lucro Líquido']):,.0f}
-• Margem líquida média: {np.mean(all_indicators['Projetado']['Margem Líquida (%)']):,.1f}%
-• ROA médio: {np.mean(all_indicators['Projetado']['ROA (%)']):,.1f}%
+💰 PRINCIPAIS MÉTRICAS (Cenário {base}):
+• Receita total projetada: R$ {sum(all_dre_data[base]['Receita']):,.0f}
+• Lucro líquido total: R$ {sum(all_dre_data[base]['Lucro Líquido']):,.0f}
+• Margem líquida média: {np.mean(all_indicators[base]['Margem Líquida (%)']):,.1f}%
+• ROA médio: {np.mean(all_indicators[base]['ROA (%)']):,.1f}%
 
 🎯 ESTRUTURA DO RELATÓRIO:
 ✓ Análise consolidada por cenário
@@ -558,10 +574,12 @@ Base: Sistema 5_Indicadores.py"""
         st.write("📊 Criando slides consolidados por cenário...")
         
         for i, cenario in enumerate(nomes_cenarios):
-            emoji = "📊" if cenario == "Projetado" else "📉" if cenario == "Pessimista" else "📈"
+            emoji = emojis.get(cenario, "📊")
             
             # DRE Consolidado (transposto: colunas = anos, linhas = dados)
-            if cenario in all_dre_data:
+            if cubo is not None and cenario in cubo.cenarios:
+                criar_slide_com_tabela(f"{emoji} DRE Consolidado - {cenario}", cubo.tabela(cenario))
+            elif cenario in all_dre_data:
                 dre_df = pd.DataFrame(all_dre_data[cenario])
                 dre_df.index = [f"Ano {ano}" for ano in anos]  # Anos nas linhas primeiro
                 # Transpor: agora anos ficam nas colunas, dados nas linhas
@@ -637,30 +655,34 @@ Base: Sistema 5_Indicadores.py"""
 
         # Análise comparativa detalhada
         if len(comparativo_data) >= 2:
-            lucro_proj = sum(all_dre_data['Projetado']['Lucro Líquido'])
-            lucro_pess = sum(all_dre_data['Pessimista']['Lucro Líquido']) if 'Pessimista' in all_dre_data else lucro_proj
-            lucro_otm = sum(all_dre_data['Otimista']['Lucro Líquido']) if 'Otimista' in all_dre_data else lucro_proj
-            
-            diferenca_pess = ((lucro_pess - lucro_proj) / lucro_proj * 100) if lucro_proj != 0 else 0
-            diferenca_otm = ((lucro_otm - lucro_proj) / lucro_proj * 100) if lucro_proj != 0 else 0
+            lucros = {nome: sum(all_dre_data[nome]['Lucro Líquido']) for nome in nomes_cenarios if nome in all_dre_data}
+            lucro_proj = lucros[base]
+            diferencas = {
+                nome: ((lucro - lucro_proj) / lucro_proj * 100) if lucro_proj != 0 else 0
+                for nome, lucro in lucros.items()
+            }
+            pior = min(lucros, key=lucros.get)
+            melhor = max(lucros, key=lucros.get)
+            linhas_lucro = "\n".join(
+                f"• Cenário {nome}: R$ {lucro:,.0f}" + ("" if nome == base else f" ({diferencas[nome]:+.1f}%)")
+                for nome, lucro in lucros.items()
+            )
             
             comparativo_text = f"""ANÁLISE COMPARATIVA ENTRE CENÁRIOS
 
 📊 IMPACTO FINANCEIRO DOS CENÁRIOS:
 
 💰 LUCRO TOTAL ({len(anos)} ANOS):
-• Cenário Projetado: R$ {lucro_proj:,.0f}
-• Cenário Pessimista: R$ {lucro_pess:,.0f} ({diferenca_pess:+.1f}%)
-• Cenário Otimista: R$ {lucro_otm:,.0f} ({diferenca_otm:+.1f}%)
+{linhas_lucro}
 
-📈 VARIAÇÃO EM RELAÇÃO AO PROJETADO:
-• Impacto Negativo (Pessimista): R$ {abs(lucro_pess - lucro_proj):,.0f}
-• Potencial Positivo (Otimista): R$ {lucro_otm - lucro_proj:,.0f}
-• Amplitude Total: R$ {abs(lucro_otm - lucro_pess):,.0f}
+📈 VARIAÇÃO EM RELAÇÃO AO {base.upper()}:
+• Impacto Negativo (pior cenário, {pior}): R$ {abs(min(lucros[pior] - lucro_proj, 0)):,.0f}
+• Potencial Positivo (melhor cenário, {melhor}): R$ {max(lucros[melhor] - lucro_proj, 0):,.0f}
+• Amplitude Total: R$ {lucros[melhor] - lucros[pior]:,.0f}
 
 ⚠️ ANÁLISE DE RISCO:
-{'• Alto risco: variação pessimista > 20%' if abs(diferenca_pess) > 20 else '• Risco moderado: variação controlada'}
-{'• Grande oportunidade: potencial otimista > 15%' if diferenca_otm > 15 else '• Oportunidade moderada'}
+{'• Alto risco: variação do pior cenário > 20%' if abs(diferencas[pior]) > 20 else '• Risco moderado: variação controlada'}
+{'• Grande oportunidade: potencial do melhor cenário > 15%' if diferencas[melhor] > 15 else '• Oportunidade moderada'}
 
 🎯 RECOMENDAÇÕES ESTRATÉGICAS:
 • Preparar planos de contingência para cenário pessimista
@@ -678,7 +700,7 @@ Base: Sistema 5_Indicadores.py"""
             dre_por_cultura_cenarios = st.session_state.get('dre_por_cultura_cenarios', {})
             
             for cenario in nomes_cenarios:
-                emoji = "📊" if cenario == "Projetado" else "📉" if cenario == "Pessimista" else "📈"
+                emoji = emojis.get(cenario, "📊")
                 
                 if cenario in all_indicators_cultura_cenarios:
                     culturas = list(all_indicators_cultura_cenarios[cenario].keys())
@@ -713,7 +735,12 @@ Base: Sistema 5_Indicadores.py"""
                         st.write(f"     Processando {cultura}...")
                         
                         # DRE da cultura (transposto)
-                        if cenario in dre_por_cultura_cenarios and cultura in dre_por_cultura_cenarios[cenario]:
+                        if cubo is not None and cenario in cubo.cenarios and cultura in cubo.culturas:
+                            criar_slide_com_tabela(
+                                f"{emoji} DRE {cultura} - {cenario}",
+                                cubo.tabela(cenario, cultura, LINHAS_DRE_CULTURA)
+                            )
+                        elif cenario in dre_por_cultura_cenarios and cultura in dre_por_cultura_cenarios[cenario]:
                             dre_cultura = dre_por_cultura_cenarios[cenario][cultura]
                             if dre_cultura:
                                 dre_cultura_df = pd.DataFrame(dre_cultura)
@@ -758,9 +785,14 @@ Base: Sistema 5_Indicadores.py"""
         
         # Fluxo de caixa consolidado (transposto)
         for cenario in nomes_cenarios:
-            emoji = "📊" if cenario == "Projetado" else "📉" if cenario == "Pessimista" else "📈"
+            emoji = emojis.get(cenario, "📊")
             
-            if cenario in all_dre_data:
+            if cubo is not None and cenario in cubo.cenarios:
+                criar_slide_com_tabela(
+                    f"{emoji} Fluxo de Caixa Consolidado - {cenario}",
+                    cubo.tabela(cenario, visao=VISAO_FLUXO_CAIXA_PPT)
+                )
+            elif cenario in all_dre_data:
                 dre_data = all_dre_data[cenario]
                 
                 fluxo_data = {
@@ -798,7 +830,7 @@ Base: Sistema 5_Indicadores.py"""
             receitas_por_cultura_cenarios = st.session_state.get('receitas_por_cultura_cenarios', {})
             
             for cenario in nomes_cenarios:
-                emoji = "📊" if cenario == "Projetado" else "📉" if cenario == "Pessimista" else "📈"
+                emoji = emojis.get(cenario, "📊")
                 
                 if cenario in all_indicators_cultura_cenarios:
                     culturas = list(all_indicators_cultura_cenarios[cenario].keys())
@@ -961,7 +993,7 @@ Possíveis causas:
             # Caso all_indicators_cultura_cenarios não esteja disponível
             st.write("⚠️ Dados de cultura não disponíveis - pulando fluxos de caixa por cultura")
             for cenario in nomes_cenarios:
-                emoji = "📊" if cenario == "Projetado" else "📉" if cenario == "Pessimista" else "📈"
+                emoji = emojis.get(cenario, "📊")
                 criar_slide_texto(f"{emoji} Fluxo de Caixa por Cultura - {cenario}", 
                                 f"""FLUXO DE CAIXA POR CULTURA - {cenario.upper()}
 
@@ -971,7 +1003,7 @@ Para gerar análises detalhadas por cultura, é necessário:
 
 1. Executar o módulo 5_Indicadores completamente
 2. Certificar que existem dados por cultura
-3. Processar todos os cenários (Projetado, Pessimista, Otimista)
+3. Processar todos os cenários da tabela de cenários
 
 Os fluxos consolidados estão disponíveis nos slides anteriores.""")
 
@@ -1120,6 +1152,7 @@ Os fluxos consolidados estão disponíveis nos slides anteriores.""")
         return None
 
 
+@medido()
 def criar_relatorio_ppt(all_indicators, all_dre_data, df_culturas_for_excel, nomes_cenarios, anos, all_indicators_cultura_cenarios=None):
     """
     Função compatível que chama a versão melhorada
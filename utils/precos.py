@@ -0,0 +1,102 @@
+# utils/precos.py
+"""
+Curvas de preço da saca por cultura e ano, importadas de uma tabela (CSV ou Excel).
+
+A tabela tem as colunas Cultura, Ano e Preco (R$/sc) e, opcionalmente, Mes (linhas mensais
+viram a média do ano) e Regiao. "Ano" é o ano-calendário ou o rótulo da projeção ("Ano N").
+Cada curva é interpolada linearmente para os anos da projeção (constante fora do intervalo
+informado) e guardada numa matriz curva × ano indexada por (cultura, região): a consulta por
+(cultura, região, ano) é direta e o preço de todos os plantios sai de um único gather pelas
+linhas dessa matriz. O plantio usa a curva da sua região (campo opcional `regiao`) e, sem ela,
+a curva da cultura sem região.
+
+O Ano 1 da projeção é o menor `ano` dos plantios; sem plantios datados, o primeiro
+ano-calendário da tabela. Assim o resultado não depende da data em que é calculado.
+
+Os preços das curvas são nominais. Como as fórmulas de receita aplicam a inflação de cada
+cenário, eles entram divididos pela inflação base acumulada do ano.
+"""
+import numpy as np
+import pandas as pd
+
+from utils.rotacao import ano_inicial
+
+CHAVE_CURVAS = "curvas_precos"
+COLUNAS_CURVAS = ["Cultura", "Ano", "Preco"]
+COLUNA_REGIAO = "Regiao"
+
+
+def ler_tabela_precos(arquivo):
+    """Lê e valida a tabela de preços (.csv ou .xlsx). Retorna DataFrame em formato longo."""
+    nome = getattr(arquivo, "name", str(arquivo)).lower()
+    tabela = pd.read_csv(arquivo, sep=None, engine="python") if nome.endswith(".csv") else pd.read_excel(arquivo)
+    faltantes = [coluna for coluna in COLUNAS_CURVAS if coluna not in tabela.columns]
+    if faltantes:
+        raise ValueError(f"Colunas obrigatórias ausentes: {', '.join(faltantes)}")
+
+    opcionais = [coluna for coluna in ("Mes", COLUNA_REGIAO) if coluna in tabela.columns]
+    tabela = tabela[COLUNAS_CURVAS + opcionais].dropna(subset=COLUNAS_CURVAS)
+    tabela["Cultura"] = tabela["Cultura"].astype(str).str.strip()
+    if COLUNA_REGIAO in tabela.columns:
+        tabela[COLUNA_REGIAO] = tabela[COLUNA_REGIAO].fillna("").astype(str).str.strip()
+    tabela["Ano"] = tabela["Ano"].astype(str).str.strip().str.removesuffix(".0")
+    tabela["Preco"] = pd.to_numeric(tabela["Preco"], errors="coerce")
+    if tabela["Preco"].isna().any():
+        raise ValueError("A coluna Preco deve conter apenas números.")
+    return tabela.reset_index(drop=True)
+
+
+def ano_calendario(valor, inicio):
+    """Ano-calendário de um valor da coluna Ano (inteiro ou rótulo "Ano N")."""
+    texto = str(valor).strip()
+    if texto.startswith("Ano "):
+        return inicio + int(texto[4:]) - 1
+    return int(float(texto))
+
+
+def inicio_curvas(tabela):
+    """Ano-calendário do Ano 1 quando nenhum plantio tem `ano`: o primeiro ano-calendário da tabela."""
+    calendario = [int(float(valor)) for valor in tabela["Ano"].astype(str).str.strip() if not valor.startswith("Ano ")]
+    return min(calendario) if calendario else 1
+
+
+def curvas_no_horizonte(curvas, anos, inicio=None):
+    """
+    Curvas interpoladas para os anos da projeção: DataFrame (cultura, região) × ano, com
+    `inicio` o ano-calendário do Ano 1 (padrão: o primeiro ano-calendário da tabela).
+    Curvas sem região ficam com região "".
+    """
+    tabela = pd.DataFrame(curvas)
+    indice = pd.MultiIndex.from_arrays([[], []], names=["Cultura", COLUNA_REGIAO])
+    if tabela.empty:
+        return pd.DataFrame(index=indice, columns=anos, dtype=float)
+    inicio = inicio or inicio_curvas(tabela)
+    tabela[COLUNA_REGIAO] = tabela[COLUNA_REGIAO].fillna("") if COLUNA_REGIAO in tabela.columns else ""
+    tabela["Ano"] = [ano_calendario(valor, inicio) for valor in tabela["Ano"]]
+    anuais = tabela.groupby(["Cultura", COLUNA_REGIAO, "Ano"])["Preco"].mean()  # linhas mensais → média do ano
+    grade = np.arange(len(anos)) + inicio
+    chaves, linhas = [], []
+    for chave, serie in anuais.groupby(level=["Cultura", COLUNA_REGIAO]):
+        chaves.append(chave)
+        linhas.append(np.interp(grade, serie.index.get_level_values("Ano"), serie.to_numpy()))
+    return pd.DataFrame(linhas, index=pd.MultiIndex.from_tuples(chaves, names=indice.names), columns=anos)
+
+
+def precos_plantios(plantios, anos, curvas, inflacoes):
+    """
+    Preço da saca de cada plantio em cada ano (plantio × ano), em valores do ano base:
+    a curva da cultura na região do plantio (ou a curva sem região) dividida pela inflação
+    base acumulada, ou o preço cadastrado se a cultura não tem curva.
+    """
+    precos = np.repeat(np.array([p.get("preco_saca", 0) for p in plantios.values()], dtype=float)[:, None], len(anos), axis=1)
+    if not curvas or not plantios:
+        return precos
+    tabela = curvas_no_horizonte(curvas, anos, ano_inicial(plantios))
+    culturas = [p.get("cultura", "") for p in plantios.values()]
+    regionais = tabela.index.get_indexer([(c, str(p.get("regiao") or "").strip()) for c, p in zip(culturas, plantios.values())])
+    gerais = tabela.index.get_indexer([(c, "") for c in culturas])
+    linhas = np.where(regionais >= 0, regionais, gerais)
+    com_curva = linhas >= 0
+    fatores = np.cumprod(1 + np.asarray(inflacoes[:len(anos)], dtype=float) / 100)
+    precos[com_curva] = tabela.to_numpy(dtype=float)[linhas[com_curva]] / fatores
+    return precos
@@ -0,0 +1,203 @@
+# utils/projecao.py
+import numpy as np
+import pandas as pd
+
+from utils.agenda import fatores_agendados, fatores_grupos, grupos_agenda
+from utils.cenarios import fatores_inflacao_cenarios, nomes_cenarios, parametros_cenarios
+from utils.emprestimos import parcelas_anuais, parcelas_por_linha
+from utils.inflacao import tabela_indices
+from utils.perf import medido
+from utils.precos import precos_plantios
+from utils.receitas import receitas_adicionais_por_ano, receitas_adicionais_projetadas
+from utils.rotacao import por_cultura_e_ano, rateio_por_ano, receita_plantio_por_ano
+
+
+def calcular_areas_por_cultura(plantios):
+    """Soma a área plantada por cultura e retorna (areas_por_cultura, area_total)."""
+    areas_por_cultura = {}
+    area_total = 0
+
+    for plantio in plantios.values():
+        cultura = plantio.get('cultura', '')
+        hectares = plantio.get('hectares', 0)
+
+        if cultura and hectares > 0:
+            if cultura not in areas_por_cultura:
+                areas_por_cultura[cultura] = 0
+            areas_por_cultura[cultura] += hectares
+            area_total += hectares
+
+    return areas_por_cultura, area_total
+
+
+@medido()
+def projetar_despesas(despesas, emprestimos, plantios, anos, inflacoes, indices=None, indices_por_categoria=None):
+    """
+    Projeta despesas e empréstimos para os anos da projeção.
+    Cada despesa é corrigida pelo seu índice de inflação (`indices`: {nome: taxas %}, além do
+    Geral = `inflacoes`; ver utils.inflacao). Sem índices nomeados, todas usam `inflacoes`.
+    Despesas com agenda (utils.agenda) só entram nos anos em que ocorrem.
+    Retorna (df_fluxo, custos_por_cultura, rateio_percentual, areas_por_cultura).
+    """
+    indices = tabela_indices(inflacoes, indices)
+    fatores = np.zeros((0, len(anos)))  # (despesa, ano), zero fora da agenda
+
+    # --- PROJEÇÃO GERAL ---
+    df_fluxo = pd.DataFrame(columns=anos)
+
+    if despesas:
+        df_desp = pd.DataFrame(despesas)
+
+        if not df_desp.empty and "Despesa" in df_desp.columns and "Valor" in df_desp.columns:
+            fatores = fatores_agendados(df_desp, indices, len(anos), indices_por_categoria)
+            valores = df_desp['Valor'].to_numpy(dtype=float)[:, None] * fatores
+            nomes = df_desp['Despesa'].astype(str).str.strip()
+            df_fluxo = pd.DataFrame(valores, index=nomes.to_numpy(), columns=anos).groupby(level=0).sum()
+
+    parcelas_emprestimos = parcelas_anuais(emprestimos, anos) if emprestimos else np.zeros((0, len(anos)))
+    for linha, valores in parcelas_por_linha(emprestimos or [], parcelas_emprestimos).items():
+        df_fluxo.loc[linha] = valores
+
+    df_fluxo.index.name = "Despesa"
+
+    # --- PROJEÇÃO POR CULTURA (com rateio administrativo) ---
+    # Área ocupada por cultura em cada ano (rotação); o rateio administrativo de cada ano segue essa área
+    culturas = [c for c in dict.fromkeys(p.get('cultura', '') for p in (plantios or {}).values()) if c]
+    area, _, _ = por_cultura_e_ano(plantios or {}, culturas, anos)
+    culturas = [c for c, a in zip(culturas, area.sum(axis=1)) if a > 0]
+    area = area[area.sum(axis=1) > 0]
+    areas_por_cultura = dict(zip(culturas, area.mean(axis=1).tolist()))
+    rateio_percentual = dict(zip(culturas, (area.sum(axis=1) / area.sum()).tolist())) if culturas else {}
+
+    custos_por_cultura = {}
+    if not culturas:
+        return df_fluxo, custos_por_cultura, rateio_percentual, areas_por_cultura
+    rateio_ano = rateio_por_ano(plantios, culturas, anos)  # (cultura, ano)
+    posicao = {c: i for i, c in enumerate(culturas)}
+
+    # Linhas na ordem em que aparecem: (nome, centro) → (centro ou None se rateada, valores por ano)
+    linhas = {}
+
+    def acumular(chave, centro, valores, substituir=False):
+        if substituir or chave not in linhas:
+            linhas[chave] = (centro, valores)  # reatribuir mantém a posição original da linha
+        else:
+            linhas[chave] = (centro, linhas[chave][1] + valores)
+
+    for despesa, fator in zip(despesas or [], fatores):
+        centro_custo = despesa.get('Centro_Custo', 'Administrativo')
+        if centro_custo == 'Administrativo':
+            acumular((f"{despesa['Despesa']} (Rateio Adm.)", None), None, despesa['Valor'] * fator)
+        elif centro_custo in posicao:
+            # Despesa direta: um cadastro repetido com o mesmo nome substitui o anterior
+            acumular((despesa['Despesa'], centro_custo), centro_custo, despesa['Valor'] * fator, substituir=True)
+
+    for emp, parcelas in zip(emprestimos or [], parcelas_emprestimos):
+        centro_custo = emp.get('centro_custo', 'Administrativo')
+        if centro_custo == 'Administrativo':
+            acumular((f"Empréstimo: {emp['objeto']} (Rateio Adm.)", None), None, np.asarray(parcelas, dtype=float))
+        elif centro_custo in posicao:
+            acumular((f"Empréstimo: {emp['objeto']}", centro_custo), centro_custo, np.asarray(parcelas, dtype=float))
+
+    chaves = list(linhas)
+    centros = np.array([linhas[k][0] or "" for k in chaves], dtype=object)
+    valores = np.array([linhas[k][1] for k in chaves]).reshape(len(chaves), len(anos))
+    rateada = centros == ""
+    for cultura, c in posicao.items():
+        # Linhas rateadas recebem a participação do ano; diretas, integralmente
+        mascara = rateada | (centros == cultura)
+        pesos = np.where(rateada[mascara, None], rateio_ano[c][None, :], 1.0)
+        custos_por_cultura[cultura] = pd.DataFrame(
+            valores[mascara] * pesos,
+            index=[chaves[k][0] for k in np.flatnonzero(mascara)],
+            columns=anos
+        )
+
+    return df_fluxo, custos_por_cultura, rateio_percentual, areas_por_cultura
+
+
+@medido()
+def fluxo_despesas_cenarios(despesas, emprestimos, anos, inflacoes, cenarios, indices=None, indices_por_categoria=None):
+    """
+    Linhas do fluxo de `projetar_despesas` em cada cenário: {linha: array (cenário × ano)}.
+    Mesmas regras do DRE: o desvio de inflação (p.p.) desloca o índice ou o crescimento
+    próprio de cada despesa, e o ajuste de despesas multiplica despesas e parcelas.
+    """
+    parametros = parametros_cenarios(cenarios)
+    n_cenarios, n_anos = len(parametros["despesas"]), len(anos)
+    linhas = {}
+
+    df_desp = pd.DataFrame(despesas or [])
+    if not df_desp.empty and "Despesa" in df_desp.columns and "Valor" in df_desp.columns:
+        grupos, taxas, mascaras = grupos_agenda(df_desp, tabela_indices(inflacoes, indices), n_anos, indices_por_categoria)
+        nomes, linha = np.unique(df_desp["Despesa"].astype(str).str.strip().to_numpy(), return_inverse=True)
+        pesos = np.zeros((len(nomes), len(taxas)))  # (linha × grupo de agenda)
+        np.add.at(pesos, (linha.reshape(-1), grupos), df_desp["Valor"].to_numpy(dtype=float))
+        fatores = fatores_grupos(taxas, mascaras, parametros["inflacao"][:, None, None])
+        linhas.update(zip(nomes, np.einsum("ng,sgy->nsy", pesos, fatores)))
+
+    parcelas_emprestimos = parcelas_anuais(emprestimos, anos) if emprestimos else np.zeros((0, n_anos))
+    for nome, valores in parcelas_por_linha(emprestimos or [], parcelas_emprestimos).items():
+        linhas[nome] = np.broadcast_to(valores, (n_cenarios, n_anos))
+
+    return {nome: valores * parametros["despesas"][:, None] for nome, valores in linhas.items()}
+
+
+def calcular_totais_plantio(plantios):
+    """Retorna (hectares_total, total_sacas, preco_total) somando todos os plantios."""
+    total_sacas = preco_total = hectares_total = 0
+
+    for p_data in plantios.values():
+        hectares = p_data.get("hectares", 0)
+        sacas = p_data.get("sacas_por_hectare", 0)
+        preco = p_data.get("preco_saca", 0)
+        hectares_total += hectares
+        total_sacas += sacas * hectares
+        preco_total += preco * sacas * hectares
+
+    return hectares_total, total_sacas, preco_total
+
+
+@medido()
+def calcular_receitas_cenarios(plantios, receitas_adicionais, anos, inflacoes, cenarios, curvas=None):
+    """
+    Calcula a receita estimada de todos os cenários da tabela `cenarios` de uma vez
+    e as receitas adicionais projetadas (com a inflação base).
+    Culturas com curva de preço (`curvas`, ver utils.precos) usam o preço da curva em cada ano.
+    Retorna (receitas, receitas_extras).
+    """
+    parametros = parametros_cenarios(cenarios)
+    fatores_cenarios = fatores_inflacao_cenarios(inflacoes, len(anos), cenarios)
+
+    # Receitas adicionais sem inflação (a inflação de cada cenário é aplicada abaixo)
+    operacional, _ = receitas_adicionais_por_ano(receitas_adicionais, anos)
+    receitas_extras = receitas_adicionais_projetadas(receitas_adicionais, anos, inflacoes)
+
+    # Receita de plantio (só nos anos que cada plantio ocupa) com ajustes de preço e produtividade,
+    # mais as receitas operacionais
+    precos = precos_plantios(plantios, anos, curvas, inflacoes) if curvas else None
+    receita_plantio = receita_plantio_por_ano(plantios, anos, precos)[None, :] * (parametros["preco"] * parametros["produtividade"])[:, None]
+    valores = (receita_plantio + operacional[None, :]) * fatores_cenarios * parametros["receita"][:, None]
+    receitas = dict(zip(nomes_cenarios(cenarios), valores.tolist()))
+
+    return receitas, receitas_extras
+
+
+@medido()
+def calcular_receitas_por_cultura_cenarios(plantios, culturas, anos, inflacoes, cenarios, curvas=None):
+    """Calcula a receita de cada cultura (restrita a `culturas`) para todos os cenários da tabela."""
+    parametros = parametros_cenarios(cenarios)
+    fatores_cenarios = fatores_inflacao_cenarios(inflacoes, len(anos), cenarios)
+    fator = parametros["preco"] * parametros["produtividade"] * parametros["receita"]
+
+    presentes = [c for c in dict.fromkeys(p.get('cultura', '') for p in plantios.values()) if c and c in culturas]
+    precos = precos_plantios(plantios, anos, curvas, inflacoes) if curvas else None
+    _, _, receita_base = por_cultura_e_ano(plantios, presentes, anos, precos)  # (cultura, ano)
+
+    return {
+        nome: {
+            cultura: dict(zip(anos, (receita_base[i] * fator[s] * fatores_cenarios[s]).tolist()))
+            for i, cultura in enumerate(presentes)
+        }
+        for s, nome in enumerate(nomes_cenarios(cenarios))
+    }
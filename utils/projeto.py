@@ -0,0 +1,97 @@
+# utils/projeto.py
+"""
+Projeto salvo como pacote Parquet: um .zip com um arquivo Parquet por cadastro (plantios,
+receitas adicionais, despesas, empréstimos e curvas de preço) e um JSON com as configurações
+(cenários, inflação, índices, regime tributário, calendários das culturas e regras de
+categorização).
+
+Cadastros guardados como dicionário (plantios, receitas) levam o identificador na coluna
+"_id". Campos opcionais ausentes num registro voltam ausentes e listas voltam como listas,
+então abrir o pacote reproduz a sessão que o gerou. Uma coluna com tipos misturados (ex.:
+"Conta" com códigos numéricos e alfanuméricos) vai para o Parquet como texto.
+"""
+import io
+import json
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+from utils.categorizacao import CHAVE_REGRAS
+from utils.cenarios import CHAVE_CENARIOS
+from utils.fluxo_mensal import CHAVE_CALENDARIOS
+from utils.impostos import CHAVE_IMPOSTOS
+from utils.inflacao import CHAVE_INDICES, CHAVE_INDICES_CATEGORIA
+from utils.precos import CHAVE_CURVAS
+from utils.session import carregar_na_sessao
+
+COLUNA_ID = "_id"
+CADASTROS_DICIONARIO = ["plantios", "receitas_adicionais"]
+CADASTROS_LISTA = ["despesas", "emprestimos", CHAVE_CURVAS]
+CONFIGURACOES = [
+    "pess_receita", "pess_despesas", "otm_receita", "otm_despesas", *[f"inf_{i}" for i in range(5)],
+    CHAVE_CENARIOS, CHAVE_INDICES, CHAVE_INDICES_CATEGORIA, CHAVE_IMPOSTOS, CHAVE_CALENDARIOS, CHAVE_REGRAS,
+]
+CHAVES_PROJETO = CADASTROS_DICIONARIO + CADASTROS_LISTA + CONFIGURACOES
+ARQUIVO_CONFIGURACOES = "configuracoes.json"
+
+
+def _para_parquet(registros):
+    tabela = pd.DataFrame(registros)
+    for coluna in tabela.columns[tabela.dtypes == object]:
+        # O Arrow exige um tipo por coluna: escalares de tipos diferentes viram texto
+        tipos = set(map(type, tabela[coluna].dropna()))
+        if len(tipos) > 1 and not tipos & {list, dict, np.ndarray}:
+            tabela[coluna] = tabela[coluna].where(tabela[coluna].isna(), tabela[coluna].astype(str))
+    buffer = io.BytesIO()
+    tabela.to_parquet(buffer, index=False)
+    return buffer.getvalue()
+
+
+def _registros(dados):
+    """Registros de um Parquet, sem os campos nulos e com listas no lugar de arrays."""
+    return [
+        {campo: valor.tolist() if isinstance(valor, np.ndarray) else valor
+         for campo, valor in registro.items()
+         if isinstance(valor, np.ndarray) or pd.notna(valor)}
+        for registro in pd.read_parquet(io.BytesIO(dados)).to_dict(orient="records")
+    ]
+
+
+def exportar_projeto(estado):
+    """Bytes do pacote (.zip) com os cadastros e as configurações da sessão."""
+    buffer = io.BytesIO()
+    # Parquet já é comprimido: o zip só agrupa os arquivos
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as pacote:
+        for nome in CADASTROS_DICIONARIO:
+            registros = [{COLUNA_ID: chave, **registro} for chave, registro in (estado.get(nome) or {}).items()]
+            pacote.writestr(f"{nome}.parquet", _para_parquet(registros))
+        for nome in CADASTROS_LISTA:
+            pacote.writestr(f"{nome}.parquet", _para_parquet(estado.get(nome) or []))
+        configuracoes = {chave: estado[chave] for chave in CONFIGURACOES if chave in estado}
+        pacote.writestr(ARQUIVO_CONFIGURACOES, json.dumps(configuracoes, ensure_ascii=False, default=float))
+    return buffer.getvalue()
+
+
+def importar_projeto(arquivo, estado):
+    """Substitui os cadastros e as configurações de `estado` pelos do pacote."""
+    with zipfile.ZipFile(arquivo) as pacote:
+        nomes = set(pacote.namelist())
+        ler = lambda nome: _registros(pacote.read(f"{nome}.parquet")) if f"{nome}.parquet" in nomes else []
+        dados = {
+            nome: {registro.pop(COLUNA_ID): registro for registro in ler(nome)} for nome in CADASTROS_DICIONARIO
+        }
+        dados.update({nome: ler(nome) for nome in CADASTROS_LISTA})
+        configuracoes = json.loads(pacote.read(ARQUIVO_CONFIGURACOES)) if ARQUIVO_CONFIGURACOES in nomes else {}
+    if CHAVE_CALENDARIOS in configuracoes:
+        # O JSON guarda os meses como texto
+        configuracoes[CHAVE_CALENDARIOS] = {
+            cultura: {tipo: {int(mes): peso for mes, peso in pesos.items()} for tipo, pesos in tipos.items()}
+            for cultura, tipos in configuracoes[CHAVE_CALENDARIOS].items()
+        }
+
+    carregar_na_sessao(dados, estado)
+    estado[CHAVE_CURVAS] = dados[CHAVE_CURVAS]
+    for chave, valor in configuracoes.items():
+        estado[chave] = valor
+    return dados
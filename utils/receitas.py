@@ -0,0 +1,41 @@
+# utils/receitas.py
+"""
+Receitas adicionais (arrendamentos, serviços, bonificações, vendas de ativos...).
+
+O cadastro guarda `anos_aplicacao` como a lista de rótulos escolhidos ("Ano 1", ...). Para a
+projeção, o cadastro inteiro vira uma máscara booleana (receita × ano) e os totais de cada
+categoria saem de um único produto matricial (categoria × receita) @ (receita × ano).
+Operacional segue a inflação (de cada cenário, nas fórmulas de receita); Extra Operacional
+entra pelo valor nominal.
+"""
+import numpy as np
+import pandas as pd
+
+CATEGORIAS_RECEITA = ["Operacional", "Extra Operacional"]
+
+
+def mascaras_receitas(receitas_adicionais, anos):
+    """Máscara (receita × ano) com True nos anos de aplicação de cada receita."""
+    indice_anos = pd.Index(anos)
+    mascaras = np.zeros((len(receitas_adicionais or {}), len(anos)), dtype=bool)
+    for linha, receita in enumerate((receitas_adicionais or {}).values()):
+        colunas = indice_anos.get_indexer(list(receita.get("anos_aplicacao", [])))
+        mascaras[linha, colunas[colunas >= 0]] = True  # anos fora da projeção são ignorados
+    return mascaras
+
+
+def receitas_adicionais_por_ano(receitas_adicionais, anos):
+    """Receitas adicionais sem inflação por ano: (operacional, extra_operacional)."""
+    receitas = list((receitas_adicionais or {}).values())
+    valores = np.array([receita.get("valor", 0) for receita in receitas], dtype=float)
+    operacional = np.array([receita.get("categoria") == "Operacional" for receita in receitas], dtype=bool)
+    pesos = np.stack([operacional, ~operacional]) * valores  # (categoria × receita)
+    totais = pesos @ mascaras_receitas(receitas_adicionais, anos)
+    return totais[0], totais[1]
+
+
+def receitas_adicionais_projetadas(receitas_adicionais, anos, inflacoes):
+    """Receitas adicionais com a inflação base: {"Operacional": [...], "Extra Operacional": [...]}."""
+    operacional, extra_operacional = receitas_adicionais_por_ano(receitas_adicionais, anos)
+    fatores = np.cumprod(1 + np.asarray(inflacoes[:len(anos)], dtype=float) / 100)
+    return dict(zip(CATEGORIAS_RECEITA, [(operacional * fatores).tolist(), extra_operacional.tolist()]))
@@ -0,0 +1,155 @@
+# utils/relatorio_excel.py
+import re
+
+import numpy as np
+import pandas as pd
+from io import BytesIO
+
+from utils.cubo import VISAO_FLUXO_CAIXA
+from utils.perf import medido
+
+CARACTERES_INVALIDOS_ABA = re.compile(r"[\[\]:*?/\\]")
+
+
+def _nome_aba(nome, usados):
+    """Ajusta o nome ao limite do Excel (31 caracteres, sem []:*?/\\) e evita repetição."""
+    base = CARACTERES_INVALIDOS_ABA.sub("_", str(nome))[:31]
+    candidato, n = base, 2
+    while candidato.lower() in usados:
+        sufixo = f"~{n}"
+        candidato = base[:31 - len(sufixo)] + sufixo
+        n += 1
+    usados.add(candidato.lower())
+    return candidato
+
+
+@medido()
+def criar_relatorio_excel_completo(all_indicators, all_dre_data, df_culturas_for_excel, nomes_cenarios, anos, all_indicators_cultura_cenarios=None, fluxo_consolidado=None, fluxos_por_cultura=None, estado=None, cubo=None):
+    """
+    Monta o relatório Excel completo (indicadores, DREs, fluxos e cadastros).
+    `estado` é o session_state (ou um dict equivalente) de onde vêm os cadastros.
+    Com `cubo`, DREs e fluxos consolidados são escritos direto das visões do cubo de resultados.
+    """
+    estado = estado if estado is not None else {}
+    output_excel = BytesIO()
+    abas = set()
+    
+    with pd.ExcelWriter(output_excel, engine="xlsxwriter") as writer:
+        # === DADOS GERAIS POR CENÁRIO ===
+        for cenario in nomes_cenarios:
+            # Indicadores gerais
+            indicators_df_for_excel = pd.DataFrame({
+                k: v for k, v in all_indicators[cenario].items()
+                if k not in ["CAGR Receita (%)", "CAGR Lucro Líquido (%)"]
+            }, index=anos)
+            cagr_row_data = [all_indicators[cenario]["CAGR Receita (%)"], all_indicators[cenario]["CAGR Lucro Líquido (%)"]] + \
+                            [np.nan] * (len(indicators_df_for_excel.columns) - 2)
+            cagr_row = pd.Series(cagr_row_data, index=indicators_df_for_excel.columns, name="CAGR")
+            indicators_df_for_excel = pd.concat([indicators_df_for_excel, pd.DataFrame(cagr_row).T])
+            indicators_df_for_excel.to_excel(writer, sheet_name=_nome_aba(f"Indicadores_Geral_{cenario}", abas))
+
+            # DRE geral
+            if cubo is not None:
+                df_dre_for_excel = cubo.tabela(cenario)
+            else:
+                df_dre_for_excel = pd.DataFrame(all_dre_data[cenario], index=anos).T
+            df_dre_for_excel.to_excel(writer, sheet_name=_nome_aba(f"DRE_Geral_{cenario}", abas))
+
+        # === DADOS POR CULTURA E CENÁRIO ===
+        if all_indicators_cultura_cenarios:
+            for cenario_name in nomes_cenarios:
+                if cenario_name in all_indicators_cultura_cenarios:
+                    for cultura, indicators_cultura in all_indicators_cultura_cenarios[cenario_name].items():
+                        # Indicadores por cultura e cenário
+                        df_cultura_indicators = pd.DataFrame({
+                            k: v for k, v in indicators_cultura.items()
+                            if k not in ["CAGR Receita (%)", "CAGR Lucro Líquido (%)"]
+                        }, index=anos)
+                        
+                        # Adicionar CAGR
+                        cagr_cultura_data = [indicators_cultura["CAGR Receita (%)"], indicators_cultura["CAGR Lucro Líquido (%)"]] + \
+                                           [np.nan] * (len(df_cultura_indicators.columns) - 2)
+                        cagr_cultura_row = pd.Series(cagr_cultura_data, index=df_cultura_indicators.columns, name="CAGR")
+                        df_cultura_indicators = pd.concat([df_cultura_indicators, pd.DataFrame(cagr_cultura_row).T])
+                        df_cultura_indicators.to_excel(writer, sheet_name=_nome_aba(f"Indicadores_{cultura}_{cenario_name}", abas))
+        
+        # === NOVOS DADOS: FLUXOS DE CAIXA ===
+        if cubo is not None:
+            for cenario in nomes_cenarios:
+                df_fluxo = cubo.tabela(cenario, visao=VISAO_FLUXO_CAIXA)
+                df_fluxo.to_excel(writer, sheet_name=_nome_aba(f'FluxoCaixa_Geral_{cenario}', abas), index=True)
+        elif fluxo_consolidado:
+            for cenario, fluxo_data in fluxo_consolidado.items():
+                df_fluxo = pd.DataFrame(fluxo_data, index=anos).T
+                df_fluxo.to_excel(writer, sheet_name=_nome_aba(f'FluxoCaixa_Geral_{cenario}', abas), index=True)
+        
+        if fluxos_por_cultura:
+            for cultura, fluxo_data in fluxos_por_cultura.items():
+                df_fluxo_cultura = pd.DataFrame(fluxo_data, index=anos).T
+                df_fluxo_cultura.to_excel(writer, sheet_name=_nome_aba(f'FluxoCaixa_{cultura}', abas), index=True)
+            
+            # Criar comparativo de fluxos por cultura
+            comparativo_fluxos = []
+            for cultura, fluxo_data in fluxos_por_cultura.items():
+                total_fluxo = sum(fluxo_data["(=) FLUXO DE CAIXA LÍQUIDO"])
+                media_anual = total_fluxo / len(anos)
+                
+                hectares = sum(
+                    plantio.get('hectares', 0) 
+                    for plantio_nome, plantio in estado.get('plantios', {}).items() 
+                    if plantio.get('cultura') == cultura
+                )
+                
+                comparativo_fluxos.append({
+                    'Cultura': cultura,
+                    'Area_ha': hectares,
+                    'Fluxo_Total_5anos': total_fluxo,
+                    'Fluxo_Medio_Anual': media_anual,
+                    'Fluxo_por_Hectare_Ano': media_anual / hectares if hectares > 0 else 0
+                })
+            
+            if comparativo_fluxos:
+                df_comparativo_fluxos = pd.DataFrame(comparativo_fluxos)
+                df_comparativo_fluxos.to_excel(writer, sheet_name=_nome_aba('Comparativo_FluxoCaixa_Culturas', abas), index=False)
+        
+        # === DADOS EXISTENTES ===
+        if estado.get('custos_por_cultura'):
+            for cultura, df_cultura in estado['custos_por_cultura'].items():
+                if not df_cultura.empty:
+                    df_cultura.to_excel(writer, sheet_name=_nome_aba(f'Custos_{cultura}', abas), index=True)
+        
+        if estado.get('fluxo_caixa') is not None and not estado['fluxo_caixa'].empty:
+            df_fluxo_despesas = estado['fluxo_caixa'].copy()
+            df_fluxo_despesas.to_excel(writer, sheet_name=_nome_aba('Fluxo_Despesas', abas), index=True)
+        
+        if estado.get('despesas'):
+            df_despesas_cadastradas = pd.DataFrame(estado['despesas'])
+            df_despesas_cadastradas.to_excel(writer, sheet_name=_nome_aba('Despesas_Cadastradas', abas), index=False)
+
+        if estado.get('emprestimos'):
+            df_emprestimos_cadastrados = pd.DataFrame(estado['emprestimos'])
+            df_emprestimos_cadastrados.to_excel(writer, sheet_name=_nome_aba('Emprestimos_Cadastrados', abas), index=False)
+        
+        if estado.get('plantios'):
+            plantios_list = []
+            for nome, dados in estado['plantios'].items():
+                plantio_row = {'Nome': nome}
+                plantio_row.update(dados)
+                if isinstance(plantio_row.get('anos'), list):
+                    plantio_row['anos'] = ", ".join(plantio_row['anos'])
+                plantios_list.append(plantio_row)
+            df_plantios = pd.DataFrame(plantios_list)
+            df_plantios.to_excel(writer, sheet_name=_nome_aba('Plantios_Cadastrados', abas), index=False)
+        
+        # Receita por Cultura
+        df_culturas_for_excel.to_excel(writer, sheet_name=_nome_aba("Receita_por_Cultura", abas), index=False)
+        
+        # Configurações
+        df_config = pd.DataFrame({
+            'Ano': anos,
+            'Inflacao (%)': estado.get('inflacoes', [4.0] * len(anos))
+        })
+        df_config.to_excel(writer, sheet_name=_nome_aba('Configuracoes_Inflacao', abas), index=False)
+
+    output_excel.seek(0)
+    return output_excel
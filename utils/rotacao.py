@@ -0,0 +1,136 @@
+# utils/rotacao.py
+"""
+Rotação de culturas: em quais anos da projeção cada plantio ocupa o seu talhão.
+
+Cada plantio guarda apenas os anos que ocupa (`anos`, rótulos "Ano N", como as receitas
+adicionais) além do talhão e da safra (Safra/Safrinha). Essas listas são as coordenadas de
+uma matriz esparsa plantio × ano; a matriz densa (pequena) é montada uma vez e receitas,
+áreas e rateios saem de produtos matriciais.
+
+Plantios antigos, sem `anos`, ocupam do seu `ano` em diante, contando o Ano 1 como o menor
+`ano` cadastrado. Se todos têm o mesmo `ano`, repetem-se em todos os anos, como antes.
+"""
+import numpy as np
+import pandas as pd
+
+SAFRAS = ["Safra", "Safrinha"]
+
+
+def ano_inicial(plantios):
+    """Ano-calendário correspondente ao Ano 1 da projeção (menor `ano` cadastrado)."""
+    anos = [int(p["ano"]) for p in plantios.values() if p.get("ano") is not None]
+    return min(anos) if anos else None
+
+
+def indices_ocupados(plantio, anos, inicio):
+    """Posições (em `anos`) ocupadas pelo plantio."""
+    if "anos" in plantio:
+        return [anos.index(ano) for ano in plantio["anos"] if ano in anos]
+    if inicio is None:
+        return list(range(len(anos)))
+    deslocamento = int(plantio.get("ano") or inicio) - inicio
+    return list(range(max(deslocamento, 0), len(anos)))
+
+
+def coordenadas_ocupacao(plantios, anos):
+    """Coordenadas (linha do plantio, coluna do ano) da matriz esparsa de ocupação."""
+    inicio = ano_inicial(plantios)
+    linhas, colunas = [], []
+    for i, plantio in enumerate(plantios.values()):
+        ocupados = indices_ocupados(plantio, anos, inicio)
+        linhas.extend([i] * len(ocupados))
+        colunas.extend(ocupados)
+    return np.asarray(linhas, dtype=int), np.asarray(colunas, dtype=int)
+
+
+def matriz_ocupacao(plantios, anos):
+    """Matriz (plantio × ano) com 1 onde o plantio ocupa o ano, na ordem de `plantios`."""
+    matriz = np.zeros((len(plantios), len(anos)))
+    linhas, colunas = coordenadas_ocupacao(plantios, anos)
+    matriz[linhas, colunas] = 1.0
+    return matriz
+
+
+def atributos_plantios(plantios):
+    """Arrays (plantio,) de área, sacas (área × produtividade) e receita base (sacas × preço)."""
+    hectares = np.array([p.get("hectares", 0) for p in plantios.values()], dtype=float)
+    sacas = hectares * np.array([p.get("sacas_por_hectare", 0) for p in plantios.values()], dtype=float)
+    receita = sacas * np.array([p.get("preco_saca", 0) for p in plantios.values()], dtype=float)
+    return hectares, sacas, receita
+
+
+def indicadora_culturas(plantios, culturas):
+    """Matriz (cultura × plantio) com 1 onde o plantio é da cultura."""
+    nomes = np.array([p.get("cultura", "") for p in plantios.values()], dtype=object)
+    return (np.asarray(list(culturas), dtype=object)[:, None] == nomes[None, :]).astype(float)
+
+
+def receita_plantios(plantios, anos, precos=None):
+    """
+    Receita base (sem inflação nem ajustes) de cada plantio em cada ano (plantio × ano).
+    `precos` (plantio × ano) substitui o preço cadastrado (ver utils.precos).
+    """
+    _, sacas, receita = atributos_plantios(plantios)
+    por_ano = receita[:, None] if precos is None else sacas[:, None] * np.asarray(precos, dtype=float)
+    return por_ano * matriz_ocupacao(plantios, anos)
+
+
+def receita_plantio_por_ano(plantios, anos, precos=None):
+    """Receita base (sem inflação nem ajustes) de todos os plantios em cada ano (ano,)."""
+    return receita_plantios(plantios, anos, precos).sum(axis=0) if plantios else np.zeros(len(anos))
+
+
+def por_cultura_e_ano(plantios, culturas, anos, precos=None):
+    """Área, sacas e receita base por cultura e ano: três arrays (cultura × ano)."""
+    if not plantios:
+        vazio = np.zeros((len(culturas), len(anos)))
+        return vazio, vazio.copy(), vazio.copy()
+    ocupacao = matriz_ocupacao(plantios, anos)
+    indicadora = indicadora_culturas(plantios, culturas)
+    hectares, sacas, _ = atributos_plantios(plantios)
+    return (
+        indicadora @ (hectares[:, None] * ocupacao),
+        indicadora @ (sacas[:, None] * ocupacao),
+        indicadora @ receita_plantios(plantios, anos, precos)
+    )
+
+
+def rateio_por_ano(plantios, culturas, anos):
+    """Participação (cultura × ano) de cada cultura na área ocupada em cada ano."""
+    area, _, _ = por_cultura_e_ano(plantios, culturas, anos)
+    total = area.sum(axis=0, keepdims=True)
+    return np.divide(area, total, out=np.zeros_like(area), where=total > 0)
+
+
+def ocupacao_talhoes(plantios, anos):
+    """Ocupação em formato longo: uma linha por talhão, safra, ano e cultura."""
+    linhas, colunas = coordenadas_ocupacao(plantios, anos)
+    ids = list(plantios)
+    return pd.DataFrame(
+        [
+            {
+                "Talhão": plantios[ids[i]].get("talhao") or ids[i],
+                "Safra": plantios[ids[i]].get("safra", SAFRAS[0]),
+                "Ano": anos[j],
+                "Cultura": plantios[ids[i]].get("cultura", ""),
+            }
+            for i, j in zip(linhas, colunas)
+        ],
+        columns=["Talhão", "Safra", "Ano", "Cultura"]
+    )
+
+
+def tabela_rotacao(plantios, anos):
+    """Mapa talhão/safra × ano com a cultura que ocupa cada posição (vazio se livre)."""
+    ocupacao = ocupacao_talhoes(plantios, anos)
+    if ocupacao.empty:
+        return pd.DataFrame(columns=anos)
+    tabela = ocupacao.pivot_table(index=["Talhão", "Safra"], columns="Ano", values="Cultura", aggfunc=" + ".join)
+    return tabela.reindex(columns=anos).fillna("")
+
+
+def conflitos_rotacao(plantios, anos):
+    """Posições (talhão, safra, ano) ocupadas por mais de um plantio."""
+    ocupacao = ocupacao_talhoes(plantios, anos)
+    contagem = ocupacao.groupby(["Talhão", "Safra", "Ano"]).size()
+    return contagem[contagem > 1].index.tolist()
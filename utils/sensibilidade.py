@@ -0,0 +1,126 @@
+# utils/sensibilidade.py
+"""
+Análise de sensibilidade (gráfico tornado).
+
+Cada direcionador (a receita de cada plantio, o total de cada categoria de despesa do DRE e a
+inflação de cada ano, aplicada a todos os índices) é perturbado para baixo e para cima. Preço
+da saca e produtividade entram juntos como "Receita": no modelo os dois só multiplicam a receita
+do plantio, e barras separadas seriam sempre idênticas. Todos os casos perturbados viram
+linhas de um único array (caso × ano) avaliado de uma vez pelo DRE e pelo kernel de indicadores,
+sem recálculos completos um a um.
+"""
+import numpy as np
+import pandas as pd
+
+from utils.agenda import fatores_grupos, grupos_agenda, pesos_categoria_grupo
+from utils.cubo import LINHAS_DRE
+from utils.dre import CATEGORIAS_DRE, dre_vetorizado
+from utils.emprestimos import total_parcelas_por_ano
+from utils.indicadores import INDICADORES, LINHAS_KERNEL, kernel_indicadores
+from utils.inflacao import tabela_indices
+from utils.perf import medido
+from utils.precos import precos_plantios
+from utils.receitas import receitas_adicionais_por_ano
+from utils.rotacao import atributos_plantios, receita_plantio_por_ano, receita_plantios
+
+# Métrica → função sobre (DRE (caso × linha × ano), indicadores (caso × indicador × ano))
+METRICAS_TORNADO = {
+    "Lucro Líquido Total (R$)": lambda dre, ind: dre[:, LINHAS_DRE.index("Lucro Líquido"), :].sum(axis=-1),
+    "Lucro Líquido Último Ano (R$)": lambda dre, ind: dre[:, LINHAS_DRE.index("Lucro Líquido"), -1],
+    "Margem Líquida Média (%)": lambda dre, ind: ind[:, INDICADORES.index("Margem Líquida (%)"), :].mean(axis=-1),
+    "DSCR Mínimo": lambda dre, ind: ind[:, INDICADORES.index("DSCR"), :].min(axis=-1),
+}
+
+
+def direcionadores(plantios, despesas_info, n_anos):
+    """
+    Lista de direcionadores: dicts com nome, tipo e a posição que cada um perturba
+    (plantio, categoria de despesa ou ano de inflação).
+    """
+    lista = []
+    for id_plantio, plantio in plantios.items():
+        rotulo = f"{plantio.get('cultura', '')} ({id_plantio})"
+        lista.append({"Direcionador": f"Receita (preço × produtividade) - {rotulo}", "Tipo": "Receita", "plantio": id_plantio})
+
+    if not despesas_info.empty and {"Categoria", "Valor"} <= set(despesas_info.columns):
+        # Só categorias que entram no DRE (Extra Operacional vem das parcelas de empréstimos)
+        presentes = set(despesas_info["Categoria"])
+        for categoria in CATEGORIAS_DRE.values():
+            if categoria in presentes:
+                lista.append({"Direcionador": f"Despesas - {categoria}", "Tipo": "Despesa", "categoria": categoria})
+
+    for j in range(n_anos):
+        lista.append({"Direcionador": f"Inflação - Ano {j + 1}", "Tipo": "Inflação", "ano": j})
+    return lista
+
+
+@medido()
+def analise_tornado(plantios, receitas_adicionais, despesas_info, emprestimos, anos, inflacoes,
+                    parametros, variacao=10.0, variacao_inflacao=1.0, metrica="Lucro Líquido Total (R$)",
+                    hectares=1.0, total_ativos=1.0, indices=None, indices_por_categoria=None, curvas=None,
+                    impostos=None):
+    """
+    Impacto de cada direcionador na `metrica`, com variação de ±`variacao`% (receita dos plantios,
+    despesas por categoria) e ±`variacao_inflacao` p.p. (inflação). `parametros` são os ajustes de um cenário
+    (um valor de `parametros_cenarios`). Retorna (DataFrame ordenado por amplitude, valor base).
+    """
+    n_anos = len(anos)
+    indices = tabela_indices(inflacoes, indices)
+    grupos, taxas, mascaras = grupos_agenda(despesas_info, indices, n_anos, indices_por_categoria)
+    lista = direcionadores(plantios, despesas_info, n_anos)
+    n_casos = 1 + 2 * len(lista)
+    sinais = np.array([-1.0, 1.0])
+
+    # Receita base de cada plantio nos anos que ocupa (plantio × ano), pelas curvas de preço se houver
+    _, sacas, receita_base = atributos_plantios(plantios)
+    precos = precos_plantios(plantios, anos, curvas, inflacoes) if curvas else None
+    receita_plantio = dict(zip(plantios, receita_plantios(plantios, anos, precos)))
+    categorias = list(CATEGORIAS_DRE.values())
+    pesos = pesos_categoria_grupo(despesas_info, categorias, grupos, len(taxas))  # (categoria, grupo)
+
+    # Caso base (linha 0) e pares baixo/alto de cada direcionador (linhas 1, 2, 3, ...)
+    plantio_casos = np.tile(receita_plantio_por_ano(plantios, anos, precos), (n_casos, 1))
+    pesos_casos = np.tile(pesos, (n_casos, 1, 1))
+    desvio_inflacao = np.zeros((n_casos, n_anos))  # p.p. somados a todas as taxas
+
+    for k, direcionador in enumerate(lista):
+        casos = slice(1 + 2 * k, 3 + 2 * k)
+        if direcionador["Tipo"] == "Receita":
+            plantio_casos[casos] += sinais[:, None] * variacao / 100 * receita_plantio[direcionador["plantio"]]
+        elif direcionador["Tipo"] == "Despesa":
+            # A categoria inteira, em todos os seus grupos de agenda e índice
+            k_categoria = categorias.index(direcionador["categoria"])
+            pesos_casos[casos, k_categoria] += sinais[:, None] * variacao / 100 * pesos[k_categoria]
+        else:
+            desvio_inflacao[casos, direcionador["ano"]] += sinais * variacao_inflacao
+
+    # Fatores (caso, grupo, ano) das despesas; as receitas seguem a inflação geral com o mesmo desvio
+    desvio = parametros["inflacao"] + desvio_inflacao
+    series = np.einsum("ckg,cgy->cky", pesos_casos, fatores_grupos(taxas, mascaras, desvio[:, None, :]))
+    fatores = np.cumprod(1 + (np.asarray(inflacoes[:n_anos], dtype=float) + desvio) / 100, axis=1)
+    operacional, extra_operacional = receitas_adicionais_por_ano(receitas_adicionais, anos)
+    receita = (
+        plantio_casos * parametros["preco"] * parametros["produtividade"] + operacional[None, :]
+    ) * fatores * parametros["receita"]
+
+    dre = dre_vetorizado(
+        receita, np.full(n_casos, parametros["despesas"]),
+        {categoria: series[:, k, :] for k, categoria in enumerate(categorias)},
+        total_parcelas_por_ano(emprestimos, anos), extra_operacional, impostos
+    )
+    preco_medio = receita_base.sum() / max(sacas.sum(), 1e-9)
+    indicadores = kernel_indicadores(dre[:, [LINHAS_DRE.index(l) for l in LINHAS_KERNEL], :], hectares, preco_medio, total_ativos)
+    valores = METRICAS_TORNADO[metrica](dre, indicadores)
+
+    base = float(valores[0])
+    baixo, alto = valores[1::2], valores[2::2]
+    tabela = pd.DataFrame({
+        "Direcionador": [d["Direcionador"] for d in lista],
+        "Tipo": [d["Tipo"] for d in lista],
+        "Baixo": baixo,
+        "Alto": alto,
+        "Impacto Baixo": baixo - base,
+        "Impacto Alto": alto - base,
+    })
+    tabela["Amplitude"] = (tabela["Alto"] - tabela["Baixo"]).abs()
+    return tabela.sort_values("Amplitude", ascending=False).reset_index(drop=True), base
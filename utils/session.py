@@ -2,6 +2,8 @@ import streamlit as st
 import json
 import os
 
+from utils.importacao import CHAVE_IMPORTADOS, CHAVE_LEITURAS
+
 CONFIG_PATH = "config.json"
 
 DEFAULTS = {
@@ -22,3 +24,23 @@ def carregar_configuracoes():
     for key, value in config.items():
         if key not in st.session_state:
             st.session_state[key] = value
+
+
+def carregar_na_sessao(dados, estado=None):
+    """Substitui os cadastros do session_state (ou de `estado`) pelos de `dados` (fazenda gerada ou projeto aberto)."""
+    if estado is None:
+        estado = st.session_state
+
+    estado["plantios"] = dados["plantios"]
+    estado["despesas"] = dados["despesas"]
+    estado["emprestimos"] = dados["emprestimos"]
+    estado["receitas_adicionais"] = dados["receitas_adicionais"]
+    estado["editing_expense_index"] = None
+    estado["editing_loan_index"] = None
+
+    # Resultados derivados dos cadastros antigos deixam de valer, assim como os arquivos
+    # já importados neles e as leituras guardadas
+    # (os nós do grafo de cálculo, utils.pipeline, se invalidam sozinhos pelas entradas)
+    for chave in ["fluxo_caixa", "custos_por_cultura", "rateio_administrativo", CHAVE_IMPORTADOS, CHAVE_LEITURAS]:
+        if chave in estado:
+            del estado[chave]
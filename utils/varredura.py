@@ -0,0 +1,58 @@
+# utils/varredura.py
+"""
+Varredura de parâmetros: avalia uma grade (corte de receita × aumento de despesas)
+numa única chamada vetorizada do DRE, para os mapas de calor da página de cenários.
+"""
+import numpy as np
+import pandas as pd
+
+from utils.cenarios import COLUNA_NOME, COLUNAS_AJUSTE, normalizar_cenarios
+from utils.cubo import LINHAS_DRE
+from utils.dre import despesas_categoria_inflacionadas, dre_vetorizado
+from utils.emprestimos import total_parcelas_por_ano
+from utils.indicadores import dividir
+from utils.perf import medido
+from utils.projecao import calcular_receitas_cenarios
+
+
+@medido()
+def varrer_cenarios(plantios, receitas_adicionais, despesas_info, emprestimos, anos, inflacoes, cortes_receita, aumentos_despesas,
+                    indices=None, indices_por_categoria=None, curvas=None, impostos=None):
+    """
+    DRE de todas as combinações de `cortes_receita` (%) × `aumentos_despesas` (%) sobre o caso base.
+    Retorna {"lucro_final": (corte × aumento), "dscr_minimo": (corte × aumento)}.
+    """
+    cortes = np.asarray(cortes_receita, dtype=float)
+    aumentos = np.asarray(aumentos_despesas, dtype=float)
+    base = normalizar_cenarios([{COLUNA_NOME: "Base", **{c: 0.0 for c in COLUNAS_AJUSTE}}])
+    receitas, receitas_extras = calcular_receitas_cenarios(plantios, receitas_adicionais, anos, inflacoes, base, curvas)
+
+    grade = (len(cortes), len(aumentos))
+    receita = np.asarray(receitas["Base"], dtype=float) * (1 - cortes / 100)[:, None, None]
+    receita = np.broadcast_to(receita, grade + receita.shape[-1:])
+    ajuste = np.broadcast_to((1 + aumentos / 100)[None, :], grade)
+    dre = dre_vetorizado(
+        receita,
+        ajuste,
+        despesas_categoria_inflacionadas(despesas_info, inflacoes, len(anos), indices, indices_por_categoria),
+        total_parcelas_por_ano(emprestimos, anos),
+        receitas_extras["Extra Operacional"],
+        impostos
+    )
+
+    linha = {nome: i for i, nome in enumerate(LINHAS_DRE)}
+    # Sem serviço da dívida, a cobertura é infinita (mesma regra do kernel de indicadores)
+    dscr = dividir(dre[..., linha["Lucro Operacional"], :], dre[..., linha["Despesas Extra Operacional"], :], padrao=np.inf)
+    return {
+        "lucro_final": dre[..., linha["Lucro Líquido"], -1],
+        "dscr_minimo": dscr.min(axis=-1),
+    }
+
+
+def grade_para_tabela(valores, cortes_receita, aumentos_despesas):
+    """Grade (corte × aumento) como DataFrame com rótulos em %."""
+    return pd.DataFrame(
+        valores,
+        index=pd.Index(np.round(cortes_receita, 2), name="Corte de Receita (%)"),
+        columns=pd.Index(np.round(aumentos_despesas, 2), name="Aumento de Despesas (%)")
+    )